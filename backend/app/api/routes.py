@@ -264,6 +264,9 @@ async def import_model_endpoint(request: ModelImportRequest):
                 model_file_url=request.model_file_url
             )
             logger.info(f"✅ Modell {request.model_id} erfolgreich importiert (active_model_id: {active_model_id})")
+            # Modell im Hintergrund aufwärmen
+            from app.prediction.warmup import get_model_warmup
+            await get_model_warmup().schedule_model(active_model_id)
         except ValueError as e:
             # Modell bereits importiert - das sollte nicht passieren, da wir oben prüfen
             logger.error(f"❌ Modell {request.model_id} ist bereits importiert (zweite Prüfung): {e}")
@@ -187,6 +187,11 @@ class HealthResponse(BaseModel):
     uptime_seconds: int
     start_time: Optional[float]
     last_error: Optional[str]
+    models_ready: Optional[int] = Field(None, description="Aufgewärmte Modelle (API-Prozess)")
+    models_warming: Optional[int] = Field(None, description="Modelle im Warm-up")
+    models_warmup_failed: Optional[int] = Field(None, description="Modelle mit fehlgeschlagenem Warm-up")
+    model_readiness: Optional[List[Dict[str, Any]]] = Field(None, description="Warm-up-Status pro Modell")
+    background_job_leaders: Optional[List[Dict[str, Any]]] = Field(None, description="Aktueller Leader pro Hintergrund-Job")
 
 
 class StatsResponse(BaseModel):
@@ -164,18 +164,24 @@ async def evaluate_alert_immediately(alert_id: int, pool: Optional[asyncpg.Pool]
 # Alert-Auswertung (Background-Job)
 # ============================================================
 
-async def evaluate_pending_alerts(batch_size: int = 100, include_non_alerts: bool = True) -> Dict[str, int]:
+async def evaluate_pending_alerts(
+    batch_size: int = 100,
+    include_non_alerts: bool = True,
+    pool: Optional[asyncpg.Pool] = None
+) -> Dict[str, int]:
     """
     Wertet alle ausstehenden Alerts aus (Hintergrund-Job).
     Prüft SOFORT ob Ziel erreicht wurde - kein Warten auf evaluation_timestamp!
     
     Args:
         batch_size: Maximale Anzahl Alerts pro Durchlauf
+        pool: Optional: DB-Pool (z.B. mit DB-Budget des Hintergrund-Schedulers)
         
     Returns:
         Dict mit Statistiken (evaluated, success, failed, expired)
     """
-    pool = await get_pool()
+    if pool is None:
+        pool = await get_pool()
     stats = {'evaluated': 0, 'success': 0, 'failed': 0, 'expired': 0}
     
     # Finde ausstehende Alerts (zeitbasiert) - NUR die, deren evaluation_timestamp erreicht wurde!
@@ -129,7 +129,7 @@ async def check_and_update_ath(alert_id: int, pool: Optional[asyncpg.Pool] = Non
         return None
 
 
-async def evaluate_pending_alerts_ath(batch_size: int = 100) -> Dict[str, int]:
+async def evaluate_pending_alerts_ath(batch_size: int = 100, pool: Optional[asyncpg.Pool] = None) -> Dict[str, int]:
     """
     Prüft alle pending/non_alert Alerts und aktualisiert ATH-Werte.
     Wird alle 30 Sekunden aufgerufen.
@@ -137,7 +137,8 @@ async def evaluate_pending_alerts_ath(batch_size: int = 100) -> Dict[str, int]:
     Returns:
         Dict mit Statistiken
     """
-    pool = await get_pool()
+    if pool is None:
+        pool = await get_pool()
     stats = {'checked': 0, 'ath_updated': 0, 'goal_reached': 0}
     
     # Hole alle pending/non_alert time_based Alerts, deren evaluation_timestamp noch nicht erreicht wurde
@@ -8,12 +8,13 @@ from decimal import Decimal
 import asyncpg
 from app.database.connection import get_pool
 from app.database.models import get_coin_metrics_at_timestamp
+from app.prediction.hot_store import MISS, get_hot_store
 from app.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
 
-async def update_ath_for_active_predictions(batch_size: int = 100) -> Dict[str, int]:
+async def update_ath_for_active_predictions(batch_size: int = 100, pool: Optional[asyncpg.Pool] = None) -> Dict[str, int]:
     """
     Prüft alle 'aktiv' Einträge und aktualisiert ATH Highest/Lowest.
     Wird alle 30 Sekunden aufgerufen.
@@ -23,11 +24,13 @@ async def update_ath_for_active_predictions(batch_size: int = 100) -> Dict[str,
     
     Args:
         batch_size: Anzahl der Einträge pro Batch
+        pool: Optional: DB-Pool (z.B. mit DB-Budget des Hintergrund-Schedulers)
         
     Returns:
         Dict mit Statistiken (checked, updated_highest, updated_lowest)
     """
-    pool = await get_pool()
+    if pool is None:
+        pool = await get_pool()
     
     # Hole alle aktiven Einträge, die noch nicht ausgewertet wurden
     rows = await pool.fetch("""
@@ -70,17 +73,19 @@ async def update_ath_for_active_predictions(batch_size: int = 100) -> Dict[str,
             check_timestamp = min(now, evaluation_timestamp)
             
             # WICHTIG: Hole ALLE Preise zwischen prediction_timestamp und check_timestamp
-            # aus coin_metrics, um den höchsten/niedrigsten Wert zu finden
-            price_history = await pool.fetch("""
-                SELECT 
-                    timestamp,
-                    price_close
-                FROM coin_metrics
-                WHERE mint = $1
-                  AND timestamp >= $2
-                  AND timestamp <= $3
-                ORDER BY timestamp ASC
-            """, coin_id, prediction_timestamp, check_timestamp)
+            # aus coin_metrics, um den höchsten/niedrigsten Wert zu finden (zuerst aus dem Hot-Store)
+            price_history = get_hot_store().price_history(coin_id, prediction_timestamp, check_timestamp)
+            if price_history is MISS:
+                price_history = await pool.fetch("""
+                    SELECT 
+                        timestamp,
+                        price_close
+                    FROM coin_metrics
+                    WHERE mint = $1
+                      AND timestamp >= $2
+                      AND timestamp <= $3
+                    ORDER BY timestamp ASC
+                """, coin_id, prediction_timestamp, check_timestamp)
             
             if not price_history:
                 # Fallback: Hole nur den aktuellen Preis
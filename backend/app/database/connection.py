@@ -6,7 +6,7 @@ Die Datenbank ist EXTERN und wird über DB_DSN konfiguriert.
 """
 import asyncpg
 from typing import Optional
-from app.utils.config import DB_DSN
+from app.utils.config import DB_DSN, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE
 
 # Globaler Connection Pool (wird beim ersten Aufruf erstellt)
 pool: Optional[asyncpg.Pool] = None
@@ -49,8 +49,8 @@ async def get_pool() -> asyncpg.Pool:
 
             pool = await asyncpg.create_pool(
                 DB_DSN,
-                min_size=1,
-                max_size=10,
+                min_size=DB_POOL_MIN_SIZE,
+                max_size=DB_POOL_MAX_SIZE,
                 command_timeout=60,
                 ssl=ssl_config
             )
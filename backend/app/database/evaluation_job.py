@@ -14,7 +14,11 @@ from app.utils.logging_config import get_logger
 logger = get_logger(__name__)
 
 
-async def evaluate_pending_predictions(batch_size: int = 100, per_model_batch_size: int = 50) -> Dict[str, int]:
+async def evaluate_pending_predictions(
+    batch_size: int = 100,
+    per_model_batch_size: int = 50,
+    pool: Optional[asyncpg.Pool] = None
+) -> Dict[str, int]:
     """
     Prüft alle 'aktiv' Einträge und wertet sie aus.
 
@@ -25,11 +29,13 @@ async def evaluate_pending_predictions(batch_size: int = 100, per_model_batch_si
     Args:
         batch_size: Maximale Gesamtanzahl der Einträge (DEPRECATED - wird nicht mehr verwendet)
         per_model_batch_size: Basis für Batch-Größe (Standard: 50, effektiv: 50*10=500)
+        pool: Optional: DB-Pool (z.B. mit DB-Budget des Hintergrund-Schedulers)
 
     Returns:
         Dict mit Statistiken (evaluated, success, failed, not_applicable)
     """
-    pool = await get_pool()
+    if pool is None:
+        pool = await get_pool()
 
     # Hole ALLE ausstehenden Predictions (unabhängig vom Modell-Status)
     # LEFT JOIN: Auch Predictions von gelöschten/inaktiven Modellen werden evaluiert
@@ -6,12 +6,14 @@ CRUD-Operationen für:
 - predictions (Vorhersagen)
 - ml_models (nur lesen, vom Training Service)
 """
-from typing import List, Dict, Optional, Any
+from collections import OrderedDict
+from typing import List, Dict, Mapping, Optional, Any, Tuple
 from datetime import datetime, timedelta, timezone
 import asyncpg
 import json
 from app.database.connection import get_pool
 from app.database.utils import from_jsonb
+from app.utils.config import HISTORY_PREFIX_CACHE_COINS, LATE_ENTRY_WINDOW_SECONDS
 from app.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -295,6 +297,113 @@ async def get_model_from_training_service(model_id: int) -> Optional[Dict[str, A
         logger.warning(f"⚠️ Fehler beim Laden aus lokaler DB (Fallback): {e}")
         return None
 
+# Konfigurations-Spalten von prediction_active_models (ohne Statistiken und Training-Metriken)
+_MODEL_CONFIG_COLUMNS = """
+    id, model_id, model_name, model_type,
+    target_variable, target_operator, target_value,
+    future_minutes, price_change_percent, target_direction,
+    features, phases, params,
+    local_model_path, model_file_url,
+    is_active, last_prediction_at,
+    custom_name, alert_threshold,
+    n8n_webhook_url, n8n_send_mode, n8n_enabled,
+    ignore_bad_seconds, ignore_positive_seconds, ignore_alert_seconds,
+    coin_filter_mode, coin_whitelist,
+    min_scan_interval_seconds,
+    max_log_entries_per_coin_negative, max_log_entries_per_coin_positive, max_log_entries_per_coin_alert,
+    send_ignored_to_n8n
+"""
+
+
+def _model_config_from_row(row) -> Dict[str, Any]:
+    """Wandelt eine prediction_active_models-Zeile in die Modell-Konfiguration um"""
+    # JSONB-Felder konvertieren
+    features = row['features']
+    if isinstance(features, str):
+        features = json.loads(features)
+    
+    phases = row['phases']
+    if phases is not None:
+        if isinstance(phases, str):
+            # Versuche zu parsen (kann JSONB String sein)
+            try:
+                parsed = json.loads(phases)
+                # Falls das Ergebnis noch ein String ist (doppelt escaped), parse erneut
+                if isinstance(parsed, str):
+                    parsed = json.loads(parsed)
+                phases = parsed
+            except (json.JSONDecodeError, TypeError):
+                # Falls Parsing fehlschlägt, setze auf None
+                phases = None
+        # Wenn phases bereits eine Liste ist, behalte sie
+        elif not isinstance(phases, list):
+            # Falls es ein anderer Typ ist (z.B. dict), setze auf None
+            phases = None
+    
+    params = row['params']
+    if params is not None and isinstance(params, str):
+        params = json.loads(params)
+
+    return {
+        'id': row['id'],
+        'model_id': row['model_id'],
+        'name': row['model_name'],
+        'custom_name': row['custom_name'],  # Falls umbenannt
+        'model_type': row['model_type'],
+        'target_variable': row['target_variable'],
+        'target_operator': row['target_operator'],
+        'target_value': float(row['target_value']) if row['target_value'] else None,
+        'future_minutes': row['future_minutes'],
+        'price_change_percent': float(row['price_change_percent']) if row['price_change_percent'] else None,
+        'target_direction': row['target_direction'],
+        'features': features,  # JSONB Array → Python List
+        'phases': phases,  # JSONB Array → Python List (kann None sein)
+        'params': params,  # JSONB Object → Python Dict
+        'local_model_path': row['local_model_path'],
+        'model_file_url': row['model_file_url'],
+        'is_active': row['is_active'],
+        'last_prediction_at': row['last_prediction_at'],
+        'alert_threshold': float(row['alert_threshold']) if row.get('alert_threshold') is not None else 0.7,
+        'n8n_webhook_url': row.get('n8n_webhook_url'),
+        # n8n_send_mode: JSONB Array oder String (für Rückwärtskompatibilität)
+        # asyncpg gibt JSONB als String zurück, daher muss from_jsonb verwendet werden
+        'n8n_send_mode': _parse_send_mode(from_jsonb(row.get('n8n_send_mode', 'all'))),
+        'n8n_enabled': row['n8n_enabled'] if row['n8n_enabled'] is not None else True,
+        # 🔄 Coin-Ignore-Einstellungen
+        'ignore_bad_seconds': row['ignore_bad_seconds'] if row['ignore_bad_seconds'] is not None else 0,
+        'ignore_positive_seconds': row['ignore_positive_seconds'] if row['ignore_positive_seconds'] is not None else 0,
+        'ignore_alert_seconds': row['ignore_alert_seconds'] if row['ignore_alert_seconds'] is not None else 0,
+        # 🔍 Coin-Filter-Einstellungen
+        'coin_filter_mode': row.get('coin_filter_mode') or 'all',
+        'coin_whitelist': json.loads(row['coin_whitelist']) if row.get('coin_whitelist') else None,
+        # ⏱️ Minimaler Scan-Interval
+        'min_scan_interval_seconds': row['min_scan_interval_seconds'] if row.get('min_scan_interval_seconds') is not None else 20,
+        # 📊 Max-Log-Entries-Einstellungen
+        'max_log_entries_per_coin_negative': row['max_log_entries_per_coin_negative'] if row.get('max_log_entries_per_coin_negative') is not None else 0,
+        'max_log_entries_per_coin_positive': row['max_log_entries_per_coin_positive'] if row.get('max_log_entries_per_coin_positive') is not None else 0,
+        'max_log_entries_per_coin_alert': row['max_log_entries_per_coin_alert'] if row.get('max_log_entries_per_coin_alert') is not None else 0,
+        'send_ignored_to_n8n': row.get('send_ignored_to_n8n', False)
+    }
+
+
+async def get_active_model_configs(pool: Optional[asyncpg.Pool] = None) -> List[Dict[str, Any]]:
+    """
+    Lädt nur die Konfiguration der aktiven Modelle - ohne die Statistiken über
+    model_predictions, die get_active_models für API/UI berechnet.
+
+    Für den Hot-Path des Event-Handlers (siehe app/prediction/model_config.py).
+    """
+    if pool is None:
+        pool = await get_pool()
+    rows = await pool.fetch(f"""
+        SELECT {_MODEL_CONFIG_COLUMNS}
+        FROM prediction_active_models
+        WHERE is_active = true
+        ORDER BY created_at DESC
+    """)
+    return [_model_config_from_row(row) for row in rows]
+
+
 async def get_active_models(include_inactive: bool = False) -> List[Dict[str, Any]]:
     """
     Holt alle aktiven Modelle aus prediction_active_models.
@@ -382,60 +491,15 @@ async def get_active_models(include_inactive: bool = False) -> List[Dict[str, An
         stats_dict = {}
         alerts_dict = {}
     
-    import json
     import os
     models = []
     for row in rows:
-        # JSONB-Felder konvertieren
-        features = row['features']
-        if isinstance(features, str):
-            features = json.loads(features)
-        
-        phases = row['phases']
-        if phases is not None:
-            if isinstance(phases, str):
-                # Versuche zu parsen (kann JSONB String sein)
-                try:
-                    parsed = json.loads(phases)
-                    # Falls das Ergebnis noch ein String ist (doppelt escaped), parse erneut
-                    if isinstance(parsed, str):
-                        parsed = json.loads(parsed)
-                    phases = parsed
-                except (json.JSONDecodeError, TypeError):
-                    # Falls Parsing fehlschlägt, setze auf None
-                    phases = None
-            # Wenn phases bereits eine Liste ist, behalte sie
-            elif not isinstance(phases, list):
-                # Falls es ein anderer Typ ist (z.B. dict), setze auf None
-                phases = None
-        
-        params = row['params']
-        if params is not None and isinstance(params, str):
-            params = json.loads(params)
-        
         # Statistiken für dieses Modell
         model_stats = stats_dict.get(row['id'], {})
         model_alerts = alerts_dict.get(row['id'], 0)
         
-        models.append({
-            'id': row['id'],
-            'model_id': row['model_id'],
-            'name': row['model_name'],
-            'custom_name': row['custom_name'],  # Falls umbenannt
-            'model_type': row['model_type'],
-            'target_variable': row['target_variable'],
-            'target_operator': row['target_operator'],
-            'target_value': float(row['target_value']) if row['target_value'] else None,
-            'future_minutes': row['future_minutes'],
-            'price_change_percent': float(row['price_change_percent']) if row['price_change_percent'] else None,
-            'target_direction': row['target_direction'],
-            'features': features,  # JSONB Array → Python List
-            'phases': phases,  # JSONB Array → Python List (kann None sein)
-            'params': params,  # JSONB Object → Python Dict
-            'local_model_path': row['local_model_path'],
-            'model_file_url': row['model_file_url'],
-            'is_active': row['is_active'],
-            'last_prediction_at': row['last_prediction_at'],
+        model = _model_config_from_row(row)
+        model.update({
             'total_predictions': model_stats.get('total', 0),
             'positive_predictions': model_stats.get('positive', 0),
             'average_probability': model_stats.get('avg_probability') if model_stats.get('avg_probability') is not None else None,
@@ -443,26 +507,6 @@ async def get_active_models(include_inactive: bool = False) -> List[Dict[str, An
             'activated_at': row['activated_at'],
             'created_at': row['created_at'],
             'updated_at': row['updated_at'],
-            'alert_threshold': float(row['alert_threshold']) if row.get('alert_threshold') is not None else 0.7,
-            'n8n_webhook_url': row.get('n8n_webhook_url'),
-            # n8n_send_mode: JSONB Array oder String (für Rückwärtskompatibilität)
-            # asyncpg gibt JSONB als String zurück, daher muss from_jsonb verwendet werden
-            'n8n_send_mode': _parse_send_mode(from_jsonb(row.get('n8n_send_mode', 'all'))),
-            'n8n_enabled': row['n8n_enabled'] if row['n8n_enabled'] is not None else True,
-            # 🔄 Coin-Ignore-Einstellungen
-            'ignore_bad_seconds': row['ignore_bad_seconds'] if row['ignore_bad_seconds'] is not None else 0,
-            'ignore_positive_seconds': row['ignore_positive_seconds'] if row['ignore_positive_seconds'] is not None else 0,
-            'ignore_alert_seconds': row['ignore_alert_seconds'] if row['ignore_alert_seconds'] is not None else 0,
-            # 🔍 Coin-Filter-Einstellungen
-            'coin_filter_mode': row.get('coin_filter_mode') or 'all',
-            'coin_whitelist': json.loads(row['coin_whitelist']) if row.get('coin_whitelist') else None,
-            # ⏱️ Minimaler Scan-Interval
-            'min_scan_interval_seconds': row['min_scan_interval_seconds'] if row.get('min_scan_interval_seconds') is not None else 20,
-            # 📊 Max-Log-Entries-Einstellungen
-            'max_log_entries_per_coin_negative': row['max_log_entries_per_coin_negative'] if row.get('max_log_entries_per_coin_negative') is not None else 0,
-            'max_log_entries_per_coin_positive': row['max_log_entries_per_coin_positive'] if row.get('max_log_entries_per_coin_positive') is not None else 0,
-            'max_log_entries_per_coin_alert': row['max_log_entries_per_coin_alert'] if row.get('max_log_entries_per_coin_alert') is not None else 0,
-            'send_ignored_to_n8n': row.get('send_ignored_to_n8n', False),
             # Performance-Metriken (beide Formate für Kompatibilität)
             'accuracy': float(row['training_accuracy']) if row.get('training_accuracy') else None,
             'f1_score': float(row['training_f1']) if row.get('training_f1') else None,
@@ -486,6 +530,7 @@ async def get_active_models(include_inactive: bool = False) -> List[Dict[str, An
             # Prüfe ob Modell-Datei existiert
             'model_file_exists': bool(row['local_model_path'] and os.path.exists(row['local_model_path']))
         })
+        models.append(model)
 
     return models
 
@@ -739,6 +784,14 @@ async def activate_model(active_model_id: int) -> bool:
         WHERE id = $1
     """, active_model_id)
     
+    # Feature-Plan wird beim nächsten Zugriff mit aktueller Konfiguration neu gebaut
+    from app.prediction.feature_processor import invalidate_feature_plan
+    invalidate_feature_plan(active_model_id)
+
+    # Modell im Hintergrund aufwärmen (Laden, FeaturePlan, Dummy-Batch)
+    from app.prediction.warmup import get_model_warmup
+    await get_model_warmup().schedule_model(active_model_id)
+    
     return result == "UPDATE 1"
 
 async def deactivate_model(active_model_id: int) -> bool:
@@ -752,14 +805,25 @@ async def deactivate_model(active_model_id: int) -> bool:
         True wenn erfolgreich, False wenn nicht gefunden
     """
     pool = await get_pool()
-    result = await pool.execute("""
+    row = await pool.fetchrow("""
         UPDATE prediction_active_models
         SET is_active = false,
             updated_at = NOW()
         WHERE id = $1
+        RETURNING local_model_path
     """, active_model_id)
     
-    return result == "UPDATE 1"
+    from app.prediction.feature_processor import invalidate_feature_plan
+    invalidate_feature_plan(active_model_id)
+    
+    if row is None:
+        return False
+    
+    # Modell nicht mehr im Speicher halten
+    from app.prediction.model_manager import evict_model
+    evict_model(row['local_model_path'])
+    
+    return True
 
 async def delete_active_model(active_model_id: int) -> bool:
     """
@@ -804,11 +868,18 @@ async def delete_active_model(active_model_id: int) -> bool:
     if result != "DELETE 1":
         return False
     
+    from app.prediction.feature_processor import invalidate_feature_plan
+    invalidate_feature_plan(active_model_id)
+    
     # 3. Lösche lokale Modell-Datei (falls vorhanden)
     local_model_path = row.get('local_model_path')
+    from app.prediction.model_manager import evict_model
+    evict_model(local_model_path)
     if local_model_path:
         import os
         try:
+            from app.prediction.model_artifacts import remove_model_artifact
+            remove_model_artifact(local_model_path)
             if os.path.exists(local_model_path):
                 os.remove(local_model_path)
                 from app.utils.logging_config import get_logger
@@ -1327,6 +1398,53 @@ async def get_max_log_entries_settings(pool: asyncpg.Pool, active_model_id: int)
         return None
 
 
+# ============================================================
+# Aktive Einträge pro Coin (max_log_entries_per_coin_*)
+# ============================================================
+
+# False, solange die Migration create_model_prediction_active_counts.sql fehlt
+_active_counts_table_available = True
+
+
+async def get_active_prediction_counts(
+    pool: asyncpg.Pool,
+    coin_id: str,
+    active_model_ids: List[int]
+) -> Dict[Tuple[int, str], int]:
+    """
+    Anzahl aktiver model_predictions eines Coins pro (active_model_id, tag).
+
+    Liest die per Trigger gepflegten Zähler (model_prediction_active_counts) - ein
+    PK-Lookup pro Coin statt COUNT(*) pro Vorhersage. Fehlt die Tabelle, wird einmal
+    gewarnt und gruppiert über model_predictions gezählt.
+
+    Returns:
+        Dict (active_model_id, tag) -> Anzahl (fehlende Keys = 0)
+    """
+    global _active_counts_table_available
+    if _active_counts_table_available:
+        try:
+            rows = await pool.fetch("""
+                SELECT active_model_id, tag, active_count
+                FROM model_prediction_active_counts
+                WHERE coin_id = $1 AND active_model_id = ANY($2::bigint[])
+            """, coin_id, active_model_ids)
+            return {(row['active_model_id'], row['tag']): row['active_count'] for row in rows}
+        except asyncpg.exceptions.UndefinedTableError:
+            _active_counts_table_available = False
+            logger.warning("⚠️ Tabelle model_prediction_active_counts fehlt - max_log_entries wird per COUNT(*) geprüft (Migration create_model_prediction_active_counts.sql ausführen)")
+
+    rows = await pool.fetch("""
+        SELECT active_model_id, tag, COUNT(*) AS active_count
+        FROM model_predictions
+        WHERE coin_id = $1
+          AND active_model_id = ANY($2::bigint[])
+          AND status = 'aktiv'
+        GROUP BY active_model_id, tag
+    """, coin_id, active_model_ids)
+    return {(row['active_model_id'], row['tag']): row['active_count'] for row in rows}
+
+
 # ============================================================
 # Coin Scan Cache - Verwaltung
 # ============================================================
@@ -1353,6 +1471,12 @@ async def check_coin_ignore_status(
         Dict mit should_ignore, ignore_until, ignore_reason, remaining_seconds oder None
     """
     try:
+        # 🚫 IGNORE-CACHE: Im Event-Handler liegen die Cooldowns im Speicher
+        from app.prediction.ignore_cache import get_ignore_cache
+        ignore_cache = get_ignore_cache()
+        if ignore_cache.loaded:
+            return ignore_cache.check(coin_id, active_model_id)
+
         now = datetime.now(timezone.utc)
         
         # Hole Cache-Eintrag
@@ -1378,6 +1502,45 @@ async def check_coin_ignore_status(
         return {"should_ignore": False}
 
 
+def compute_scan_cache_entry(
+    coin_id: str,
+    active_model_id: int,
+    prediction: int,
+    probability: float,
+    alert_threshold: float,
+    ignore_bad_seconds: int,
+    ignore_positive_seconds: int,
+    ignore_alert_seconds: int
+) -> Tuple:
+    """
+    Berechnet die coin_scan_cache-Zeile nach einer Vorhersage.
+
+    Returns:
+        (coin_id, active_model_id, last_scan_at, last_prediction, last_probability,
+         was_alert, ignore_until, ignore_reason)
+    """
+    now = datetime.now(timezone.utc)
+    was_alert = probability >= alert_threshold
+
+    # Bestimme Ignore-Dauer basierend auf Ergebnis
+    # WICHTIG: Priorität ist Alert > Positive > Bad (Alert hat höchste Priorität)
+    ignore_seconds = 0
+    ignore_reason = None
+
+    if was_alert and ignore_alert_seconds > 0:  # Alert (höchste Priorität)
+        ignore_seconds = ignore_alert_seconds
+        ignore_reason = "alert"
+    elif prediction == 1 and ignore_positive_seconds > 0:  # Positive Vorhersage
+        ignore_seconds = ignore_positive_seconds
+        ignore_reason = "positive"
+    elif prediction == 0 and ignore_bad_seconds > 0:  # Schlechte Vorhersage
+        ignore_seconds = ignore_bad_seconds
+        ignore_reason = "bad"
+
+    ignore_until = now + timedelta(seconds=ignore_seconds) if ignore_seconds > 0 else None
+    return (coin_id, active_model_id, now, prediction, probability, was_alert, ignore_until, ignore_reason)
+
+
 async def update_coin_scan_cache(
     pool: asyncpg.Pool,
     coin_id: str,
@@ -1404,25 +1567,21 @@ async def update_coin_scan_cache(
         ignore_alert_seconds: Sekunden für Alert-Vorhersagen
     """
     try:
-        now = datetime.now(timezone.utc)
-        was_alert = probability >= alert_threshold
-
-        # Bestimme Ignore-Dauer basierend auf Ergebnis
-        # WICHTIG: Priorität ist Alert > Positive > Bad (Alert hat höchste Priorität)
-        ignore_seconds = 0
-        ignore_reason = None
-
-        if was_alert and ignore_alert_seconds > 0:  # Alert (höchste Priorität)
-            ignore_seconds = ignore_alert_seconds
-            ignore_reason = "alert"
-        elif prediction == 1 and ignore_positive_seconds > 0:  # Positive Vorhersage
-            ignore_seconds = ignore_positive_seconds
-            ignore_reason = "positive"
-        elif prediction == 0 and ignore_bad_seconds > 0:  # Schlechte Vorhersage
-            ignore_seconds = ignore_bad_seconds
-            ignore_reason = "bad"
-
-        ignore_until = now + timedelta(seconds=ignore_seconds) if ignore_seconds > 0 else None
+        entry = compute_scan_cache_entry(
+            coin_id, active_model_id, prediction, probability, alert_threshold,
+            ignore_bad_seconds, ignore_positive_seconds, ignore_alert_seconds
+        )
+        _, _, now, _, _, _, ignore_until, ignore_reason = entry
+        ignore_seconds = (ignore_until - now).total_seconds() if ignore_until else 0
+
+        # 🚫 IGNORE-CACHE: Sofort im Speicher wirksam, DB-Zeile per Write-Behind
+        from app.prediction.ignore_cache import get_ignore_cache
+        ignore_cache = get_ignore_cache()
+        if ignore_cache.loaded:
+            ignore_cache.record(*entry)
+            if ignore_seconds > 0:
+                logger.debug(f"🚫 Coin {coin_id[:8]}... wird für {ignore_seconds:.0f}s ignoriert ({ignore_reason})")
+            return
 
         # Update oder Insert
         await pool.execute("""
@@ -1439,10 +1598,10 @@ async def update_coin_scan_cache(
                 ignore_until = EXCLUDED.ignore_until,
                 ignore_reason = EXCLUDED.ignore_reason,
                 updated_at = EXCLUDED.updated_at
-        """, coin_id, active_model_id, now, prediction, probability, was_alert, ignore_until, ignore_reason)
+        """, *entry)
 
         if ignore_seconds > 0:
-            logger.debug(f"🚫 Coin {coin_id[:8]}... wird für {ignore_seconds}s ignoriert ({ignore_reason})")
+            logger.debug(f"🚫 Coin {coin_id[:8]}... wird für {ignore_seconds:.0f}s ignoriert ({ignore_reason})")
 
     except Exception as e:
         logger.error(f"Fehler beim Update des Scan-Cache für Coin {coin_id}: {e}")
@@ -2101,6 +2260,12 @@ async def get_coin_metrics_at_timestamp(
     Returns:
         Dict mit allen Metriken oder None wenn nicht gefunden
     """
+    # Zuerst Hot-Store (gerade gesehene Zeilen), bei Miss aus der DB
+    from app.prediction.hot_store import MISS, get_hot_store
+    metrics = get_hot_store().metrics_at(coin_id, timestamp)
+    if metrics is not MISS:
+        return metrics
+
     if pool is None:
         pool = await get_pool()
     
@@ -2142,6 +2307,301 @@ async def get_coin_metrics_at_timestamp(
         'phase_id': int(row['phase_id']) if row['phase_id'] else None
     }
 
+# Spalten von coin_metrics (einmal pro Prozess gelesen - externes Schema)
+_COIN_METRICS_COLUMNS: Optional[List[str]] = None
+
+
+async def get_coin_metrics_columns(pool: Optional[asyncpg.Pool] = None) -> Optional[List[str]]:
+    """
+    Gibt die Spaltennamen von coin_metrics zurück (gecacht).
+
+    Returns:
+        Liste der Spalten oder None, wenn das Schema nicht gelesen werden konnte
+    """
+    global _COIN_METRICS_COLUMNS
+    if _COIN_METRICS_COLUMNS is not None:
+        return _COIN_METRICS_COLUMNS
+
+    if pool is None:
+        pool = await get_pool()
+    try:
+        rows = await pool.fetch("""
+            SELECT column_name
+            FROM information_schema.columns
+            WHERE table_name = 'coin_metrics'
+              AND table_schema = ANY(current_schemas(false))
+            ORDER BY ordinal_position
+        """)
+    except Exception as e:
+        logger.warning(f"⚠️ Spalten von coin_metrics konnten nicht gelesen werden: {e}")
+        return None
+
+    if not rows:
+        return None
+    _COIN_METRICS_COLUMNS = [row['column_name'] for row in rows]
+    logger.info(f"📋 coin_metrics Schema geladen: {len(_COIN_METRICS_COLUMNS)} Spalten")
+    return _COIN_METRICS_COLUMNS
+
+
+# (mint, Phasen-Filter) -> Aggregat aller Zeilen mit timestamp < upto. Das Fenster der
+# Feature-Historie wandert mit jeder neuen Zeile nach vorne - das Aggregat wird nur um die
+# Zeilen zwischen altem und neuem Stand fortgeschrieben, statt bei jeder Vorhersage die
+# gesamte (mit dem Alter des Coins wachsende) Historie zu aggregieren.
+# recent: Zeitstempel der letzten LATE_ENTRY_WINDOW_SECONDS vor upto - spät committete
+# Zeilen in diesem Bereich werden beim Fortschreiben nachgezählt, bereits gezählte übersprungen.
+_HISTORY_PREFIX_CACHE: "OrderedDict[Tuple[str, Tuple[int, ...]], Dict[str, Any]]" = OrderedDict()
+
+
+def _history_prefix_key(coin_id: str, phases: Optional[List[int]]) -> Tuple[str, Tuple[int, ...]]:
+    return coin_id, tuple(sorted(int(p) for p in phases)) if phases else ()
+
+
+def _cached_history_prefix(key: Tuple[str, Tuple[int, ...]], before: datetime) -> Optional[Dict[str, Any]]:
+    """Gecachtes Aggregat, das sich bis `before` fortschreiben lässt (sonst None)"""
+    entry = _HISTORY_PREFIX_CACHE.get(key)
+    if entry is None or entry['upto'] > before:
+        return None
+    _HISTORY_PREFIX_CACHE.move_to_end(key)
+    return entry
+
+
+def _store_history_prefix(key: Tuple[str, Tuple[int, ...]], entry: Dict[str, Any]):
+    current = _HISTORY_PREFIX_CACHE.get(key)
+    # Parallele Anfragen: jedes Ergebnis ist vollständig - der weiteste Stand gewinnt
+    if current is None or current['upto'] <= entry['upto']:
+        _HISTORY_PREFIX_CACHE[key] = entry
+        _HISTORY_PREFIX_CACHE.move_to_end(key)
+    while len(_HISTORY_PREFIX_CACHE) > HISTORY_PREFIX_CACHE_COINS:
+        _HISTORY_PREFIX_CACHE.popitem(last=False)
+
+
+def _history_prefix_entry(row: Mapping[str, Any], before: datetime) -> Dict[str, Any]:
+    """Cache-Eintrag aus dem Aggregat-Query über die gesamte Historie vor `before`"""
+    return {
+        'first_ts': row['first_ts'],
+        'ath': row['ath'],
+        'ath_ts': row['ath_ts'],
+        'dev_sold_sum': row['dev_sold_sum'] or 0,
+        'row_count': int(row['row_count'] or 0),
+        'upto': before,
+        'recent': frozenset(row['recent'] or ()),
+    }
+
+
+def _advance_history_prefix(entry: Dict[str, Any], rows: List[Mapping[str, Any]], before: datetime) -> Dict[str, Any]:
+    """
+    Schreibt ein Aggregat bis `before` fort.
+
+    Args:
+        rows: Zeilen mit upto - LATE_ENTRY_WINDOW_SECONDS <= timestamp < before (aufsteigend)
+    """
+    first_ts, ath, ath_ts = entry['first_ts'], entry['ath'], entry['ath_ts']
+    dev_sold_sum, row_count = entry['dev_sold_sum'], entry['row_count']
+    recent = set(entry['recent'])
+    for row in rows:
+        ts = row['timestamp']
+        if ts < entry['upto'] and ts in recent:
+            continue  # bereits gezählt
+        recent.add(ts)
+        row_count += 1
+        dev_sold_sum += row['dev_sold_amount'] or 0
+        first_ts = ts if first_ts is None else min(first_ts, ts)
+        price_high = row['price_high']
+        if price_high is not None:
+            # ath_ts = erster Zeitpunkt mit dem ATH (wie MIN(timestamp) WHERE price_high = MAX(price_high))
+            if ath is None or price_high > ath:
+                ath, ath_ts = price_high, ts
+            elif price_high == ath and ts < ath_ts:
+                ath_ts = ts
+    recent_from = before - timedelta(seconds=LATE_ENTRY_WINDOW_SECONDS)
+    return {
+        'first_ts': first_ts,
+        'ath': ath,
+        'ath_ts': ath_ts,
+        'dev_sold_sum': dev_sold_sum,
+        'row_count': row_count,
+        'upto': before,
+        'recent': frozenset(ts for ts in recent if ts >= recent_from),
+    }
+
+
+def _history_prefix_result(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if not entry['row_count']:
+        return None
+    return {
+        'first_ts': entry['first_ts'],
+        'ath': float(entry['ath']) if entry['ath'] is not None else None,
+        'ath_ts': entry['ath_ts'],
+        'dev_sold_sum': float(entry['dev_sold_sum'] or 0.0),
+        'row_count': entry['row_count'],
+    }
+
+
+async def get_coin_history_prefix(
+    coin_id: str,
+    before: datetime,
+    phases: Optional[List[int]] = None,
+    pool: Optional[asyncpg.Pool] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Aggregat über die gesamte Historie eines Coins VOR einem Zeitpunkt.
+
+    Liefert die Werte, die Full-History-Features (rolling_ath, ath_breakout,
+    minutes_since_ath, dev_sold_cumsum, coin_age_minutes) benötigen, ohne alle
+    Zeilen zu übertragen:
+    - first_ts: erster Eintrag
+    - ath: MAX(price_high)
+    - ath_ts: erster Zeitpunkt, an dem das ATH erreicht wurde (= letzter ATH-Breakout,
+      sofern nicht der erste Eintrag selbst)
+    - dev_sold_sum: SUM(dev_sold_amount)
+
+    Nur die erste Anfrage pro Coin aggregiert die gesamte Historie - danach werden nur
+    die Zeilen seit dem letzten Stand gelesen (siehe _HISTORY_PREFIX_CACHE).
+
+    Returns:
+        Dict oder None, wenn es vor `before` keine Einträge gibt
+    """
+    if pool is None:
+        pool = await get_pool()
+
+    key = _history_prefix_key(coin_id, phases)
+    cached = _cached_history_prefix(key, before)
+    if cached is not None:
+        phase_filter = "AND phase_id_at_time = ANY($4::int[])" if phases else ""
+        since = cached['upto'] - timedelta(seconds=LATE_ENTRY_WINDOW_SECONDS)
+        rows = await pool.fetch(f"""
+            SELECT timestamp, price_high, dev_sold_amount
+            FROM coin_metrics
+            WHERE mint = $1
+              AND timestamp >= $2
+              AND timestamp < $3
+              {phase_filter}
+            ORDER BY timestamp
+        """, coin_id, since, before, *([list(key[1])] if phases else []))
+        entry = _advance_history_prefix(cached, rows, before)
+        _store_history_prefix(key, entry)
+        return _history_prefix_result(entry)
+
+    phase_filter = "AND phase_id_at_time = ANY($4::int[])" if phases else ""
+    args = [coin_id, before, before - timedelta(seconds=LATE_ENTRY_WINDOW_SECONDS)] + ([list(key[1])] if phases else [])
+    row = await pool.fetchrow(f"""
+        WITH prefix AS (
+            SELECT timestamp, price_high, dev_sold_amount
+            FROM coin_metrics
+            WHERE mint = $1
+              AND timestamp < $2
+              {phase_filter}
+        ), agg AS (
+            SELECT
+                MIN(timestamp) AS first_ts,
+                MAX(price_high) AS ath,
+                SUM(COALESCE(dev_sold_amount, 0)) AS dev_sold_sum,
+                COUNT(*) AS row_count
+            FROM prefix
+        )
+        SELECT
+            agg.first_ts, agg.ath, agg.dev_sold_sum, agg.row_count,
+            (SELECT MIN(p.timestamp) FROM prefix p WHERE p.price_high = agg.ath) AS ath_ts,
+            ARRAY(SELECT p.timestamp FROM prefix p WHERE p.timestamp >= $3) AS recent
+        FROM agg
+    """, *args)
+
+    if not row:
+        return None
+    entry = _history_prefix_entry(row, before)
+    _store_history_prefix(key, entry)
+    return _history_prefix_result(entry)
+
+
+async def get_coin_history_prefixes_bulk(
+    befores: Dict[str, datetime],
+    phases: Optional[List[int]] = None,
+    pool: Optional[asyncpg.Pool] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Wie get_coin_history_prefix, aber für viele Coins in höchstens zwei Queries
+    (Fortschreiben gecachter Aggregate, volle Aggregation für neue Coins).
+
+    Args:
+        befores: mint -> Zeitpunkt, vor dem aggregiert wird
+
+    Returns:
+        mint -> Aggregat (nur Coins mit Einträgen vor dem Zeitpunkt)
+    """
+    if not befores:
+        return {}
+    if pool is None:
+        pool = await get_pool()
+
+    late_window = timedelta(seconds=LATE_ENTRY_WINDOW_SECONDS)
+    phases_list = list(_history_prefix_key('', phases)[1]) if phases else None
+    entries: Dict[str, Dict[str, Any]] = {}
+    cached = {}
+    for mint, before in befores.items():
+        entry = _cached_history_prefix(_history_prefix_key(mint, phases), before)
+        if entry is not None:
+            cached[mint] = entry
+    missing = [mint for mint in befores if mint not in cached]
+
+    if cached:
+        mints = list(cached.keys())
+        phase_filter = "AND c.phase_id_at_time = ANY($4::int[])" if phases else ""
+        rows = await pool.fetch(f"""
+            SELECT c.mint, c.timestamp, c.price_high, c.dev_sold_amount
+            FROM unnest($1::text[], $2::timestamptz[], $3::timestamptz[]) AS b(mint, since, before_ts)
+            JOIN coin_metrics c ON c.mint = b.mint AND c.timestamp >= b.since AND c.timestamp < b.before_ts
+            WHERE TRUE {phase_filter}
+            ORDER BY c.mint, c.timestamp
+        """, mints, [cached[m]['upto'] - late_window for m in mints], [befores[m] for m in mints],
+            *([phases_list] if phases else []))
+        by_mint: Dict[str, List[asyncpg.Record]] = {}
+        for row in rows:
+            by_mint.setdefault(row['mint'], []).append(row)
+        for mint in mints:
+            entries[mint] = _advance_history_prefix(cached[mint], by_mint.get(mint, []), befores[mint])
+
+    if missing:
+        phase_filter = "AND c.phase_id_at_time = ANY($4::int[])" if phases else ""
+        rows = await pool.fetch(f"""
+            WITH bounds AS (
+                SELECT * FROM unnest($1::text[], $2::timestamptz[], $3::timestamptz[]) AS b(mint, before_ts, recent_from)
+            ), prefix AS (
+                SELECT c.mint, c.timestamp, c.price_high, c.dev_sold_amount, b.recent_from
+                FROM bounds b
+                JOIN coin_metrics c ON c.mint = b.mint AND c.timestamp < b.before_ts
+                WHERE TRUE {phase_filter}
+            ), agg AS (
+                SELECT
+                    mint,
+                    MIN(timestamp) AS first_ts,
+                    MAX(price_high) AS ath,
+                    SUM(COALESCE(dev_sold_amount, 0)) AS dev_sold_sum,
+                    COUNT(*) AS row_count
+                FROM prefix
+                GROUP BY mint
+            )
+            SELECT
+                agg.mint, agg.first_ts, agg.ath, agg.dev_sold_sum, agg.row_count,
+                (SELECT MIN(p.timestamp) FROM prefix p WHERE p.mint = agg.mint AND p.price_high = agg.ath) AS ath_ts,
+                ARRAY(SELECT p.timestamp FROM prefix p WHERE p.mint = agg.mint AND p.timestamp >= p.recent_from) AS recent
+            FROM agg
+        """, missing, [befores[m] for m in missing], [befores[m] - late_window for m in missing],
+            *([phases_list] if phases else []))
+        found = {row['mint']: row for row in rows}
+        empty = {'first_ts': None, 'ath': None, 'ath_ts': None, 'dev_sold_sum': 0, 'row_count': 0, 'recent': None}
+        for mint in missing:
+            # Coins ohne Zeilen vor dem Zeitpunkt ebenfalls cachen (Aggregat startet leer)
+            entries[mint] = _history_prefix_entry(found.get(mint, empty), befores[mint])
+
+    results = {}
+    for mint, entry in entries.items():
+        _store_history_prefix(_history_prefix_key(mint, phases), entry)
+        result = _history_prefix_result(entry)
+        if result is not None:
+            results[mint] = result
+    return results
+
+
 async def get_coin_price_history(
     coin_id: str,
     start_timestamp: datetime,
@@ -2497,6 +2957,60 @@ async def get_model_type_defaults(model_type: str) -> Dict[str, Any]:
 # model_predictions - NEUE EINFACHE ARCHITEKTUR
 # ============================================================
 
+def build_model_prediction_row(
+    coin_id: str,
+    prediction_timestamp: datetime,
+    model_id: int,
+    active_model_id: Optional[int],
+    prediction: int,
+    probability: float,
+    alert_threshold: float,
+    future_minutes: int,
+    metrics: Optional[Dict[str, Any]] = None,
+    phase_id_at_time: Optional[int] = None
+) -> Tuple:
+    """
+    Baut die model_predictions-Zeile (Spaltenreihenfolge wie im INSERT, ohne status).
+    Berechnet tag und evaluation_timestamp.
+    """
+    # Berechne tag automatisch
+    if probability < 0.5:
+        tag = 'negativ'
+    elif probability < alert_threshold:
+        tag = 'positiv'
+    else:
+        tag = 'alert'
+    
+    # Berechne evaluation_timestamp
+    evaluation_timestamp = prediction_timestamp + timedelta(minutes=future_minutes)
+    
+    # Extrahiere Metriken
+    price_close = metrics.get('price_close') if metrics else None
+    price_open = metrics.get('price_open') if metrics else None
+    price_high = metrics.get('price_high') if metrics else None
+    price_low = metrics.get('price_low') if metrics else None
+    market_cap = metrics.get('market_cap_close') if metrics else None
+    volume = metrics.get('volume_usd') if metrics else (metrics.get('volume_sol') if metrics else None)  # Fallback auf volume_sol
+    
+    return (
+        coin_id,
+        model_id,
+        active_model_id,
+        prediction,
+        probability,
+        tag,
+        prediction_timestamp,
+        evaluation_timestamp,
+        price_close,
+        price_open,
+        price_high,
+        price_low,
+        market_cap,
+        volume,
+        phase_id_at_time
+    )
+
+
 async def save_model_prediction(
     coin_id: str,
     prediction_timestamp: datetime,
@@ -2509,10 +3023,11 @@ async def save_model_prediction(
     metrics: Optional[Dict[str, Any]] = None,
     phase_id_at_time: Optional[int] = None,
     pool: Optional[asyncpg.Pool] = None
-) -> int:
+) -> Optional[int]:
     """
     Speichert Vorhersage in model_predictions Tabelle.
     Berechnet automatisch tag und evaluation_timestamp.
+    Idempotent: existiert (active_model_id, coin_id, prediction_timestamp) bereits, passiert nichts.
     
     Args:
         coin_id: Coin-ID (mint)
@@ -2528,29 +3043,16 @@ async def save_model_prediction(
         pool: Optional DB-Pool
         
     Returns:
-        ID des neuen Eintrags
+        ID des neuen Eintrags (None, wenn bereits vorhanden)
     """
     if pool is None:
         pool = await get_pool()
     
-    # Berechne tag automatisch
-    if probability < 0.5:
-        tag = 'negativ'
-    elif probability < alert_threshold:
-        tag = 'positiv'
-    else:
-        tag = 'alert'
-    
-    # Berechne evaluation_timestamp
-    evaluation_timestamp = prediction_timestamp + timedelta(minutes=future_minutes)
-    
-    # Extrahiere Metriken
-    price_close = metrics.get('price_close') if metrics else None
-    price_open = metrics.get('price_open') if metrics else None
-    price_high = metrics.get('price_high') if metrics else None
-    price_low = metrics.get('price_low') if metrics else None
-    market_cap = metrics.get('market_cap_close') if metrics else None
-    volume = metrics.get('volume_usd') if metrics else (metrics.get('volume_sol') if metrics else None)  # Fallback auf volume_sol
+    row = build_model_prediction_row(
+        coin_id, prediction_timestamp, model_id, active_model_id, prediction, probability,
+        alert_threshold, future_minutes, metrics=metrics, phase_id_at_time=phase_id_at_time
+    )
+    tag = row[5]
     
     # Speichere in DB
     prediction_id = await pool.fetchval("""
@@ -2566,24 +3068,14 @@ async def save_model_prediction(
             $1, $2, $3, $4, $5, $6, 'aktiv',
             $7, $8, $9, $10, $11, $12, $13, $14, $15
         )
+        ON CONFLICT DO NOTHING
         RETURNING id
-    """,
-        coin_id,
-        model_id,
-        active_model_id,
-        prediction,
-        probability,
-        tag,
-        prediction_timestamp,
-        evaluation_timestamp,
-        price_close,
-        price_open,
-        price_high,
-        price_low,
-        market_cap,
-        volume,
-        phase_id_at_time
-    )
+    """, *row)
+    
+    # Bereits vorhanden (Wiederholung/Replay) - Zähler nicht erneut erhöhen
+    if prediction_id is None:
+        logger.debug(f"⏭️ Model Prediction bereits vorhanden: coin={coin_id[:12]}..., active_model_id={active_model_id}, timestamp={prediction_timestamp}")
+        return None
     
     # Update total_predictions Counter
     if active_model_id:
@@ -2598,3 +3090,210 @@ async def save_model_prediction(
     logger.info(f"✅ Model Prediction {prediction_id} gespeichert: coin={coin_id[:12]}..., tag={tag}, probability={probability:.2%}, threshold={alert_threshold:.2%}")
     
     return prediction_id
+
+
+# ============================================================
+# Verarbeitungsstand (Watermark) des Event-Handlers
+# ============================================================
+
+# False, solange die Migration add_prediction_idempotency.sql fehlt
+_watermark_table_available = True
+
+# Nur vorwärts bewegen - (timestamp, mint) als Cursor
+_WATERMARK_UPSERT_SQL = """
+            INSERT INTO prediction_watermarks (consumer, last_timestamp, last_mint, updated_at)
+            VALUES ({consumer}, {timestamp}, {mint}, NOW())
+            ON CONFLICT (consumer) DO UPDATE SET
+                last_timestamp = EXCLUDED.last_timestamp,
+                last_mint = EXCLUDED.last_mint,
+                updated_at = NOW()
+            WHERE (prediction_watermarks.last_timestamp, prediction_watermarks.last_mint)
+                < (EXCLUDED.last_timestamp, EXCLUDED.last_mint)
+        """
+
+
+def watermark_available() -> bool:
+    """True, solange prediction_watermarks existiert (bzw. noch nicht als fehlend erkannt wurde)"""
+    return _watermark_table_available
+
+
+async def get_processing_watermark(
+    pool: asyncpg.Pool,
+    consumer: str = 'event_handler'
+) -> Optional[Tuple[datetime, str]]:
+    """
+    Lädt den persistierten Verarbeitungsstand (timestamp, mint).
+
+    Returns:
+        (last_timestamp, last_mint) oder None (noch kein Stand / Tabelle fehlt)
+    """
+    global _watermark_table_available
+    try:
+        row = await pool.fetchrow("""
+            SELECT last_timestamp, last_mint
+            FROM prediction_watermarks
+            WHERE consumer = $1
+        """, consumer)
+    except asyncpg.exceptions.UndefinedTableError:
+        _watermark_table_available = False
+        logger.warning("⚠️ Tabelle prediction_watermarks fehlt - Verarbeitungsstand wird nicht persistiert (Migration add_prediction_idempotency.sql ausführen)")
+        return None
+    if row is None:
+        return None
+    return row['last_timestamp'], row['last_mint']
+
+
+async def save_processing_watermark(
+    pool: asyncpg.Pool,
+    timestamp: datetime,
+    mint: str,
+    consumer: str = 'event_handler'
+):
+    """Speichert den Verarbeitungsstand (nur wenn er weiter ist als der gespeicherte)"""
+    if not _watermark_table_available:
+        return
+    await pool.execute(
+        _WATERMARK_UPSERT_SQL.format(consumer='$1', timestamp='$2', mint='$3'),
+        consumer, timestamp, mint
+    )
+
+
+async def rewind_processing_watermark(
+    pool: asyncpg.Pool,
+    timestamp: datetime,
+    mint: str,
+    consumer: str = 'event_handler'
+) -> bool:
+    """
+    Setzt den Verarbeitungsstand explizit zurück (nur wenn er hinter dem gespeicherten liegt) -
+    z.B. für verspätete Commits hinter dem Cursor, die sonst nur im Speicher stünden.
+
+    Returns:
+        True, wenn der Stand zurückgesetzt wurde
+    """
+    if not _watermark_table_available:
+        return False
+    result = await pool.execute("""
+        UPDATE prediction_watermarks
+        SET last_timestamp = $2, last_mint = $3, updated_at = NOW()
+        WHERE consumer = $1 AND (last_timestamp, last_mint) > ($2, $3)
+    """, consumer, timestamp, mint)
+    return int(result.split()[-1]) > 0
+
+
+async def save_model_predictions_batch(
+    rows: List[Tuple],
+    scan_cache_rows: Optional[List[Tuple]] = None,
+    watermark: Optional[Tuple[str, datetime, str]] = None,
+    pool: Optional[asyncpg.Pool] = None
+) -> List[int]:
+    """
+    Speichert viele Vorhersagen in EINEM Statement (ein Roundtrip pro Batch).
+
+    - INSERT aller Zeilen in model_predictions (per unnest, ON CONFLICT DO NOTHING -
+      bereits vorhandene Vorhersagen werden bei Wiederholung/Replay übersprungen)
+    - total_predictions pro Modell einmal um die Anzahl im Batch erhöhen
+      (statt ein UPDATE pro Vorhersage - weniger Row-Lock-Konkurrenz)
+    - Optional: UPSERT in coin_scan_cache (wenn kein In-Memory Ignore-Cache aktiv ist)
+    - Optional: Verarbeitungsstand (prediction_watermarks) in derselben Transaktion
+
+    Args:
+        rows: Zeilen aus build_model_prediction_row
+        scan_cache_rows: Zeilen aus compute_scan_cache_entry (je (coin_id, active_model_id) höchstens einmal)
+        watermark: (consumer, timestamp, mint) - wird nur vorwärts bewegt (siehe save_processing_watermark)
+        pool: Optional DB-Pool
+
+    Returns:
+        IDs der neuen Einträge (ohne übersprungene Duplikate)
+    """
+    if not rows:
+        return []
+    if pool is None:
+        pool = await get_pool()
+
+    columns = [list(column) for column in zip(*rows)]
+    scan_columns = [list(column) for column in zip(*scan_cache_rows)] if scan_cache_rows else [[] for _ in range(8)]
+    watermark_cte = ""
+    watermark_args: List[Any] = []
+    if watermark is not None:
+        watermark_cte = f""",
+        watermark AS ({_WATERMARK_UPSERT_SQL.format(consumer='$24', timestamp='$25', mint='$26')})"""
+        watermark_args = list(watermark)
+
+    records = await pool.fetch(f"""
+        WITH input AS (
+            SELECT *
+            FROM unnest(
+                $1::text[], $2::bigint[], $3::bigint[], $4::int[], $5::float8[], $6::text[],
+                $7::timestamptz[], $8::timestamptz[],
+                $9::float8[], $10::float8[], $11::float8[], $12::float8[], $13::float8[], $14::float8[],
+                $15::int[]
+            ) AS t(
+                coin_id, model_id, active_model_id, prediction, probability, tag,
+                prediction_timestamp, evaluation_timestamp,
+                price_close, price_open, price_high, price_low, market_cap, volume,
+                phase_id
+            )
+        ),
+        inserted AS (
+            INSERT INTO model_predictions (
+                coin_id, model_id, active_model_id,
+                prediction, probability, tag, status,
+                prediction_timestamp, evaluation_timestamp,
+                price_close_at_prediction, price_open_at_prediction,
+                price_high_at_prediction, price_low_at_prediction,
+                market_cap_at_prediction, volume_at_prediction,
+                phase_id_at_prediction
+            )
+            SELECT coin_id, model_id, active_model_id,
+                   prediction, probability, tag, 'aktiv',
+                   prediction_timestamp, evaluation_timestamp,
+                   price_close, price_open, price_high, price_low, market_cap, volume,
+                   phase_id
+            FROM input
+            ON CONFLICT DO NOTHING
+            RETURNING id, active_model_id
+        ),
+        counters AS (
+            UPDATE prediction_active_models pam
+            SET total_predictions = pam.total_predictions + d.n,
+                last_prediction_at = NOW(),
+                updated_at = NOW()
+            FROM (
+                SELECT active_model_id, COUNT(*) AS n
+                FROM inserted
+                WHERE active_model_id IS NOT NULL
+                GROUP BY active_model_id
+            ) d
+            WHERE pam.id = d.active_model_id
+        ),
+        scan_cache AS (
+            INSERT INTO coin_scan_cache (
+                coin_id, active_model_id, last_scan_at, last_prediction,
+                last_probability, was_alert, ignore_until, ignore_reason, updated_at
+            )
+            SELECT coin_id, active_model_id, last_scan_at, last_prediction,
+                   last_probability, was_alert, ignore_until, ignore_reason, last_scan_at
+            FROM unnest($16::text[], $17::bigint[], $18::timestamptz[], $19::int[],
+                        $20::float8[], $21::bool[], $22::timestamptz[], $23::text[])
+                AS s(coin_id, active_model_id, last_scan_at, last_prediction,
+                     last_probability, was_alert, ignore_until, ignore_reason)
+            ON CONFLICT (coin_id, active_model_id)
+            DO UPDATE SET
+                last_scan_at = EXCLUDED.last_scan_at,
+                last_prediction = EXCLUDED.last_prediction,
+                last_probability = EXCLUDED.last_probability,
+                was_alert = EXCLUDED.was_alert,
+                ignore_until = EXCLUDED.ignore_until,
+                ignore_reason = EXCLUDED.ignore_reason,
+                updated_at = EXCLUDED.updated_at
+        ){watermark_cte}
+        SELECT id FROM inserted
+    """, *columns, *scan_columns, *watermark_args)
+
+    skipped = len(rows) - len(records)
+    logger.info(
+        f"✅ {len(records)} Model Predictions gespeichert (Batch, {len(scan_cache_rows or [])} Scan-Cache-Zeilen"
+        + (f", {skipped} bereits vorhanden" if skipped else "") + ")"
+    )
+    return [record['id'] for record in records]
@@ -28,14 +28,6 @@ async def lifespan(app: FastAPI):
     # DB-Pool wird lazy geladen (beim ersten API-Call)
     logger.info("ℹ️ Datenbank-Verbindung wird lazy geladen (beim ersten API-Call)")
 
-    # Starte Alert-Evaluator als Background-Task
-    try:
-        from app.prediction.alert_evaluator import start_alert_evaluator
-        await start_alert_evaluator(interval_seconds=30)
-        logger.info("✅ Alert-Evaluator gestartet")
-    except Exception as e:
-        logger.error(f"❌ Fehler beim Starten des Alert-Evaluators: {e}", exc_info=True)
-
     # Prüfe und stelle fehlende Modell-Dateien wieder her
     try:
         from app.prediction.model_manager import ensure_model_files
@@ -52,7 +44,14 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ Fehler bei Modell-Recovery beim Startup: {e}", exc_info=True)
 
-    logger.info("ℹ️ Event-Handler läuft als separater Supervisor-Prozess")
+    # Aktive Modelle im Hintergrund aufwärmen (blockiert den Start nicht)
+    try:
+        from app.prediction.warmup import get_model_warmup
+        await get_model_warmup().schedule_active_models()
+    except Exception as e:
+        logger.error(f"❌ Fehler beim Starten des Modell-Warm-ups: {e}", exc_info=True)
+
+    logger.info("ℹ️ Event-Handler läuft als separater Supervisor-Prozess (inkl. Alert-Evaluator im Hintergrund-Scheduler)")
 
     # Starte MCP Session Manager
     session_manager = get_session_manager()
@@ -63,6 +62,8 @@ async def lifespan(app: FastAPI):
 
     # === SHUTDOWN ===
     logger.info("🛑 Stoppe Pump Server...")
+    from app.prediction.executor import get_inference_executor
+    get_inference_executor().shutdown()
     logger.info("✅ Service gestoppt")
 
 
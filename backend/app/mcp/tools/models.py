@@ -147,6 +147,10 @@ async def import_model(model_id: int) -> Dict[str, Any]:
             model_file_url=model_file_url
         )
 
+        # 4. Warm-up im Hintergrund
+        from app.prediction.warmup import get_model_warmup
+        await get_model_warmup().schedule_model(active_model_id)
+
         return {
             "success": True,
             "message": f"Model {model_id} successfully imported",
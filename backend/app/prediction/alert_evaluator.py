@@ -1,16 +1,23 @@
 """
 Alert-Evaluator Background Service
-Wertet regelmäßig ausstehende Alerts aus
+Wertet regelmäßig ausstehende Alerts aus - als Job des Hintergrund-Schedulers im Event-Handler
+(adaptives Intervall, DB-Budget, bei mehreren Replikas nur auf dem gewählten Leader)
 """
 import asyncio
 from datetime import datetime, timezone
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.database.alert_models import evaluate_pending_alerts
 from app.database.ath_tracker import evaluate_pending_alerts_ath
+from app.database.connection import get_pool
+from app.prediction.leadership import JOB_ALERT_EVALUATOR
+from app.prediction.scheduler import BackgroundJob, BackgroundScheduler, get_background_scheduler
 from app.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Alerts pro Runde (ATH-Tracking und finale Auswertung)
+ALERT_BATCH_SIZE = 100
+
 
 class AlertEvaluator:
     """Background-Service für Alert-Auswertung"""
@@ -25,13 +32,13 @@ class AlertEvaluator:
         self.last_run: datetime | None = None
         self.stats: Dict[str, int] = {'total_evaluated': 0, 'total_success': 0, 'total_failed': 0, 'total_expired': 0}
     
-    async def run_once(self) -> Dict[str, int]:
+    async def run_once(self, pool=None) -> Dict[str, int]:
         """Führt eine einzelne Auswertungs-Runde durch"""
         try:
             logger.debug("🔄 Starte Alert-Auswertung...")
             
             # 1. ATH-Tracking: Prüfe alle pending/non_alert Alerts und aktualisiere ATH
-            ath_stats = await evaluate_pending_alerts_ath(batch_size=100)
+            ath_stats = await evaluate_pending_alerts_ath(batch_size=ALERT_BATCH_SIZE, pool=pool)
             if ath_stats.get('checked', 0) > 0:
                 logger.debug(
                     f"📊 ATH-Tracking: {ath_stats.get('checked', 0)} geprüft, "
@@ -40,7 +47,7 @@ class AlertEvaluator:
                 )
             
             # 2. Finale Evaluierung: Nur für Alerts, deren evaluation_timestamp erreicht wurde
-            stats = await evaluate_pending_alerts(batch_size=100, include_non_alerts=True)
+            stats = await evaluate_pending_alerts(batch_size=ALERT_BATCH_SIZE, include_non_alerts=True, pool=pool)
             
             # Update Gesamt-Statistiken
             self.stats['total_evaluated'] += stats.get('evaluated', 0)
@@ -58,28 +65,27 @@ class AlertEvaluator:
                 )
             
             self.last_run = datetime.now(timezone.utc)
-            return stats
+            return {**stats, 'ath_checked': ath_stats.get('checked', 0)}
             
         except Exception as e:
             logger.error(f"❌ Fehler bei Alert-Auswertung: {e}", exc_info=True)
-            return {'evaluated': 0, 'success': 0, 'failed': 0, 'expired': 0}
+            return {'evaluated': 0, 'success': 0, 'failed': 0, 'expired': 0, 'ath_checked': 0}
+    
+    async def _run_job(self, pool) -> int:
+        if not self.running:
+            return 0
+        stats = await self.run_once(pool)
+        # Voller Batch in einer der beiden Stufen = Rückstand
+        return max(stats.get('evaluated', 0), stats.get('ath_checked', 0))
     
-    async def start(self):
-        """Startet den Alert-Evaluator als Background-Service"""
+    def register(self, scheduler: BackgroundScheduler):
+        """Registriert die Alert-Auswertung als Job des Hintergrund-Schedulers"""
         self.running = True
-        logger.info(f"🚀 Alert-Evaluator gestartet (Intervall: {self.interval_seconds}s)")
-        
-        # Warte kurz, damit die DB-Verbindung bereit ist
-        await asyncio.sleep(5)
-        
-        while self.running:
-            try:
-                await self.run_once()
-            except Exception as e:
-                logger.error(f"❌ Fehler im Alert-Evaluator Loop: {e}", exc_info=True)
-            
-            # Warte auf nächstes Intervall
-            await asyncio.sleep(self.interval_seconds)
+        scheduler.register(BackgroundJob(
+            JOB_ALERT_EVALUATOR, self._run_job, interval=self.interval_seconds,
+            batch_size=ALERT_BATCH_SIZE, leader_job=JOB_ALERT_EVALUATOR
+        ))
+        logger.info(f"🚀 Alert-Evaluator registriert (Intervall: {self.interval_seconds}s)")
     
     async def stop(self):
         """Stoppt den Alert-Evaluator"""
@@ -97,40 +103,27 @@ class AlertEvaluator:
 
 
 # Globale Instanz
-_alert_evaluator: AlertEvaluator | None = None
+_alert_evaluator: Optional[AlertEvaluator] = None
 
 
-async def start_alert_evaluator(interval_seconds: int = 30):
-    """Startet den Alert-Evaluator als Background-Task"""
+def get_alert_evaluator(interval_seconds: int = 30) -> AlertEvaluator:
+    """Gibt die prozessweite AlertEvaluator-Instanz zurück"""
     global _alert_evaluator
-    
     if _alert_evaluator is None:
         _alert_evaluator = AlertEvaluator(interval_seconds=interval_seconds)
-        # Starte als Background-Task (blockiert nicht)
-        asyncio.create_task(_alert_evaluator.start())
-        logger.info("✅ Alert-Evaluator Background-Task gestartet")
-    else:
-        logger.warning("⚠️ Alert-Evaluator läuft bereits")
-
-
-async def stop_alert_evaluator():
-    """Stoppt den Alert-Evaluator"""
-    global _alert_evaluator
-    
-    if _alert_evaluator:
-        await _alert_evaluator.stop()
-        _alert_evaluator = None
-        logger.info("✅ Alert-Evaluator gestoppt")
+    return _alert_evaluator
 
 
 async def main():
-    """Main entry point für direkten Start (z.B. als separater Service)"""
-    evaluator = AlertEvaluator(interval_seconds=30)
+    """Main entry point für direkten Start (z.B. als separater Service ohne Event-Handler)"""
+    scheduler = get_background_scheduler()
+    get_alert_evaluator().register(scheduler)
+    scheduler.start(await get_pool())
     try:
-        await evaluator.start()
-    except KeyboardInterrupt:
+        await asyncio.Event().wait()
+    except (KeyboardInterrupt, asyncio.CancelledError):
         logger.info("🛑 Alert-Evaluator wird beendet...")
-        await evaluator.stop()
+        await scheduler.stop()
 
 
 if __name__ == "__main__":
@@ -3,12 +3,16 @@ Prediction Engine für Pump Server
 
 Macht Vorhersagen mit geladenen Modellen.
 """
+import asyncio
 import time
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timezone
 import asyncpg
 import numpy as np
-from app.prediction.feature_processor import prepare_features
+from app.prediction.executor import get_inference_executor
+from app.prediction.feature_processor import (
+    prepare_features, peek_feature_plan, get_coin_histories_bulk, FeatureContext
+)
 from app.prediction.model_manager import get_model
 from app.utils.logging_config import get_logger
 from app.utils.metrics import (
@@ -19,11 +23,43 @@ from app.utils.metrics import (
 logger = get_logger(__name__)
 
 
+async def _get_model_with_recovery(model_config: Dict[str, Any], pool: Optional[asyncpg.Pool] = None) -> Any:
+    """Lädt Modell (aus Cache oder Datei) - fehlt die Datei, wird sie vom Training Service wiederhergestellt"""
+    executor = get_inference_executor()
+    try:
+        return await executor.run('load_model', get_model, model_config)
+    except FileNotFoundError:
+        # Modell-Datei fehlt - versuche Recovery vom Training Service
+        logger.warning(
+            f"⚠️ Modell-Datei fehlt für model_id={model_config['model_id']}, "
+            f"versuche Wiederherstellung..."
+        )
+        from app.prediction.model_manager import recover_model_file
+        recovered_path = await recover_model_file(model_config)
+        # Kopie statt Mutation - Konfigurations-Snapshots sind unveränderlich
+        model_config = {**model_config, 'local_model_path': recovered_path}
+
+        # DB-Pfad aktualisieren
+        if pool:
+            await pool.execute("""
+                UPDATE prediction_active_models
+                SET local_model_path = $1, updated_at = NOW()
+                WHERE id = $2
+            """, recovered_path, model_config.get('id'))
+
+        return await executor.run('load_model', get_model, model_config)
+
+
+def _model_name(model_config: Dict[str, Any]) -> str:
+    return model_config.get('custom_name') or model_config.get('name', 'Unknown')
+
+
 async def predict_coin(
     coin_id: str,
     timestamp: datetime,
     model_config: Dict[str, Any],
-    pool: Optional[asyncpg.Pool] = None
+    pool: Optional[asyncpg.Pool] = None,
+    feature_context: Optional[FeatureContext] = None
 ) -> Dict[str, Any]:
     """
     Macht Vorhersage für einen Coin mit einem Modell.
@@ -33,6 +69,7 @@ async def predict_coin(
         timestamp: Zeitstempel der Daten
         model_config: Modell-Konfiguration (aus prediction_active_models)
         pool: Datenbank-Pool (optional)
+        feature_context: Geteilter Feature-Kontext des Coin-Events (optional)
         
     Returns:
         Dict mit 'prediction' (0 oder 1) und 'probability' (0.0 - 1.0)
@@ -44,34 +81,15 @@ async def predict_coin(
     
     try:
         # 1. Lade Modell (aus Cache oder Datei) - VOR Features, damit Recovery greifen kann
-        try:
-            model = get_model(model_config)
-        except FileNotFoundError:
-            # Modell-Datei fehlt - versuche Recovery vom Training Service
-            logger.warning(
-                f"⚠️ Modell-Datei fehlt für model_id={model_config['model_id']}, "
-                f"versuche Wiederherstellung..."
-            )
-            from app.prediction.model_manager import recover_model_file
-            recovered_path = await recover_model_file(model_config)
-            model_config['local_model_path'] = recovered_path
-
-            # DB-Pfad aktualisieren
-            if pool:
-                await pool.execute("""
-                    UPDATE prediction_active_models
-                    SET local_model_path = $1, updated_at = NOW()
-                    WHERE id = $2
-                """, recovered_path, model_config.get('id'))
-
-            model = get_model(model_config)
+        model = await _get_model_with_recovery(model_config, pool)
 
         # 2. Bereite Features auf (Modell ist jetzt garantiert auf Disk)
         feature_start = time.time()
         features_df = await prepare_features(
             coin_id=coin_id,
             model_config=model_config,
-            pool=pool
+            pool=pool,
+            feature_context=feature_context
         )
         feature_duration = time.time() - feature_start
         ml_feature_processing_duration_seconds.observe(feature_duration)
@@ -83,8 +101,9 @@ async def predict_coin(
         if X.ndim == 1:
             X = X.reshape(1, -1)
         
-        prediction = model.predict(X)
-        probability = model.predict_proba(X)[:, 1]  # Wahrscheinlichkeit für Klasse 1
+        prediction, probability = await get_inference_executor().predict_proba(
+            model, model_config.get('local_model_path'), X
+        )
         
         # 4. Letzter Eintrag (neueste Vorhersage)
         result = {
@@ -96,8 +115,7 @@ async def predict_coin(
         prediction_duration = time.time() - start_time
         ml_prediction_duration_seconds.labels(model_id=str(model_config['model_id'])).observe(prediction_duration)
         
-        model_name = model_config.get('custom_name') or model_config.get('name', 'Unknown')
-        increment_predictions(model_config['model_id'], model_name)
+        increment_predictions(model_config['model_id'], _model_name(model_config))
         
         logger.debug(
             f"✅ Vorhersage für Coin {coin_id[:8]}... mit Modell {model_config['model_id']}: "
@@ -122,80 +140,205 @@ async def predict_coin(
         raise
 
 
-async def predict_coin_all_models(
-    coin_id: str,
-    timestamp: datetime,
-    active_models: List[Dict[str, Any]],
+
+async def _prime_histories_bulk(contexts: List[FeatureContext], pool: Optional[asyncpg.Pool] = None):
+    """
+    Lädt die Historie aller Coins eines Batches mit einem Query pro Bedarf.
+
+    Coins mit identischem Bedarf (Phasen-Filter, Spalten, Zeilen) werden gebündelt -
+    statt O(Coins × Modelle) Round-Trips fallen nur so viele an, wie es unterschiedliche
+    Bedarfe gibt. Coins, deren Historie im Hot-Store liegt, brauchen keinen Query.
+    Schlägt der Bulk-Load fehl, laden die Coins wie bisher einzeln.
+    """
+    demand_groups: Dict[Tuple, List[FeatureContext]] = {}
+    for feature_context in contexts:
+        for demand in feature_context.history_demands():
+            phases_key, columns, rows = demand
+            if columns is not None and feature_context.prime_from_hot_store(phases_key, columns, rows):
+                continue
+            demand_groups.setdefault(demand, []).append(feature_context)
+
+    for (phases_key, columns, rows), group in demand_groups.items():
+        if len(group) < 2:
+            continue  # Einzelner Coin - normaler Pfad
+        try:
+            histories = await get_coin_histories_bulk(
+                [feature_context.coin_id for feature_context in group],
+                limit=rows,
+                phases=list(phases_key) or None,
+                pool=pool,
+                columns=sorted(columns) if columns is not None else None
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Bulk-Historie für {len(group)} Coins fehlgeschlagen: {e} - lade einzeln")
+            continue
+        for feature_context in group:
+            history = histories.get(feature_context.coin_id)
+            if history is not None:
+                feature_context.prime_history(phases_key, columns, rows, history)
+
+
+async def predict_coins_batch(
+    coin_requests: List[Dict[str, Any]],
     pool: Optional[asyncpg.Pool] = None
-) -> List[Dict[str, Any]]:
+) -> List[List[Dict[str, Any]]]:
     """
-    Macht Vorhersagen mit ALLEN aktiven Modellen.
-    
-    ✅ OPTIMIERT: Parallele Verarbeitung - alle Modelle laufen gleichzeitig!
-    Jedes Modell ist isoliert - ein langsames Modell blockiert die anderen nicht.
-    
+    Macht Vorhersagen für MEHRERE Coins in einem Batch.
+
+    ✅ OPTIMIERT: Pro Modell wird EINE Feature-Matrix über alle Coins gebaut und
+    predict_proba nur EINMAL aufgerufen (statt predict + predict_proba pro Coin).
+    Die fixen Kosten pro Aufruf (RandomForest/XGBoost) fallen so nur einmal pro Batch an.
+
+    Ablauf:
+    1. Features: parallel pro (Coin, Modell), Coins teilen je einen FeatureContext
+    2. Inferenz: gruppiert pro Modell (und Feature-Spalten), ein predict_proba-Aufruf
+    3. Ergebnisse werden zurück auf die Coins verteilt
+
     Args:
-        coin_id: Coin-ID (mint)
-        timestamp: Zeitstempel der Daten
-        active_models: Liste von aktiven Modell-Konfigurationen
+        coin_requests: Liste von Dicts mit 'coin_id', 'timestamp' und 'models'
+                       (Modell-Konfigurationen, die den Coin verarbeiten sollen)
         pool: Datenbank-Pool (optional)
-        
+
     Returns:
-        Liste von Vorhersagen (pro Modell ein Dict)
+        Pro Request eine Liste von Vorhersagen (gleiches Format wie predict_coin_all_models)
     """
-    import asyncio
-    
-    async def predict_single_model(model_config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Hilfsfunktion für parallele Verarbeitung eines Modells"""
+    results: List[List[Dict[str, Any]]] = [[] for _ in coin_requests]
+
+    # 1. Features vorbereiten (ein FeatureContext pro Coin-Event)
+    async def prepare_row(index: int, coin_id: str, model_config: Dict[str, Any], feature_context: FeatureContext):
         try:
-            result = await predict_coin(
+            model = await _get_model_with_recovery(model_config, pool)
+            feature_start = time.time()
+            features_df = await prepare_features(
                 coin_id=coin_id,
-                timestamp=timestamp,
                 model_config=model_config,
-                pool=pool
+                pool=pool,
+                feature_context=feature_context
             )
-            
-            return {
-                "model_id": model_config['model_id'],
-                "active_model_id": model_config['id'],
-                "model_name": model_config.get('custom_name') or model_config.get('name', 'Unknown'),
-                "prediction": result['prediction'],
-                "probability": result['probability']
-            }
-            
+            ml_feature_processing_duration_seconds.observe(time.time() - feature_start)
+            return index, model_config, model, features_df
         except ValueError as e:
             # Feature-Fehler (z.B. keine Historie, fehlende Features, Phase-Filter)
+            increment_errors("prediction")
             logger.warning(
-                f"⚠️ Feature-Fehler bei Modell ID {model_config.get('id', 'unknown')} (Model ID: {model_config['model_id']}, Name: {model_config.get('custom_name') or model_config.get('name', 'Unknown')}) für Coin {coin_id[:8]}...: {e}"
+                f"⚠️ Feature-Fehler bei Modell ID {model_config.get('id', 'unknown')} (Model ID: {model_config['model_id']}, Name: {_model_name(model_config)}) für Coin {coin_id[:8]}...: {e}"
             )
-            return None  # Überspringe dieses Modell
         except Exception as e:
+            increment_errors("prediction")
             logger.error(
-                f"❌ Fehler bei Modell ID {model_config.get('id', 'unknown')} (Model ID: {model_config['model_id']}, Name: {model_config.get('custom_name') or model_config.get('name', 'Unknown')}) für Coin {coin_id[:8]}...: {e}",
+                f"❌ Fehler bei Modell ID {model_config.get('id', 'unknown')} (Model ID: {model_config['model_id']}, Name: {_model_name(model_config)}) für Coin {coin_id[:8]}...: {e}",
                 exc_info=True
             )
-            return None  # Überspringe dieses Modell
-    
-    # ✅ PARALLELE VERARBEITUNG: Alle Modelle laufen gleichzeitig!
-    # return_exceptions=True: Fehler werden als None zurückgegeben, nicht als Exception
-    tasks = [predict_single_model(model_config) for model_config in active_models]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    # Filtere None und Exceptions heraus
-    valid_results = [r for r in results if r is not None and not isinstance(r, Exception)]
+        return None  # Überspringe dieses Modell für diesen Coin
+
+    contexts: List[FeatureContext] = []
+    for request in coin_requests:
+        feature_context = FeatureContext(request['coin_id'], pool=pool)
+        # Spalten-/Zeilenbedarf aller Modelle vorab anmelden -> ein Historie-Query pro Phasen-Filter
+        for model_config in request['models']:
+            plan = peek_feature_plan(model_config)
+            if plan is not None:
+                feature_context.register_plan(plan)
+        contexts.append(feature_context)
+
+    # Historie für alle Coins gebündelt laden: ein Query pro (Phasen-Filter, Spalten, Zeilen)
+    await _prime_histories_bulk(contexts, pool)
+
+    tasks = []
+    for index, request in enumerate(coin_requests):
+        for model_config in request['models']:
+            tasks.append(prepare_row(index, request['coin_id'], model_config, contexts[index]))
+    prepared = await asyncio.gather(*tasks)
+
+    # 2. Gruppieren pro Modell - Feature-Spalten müssen für alle Zeilen identisch sein
+    groups: Dict[Tuple, List[Tuple[int, Dict[str, Any], Any, Any]]] = {}
+    for item in prepared:
+        if item is None:
+            continue
+        index, model_config, model, features_df = item
+        key = (model_config['id'], tuple(features_df.columns))
+        groups.setdefault(key, []).append(item)
+
+    # 3. Ein predict_proba-Aufruf pro Gruppe (im Executor, nicht im Event-Loop), Ergebnisse zurück verteilen
+    executor = get_inference_executor()
+    for rows in groups.values():
+        model_config, model = rows[0][1], rows[0][2]
+        try:
+            start_time = time.time()
+            X = np.vstack([features_df.values[-1:] for _, _, _, features_df in rows])
+            predictions, probabilities = await executor.predict_proba(model, model_config.get('local_model_path'), X)
+            ml_prediction_duration_seconds.labels(model_id=str(model_config['model_id'])).observe(time.time() - start_time)
+        except Exception as e:
+            increment_errors("prediction")
+            logger.error(
+                f"❌ Batch-Inferenz fehlgeschlagen für Modell ID {model_config.get('id', 'unknown')} (Model ID: {model_config['model_id']}, {len(rows)} Coins): {e}",
+                exc_info=True
+            )
+            continue
+
+        model_name = _model_name(model_config)
+        for (index, _, _, _), prediction, probability in zip(rows, predictions, probabilities):
+            increment_predictions(model_config['model_id'], model_name)
+            results[index].append({
+                "model_id": model_config['model_id'],
+                "active_model_id": model_config['id'],
+                "model_name": model_name,
+                "prediction": int(prediction),
+                "probability": float(probability)
+            })
+
+        logger.debug(f"✅ Batch-Inferenz Modell {model_config['model_id']}: {len(rows)} Coins in einem predict_proba-Aufruf")
+
+    # Reihenfolge pro Coin wie in der Modell-Liste
+    for index, request in enumerate(coin_requests):
+        order = {m['id']: position for position, m in enumerate(request['models'])}
+        results[index].sort(key=lambda r: order.get(r['active_model_id'], 0))
+
+        coin_id = request['coin_id']
+        total_models = len(request['models'])
+        valid_count = len(results[index])
+        if valid_count == 0 and total_models > 0:
+            logger.error(
+                f"CRITICAL: ALLE {total_models} Modelle fehlgeschlagen fuer Coin {coin_id[:8]}... "
+                f"Wahrscheinlich Feature-Mismatch oder Daten-Problem."
+            )
+        elif valid_count < total_models:
+            logger.warning(
+                f"⚠️ Vorhersagen für Coin {coin_id[:8]}...: {valid_count}/{total_models} erfolgreich, {total_models - valid_count} fehlgeschlagen"
+            )
+
+    return results
+
+
+async def predict_coin_all_models(
+    coin_id: str,
+    timestamp: datetime,
+    active_models: List[Dict[str, Any]],
+    pool: Optional[asyncpg.Pool] = None
+) -> List[Dict[str, Any]]:
+    """
+    Macht Vorhersagen mit ALLEN aktiven Modellen.
     
-    if len(valid_results) == 0 and len(active_models) > 0:
-        logger.error(
-            f"CRITICAL: ALLE {len(active_models)} Modelle fehlgeschlagen fuer Coin {coin_id[:8]}... "
-            f"Wahrscheinlich Feature-Mismatch oder Daten-Problem."
-        )
-    elif len(valid_results) < len(active_models):
-        failed_count = len(active_models) - len(valid_results)
-        logger.warning(
-            f"⚠️ Vorhersagen für Coin {coin_id[:8]}...: {len(valid_results)}/{len(active_models)} erfolgreich, {failed_count} fehlgeschlagen"
-        )
-    else:
-        logger.info(f"✅ Vorhersagen für Coin {coin_id[:8]}...: {len(valid_results)}/{len(active_models)} erfolgreich (parallel verarbeitet)")
+    ✅ OPTIMIERT: Parallele Verarbeitung - alle Modelle laufen gleichzeitig!
+    Jedes Modell ist isoliert - ein fehlerhaftes Modell blockiert die anderen nicht.
+    ✅ OPTIMIERT: Alle Modelle teilen einen FeatureContext - Historie wird nur einmal
+    pro Phasen-Filter geladen, Feature-Engineering nur einmal pro Window-Konfiguration.
     
-    return valid_results
+    Args:
+        coin_id: Coin-ID (mint)
+        timestamp: Zeitstempel der Daten
+        active_models: Liste von aktiven Modell-Konfigurationen
+        pool: Datenbank-Pool (optional)
+        
+    Returns:
+        Liste von Vorhersagen (pro Modell ein Dict)
+    """
+    results = (await predict_coins_batch(
+        [{"coin_id": coin_id, "timestamp": timestamp, "models": active_models}],
+        pool=pool
+    ))[0]
 
+    if results and len(results) == len(active_models):
+        logger.info(f"✅ Vorhersagen für Coin {coin_id[:8]}...: {len(results)}/{len(active_models)} erfolgreich (parallel verarbeitet)")
+    
+    return results
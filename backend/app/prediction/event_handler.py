@@ -2,461 +2,728 @@
 Event-Handler für Pump Server
 
 Überwacht coin_metrics für neue Einträge und macht automatisch Vorhersagen.
-Unterstützt LISTEN/NOTIFY (Echtzeit) und Polling-Fallback.
+Neue Zeilen werden immer über den Keyset-Cursor (timestamp, mint) gelesen - LISTEN/NOTIFY
+weckt den Reader sofort (Push), Polling läuft nur noch als Sicherheitsnetz. Nach jedem
+(Re-)Connect des Listeners wird ab dem Cursor nachgelesen, dadurch geht nichts verloren.
 """
 import asyncio
 import json
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Mapping, NamedTuple, Optional, Set, Tuple
 import asyncpg
 from app.database.connection import get_pool, DB_DSN
 from app.database.models import (
-    get_active_models, save_prediction, save_model_prediction,
+    save_prediction, save_model_prediction,
     check_coin_ignore_status, update_coin_scan_cache,
-    get_coin_metrics_at_timestamp
+    get_coin_metrics_at_timestamp, build_model_prediction_row,
+    compute_scan_cache_entry, save_model_predictions_batch,
+    get_active_prediction_counts, watermark_available,
+    get_processing_watermark, save_processing_watermark, rewind_processing_watermark
 )
-from app.prediction.engine import predict_coin_all_models
+from app.prediction.alert_evaluator import get_alert_evaluator
+from app.prediction.engine import predict_coins_batch
+from app.prediction.executor import get_inference_executor
+from app.prediction.feature_processor import get_feature_plan
+from app.prediction.hot_store import get_hot_store
+from app.prediction.ignore_cache import get_ignore_cache
+from app.prediction.ingest_buffer import IngestBuffer
+from app.prediction.leadership import JOB_ATH_TRACKING, JOB_PREDICTION_EVALUATION, get_leader_election
+from app.prediction.model_config import ModelConfigSnapshot, get_model_config_store
+from app.prediction.model_manager import pin_active_models
+from app.prediction.routing import ModelRoutingIndex
+from app.prediction.scheduler import BackgroundJob, get_background_scheduler
 from app.prediction.n8n_client import send_to_n8n
-from app.utils.config import POLLING_INTERVAL_SECONDS, BATCH_SIZE, BATCH_TIMEOUT_SECONDS
+from app.prediction.warmup import get_model_warmup
+from app.prediction.work_queue import get_work_queue
+from app.utils.config import (
+    POLLING_INTERVAL_SECONDS, POLLING_PAGE_SIZE, BATCH_SIZE, COIN_PIPELINE_CONCURRENCY,
+    IGNORE_CACHE_ENABLED, LISTEN_RECONNECT_MAX_SECONDS, LISTEN_HEALTHCHECK_SECONDS,
+    INGEST_BUFFER_CAPACITY, INGEST_SHED_POLICY, INGEST_MAX_ATTEMPTS, LATE_ENTRY_WINDOW_SECONDS,
+    EVENT_HANDLER_MODE,
+    WORK_QUEUE_POLL_SECONDS, WORK_QUEUE_MAX_ATTEMPTS
+)
 from app.utils.logging_config import get_logger
+from app.utils.metrics import (
+    ml_pipeline_stage_duration_seconds, ml_pipeline_inflight, increment_errors,
+    ml_ingest_listener_connected, ml_ingest_lag_seconds, ml_work_queue_items_total
+)
 
 logger = get_logger(__name__)
 
+# Schlüssel in prediction_watermarks
+WATERMARK_CONSUMER = 'event_handler'
+# Batch-Größen der Hintergrund-Jobs (voller Batch = Rückstand, der Scheduler macht sofort weiter)
+EVALUATION_BATCH_SIZE = 500  # evaluate_pending_predictions holt per_model_batch_size * 10 = 500 Einträge
+ATH_TRACKING_BATCH_SIZE = 200
+
+# Ergebnis eines Batches bzw. einer Welle - nur committed/empty dürfen den Verarbeitungsstand weiterschieben
+BATCH_COMMITTED = 'committed'  # Vorhersagen geschrieben
+BATCH_EMPTY = 'empty'  # bewusst nichts zu schreiben (ignoriert, gefiltert, max_log)
+BATCH_FAILED = 'failed'  # Inferenz/Vorbereitung/Write fehlgeschlagen - Einträge erneut verarbeiten
+BATCH_DEFERRED = 'deferred'  # kein Modell routbar (Warm-up) - Einträge unverändert zurückstellen
+
+
+class BatchOutcome(NamedTuple):
+    status: str
+    watermark_saved: bool  # Verarbeitungsstand im selben Write committet
+    failed_entries: List[Dict[str, Any]]  # Einträge, die nicht (vollständig) geschrieben wurden
+
+
+def _combine_status(statuses: List[str]) -> str:
+    if BATCH_FAILED in statuses:
+        return BATCH_FAILED
+    if BATCH_COMMITTED in statuses:
+        return BATCH_COMMITTED
+    return BATCH_EMPTY
+
 
 class EventHandler:
     """Event-Handler mit LISTEN/NOTIFY und Polling-Fallback"""
     
     def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
         self.listener_connection: Optional[asyncpg.Connection] = None
-        self.use_listen_notify = True
-        self.batch: List[Dict[str, Any]] = []
-        self.batch_lock = asyncio.Lock()
-        self.last_batch_time = datetime.now(timezone.utc)
+        self.use_listen_notify = False
+        self.listener_lost = asyncio.Event()
+        # NOTIFY weckt den Keyset-Reader - die Zeilen selbst kommen immer über den Cursor
+        self.ingest_wakeup = asyncio.Event()
+        self.wake_source: Optional[str] = None
+        # Notifications hinter dem Cursor (spät committete Transaktionen) - werden direkt verarbeitet
+        self.late_entries: List[Dict[str, Any]] = []
+        # Gelesene (timestamp, mint)-Keys der letzten LATE_ENTRY_WINDOW_SECONDS hinter dem Cursor -
+        # unterscheidet verspätete Commits von bereits gelesenen Zeilen (auch bei mehrseitigem Rückstand)
+        self.recent_keys: OrderedDict = OrderedDict()
+        # Neuester Eintrag pro Mint, begrenzt - bei Überlauf Load Shedding (INGEST_SHED_POLICY)
+        self.ingest_buffer = IngestBuffer(INGEST_BUFFER_CAPACITY, INGEST_SHED_POLICY, is_priority=self._has_pending_alert)
+        # mint -> evaluation_timestamp der letzten Alert-Vorhersage (Priorität bei alerts_first)
+        self.alert_mints: Dict[str, datetime] = {}
+        self.saved_watermark: Optional[Tuple[datetime, str]] = None
         self.running = False
-        self.active_models: List[Dict[str, Any]] = []
-        self.last_models_update = datetime.now(timezone.utc)
-        self.notification_queue: Optional[asyncio.Queue] = None
+        self.active_models: List[Mapping[str, Any]] = []
+        self.models_version = 0  # Version des zuletzt übernommenen ModelConfigSnapshot
+        self.routing_index: Optional[ModelRoutingIndex] = None
         self.last_heartbeat = datetime.now(timezone.utc)
+        self.last_heartbeat_log = datetime.now(timezone.utc)  # Watchdog loggt den Heartbeat alle 5 Minuten
         self.last_processed_timestamp = datetime.now(timezone.utc) - timedelta(minutes=5)
+        self.last_processed_mint: Optional[str] = None  # Cursor (timestamp, mint), persistiert in prediction_watermarks
+        # Begrenzte Parallelität pro Coin (an DB_POOL_MAX_SIZE ausgerichtet), Batches nacheinander
+        self.pipeline_semaphore = asyncio.Semaphore(max(1, COIN_PIPELINE_CONCURRENCY))
+        self.pipeline_lock = asyncio.Lock()
     
-    async def setup_listener(self):
-        """Setup LISTEN/NOTIFY Listener"""
+    async def setup_listener(self) -> bool:
+        """
+        (Re-)Connect der LISTEN-Connection auf coin_metrics_insert.
+
+        Returns:
+            True, wenn LISTEN aktiv ist
+        """
         logger.info("🔧 Starte LISTEN/NOTIFY Setup...")
         try:
             # Separate Connection für LISTEN (kann nicht über Pool sein)
             self.listener_connection = await asyncpg.connect(DB_DSN)
-            
-            # ⚠️ WICHTIG: asyncpg's add_listener benötigt eine sync Funktion
-            # Aber wir müssen async Code ausführen - nutze eine Queue!
-            self.notification_queue = asyncio.Queue()
-            
-            # Listener-Funktion (MUSS synchron sein für asyncpg!)
-            def notification_handler(conn, pid, channel, payload):
-                """Wird aufgerufen wenn NOTIFY empfangen wird - LIVE!"""
-                try:
-                    logger.info(f"🔔🔔🔔 LIVE NOTIFY empfangen! Channel={channel}, PID={pid}")
-                    logger.info(f"📦 Payload: {payload}")
-                    
-                    # Parse JSON
-                    data = json.loads(payload)
-                    coin_id = data.get('mint', 'UNKNOWN')[:20]
-                    timestamp = data.get('timestamp', 'N/A')
-                    logger.info(f"🪙 Neuer Coin-Eintrag LIVE: {coin_id}... am {timestamp}")
-                    
-                    # Füge zu Queue hinzu (thread-safe)
-                    # ⚠️ WICHTIG: notification_handler ist sync, aber Queue.put() ist async
-                    # Nutze call_soon_threadsafe um async Task im Event Loop zu erstellen
-                    try:
-                        loop = asyncio.get_event_loop()
-                        if loop.is_running():
-                            # Loop läuft - nutze call_soon_threadsafe für async Operation
-                            def put_in_queue():
-                                try:
-                                    asyncio.create_task(self.notification_queue.put(data))
-                                except Exception as e:
-                                    logger.error(f"❌ Fehler beim Erstellen der Queue-Task: {e}")
-                            loop.call_soon_threadsafe(put_in_queue)
-                            logger.debug(f"✅ Event zu Queue hinzugefügt für Coin {coin_id}...")
-                        else:
-                            # Loop läuft nicht - direkt put (sollte nicht passieren)
-                            asyncio.run(self.notification_queue.put(data))
-                            logger.debug(f"✅ Event zu Queue hinzugefügt (run) für Coin {coin_id}...")
-                    except RuntimeError as e:
-                        # Kein Event Loop - erstelle neuen
-                        logger.warning(f"⚠️ Kein Event Loop, erstelle neuen: {e}")
-                        try:
-                            loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(loop)
-                            loop.run_until_complete(self.notification_queue.put(data))
-                            logger.debug(f"✅ Event zu Queue hinzugefügt (neuer Loop) für Coin {coin_id}...")
-                        except Exception as e2:
-                            logger.error(f"❌ Fehler beim Erstellen neues Loop: {e2}")
-                except Exception as e:
-                    logger.error(f"❌ Fehler beim Verarbeiten von Notification: {e}", exc_info=True)
-            
-            # Listener registrieren
-            await self.listener_connection.add_listener(
-                'coin_metrics_insert',
-                notification_handler
-            )
-            
-            # LISTEN aktivieren
-            await self.listener_connection.execute("LISTEN coin_metrics_insert")
+            self.listener_lost.clear()
+            self.listener_connection.add_termination_listener(lambda conn: self.listener_lost.set())
+            await self.listener_connection.add_listener('coin_metrics_insert', self._notification_handler)
 
-            logger.info("✅ LISTEN/NOTIFY ERFOLGREICH aktiviert - warte auf neue Coins!")
             self.use_listen_notify = True
-            
-            # Starte Queue-Processor (verarbeitet Events aus Queue)
-            asyncio.create_task(self._process_notification_queue())
-            
+            ml_ingest_listener_connected.set(1)
+            logger.info("✅ LISTEN/NOTIFY aktiviert - Catch-up ab Cursor, danach Push")
+            # Catch-up: alles, was vor/während des (Re-)Connects eingefügt wurde, kommt über den Cursor
+            self._wake('catchup')
+            return True
         except Exception as e:
-            logger.warning(f"⚠️ LISTEN/NOTIFY nicht verfügbar: {e}", exc_info=True)
-            logger.info("→ Fallback auf Polling")
-            logger.error(f"❌ LISTEN/NOTIFY SETUP FEHLER: {str(e)}")
-            logger.info("🔄 POLLING-MODUS: Prüfe alle 30 Sekunden nach neuen Coins")
-            import traceback
-            logger.error(f"❌ FULL TRACEBACK: {traceback.format_exc()}")
-            self.use_listen_notify = False
-    
-    async def _process_notification_queue(self):
-        """Verarbeitet Events aus der Notification-Queue"""
-        logger.info("🔄 Notification-Queue-Processor gestartet")
+            logger.warning(f"⚠️ LISTEN/NOTIFY nicht verfügbar - Polling alle {POLLING_INTERVAL_SECONDS}s: {e}")
+            await self._close_listener()
+            return False
+
+    async def _close_listener(self):
+        self.use_listen_notify = False
+        ml_ingest_listener_connected.set(0)
+        if self.listener_connection is not None and not self.listener_connection.is_closed():
+            try:
+                await self.listener_connection.close()
+            except Exception as e:
+                logger.debug(f"LISTEN-Connection schließen fehlgeschlagen: {e}")
+        self.listener_connection = None
+
+    def _notification_handler(self, conn, pid, channel, payload):
+        """asyncpg-Callback (synchron) - übergibt thread-sicher an den Event-Loop"""
+        self.loop.call_soon_threadsafe(self._on_coin_notify, payload)
+
+    def _on_coin_notify(self, payload: str):
+        """Läuft im Event-Loop: weckt den Reader; Zeilen hinter dem Cursor werden direkt vorgemerkt"""
+        try:
+            data = json.loads(payload)
+            mint = data['mint']
+            timestamp = datetime.fromisoformat(data['timestamp'])
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+        except Exception as e:
+            logger.warning(f"⚠️ Ungültige Notification ignoriert: {payload[:200]} ({e})")
+            return
+
+        key = (timestamp, mint)
+        if key <= (self.last_processed_timestamp, self.last_processed_mint or '') and key not in self.recent_keys:
+            # Transaktion hat nach dem Lesen des Cursors committet - der Keyset-Reader sieht sie nie
+            self.late_entries.append({'mint': mint, 'timestamp': timestamp, 'phase_id': data.get('phase_id')})
+        self._wake('notify')
+
+    def _wake(self, source: str):
+        if self.wake_source is None:
+            self.wake_source = source
+        self.ingest_wakeup.set()
+
+    def _remember_keys(self, keys: List[Tuple[datetime, str]]):
+        for key in keys:
+            self.recent_keys[key] = None
+        if not self.recent_keys:
+            return
+        # Keys kommen aufsteigend (Keyset) - vorne liegen die ältesten; Grenze relativ zum neuen Cursor
+        cutoff = next(reversed(self.recent_keys))[0] - timedelta(seconds=LATE_ENTRY_WINDOW_SECONDS)
+        while self.recent_keys and next(iter(self.recent_keys))[0] < cutoff:
+            self.recent_keys.popitem(last=False)
+
+    async def _listener_loop(self):
+        """Hält die LISTEN-Connection offen: Reconnect mit Backoff, regelmäßiger Health-Check"""
+        backoff = 1.0
         while self.running:
             try:
-                # Warte auf Event (mit Timeout)
-                event_data = await asyncio.wait_for(
-                    self.notification_queue.get(),
-                    timeout=1.0
-                )
-                logger.debug(f"📥 Event aus Queue geholt: {event_data.get('mint', 'UNKNOWN')[:20]}...")
-                await self.add_to_batch(event_data)
-            except asyncio.TimeoutError:
-                # Timeout ist OK - nur prüfen ob noch running
-                continue
+                if self.listener_connection is None or self.listener_connection.is_closed():
+                    if not await self.setup_listener():
+                        await asyncio.sleep(backoff)
+                        backoff = min(backoff * 2, LISTEN_RECONNECT_MAX_SECONDS)
+                        continue
+                    backoff = 1.0
+
+                try:
+                    await asyncio.wait_for(self.listener_lost.wait(), timeout=LISTEN_HEALTHCHECK_SECONDS)
+                    logger.warning("⚠️ LISTEN-Connection verloren - Reconnect")
+                except asyncio.TimeoutError:
+                    # Health-Check: erkennt auch stille Verbindungsabbrüche
+                    try:
+                        await asyncio.wait_for(self.listener_connection.fetchval("SELECT 1"), timeout=5)
+                        continue
+                    except Exception as e:
+                        logger.warning(f"⚠️ LISTEN-Connection Health-Check fehlgeschlagen - Reconnect: {e}")
+                await self._close_listener()
             except Exception as e:
-                logger.error(f"❌ Fehler im Queue-Processor: {e}", exc_info=True)
-    
-    async def add_to_batch(self, event_data: Dict[str, Any]):
-        """Fügt Event zu Batch hinzu"""
-        should_process = False
-        batch_to_process = None
-        
-        async with self.batch_lock:
-            # Wenn Batch leer war, setze last_batch_time neu (Start des neuen Batches)
-            if not self.batch:
-                self.last_batch_time = datetime.now(timezone.utc)
-            
-            self.batch.append(event_data)
-            logger.debug(f"📥 Event zu Batch hinzugefügt (Batch-Größe: {len(self.batch)})")
-            
-            # Prüfe ob Batch voll
-            if len(self.batch) >= BATCH_SIZE:
-                logger.info(f"📦 Batch voll ({len(self.batch)} Einträge), verarbeite sofort")
-                batch_to_process = self.batch.copy()
-                self.batch.clear()
-                self.last_batch_time = datetime.now(timezone.utc)
-                should_process = True
-        
-        # ⚠️ WICHTIG: Verarbeite Batch AUSSERHALB des Locks!
-        if should_process and batch_to_process:
-            logger.info(f"🔄 Verarbeite Batch: {len(batch_to_process)} Einträge")
-            await self._process_coin_entries(batch_to_process)
-    
-    async def process_batch(self):
-        """Verarbeitet aktuellen Batch"""
-        async with self.batch_lock:
-            if not self.batch:
-                return
-            
-            batch_to_process = self.batch.copy()
-            self.batch.clear()
-            self.last_batch_time = datetime.now(timezone.utc)
-        
-        logger.info(f"🔄 Verarbeite Batch: {len(batch_to_process)} Einträge")
-        # Verarbeite Batch
-        await self._process_coin_entries(batch_to_process)
-    
-    async def _process_coin_entries(self, coin_entries: List[Dict[str, Any]]):
+                logger.error(f"❌ Fehler im Listener-Loop: {e}", exc_info=True)
+                await self._close_listener()
+                await asyncio.sleep(backoff)
+
+    async def _apply_model_snapshot(self, snapshot: ModelConfigSnapshot):
+        """Übernimmt einen neuen Konfigurations-Snapshot (nur bei neuer Version)"""
+        if snapshot.version == self.models_version:
+            return
+        self.models_version = snapshot.version
+        self.active_models = list(snapshot.models)
+        try:
+            # Process-Executor: Worker laden die aktiven Modelle beim Start vor
+            get_inference_executor().preload([m.get('local_model_path') for m in self.active_models])
+            # Aktive Modelle im Cache pinnen - deaktivierte werden dabei entfernt
+            pin_active_models([m.get('local_model_path') for m in self.active_models])
+            # Neue Modelle im Hintergrund aufwärmen - erst danach werden sie geroutet
+            get_model_warmup().schedule(self.active_models)
+            # Feature-Pläne einmal pro Modell bauen (bei Konfig-Änderung automatisch neu)
+            for m in self.active_models:
+                await get_feature_plan(m)
+            logger.info(f"✅ Aktive Modelle aktualisiert (Version {snapshot.version}): {len(self.active_models)} Modelle")
+            # Debug: Zeige n8n_enabled Status
+            for m in self.active_models:
+                logger.debug(f"  - Modell {m.get('id')}: n8n_enabled={m.get('n8n_enabled')}, n8n_url={m.get('n8n_webhook_url')}")
+        except Exception as e:
+            logger.error(f"❌ Fehler beim Aktualisieren aktiver Modelle: {e}")
+
+    async def _process_coin_entries(
+        self,
+        coin_entries: List[Dict[str, Any]],
+        watermark: Optional[Tuple[datetime, str]] = None
+    ) -> BatchOutcome:
         """
         Verarbeitet Liste von Coin-Einträgen.
         
         Args:
             coin_entries: Liste von Dicts mit 'mint' und 'timestamp'
+            watermark: Verarbeitungsstand (timestamp, mint) nach diesem Batch - wird mit dem
+                letzten Batch-Write in derselben Transaktion gespeichert
+
+        Returns:
+            BatchOutcome: Status (committed / empty / failed / deferred), ob der Verarbeitungsstand
+            mitgeschrieben wurde, und die fehlgeschlagenen bzw. zurückgestellten Einträge
         """
         pool = await get_pool()
         
-        # Aktualisiere aktive Modelle (alle 10 Sekunden - für n8n Einstellungen wichtig!)
-        now = datetime.now(timezone.utc)
-        if (now - self.last_models_update).total_seconds() > 10:
-            try:
-                self.active_models = await get_active_models()
-                self.last_models_update = now
-                logger.debug(f"✅ Aktive Modelle aktualisiert: {len(self.active_models)} Modelle")
-                # Debug: Zeige n8n_enabled Status
-                for m in self.active_models:
-                    logger.debug(f"  - Modell {m.get('id')}: n8n_enabled={m.get('n8n_enabled')}, n8n_url={m.get('n8n_webhook_url')}")
-            except Exception as e:
-                logger.error(f"❌ Fehler beim Aktualisieren aktiver Modelle: {e}")
+        # Modell-Konfiguration aus dem Snapshot (Reload per NOTIFY, siehe model_config.py)
+        await self._apply_model_snapshot(get_model_config_store().get())
         
         if not self.active_models:
             logger.warning("⚠️ Keine aktiven Modelle - überspringe Vorhersagen")
-            return
+            return BatchOutcome(BATCH_EMPTY, False, [])
         
+        # 🔥 WARM-UP: Nur aufgewärmte Modelle verarbeiten (kein Latenz-Spike im ersten Batch)
+        routable_models = self._routable_models()
+        if not routable_models:
+            # Nicht "alles ignoriert": die Einträge wurden nie vorhergesagt - zurückstellen, Stand bleibt stehen
+            logger.info(f"🔥 Alle Modelle noch im Warm-up - {len(coin_entries)} Einträge zurückgestellt")
+            return BatchOutcome(BATCH_DEFERRED, False, list(coin_entries))
+        if len(routable_models) < len(self.active_models):
+            logger.info(f"🔥 {len(self.active_models) - len(routable_models)} Modelle noch im Warm-up - werden übersprungen")
+
+        # 🔀 ROUTING-INDEX: Einmal pro Snapshot-Version bzw. Warm-up-Stand neu bauen
+        routing_key = (self.models_version, tuple(m.get('id') for m in routable_models))
+        if self.routing_index is None or self.routing_index.key != routing_key:
+            self.routing_index = ModelRoutingIndex(routable_models, key=routing_key)
+        routing_index = self.routing_index
+
         # Verarbeite jeden Coin mit Ignore-Logik
-        model_names = [m.get('custom_name') or m.get('name', 'Unknown') for m in self.active_models]
-        logger.info(f"📊 Verarbeite {len(coin_entries)} Coin-Einträge mit {len(self.active_models)} aktiven Modellen: {', '.join(model_names)}")
+        model_names = [m.get('custom_name') or m.get('name', 'Unknown') for m in routable_models]
+        logger.info(f"📊 Verarbeite {len(coin_entries)} Coin-Einträge mit {len(routable_models)} aktiven Modellen: {', '.join(model_names)}")
+
+        # 🌊 WELLEN: Das n-te Vorkommen eines Coins im Batch landet in Welle n.
+        # Innerhalb einer Welle ist jeder Mint höchstens einmal enthalten und wird parallel verarbeitet;
+        # die Wellen laufen nacheinander - die Reihenfolge pro Mint bleibt damit erhalten.
+        waves: List[List[Dict[str, Any]]] = []
+        occurrences: Dict[Any, int] = {}
+        for entry in coin_entries:
+            mint = entry.get('mint')
+            wave_index = occurrences.get(mint, 0)
+            occurrences[mint] = wave_index + 1
+            if wave_index == len(waves):
+                waves.append([])
+            waves[wave_index].append(entry)
 
         total_processed = 0
         total_ignored = 0
+        statuses: List[str] = []
+        failed_entries: List[Dict[str, Any]] = []
+        watermark_saved = False
+        # Batches (Ingestion, verspätete Einträge) nacheinander - sonst könnten zwei Batches denselben Mint überholen
+        async with self.pipeline_lock:
+            for wave_index, wave in enumerate(waves):
+                # Verarbeitungsstand nur mit der letzten Welle - erst dann ist der ganze Batch geschrieben -
+                # und nie über fehlgeschlagene Einträge früherer Wellen hinweg
+                wave_watermark = watermark if wave_index == len(waves) - 1 and not failed_entries else None
+                processed, ignored, outcome = await self._process_wave(wave, routing_index, pool, watermark=wave_watermark)
+                total_processed += processed
+                total_ignored += ignored
+                statuses.append(outcome.status)
+                failed_entries.extend(outcome.failed_entries)
+                watermark_saved = outcome.watermark_saved
 
-        for entry in coin_entries:
-            coin_id = entry.get('mint')
-            timestamp_str = entry.get('timestamp')
-            
-            if not coin_id or not timestamp_str:
-                logger.warning(f"⚠️ Ungültiger Eintrag: {entry}")
-                continue
-            
-            logger.debug(f"🪙 Verarbeite Coin: {coin_id[:20]}... am {timestamp_str}")
-            
-            # Parse timestamp
+        # 📊 Zusammenfassung der Verarbeitung
+        logger.info(f"📊 Batch-Verarbeitung abgeschlossen: {total_processed} Vorhersagen erstellt, {total_ignored} Coins/Modelle ignoriert")
+        if failed_entries:
+            logger.warning(f"⚠️ {len(failed_entries)} Coin-Einträge nicht geschrieben - Verarbeitungsstand bleibt stehen")
+        return BatchOutcome(_combine_status(statuses), watermark_saved, failed_entries)
+
+    def _routable_models(self) -> List[Dict[str, Any]]:
+        """Aktive Modelle, deren Warm-up abgeschlossen ist"""
+        warmup = get_model_warmup()
+        return [m for m in self.active_models if warmup.is_ready(m)]
+
+    async def _run_limited(self, stage: str, coro):
+        """Führt eine Pipeline-Stufe für einen Coin unter dem Concurrency-Limit aus (mit Timing)"""
+        async with self.pipeline_semaphore:
+            ml_pipeline_inflight.inc()
+            start_time = time.time()
             try:
-                if isinstance(timestamp_str, str):
-                    timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                else:
-                    timestamp = timestamp_str
-                
-                if timestamp.tzinfo is None:
-                    timestamp = timestamp.replace(tzinfo=timezone.utc)
-            except Exception as e:
-                logger.error(f"❌ Fehler beim Parsen von Timestamp: {e}")
-                continue
+                return await coro
+            finally:
+                ml_pipeline_stage_duration_seconds.labels(stage=stage).observe(time.time() - start_time)
+                ml_pipeline_inflight.dec()
+
+    async def _process_wave(
+        self,
+        entries: List[Dict[str, Any]],
+        routing_index: ModelRoutingIndex,
+        pool: asyncpg.Pool,
+        watermark: Optional[Tuple[datetime, str]] = None
+    ) -> Tuple[int, int, BatchOutcome]:
+        """
+        Verarbeitet eine Welle (jeder Mint höchstens einmal): Routing, Vorbereitung und n8n
+        parallel unter COIN_PIPELINE_CONCURRENCY, Inferenz und DB-Write als je ein Batch.
+
+        Returns:
+            (Anzahl Vorhersagen, Anzahl ignorierter Coin/Modell-Paare, BatchOutcome der Welle)
+        """
+        # 🔀 ROUTING: Filter- und Ignore-Logik pro Coin und Modell
+        routed = await asyncio.gather(*(
+            self._run_limited('route', self._route_entry(entry, routing_index, pool))
+            for entry in entries
+        ))
+        coin_requests = [request for request, _ in routed if request is not None]
+        total_ignored = sum(ignored for _, ignored in routed)
+
+        if not coin_requests:
+            return 0, total_ignored, BatchOutcome(BATCH_EMPTY, False, [])
+
+        # 🧊 HOT-STORE: Neue Zeilen der Batch-Coins einmal laden (Features, Metriken, ATH lesen daraus)
+        ingest_start = time.time()
+        await get_hot_store().ingest([r['coin_id'] for r in coin_requests], pool=pool)
+        ml_pipeline_stage_duration_seconds.labels(stage='ingest').observe(time.time() - ingest_start)
+
+        # 🔮 BATCH-INFERENZ: Ein predict_proba-Aufruf pro Modell für alle Coins der Welle
+        predict_start = time.time()
+        try:
+            batch_results = await predict_coins_batch(coin_requests, pool=pool)
+        except Exception as e:
+            logger.error(f"❌ Fehler bei Batch-Inferenz für {len(coin_requests)} Coins: {e}", exc_info=True)
+            return 0, total_ignored, BatchOutcome(BATCH_FAILED, False, [r['entry'] for r in coin_requests])
+        finally:
+            ml_pipeline_stage_duration_seconds.labels(stage='predict').observe(time.time() - predict_start)
+
+        total_processed = sum(len(results) for results in batch_results)
+
+        # 💾 PERSISTENZ: Pro Coin vorbereiten (Metriken, max_log-Prüfung), dann EIN Batch-Write
+        prepared = await asyncio.gather(*(
+            self._run_limited('prepare', self._prepare_persistence(request, results, pool))
+            for request, results in zip(coin_requests, batch_results)
+        ))
+        total_ignored += sum(p['ignored'] for p in prepared)
+        failed_mints = {request['coin_id'] for request, p in zip(coin_requests, prepared) if p['failed']}
+        # Vorbereitung fehlgeschlagen: Stand nicht mitschreiben, sonst läge er hinter diesen Coins
+        status, watermark_saved, write_failed_mints = await self._write_predictions(
+            prepared, pool, watermark=None if failed_mints else watermark
+        )
+        failed_mints |= write_failed_mints
+        if failed_mints:
+            status = BATCH_FAILED
+
+        # 📤 n8n: Pro Coin parallel (nur für tatsächlich verarbeitete Modelle)
+        await asyncio.gather(*(
+            self._run_limited('n8n', self._send_coin_to_n8n(request, results))
+            for request, results in zip(coin_requests, batch_results)
+        ))
+        failed_entries = [request['entry'] for request in coin_requests if request['coin_id'] in failed_mints]
+        return total_processed, total_ignored, BatchOutcome(status, watermark_saved, failed_entries)
+
+    async def _write_predictions(
+        self,
+        prepared: List[Dict[str, Any]],
+        pool: asyncpg.Pool,
+        watermark: Optional[Tuple[datetime, str]] = None
+    ) -> Tuple[str, bool, Set[str]]:
+        """
+        Schreibt alle Vorhersagen einer Welle in einem Roundtrip (model_predictions,
+        total_predictions-Deltas, coin_scan_cache, optional Verarbeitungsstand). Schlägt der
+        Batch fehl, wird Zeile für Zeile gespeichert, damit eine fehlerhafte Zeile nicht die
+        ganze Welle kostet. Doppelte Vorhersagen (Replay) werden übersprungen.
+
+        Returns:
+            (Status committed/empty/failed, Verarbeitungsstand im Batch mitgeschrieben,
+            Mints mit nicht gespeicherten Vorhersagen)
+        """
+        predictions = [kwargs for p in prepared for kwargs in p['predictions']]
+        scan_updates = [kwargs for p in prepared for kwargs in p['scan_updates']]
+        if not predictions:
+            return BATCH_EMPTY, False, set()
+        if watermark is not None and not watermark_available():
+            watermark = None
+
+        ignore_cache = get_ignore_cache()
+        persist_start = time.time()
+        try:
+            rows = [build_model_prediction_row(**kwargs) for kwargs in predictions]
+            scan_entries = [compute_scan_cache_entry(**kwargs) for kwargs in scan_updates]
+            await save_model_predictions_batch(
+                rows,
+                scan_cache_rows=None if ignore_cache.loaded else scan_entries,
+                watermark=(WATERMARK_CONSUMER, *watermark) if watermark is not None else None,
+                pool=pool
+            )
+            # Cooldowns erst nach erfolgreichem Write wirksam (wie bisher nach save_model_prediction)
+            if ignore_cache.loaded:
+                for scan_entry in scan_entries:
+                    ignore_cache.record(*scan_entry)
+            # Coins mit offenen Alerts merken (Priorität im Ingestion-Puffer)
+            for row in rows:
+                if row[5] == 'alert':
+                    self.alert_mints[row[0]] = row[7]
+            if len(self.alert_mints) > INGEST_BUFFER_CAPACITY:
+                now = datetime.now(timezone.utc)
+                self.alert_mints = {mint: ts for mint, ts in self.alert_mints.items() if ts > now}
+            return BATCH_COMMITTED, watermark is not None, set()
+        except Exception as e:
+            logger.error(f"❌ Batch-Write für {len(predictions)} Vorhersagen fehlgeschlagen - speichere einzeln: {e}")
+            failed_mints: Set[str] = set()
+            for save_kwargs, scan_kwargs in zip(predictions, scan_updates):
+                try:
+                    await save_model_prediction(**save_kwargs, pool=pool)
+                    # coin_scan_cache wie im Batch-Pfad: bei geladenem Ignore-Cache über dessen Write-Behind
+                    if ignore_cache.loaded:
+                        ignore_cache.record(*compute_scan_cache_entry(**scan_kwargs))
+                    else:
+                        await update_coin_scan_cache(pool=pool, **scan_kwargs)
+                except Exception as e:
+                    failed_mints.add(save_kwargs['coin_id'])
+                    logger.error(f"❌ Fehler beim Speichern/Aktualisieren für Modell {save_kwargs['active_model_id']}: {e}")
+            # Verarbeitungsstand wurde nicht mitgeschrieben - der Aufrufer schiebt ihn nur ohne Fehler weiter
+            return (BATCH_FAILED if failed_mints else BATCH_COMMITTED), False, failed_mints
+        finally:
+            persist_duration = time.time() - persist_start
+            ml_pipeline_stage_duration_seconds.labels(stage='persist').observe(persist_duration)
+            logger.info(f"💾 {len(predictions)} Vorhersagen gespeichert in {persist_duration * 1000:.0f}ms")
+
+    async def _route_entry(
+        self,
+        entry: Dict[str, Any],
+        routing_index: ModelRoutingIndex,
+        pool: asyncpg.Pool
+    ) -> Tuple[Optional[Dict[str, Any]], int]:
+        """
+        Filter- und Ignore-Logik für einen Coin-Eintrag über alle Modelle.
+
+        Returns:
+            (Request für predict_coins_batch oder None, Anzahl ignorierter Coin/Modell-Paare)
+        """
+        ignored = 0
+        coin_id = entry.get('mint')
+        timestamp_str = entry.get('timestamp')
+        
+        if not coin_id or not timestamp_str:
+            logger.warning(f"⚠️ Ungültiger Eintrag: {entry}")
+            return None, ignored
+        
+        logger.debug(f"🪙 Verarbeite Coin: {coin_id[:20]}... am {timestamp_str}")
+        
+        # Parse timestamp
+        try:
+            if isinstance(timestamp_str, str):
+                timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+            else:
+                timestamp = timestamp_str
             
-            # 🔄 COIN-FILTER- UND IGNORE-LOGIK: Prüfe für jedes Modell separat
-            models_to_process = []
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+        except Exception as e:
+            logger.error(f"❌ Fehler beim Parsen von Timestamp: {e}")
+            return None, ignored
+        
+        # 🔍 COIN-FILTER- UND PHASEN-LOGIK: Kandidaten aus dem Routing-Index (Whitelist + Phasen)
+        candidate_models = routing_index.route(coin_id, entry.get('phase_id'))
+        ignored += routing_index.model_count - len(candidate_models)
+        if len(candidate_models) < routing_index.model_count:
+            logger.debug(f"🚫 Coin {coin_id[:8]}... (Phase {entry.get('phase_id')}) passt zu {len(candidate_models)} von {routing_index.model_count} Modellen (Whitelist/Phasen)")
 
-            for model_config in self.active_models:
-                model_id = model_config.get('id')
+        # 🔄 IGNORE-LOGIK: Prüfe für jedes Kandidaten-Modell separat
+        models_to_process = []
 
-                # 🔍 COIN-FILTER-LOGIK: Prüfe ob Coin verarbeitet werden soll
-                coin_filter_mode = model_config.get('coin_filter_mode') or 'all'  # Default: 'all' wenn None
-                coin_whitelist = model_config.get('coin_whitelist') or []
+        for model_config in candidate_models:
+            model_id = model_config.get('id')
 
-                # Wenn Whitelist-Modus: Prüfe ob Coin in Whitelist ist
-                if coin_filter_mode == 'whitelist':
-                    if not coin_whitelist or coin_id not in coin_whitelist:
-                        logger.debug(f"🚫 Coin {coin_id[:8]}... nicht in Whitelist von Modell {model_id} - überspringe")
-                        total_ignored += 1
-                        continue
+            # ✅ Coin-Filter bestanden - prüfe jetzt Ignore-Einstellungen
+            # WICHTIG: min_scan_interval wurde entfernt - verwende nur ignore_bad/positive/alert_seconds
+            ignore_status = await check_coin_ignore_status(
+                pool, 
+                coin_id, 
+                model_id,
+                min_scan_interval_seconds=0  # Deaktiviert - wird nicht mehr verwendet
+            )
 
-                # 🔍 PHASEN-FILTER-LOGIK: Prüfe ob Coin in der richtigen Phase ist
-                model_phases = model_config.get('phases')
-                coin_phase_id = entry.get('phase_id')
+            if ignore_status.get('should_ignore'):
+                # Coin wird ignoriert - KEIN Eintrag nirgendwo, nur minimales Debug-Logging
+                ignore_reason = ignore_status.get('ignore_reason')
+                remaining_seconds = ignore_status.get('remaining_seconds', 0)
                 
-                # Wenn Modell auf spezifische Phasen trainiert wurde, prüfe ob Coin in einer dieser Phasen ist
-                if model_phases and len(model_phases) > 0:
-                    # Modell ist nur für bestimmte Phasen trainiert
-                    if coin_phase_id is None:
-                        logger.debug(f"🚫 Coin {coin_id[:8]}... hat keine Phase (phase_id=None) - Modell {model_id} benötigt Phasen {model_phases} - überspringe")
-                        total_ignored += 1
-                        continue
+                # Nur Debug-Logging (keine Info-Logs um Logs nicht zu überfluten)
+                logger.debug(f"🚫 Coin {coin_id[:8]}... wird von Modell {model_id} ignoriert ({ignore_reason}) - noch {remaining_seconds:.1f}s")
+                
+                ignored += 1
+                continue
+
+            # ✅ Coin soll verarbeitet werden - zur Verarbeitungsliste hinzufügen
+            models_to_process.append(model_config)
+
+        # Überspringe diesen Coin komplett, wenn alle Modelle ihn ignorieren
+        if not models_to_process:
+            logger.debug(f"🚫 Coin {coin_id[:8]}... wird von allen Modellen ignoriert - überspringe")
+            return None, ignored
+
+        logger.info(f"🔮 Starte Vorhersagen für Coin {coin_id[:20]}... mit {len(models_to_process)} von {routing_index.model_count} Modellen")
+        return {
+            "entry": entry,
+            "coin_id": coin_id,
+            "timestamp": timestamp,
+            "models": models_to_process  # Nur nicht-ignorierende Modelle
+        }, ignored
+
+    async def _prepare_persistence(
+        self,
+        request: Dict[str, Any],
+        results: List[Dict[str, Any]],
+        pool: asyncpg.Pool
+    ) -> Dict[str, Any]:
+        """
+        Bereitet das Speichern der Vorhersagen eines Coins vor: Metriken zum Zeitpunkt
+        der Vorhersage laden und max_log_entries prüfen. Geschrieben wird gesammelt
+        in _write_predictions.
+
+        Returns:
+            Dict mit predictions (kwargs für save_model_prediction), scan_updates
+            (kwargs für update_coin_scan_cache), ignored (wegen max_log_entries) und
+            failed (Vorbereitung fehlgeschlagen - Coin wird erneut verarbeitet)
+        """
+        prepared = {'predictions': [], 'scan_updates': [], 'ignored': 0, 'failed': False}
+        entry = request['entry']
+        coin_id = request['coin_id']
+        timestamp = request['timestamp']
+        models_to_process = request['models']
+
+        try:
+            logger.info(f"✅ {len(results)} Vorhersagen erstellt für Coin {coin_id[:20]}...")
+            
+            # Hole Metriken für diesen Coin zum Zeitpunkt der Vorhersage
+            metrics = await get_coin_metrics_at_timestamp(coin_id, timestamp, pool=pool)
+
+            # Aktive Einträge pro (Modell, Tag) einmal pro Coin laden - nur wenn ein Limit gesetzt ist
+            active_counts = {}
+            limited_model_ids = [
+                m.get('id') for m in models_to_process
+                if any(m.get(key) for key in (
+                    'max_log_entries_per_coin_negative',
+                    'max_log_entries_per_coin_positive',
+                    'max_log_entries_per_coin_alert'
+                ))
+            ]
+            if limited_model_ids:
+                active_counts = await get_active_prediction_counts(pool, coin_id, limited_model_ids)
+            
+            # Über eine Kopie iterieren - per max_log ignorierte Ergebnisse werden für n8n angehängt
+            for result in list(results):
+                try:
+                    model_id = result.get('active_model_id')
+                    prediction = result['prediction']
+                    probability = result['probability']
                     
-                    if coin_phase_id not in model_phases:
-                        logger.debug(f"🚫 Coin {coin_id[:8]}... ist in Phase {coin_phase_id}, aber Modell {model_id} ist nur für Phasen {model_phases} trainiert - überspringe")
-                        total_ignored += 1
+                    # Finde das entsprechende Modell-Config für future_minutes und alert_threshold
+                    model_config = next((m for m in models_to_process if m.get('id') == model_id), None)
+                    if not model_config:
+                        logger.warning(f"⚠️ Modell-Config nicht gefunden für active_model_id={model_id}")
                         continue
                     
-                    logger.debug(f"✅ Coin {coin_id[:8]}... ist in Phase {coin_phase_id}, passt zu Modell {model_id} (Phasen {model_phases})")
-                else:
-                    # Modell ist für alle Phasen (phases = None oder [])
-                    logger.debug(f"✅ Coin {coin_id[:8]}... wird von Modell {model_id} verarbeitet (Modell für alle Phasen)")
-
-                # ✅ Coin-Filter bestanden - prüfe jetzt Ignore-Einstellungen
-                # WICHTIG: min_scan_interval wurde entfernt - verwende nur ignore_bad/positive/alert_seconds
-                ignore_status = await check_coin_ignore_status(
-                    pool, 
-                    coin_id, 
-                    model_id,
-                    min_scan_interval_seconds=0  # Deaktiviert - wird nicht mehr verwendet
-                )
+                    alert_threshold = model_config.get('alert_threshold', 0.7)
+                    future_minutes = model_config.get('future_minutes', 10)  # Default: 10 Minuten
 
-                if ignore_status.get('should_ignore'):
-                    # Coin wird ignoriert - KEIN Eintrag nirgendwo, nur minimales Debug-Logging
-                    ignore_reason = ignore_status.get('ignore_reason')
-                    remaining_seconds = ignore_status.get('remaining_seconds', 0)
+                    # 🔍 MAX-LOG-ENTRIES-PRÜFUNG: Prüfe ob Coin bereits zu oft eingetragen wurde
+                    # Berechne tag vorher (wird auch in save_model_prediction berechnet, aber wir brauchen es hier)
+                    if probability < 0.5:
+                        tag = 'negativ'
+                    elif probability < alert_threshold:
+                        tag = 'positiv'
+                    else:
+                        tag = 'alert'
                     
-                    # Nur Debug-Logging (keine Info-Logs um Logs nicht zu überfluten)
-                    logger.debug(f"🚫 Coin {coin_id[:8]}... wird von Modell {model_id} ignoriert ({ignore_reason}) - noch {remaining_seconds:.1f}s")
+                    # Prüfe Limit für diesen Tag
+                    max_entries = None
+                    if tag == 'negativ':
+                        max_entries = model_config.get('max_log_entries_per_coin_negative', 0)
+                    elif tag == 'positiv':
+                        max_entries = model_config.get('max_log_entries_per_coin_positive', 0)
+                    else:  # alert
+                        max_entries = model_config.get('max_log_entries_per_coin_alert', 0)
                     
-                    total_ignored += 1
-                    continue
+                    # Wenn Limit gesetzt (max_entries > 0), prüfe ob bereits erreicht
+                    if max_entries > 0:
+                        current_count = active_counts.get((model_id, tag), 0)
+                        
+                        if current_count >= max_entries:
+                            # Prüfe ob ignorierten Coins trotzdem an n8n gesendet werden sollen
+                            send_ignored_to_n8n = model_config.get('send_ignored_to_n8n', False)
+                            n8n_enabled = model_config.get('n8n_enabled', False)
+                            
+                            if send_ignored_to_n8n and n8n_enabled:
+                                # Sende trotzdem an n8n, aber speichere NICHT in DB
+                                logger.debug(f"📤 Coin {coin_id[:8]}... bereits {current_count}x als {tag} eingetragen (Limit: {max_entries}) - sende trotzdem an n8n (ohne DB-Speicherung)")
+                                
+                                # Erstelle temporäres Result-Objekt für n8n
+                                ignored_result = {
+                                    'active_model_id': model_id,
+                                    'model_id': result['model_id'],
+                                    'prediction': prediction,
+                                    'probability': probability,
+                                    'coin_id': coin_id,
+                                    'timestamp': timestamp
+                                }
+                                
+                                # Sende an n8n (wird später im send_to_n8n Block verarbeitet)
+                                # Wir fügen es zu results hinzu, damit es an n8n gesendet wird
+                                results.append(ignored_result)
+                                
+                                prepared['ignored'] += 1
+                                continue  # Überspringe DB-Speicherung
+                            else:
+                                # Komplett überspringen (kein n8n, keine DB)
+                                logger.debug(f"🚫 Coin {coin_id[:8]}... bereits {current_count}x als {tag} eingetragen (Limit: {max_entries}) - überspringe komplett")
+                                prepared['ignored'] += 1
+                                continue
 
-                # ✅ Coin soll verarbeitet werden - zur Verarbeitungsliste hinzufügen
-                models_to_process.append(model_config)
+                    # Vorhersage für model_predictions + Scan-Cache vormerken
+                    prepared['predictions'].append(dict(
+                        coin_id=coin_id,
+                        prediction_timestamp=timestamp,
+                        model_id=result['model_id'],
+                        active_model_id=model_id,
+                        prediction=prediction,
+                        probability=probability,
+                        alert_threshold=alert_threshold,
+                        future_minutes=future_minutes,
+                        metrics=metrics,
+                        phase_id_at_time=entry.get('phase_id')
+                    ))
+                    prepared['scan_updates'].append(dict(
+                        coin_id=coin_id,
+                        active_model_id=model_id,
+                        prediction=prediction,
+                        probability=probability,
+                        alert_threshold=alert_threshold,
+                        ignore_bad_seconds=model_config.get('ignore_bad_seconds', 0),
+                        ignore_positive_seconds=model_config.get('ignore_positive_seconds', 0),
+                        ignore_alert_seconds=model_config.get('ignore_alert_seconds', 0)
+                    ))
 
-            # Überspringe diesen Coin komplett, wenn alle Modelle ihn ignorieren
-            if not models_to_process:
-                logger.debug(f"🚫 Coin {coin_id[:8]}... wird von allen Modellen ignoriert - überspringe")
-                continue
+                except Exception as e:
+                    prepared['failed'] = True
+                    logger.error(f"❌ Fehler beim Vorbereiten der Vorhersage für Modell {model_id}: {e}")
 
-            try:
-                logger.info(f"🔮 Starte Vorhersagen für Coin {coin_id[:20]}... mit {len(models_to_process)} von {len(self.active_models)} Modellen")
+        except Exception as e:
+            prepared['failed'] = True
+            logger.error(
+                f"❌ Fehler bei Verarbeitung von Coin {coin_id[:8]}...: {e}",
+                exc_info=True
+            )
+
+        return prepared
 
-                # Mache Vorhersagen nur mit den Modellen, die den Coin nicht ignorieren
-                results = await predict_coin_all_models(
+    async def _send_coin_to_n8n(self, request: Dict[str, Any], results: List[Dict[str, Any]]):
+        """Sendet die Vorhersagen eines Coins an n8n (nur für tatsächlich verarbeitete Modelle)"""
+        coin_id = request['coin_id']
+        try:
+            if results:
+                logger.info(f"📤 Sende {len(results)} Vorhersagen an n8n")
+                result = await send_to_n8n(
                     coin_id=coin_id,
-                    timestamp=timestamp,
-                    active_models=models_to_process,  # Nur nicht-ignorierende Modelle
-                    pool=pool
+                    timestamp=request['timestamp'],
+                    predictions=results,
+                    active_models=request['models']  # Nur die verarbeiteten Modelle
                 )
-                
-                logger.info(f"✅ {len(results)} Vorhersagen erstellt für Coin {coin_id[:20]}...")
-                total_processed += len(results)
-                
-                # Speichere Vorhersagen in DB und aktualisiere Cache
-                # Hole Metriken für diesen Coin zum Zeitpunkt der Vorhersage
-                metrics = await get_coin_metrics_at_timestamp(coin_id, timestamp, pool=pool)
-                
-                for result in results:
-                    try:
-                        model_id = result.get('active_model_id')
-                        prediction = result['prediction']
-                        probability = result['probability']
-                        
-                        # Finde das entsprechende Modell-Config für future_minutes und alert_threshold
-                        model_config = next((m for m in models_to_process if m.get('id') == model_id), None)
-                        if not model_config:
-                            logger.warning(f"⚠️ Modell-Config nicht gefunden für active_model_id={model_id}")
-                            continue
-                        
-                        alert_threshold = model_config.get('alert_threshold', 0.7)
-                        future_minutes = model_config.get('future_minutes', 10)  # Default: 10 Minuten
-
-                        # 🔍 MAX-LOG-ENTRIES-PRÜFUNG: Prüfe ob Coin bereits zu oft eingetragen wurde
-                        # Berechne tag vorher (wird auch in save_model_prediction berechnet, aber wir brauchen es hier)
-                        if probability < 0.5:
-                            tag = 'negativ'
-                        elif probability < alert_threshold:
-                            tag = 'positiv'
-                        else:
-                            tag = 'alert'
-                        
-                        # Prüfe Limit für diesen Tag
-                        max_entries = None
-                        if tag == 'negativ':
-                            max_entries = model_config.get('max_log_entries_per_coin_negative', 0)
-                        elif tag == 'positiv':
-                            max_entries = model_config.get('max_log_entries_per_coin_positive', 0)
-                        else:  # alert
-                            max_entries = model_config.get('max_log_entries_per_coin_alert', 0)
-                        
-                        # Wenn Limit gesetzt (max_entries > 0), prüfe ob bereits erreicht
-                        if max_entries > 0:
-                            current_count = await pool.fetchval("""
-                                SELECT COUNT(*)
-                                FROM model_predictions
-                                WHERE coin_id = $1
-                                  AND active_model_id = $2
-                                  AND tag = $3
-                                  AND status = 'aktiv'
-                            """, coin_id, model_id, tag)
-                            
-                            if current_count >= max_entries:
-                                # Prüfe ob ignorierten Coins trotzdem an n8n gesendet werden sollen
-                                send_ignored_to_n8n = model_config.get('send_ignored_to_n8n', False)
-                                n8n_enabled = model_config.get('n8n_enabled', False)
-                                
-                                if send_ignored_to_n8n and n8n_enabled:
-                                    # Sende trotzdem an n8n, aber speichere NICHT in DB
-                                    logger.debug(f"📤 Coin {coin_id[:8]}... bereits {current_count}x als {tag} eingetragen (Limit: {max_entries}) - sende trotzdem an n8n (ohne DB-Speicherung)")
-                                    
-                                    # Erstelle temporäres Result-Objekt für n8n
-                                    ignored_result = {
-                                        'active_model_id': model_id,
-                                        'model_id': result['model_id'],
-                                        'prediction': prediction,
-                                        'probability': probability,
-                                        'coin_id': coin_id,
-                                        'timestamp': timestamp
-                                    }
-                                    
-                                    # Sende an n8n (wird später im send_to_n8n Block verarbeitet)
-                                    # Wir fügen es zu results hinzu, damit es an n8n gesendet wird
-                                    results.append(ignored_result)
-                                    
-                                    total_ignored += 1
-                                    continue  # Überspringe DB-Speicherung
-                                else:
-                                    # Komplett überspringen (kein n8n, keine DB)
-                                    logger.debug(f"🚫 Coin {coin_id[:8]}... bereits {current_count}x als {tag} eingetragen (Limit: {max_entries}) - überspringe komplett")
-                                    total_ignored += 1
-                                    continue
-
-                        # Speichere Vorhersage in NEUER Tabelle (model_predictions)
-                        await save_model_prediction(
-                            coin_id=coin_id,
-                            prediction_timestamp=timestamp,
-                            model_id=result['model_id'],
-                            active_model_id=model_id,
-                            prediction=prediction,
-                            probability=probability,
-                            alert_threshold=alert_threshold,
-                            future_minutes=future_minutes,
-                            metrics=metrics,
-                            phase_id_at_time=entry.get('phase_id'),
-                            pool=pool
-                        )
-                        
-                        # ⚠️ ALTE FUNKTION: Behalte für Rückwärtskompatibilität (kann später entfernt werden)
-                        # await save_prediction(...)
-
-                        # 🔄 CACHE-AKTUALISIERUNG: Nach erfolgreicher Vorhersage
-                        if model_id:
-                            # Finde das entsprechende Modell-Config
-                            model_config = next((m for m in models_to_process if m.get('id') == model_id), None)
-                            if model_config:
-                                await update_coin_scan_cache(
-                                    pool=pool,
-                                    coin_id=coin_id,
-                                    active_model_id=model_id,
-                                    prediction=prediction,
-                                    probability=probability,
-                                    alert_threshold=model_config.get('alert_threshold', 0.7),
-                                    ignore_bad_seconds=model_config.get('ignore_bad_seconds', 0),
-                                    ignore_positive_seconds=model_config.get('ignore_positive_seconds', 0),
-                                    ignore_alert_seconds=model_config.get('ignore_alert_seconds', 0)
-                                )
+                logger.info(f"📤 n8n Ergebnis: {result}")
+            else:
+                logger.warning(f"⚠️ Keine Vorhersagen für Coin {coin_id[:8]}...")
+        except Exception as e:
+            logger.error(f"❌ Fehler beim Senden an n8n für Coin {coin_id[:8]}...: {e}", exc_info=True)
 
-                    except Exception as e:
-                        logger.error(f"❌ Fehler beim Speichern/Aktualisieren für Modell {model_id}: {e}")
-                
-                # Sende Vorhersagen an n8n (nur für tatsächlich verarbeitete Modelle)
-                if results:
-                    logger.info(f"📤 Sende {len(results)} Vorhersagen an n8n")
-                    result = await send_to_n8n(
-                        coin_id=coin_id,
-                        timestamp=timestamp,
-                        predictions=results,
-                        active_models=models_to_process  # Nur die verarbeiteten Modelle
-                    )
-                    logger.info(f"📤 n8n Ergebnis: {result}")
-                else:
-                    logger.warning(f"⚠️ Keine Vorhersagen für Coin {coin_id[:8]}...")
-                
-            except Exception as e:
-                logger.error(
-                    f"❌ Fehler bei Verarbeitung von Coin {coin_id[:8]}...: {e}",
-                    exc_info=True
-                )
-                continue
-    
-        # 📊 Zusammenfassung der Verarbeitung
-        logger.info(f"📊 Batch-Verarbeitung abgeschlossen: {total_processed} Vorhersagen erstellt, {total_ignored} Coins/Modelle ignoriert")
-    
-    async def start_polling_fallback(self):
-        """Polling-Fallback wenn LISTEN/NOTIFY nicht verfügbar"""
-        pool = await get_pool()
+    async def _restore_cursor(self, pool: asyncpg.Pool):
+        """Setzt den Startpunkt (timestamp, mint) des Pollings"""
+        # Persistierter Verarbeitungsstand (mit dem letzten Batch-Write committet) - exakter Wiedereinstieg
+        watermark = await get_processing_watermark(pool, WATERMARK_CONSUMER)
+        if watermark is not None:
+            self.last_processed_timestamp, self.last_processed_mint = watermark
+            logger.info(f"📊 Verwende gespeicherten Verarbeitungsstand als Startpunkt: {self.last_processed_timestamp} ({self.last_processed_mint[:8]}...)")
+            return
         
+        # Sonst (erster Start / Migration fehlt): Heuristik über die letzte verarbeitete Prediction
         # WICHTIG: Prüfe letzte verarbeitete Prediction, um nicht zu viele zu verarbeiten
         # Aber wenn keine Predictions existieren, gehe weiter zurück
         last_prediction_row = await pool.fetchrow("""
@@ -493,74 +760,286 @@ class EventHandler:
                 # Keine coin_metrics vorhanden - starte mit letzten 5 Minuten
                 self.last_processed_timestamp = datetime.now(timezone.utc) - timedelta(minutes=5)
                 logger.warning(f"⚠️ Keine coin_metrics vorhanden, starte mit letzten 5 Minuten: {self.last_processed_timestamp}")
+
+    async def _fetch_new_entries(
+        self,
+        pool: asyncpg.Pool
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[datetime, str]], bool]:
+        """
+        Liest die nächste Keyset-Seite aus coin_metrics ab dem Cursor (timestamp, mint).
+
+        Die Kosten hängen nur von den neuen Zeilen ab (Index idx_coin_metrics_timestamp_mint,
+        siehe sql/migrations/add_coin_metrics_polling_index.sql) - nicht vom Rückstand.
+        Mehrere Zeilen desselben Mints werden auf die neueste zusammengefasst (inkl. Phase
+        zu diesem Zeitpunkt).
+
+        Returns:
+            (Einträge mit mint/timestamp/phase_id, Cursor nach der Seite, Seite voll)
+        """
+        rows = await pool.fetch("""
+            SELECT mint, timestamp, phase_id_at_time AS phase_id
+            FROM coin_metrics
+            WHERE (timestamp, mint) > ($1, $2)
+            ORDER BY timestamp, mint
+            LIMIT $3
+        """, self.last_processed_timestamp, self.last_processed_mint or '', POLLING_PAGE_SIZE)
+        if not rows:
+            return [], None, False
+
+        # Neueste Zeile pro Mint (Zeilen kommen aufsteigend - spätere überschreiben frühere)
+        latest: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            latest.pop(row['mint'], None)
+            latest[row['mint']] = {
+                'mint': row['mint'],
+                'timestamp': row['timestamp'],
+                'phase_id': row['phase_id']
+            }
+        cursor = (rows[-1]['timestamp'], rows[-1]['mint'])
+        self._remember_keys([(row['timestamp'], row['mint']) for row in rows])
+        return list(latest.values()), cursor, len(rows) == POLLING_PAGE_SIZE
+
+    def _safe_watermark(self) -> Tuple[datetime, str]:
+        """Persistierbarer Stand: gelesener Cursor, aber nicht hinter noch wartende Einträge"""
+        read_cursor = (self.last_processed_timestamp, self.last_processed_mint or '')
+        oldest_pending = self.ingest_buffer.oldest_timestamp()
+        if oldest_pending is None:
+            return read_cursor
+        # (timestamp, '') liegt vor allen Mints dieses Zeitstempels - wird nach Neustart erneut gelesen
+        return min(read_cursor, (oldest_pending, ''))
+
+    async def _rewind_watermark(self, pool: asyncpg.Pool, late_entries: List[Dict[str, Any]]):
+        """
+        Verspätete Einträge liegen hinter dem gespeicherten Stand, der sonst nur vorwärts geht -
+        Stand explizit vor den ältesten zurücksetzen, damit sie einen Neustart überleben.
+        """
+        if not watermark_available():
+            return
+        oldest = (min(entry['timestamp'] for entry in late_entries), '')
+        if await rewind_processing_watermark(pool, *oldest, consumer=WATERMARK_CONSUMER):
+            logger.info(f"⏪ Verarbeitungsstand für verspätete Einträge zurückgesetzt auf {oldest[0]}")
+        if self.saved_watermark is None or oldest < self.saved_watermark:
+            self.saved_watermark = oldest
+
+    def _has_pending_alert(self, mint: str) -> bool:
+        """True, solange für den Coin eine Alert-Vorhersage auf ihre Auswertung wartet"""
+        evaluation_timestamp = self.alert_mints.get(mint)
+        if evaluation_timestamp is None:
+            return False
+        if evaluation_timestamp <= datetime.now(timezone.utc):
+            del self.alert_mints[mint]
+            return False
+        return True
+
+    def _observe_lag(self, source: str, entries: List[Dict[str, Any]]):
+        now = datetime.now(timezone.utc)
+        for entry in entries:
+            ml_ingest_lag_seconds.labels(source=source).observe(max(0.0, (now - entry['timestamp']).total_seconds()))
+
+    def _start_background_tasks(self, pool: asyncpg.Pool):
+        # Hintergrund-Jobs über den Scheduler: adaptives Intervall, DB-Budget, Vorrang für den Hot-Path
+        scheduler = get_background_scheduler()
+        scheduler.set_hot_path_depth(lambda: len(self.ingest_buffer))
+        # Watchdog pro Prozess (überwacht den eigenen Heartbeat) - ohne DB, läuft auch unter Last
+        scheduler.register(BackgroundJob(
+            'watchdog', self._watchdog_check, interval=60, max_interval=60,
+            uses_db=False, yields=False, initial_delay=60
+        ))
+        # Auswertung, ATH-Tracking und Alert-Evaluator nur auf dem gewählten Leader (siehe leadership.py)
+        scheduler.register(BackgroundJob(
+            JOB_PREDICTION_EVALUATION, self._run_evaluation, interval=30,
+            batch_size=EVALUATION_BATCH_SIZE, leader_job=JOB_PREDICTION_EVALUATION
+        ))
+        scheduler.register(BackgroundJob(
+            JOB_ATH_TRACKING, self._run_ath_tracking, interval=30,
+            batch_size=ATH_TRACKING_BATCH_SIZE, leader_job=JOB_ATH_TRACKING
+        ))
+        get_alert_evaluator().register(scheduler)
+        scheduler.start(pool)
+        if get_ignore_cache().loaded:
+            asyncio.create_task(get_ignore_cache().run(pool, lambda: self.running))  # Write-Behind für coin_scan_cache
+        # Modell-Konfiguration bei Änderungen (NOTIFY) neu laden
+        asyncio.create_task(get_model_config_store().run(pool, lambda: self.running, on_change=self._apply_model_snapshot))
+
+    def _requeue_failed(self, entries: List[Dict[str, Any]]):
+        """Legt fehlgeschlagene Einträge zurück in den Puffer (nach INGEST_MAX_ATTEMPTS verworfen)"""
+        retry = []
+        for entry in entries:
+            attempts = entry.get('attempts', 0) + 1
+            if attempts >= INGEST_MAX_ATTEMPTS:
+                increment_errors('prediction')
+                logger.error(f"❌ Coin {entry['mint'][:8]}... ({entry['timestamp']}) nach {attempts} Versuchen verworfen")
+                continue
+            retry.append({**entry, 'attempts': attempts})
+        if retry:
+            logger.warning(f"🔁 {len(retry)} fehlgeschlagene Einträge zurück in den Ingestion-Puffer")
+            self.ingest_buffer.put_many(retry)
+
+    async def run_worker(self):
+        """
+        Worker-Loop (verteilter Modus): Aufträge aus prediction_work_queue per SKIP LOCKED holen,
+        verarbeiten und nach dem Persistieren bestätigen.
+        """
+        pool = await get_pool()
+        work_queue = get_work_queue()
+        partitions = work_queue.partitions if work_queue.partitions is not None else 'alle'
+        logger.info(f"👷 Worker {work_queue.worker_id} gestartet (Partitionen: {partitions})")
+        if work_queue.partitions is None and get_ignore_cache().loaded:
+            logger.warning("⚠️ Worker ohne WORKER_PARTITIONS: Cooldowns im Ignore-Cache sind nur pro Prozess konsistent - Partitionen setzen oder IGNORE_CACHE_ENABLED=false")
+
+        while self.running:
+            try:
+                self.last_heartbeat = datetime.now(timezone.utc)
+                await self._apply_model_snapshot(get_model_config_store().get())
+                if not self.active_models:
+                    await asyncio.sleep(POLLING_INTERVAL_SECONDS)
+                    continue
+                if not self._routable_models():
+                    # Warm-up läuft - Aufträge gar nicht erst holen (bleiben für andere Worker frei)
+                    await asyncio.sleep(WORK_QUEUE_POLL_SECONDS)
+                    continue
+
+                items = await work_queue.claim(pool, BATCH_SIZE)
+                if not items:
+                    await asyncio.sleep(WORK_QUEUE_POLL_SECONDS)
+                    continue
+                ml_work_queue_items_total.labels(action='claimed').inc(len(items))
+
+                # Aufträge, die wiederholt fehlschlagen, nicht endlos neu versuchen
+                poisoned = [item for item in items if item['attempts'] > WORK_QUEUE_MAX_ATTEMPTS]
+                if poisoned:
+                    logger.error(f"❌ {len(poisoned)} Aufträge nach {WORK_QUEUE_MAX_ATTEMPTS} Versuchen verworfen: {[i['mint'][:8] for i in poisoned]}")
+                    ml_work_queue_items_total.labels(action='dropped').inc(len(poisoned))
+                    await work_queue.ack(pool, poisoned)
+                    items = [item for item in items if item['attempts'] <= WORK_QUEUE_MAX_ATTEMPTS]
+
+                if items:
+                    self._observe_lag('queue', items)
+                    outcome = await self._process_coin_entries(items)
+                    if outcome.status == BATCH_DEFERRED:
+                        # Warm-up während des Claims begonnen - Aufträge ohne Versuch freigeben
+                        released = await work_queue.release(pool, items)
+                        ml_work_queue_items_total.labels(action='released').inc(released)
+                        await asyncio.sleep(WORK_QUEUE_POLL_SECONDS)
+                        continue
+                    # Fehlgeschlagene Aufträge nicht bestätigen - nach Ablauf der Lease erneut (attempts zählt mit)
+                    failed_mints = {entry['mint'] for entry in outcome.failed_entries}
+                    acked = await work_queue.ack(pool, [item for item in items if item['mint'] not in failed_mints])
+                    ml_work_queue_items_total.labels(action='acked').inc(acked)
+                    self.last_heartbeat = datetime.now(timezone.utc)
+                    logger.debug(f"✅ Worker: {len(items)} Aufträge verarbeitet, {acked} bestätigt, {len(failed_mints)} fehlgeschlagen")
+            except Exception as e:
+                logger.error(f"❌ Fehler im Worker-Loop: {e}", exc_info=True)
+                await asyncio.sleep(POLLING_INTERVAL_SECONDS)
+
+    async def run_ingestion(self):
+        """
+        Ingestion-Loop: Push per LISTEN/NOTIFY (weckt den Keyset-Reader sofort), Polling
+        alle POLLING_INTERVAL_SECONDS nur noch als Sicherheitsnetz (bzw. wenn LISTEN fehlt).
+        """
+        pool = await get_pool()
         
-        logger.info(f"🔄 Starte Polling-Fallback (Intervall: {POLLING_INTERVAL_SECONDS}s, Start: {self.last_processed_timestamp})")
+        await self._restore_cursor(pool)
         
-        # Starte Watchdog-Task für Heartbeats
-        asyncio.create_task(self._watchdog_loop())
-        asyncio.create_task(self._evaluation_loop())  # Starte Auswertungs-Loop
-        asyncio.create_task(self._ath_tracking_loop())  # Starte ATH-Tracking-Loop
+        logger.info(f"🔄 Starte Ingestion (Push + Sicherheitsnetz alle {POLLING_INTERVAL_SECONDS}s, Start: {self.last_processed_timestamp})")
+        
+        # LISTEN-Connection mit Reconnect + Catch-up
+        asyncio.create_task(self._listener_loop())
         
         while self.running:
             try:
                 # Update Heartbeat
                 self.last_heartbeat = datetime.now(timezone.utc)
                 
-                # Hole aktive Modelle (periodisch aktualisieren)
-                self.active_models = await get_active_models()
+                if EVENT_HANDLER_MODE == 'local':
+                    # Aktive Modelle aus dem Snapshot (wird per NOTIFY aktualisiert)
+                    await self._apply_model_snapshot(get_model_config_store().get())
+                    
+                    if not self.active_models:
+                        logger.warning("⚠️ Keine aktiven Modelle gefunden")
+                        await asyncio.sleep(POLLING_INTERVAL_SECONDS)
+                        continue
                 
-                if not self.active_models:
-                    logger.warning("⚠️ Keine aktiven Modelle gefunden")
-                    await asyncio.sleep(POLLING_INTERVAL_SECONDS)
-                    continue
+                source = self.wake_source or 'poll'
+                self.wake_source = None
                 
-                # Hole neue Einträge
-                # WICHTIG: Hole die Phase zum Zeitpunkt des latest_timestamp, nicht MAX(phase_id_at_time)!
-                query = """
-                    WITH latest_entries AS (
-                        SELECT DISTINCT 
-                            mint, 
-                            MAX(timestamp) as latest_timestamp
-                    FROM coin_metrics
-                    WHERE timestamp > $1
-                    GROUP BY mint
-                    )
-                    SELECT 
-                        le.mint,
-                        le.latest_timestamp,
-                        cm.phase_id_at_time as phase_id
-                    FROM latest_entries le
-                    JOIN coin_metrics cm ON cm.mint = le.mint 
-                        AND cm.timestamp = le.latest_timestamp
-                    ORDER BY le.latest_timestamp ASC
-                    LIMIT $2
-                """
-                rows = await pool.fetch(query, self.last_processed_timestamp, BATCH_SIZE)
+                # Verspätete Commits (hinter dem Cursor, per NOTIFY gemeldet) in den Puffer
+                if self.late_entries:
+                    late_entries, self.late_entries = self.late_entries, []
+                    self._observe_lag('late', late_entries)
+                    logger.info(f"📥 {len(late_entries)} verspätete Einträge (hinter dem Cursor) aus NOTIFY")
+                    self.ingest_buffer.put_many(late_entries)
+                    if EVENT_HANDLER_MODE == 'local':
+                        # Im verteilten Modus landen sie mit dem Stand atomar in der Work-Queue
+                        await self._rewind_watermark(pool, late_entries)
+                
+                # Neue Einträge bis zum aktuellen Stand lesen (Keyset-Seiten ab dem Cursor) -
+                # der Puffer fasst pro Mint zusammen und verwirft bei Überlauf
+                while self.running:
+                    events, cursor, page_full = await self._fetch_new_entries(pool)
+                    if not events:
+                        break
+                    self._observe_lag(source, events)
+                    logger.info(f"📥 {source}: {len(events)} neue Einträge gefunden (seit {self.last_processed_timestamp})")
+                    self.ingest_buffer.put_many(events)
+                    self.last_processed_timestamp, self.last_processed_mint = cursor
+                    if not page_full:
+                        break
                 
-                if rows:
-                    logger.info(f"📥 Polling: {len(rows)} neue Einträge gefunden (seit {self.last_processed_timestamp})")
-                    events = [
-                        {
-                            'mint': row['mint'],
-                            'timestamp': row['latest_timestamp'],
-                            'phase_id': row['phase_id']
-                        }
-                        for row in rows
-                    ]
-                    await self._process_coin_entries(events)
-                    self.last_processed_timestamp = max(e['timestamp'] for e in events)
+                if self.ingest_buffer and EVENT_HANDLER_MODE != 'local':
+                    # Verteilter Modus: alle wartenden Coins als Aufträge in die Work-Queue (mit Cursor atomar)
+                    entries = self.ingest_buffer.take(len(self.ingest_buffer))
+                    watermark = self._safe_watermark()
+                    await get_work_queue().enqueue(
+                        pool, entries,
+                        watermark=(WATERMARK_CONSUMER, *watermark) if watermark_available() else None
+                    )
+                    self.saved_watermark = watermark
+                    ml_work_queue_items_total.labels(action='enqueued').inc(len(entries))
+                    self.last_heartbeat = datetime.now(timezone.utc)
+                    logger.debug(f"📤 {source}: {len(entries)} Coins in die Work-Queue geschrieben (gelesen bis {self.last_processed_timestamp})")
+                elif self.ingest_buffer and not self._routable_models():
+                    # Warm-up läuft - Einträge bleiben im Puffer, Verarbeitungsstand bleibt stehen
+                    self.last_heartbeat = datetime.now(timezone.utc)
+                    logger.debug(f"🔥 {source}: Warm-up läuft - {len(self.ingest_buffer)} Coins warten im Puffer")
+                elif self.ingest_buffer:
+                    batch = self.ingest_buffer.take(BATCH_SIZE)
+                    # Verarbeitungsstand: bis vor den ältesten noch wartenden Eintrag (Replay ist idempotent)
+                    watermark = self._safe_watermark()
+                    outcome = await self._process_coin_entries(batch, watermark=watermark)
+                    if outcome.status == BATCH_DEFERRED:
+                        # Kein Modell routbar - Einträge ohne Versuch zurück, Stand bleibt stehen
+                        self.ingest_buffer.put_many(outcome.failed_entries)
+                    elif outcome.status == BATCH_FAILED:
+                        # Stand bleibt stehen - fehlgeschlagene Einträge zurück in den Puffer
+                        self._requeue_failed(outcome.failed_entries)
+                    elif outcome.watermark_saved:
+                        self.saved_watermark = watermark
+                    elif watermark != self.saved_watermark and watermark_available():
+                        # Geschrieben ohne Stand (Einzel-Fallback) oder bewusst nichts zu schreiben - Stand weiterschieben
+                        await save_processing_watermark(pool, *watermark, consumer=WATERMARK_CONSUMER)
+                        self.saved_watermark = watermark
                     # Update Heartbeat nach erfolgreicher Verarbeitung
                     self.last_heartbeat = datetime.now(timezone.utc)
-                    logger.debug(f"✅ Polling: Verarbeitet bis {self.last_processed_timestamp}")
+                    logger.debug(f"✅ {source}: {len(batch)} Coins verarbeitet, {len(self.ingest_buffer)} wartend (gelesen bis {self.last_processed_timestamp})")
+                    
+                    # Rückstand im Puffer - sofort weiter statt zu warten (nach Fehlern erst beim nächsten Wecken)
+                    if self.ingest_buffer and outcome.status not in (BATCH_FAILED, BATCH_DEFERRED):
+                        self._wake(source)
                 else:
                     # Auch wenn keine neuen Einträge, update Heartbeat (zeigt dass Loop läuft)
                     self.last_heartbeat = datetime.now(timezone.utc)
-                    logger.debug(f"📭 Polling: Keine neuen Einträge seit {self.last_processed_timestamp}")
+                    logger.debug(f"📭 {source}: Keine neuen Einträge seit {self.last_processed_timestamp}")
                 
-                await asyncio.sleep(POLLING_INTERVAL_SECONDS)
+                # Warten auf NOTIFY (Push) - spätestens nach POLLING_INTERVAL_SECONDS (Sicherheitsnetz)
+                try:
+                    await asyncio.wait_for(self.ingest_wakeup.wait(), timeout=POLLING_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self.ingest_wakeup.clear()
                 
             except Exception as e:
-                logger.error(f"❌ Fehler im Polling-Loop: {e}", exc_info=True)
+                logger.error(f"❌ Fehler im Ingestion-Loop: {e}", exc_info=True)
                 # WICHTIG: Auch bei Fehlern weitermachen, damit der Loop nicht stoppt
                 await asyncio.sleep(POLLING_INTERVAL_SECONDS)
                 continue
@@ -569,10 +1048,13 @@ class EventHandler:
     async def start(self):
         """Startet Event-Handler"""
         self.running = True
+        self.loop = asyncio.get_running_loop()
         
-        # Lade aktive Modelle
+        # Lade aktive Modelle (Konfigurations-Snapshot)
+        model_config_store = get_model_config_store()
         try:
-            self.active_models = await get_active_models()
+            await model_config_store.refresh(await get_pool())
+            self.active_models = list(model_config_store.get().models)
             logger.info(f"✅ {len(self.active_models)} aktive Modelle geladen")
         except Exception as e:
             logger.error(f"❌ Fehler beim Laden aktiver Modelle: {e}")
@@ -591,137 +1073,100 @@ class EventHandler:
                 )
                 # Modelle neu laden falls welche wiederhergestellt wurden
                 if recovery_stats['recovered'] > 0:
-                    self.active_models = await get_active_models()
+                    await model_config_store.refresh(await get_pool())
+                    self.active_models = list(model_config_store.get().models)
                     logger.info(f"✅ Aktive Modelle nach Recovery neu geladen: {len(self.active_models)}")
             else:
                 logger.info("✅ Alle Modell-Dateien vorhanden, keine Recovery nötig")
         except Exception as e:
             logger.error(f"❌ Fehler bei Modell-Recovery: {e}", exc_info=True)
 
-        # Versuche LISTEN/NOTIFY
-        await self.setup_listener()
-        
-        # WICHTIG: Nutze IMMER Polling-Fallback (LISTEN/NOTIFY ist zu unzuverlässig)
-        # Der Benutzer hat Recht: Es ist einfach - alle Coins die nicht in den letzten X Sekunden
-        # geprüft wurden, werden geprüft und in die Logs eingetragen
-        logger.info("🔄 Event-Handler gestartet (Polling-Modus - zuverlässig)")
-        await self.start_polling_fallback()
-    
-    async def _batch_timeout_loop(self):
-        """Background-Task für Batch-Timeout"""
-        logger.debug("⏰ Batch-Timeout-Loop gestartet")
-        while self.running:
+        # Aktive Modelle übernehmen (Preload, Pinning, Warm-up im Hintergrund, Feature-Pläne)
+        await self._apply_model_snapshot(model_config_store.get())
+
+        # Cooldowns aus coin_scan_cache in den Speicher laden (Write-Behind-Loop startet mit dem Polling)
+        if IGNORE_CACHE_ENABLED:
             try:
-                await asyncio.sleep(BATCH_TIMEOUT_SECONDS)
-
-                batch_to_process = None
-                async with self.batch_lock:
-                    if self.batch:
-                        time_since_last = (datetime.now(timezone.utc) - self.last_batch_time).total_seconds()
-                        if time_since_last >= BATCH_TIMEOUT_SECONDS:
-                            logger.info(f"⏰ Batch-Timeout erreicht ({time_since_last:.1f}s), verarbeite {len(self.batch)} Einträge")
-                            batch_to_process = self.batch.copy()
-                            self.batch.clear()
-                            self.last_batch_time = datetime.now(timezone.utc)
-
-                # ⚠️ WICHTIG: Verarbeite Batch AUSSERHALB des Locks!
-                if batch_to_process:
-                    logger.info(f"🔄 Verarbeite Batch (Timeout): {len(batch_to_process)} Einträge")
-                    await self._process_coin_entries(batch_to_process)
+                await get_ignore_cache().load(await get_pool())
             except Exception as e:
-                logger.error(f"❌ Fehler im Batch-Timeout-Loop: {e}", exc_info=True)
-                # Weiterlaufen, auch bei Fehlern
-                continue
+                logger.error(f"❌ Fehler beim Laden des Ignore-Cache - nutze DB direkt: {e}")
+
+        pool = await get_pool()
+        self._start_background_tasks(pool)
+        
+        # local: Ingestion + Verarbeitung in diesem Prozess (wie bisher)
+        # ingest / worker / distributed: über prediction_work_queue auf mehrere Prozesse/Nodes verteilt
+        logger.info(f"🔄 Event-Handler gestartet (Modus: {EVENT_HANDLER_MODE}, LISTEN/NOTIFY + Keyset-Catch-up)")
+        if EVENT_HANDLER_MODE == 'worker':
+            await self.run_worker()
+            return
+        if EVENT_HANDLER_MODE == 'distributed':
+            asyncio.create_task(self.run_worker())
+        # Push (LISTEN/NOTIFY) mit Catch-up über den Cursor - Polling nur als Sicherheitsnetz
+        await self.run_ingestion()
     
-    async def _evaluation_loop(self):
-        """Auswertungs-Loop: Prüft alle 'aktiv' Einträge und wertet sie aus"""
+    async def _run_evaluation(self, pool) -> int:
+        """Auswertung: Prüft alle 'aktiv' Einträge und wertet sie aus"""
         from app.database.evaluation_job import evaluate_pending_predictions
-        logger.info("🔄 Auswertungs-Loop gestartet")
-        await asyncio.sleep(5)  # Kurze Verzögerung beim Start
-        while self.running:
-            try:
-                # Erhöhte Batch-Größe für bessere Performance bei vielen ausstehenden Auswertungen
-                batch_size = 500
-                stats = await evaluate_pending_predictions(batch_size=batch_size)
-                if stats['evaluated'] > 0:
-                    logger.info(f"✅ {stats['evaluated']} Vorhersagen ausgewertet: {stats['success']} success, {stats['failed']} failed, {stats['not_applicable']} not_applicable")
-                else:
-                    logger.debug(f"🔄 Auswertungs-Loop: Keine ausstehenden Auswertungen")
-                
-                # Wenn viele ausgewertet wurden, verkürze das Intervall für schnelleres Aufholen
-                if stats['evaluated'] >= batch_size:
-                    # Viele ausstehend - verarbeite schneller
-                    await asyncio.sleep(10)  # Nur 10 Sekunden warten
-                else:
-                    # Wenige ausstehend - normaler Intervall
-                    await asyncio.sleep(30)  # Alle 30 Sekunden prüfen (statt 60)
-            except Exception as e:
-                logger.error(f"❌ Fehler im Auswertungs-Loop: {e}", exc_info=True)
-                await asyncio.sleep(30)  # Auch bei Fehler weiterlaufen
+        stats = await evaluate_pending_predictions(batch_size=EVALUATION_BATCH_SIZE, pool=pool)
+        if stats['evaluated'] > 0:
+            logger.info(f"✅ {stats['evaluated']} Vorhersagen ausgewertet: {stats['success']} success, {stats['failed']} failed, {stats['not_applicable']} not_applicable")
+        else:
+            logger.debug(f"🔄 Auswertung: Keine ausstehenden Auswertungen")
+        # Voller Batch = Rückstand - der Scheduler startet sofort die nächste Runde
+        return stats['evaluated']
     
-    async def _ath_tracking_loop(self):
-        """ATH-Tracking-Loop: Prüft alle 30 Sekunden ATH Highest/Lowest für aktive Predictions"""
+    async def _run_ath_tracking(self, pool) -> int:
+        """ATH-Tracking: Prüft ATH Highest/Lowest für aktive Predictions"""
         from app.database.ath_tracker_model_predictions import update_ath_for_active_predictions
-        logger.info("📈 ATH-Tracking-Loop gestartet")
-        await asyncio.sleep(5)  # Kurze Verzögerung beim Start
-        while self.running:
-            try:
-                stats = await update_ath_for_active_predictions(batch_size=200)  # Größerer Batch
-                if stats['checked'] > 0:
-                    logger.info(f"📈 ATH-Tracking: {stats['checked']} geprüft, {stats['updated_highest']} Highest, {stats['updated_lowest']} Lowest aktualisiert, {stats['errors']} Fehler")
-                else:
-                    logger.debug(f"📈 ATH-Tracking: Keine Einträge zum Prüfen gefunden")
-                await asyncio.sleep(30)  # Alle 30 Sekunden prüfen (schneller für neue Einträge)
-            except Exception as e:
-                logger.error(f"❌ Fehler im ATH-Tracking-Loop: {e}", exc_info=True)
-                await asyncio.sleep(30)  # Auch bei Fehler weiterlaufen
+        stats = await update_ath_for_active_predictions(batch_size=ATH_TRACKING_BATCH_SIZE, pool=pool)
+        if stats['checked'] > 0:
+            logger.info(f"📈 ATH-Tracking: {stats['checked']} geprüft, {stats['updated_highest']} Highest, {stats['updated_lowest']} Lowest aktualisiert, {stats['errors']} Fehler")
+        else:
+            logger.debug(f"📈 ATH-Tracking: Keine Einträge zum Prüfen gefunden")
+        return stats['checked']
     
-    async def _watchdog_loop(self):
-        """Watchdog-Task für Heartbeats und Health-Checks"""
-        logger.info("🐕 Watchdog-Loop gestartet")
-        last_heartbeat_check = datetime.now(timezone.utc)
+    async def _watchdog_check(self, pool) -> int:
+        """Watchdog für Heartbeats und Health-Checks"""
+        # Prüfe ob Event-Handler noch aktiv ist (Heartbeat sollte regelmäßig aktualisiert werden)
+        time_since_heartbeat = (datetime.now(timezone.utc) - self.last_heartbeat).total_seconds()
+        time_since_last_processed = (datetime.now(timezone.utc) - self.last_processed_timestamp).total_seconds()
         
-        while self.running:
-            try:
-                await asyncio.sleep(60)  # Alle 60 Sekunden prüfen
-                
-                # Prüfe ob Event-Handler noch aktiv ist (Heartbeat sollte regelmäßig aktualisiert werden)
-                time_since_heartbeat = (datetime.now(timezone.utc) - self.last_heartbeat).total_seconds()
-                time_since_last_processed = (datetime.now(timezone.utc) - self.last_processed_timestamp).total_seconds()
-                
-                if time_since_heartbeat > 180:  # Mehr als 3 Minuten ohne Heartbeat = Problem
-                    logger.error(f"🚨 Watchdog: Kein Heartbeat seit {time_since_heartbeat:.1f}s - Event-Handler hängt möglicherweise!")
-                    logger.error(f"🚨 Watchdog: Letzte Verarbeitung vor {time_since_last_processed:.1f}s")
-                    # Versuche graceful restart durch Beenden des Loops
-                    logger.warning("🔄 Watchdog: Versuche Event-Handler neu zu starten...")
-                    self.running = False
-                    # Exit mit Fehlercode, damit Supervisor neu startet
-                    import sys
-                    sys.exit(1)
-                
-                # Log Heartbeat (nur alle 5 Minuten, um Logs nicht zu überfluten)
-                if (datetime.now(timezone.utc) - last_heartbeat_check).total_seconds() >= 300:
-                    logger.info(f"💓 Watchdog Heartbeat: Event-Handler läuft (letzte Verarbeitung: {self.last_processed_timestamp}, Heartbeat: {time_since_heartbeat:.1f}s alt)")
-                    last_heartbeat_check = datetime.now(timezone.utc)
-                
-            except Exception as e:
-                logger.error(f"❌ Fehler im Watchdog-Loop: {e}", exc_info=True)
-                # Weiterlaufen, auch bei Fehlern
-                continue
+        if time_since_heartbeat > 180:  # Mehr als 3 Minuten ohne Heartbeat = Problem
+            logger.error(f"🚨 Watchdog: Kein Heartbeat seit {time_since_heartbeat:.1f}s - Event-Handler hängt möglicherweise!")
+            logger.error(f"🚨 Watchdog: Letzte Verarbeitung vor {time_since_last_processed:.1f}s")
+            # Versuche graceful restart durch Beenden des Loops
+            logger.warning("🔄 Watchdog: Versuche Event-Handler neu zu starten...")
+            self.running = False
+            # Exit mit Fehlercode, damit Supervisor neu startet
+            import sys
+            sys.exit(1)
+        
+        # Log Heartbeat (nur alle 5 Minuten, um Logs nicht zu überfluten)
+        if (datetime.now(timezone.utc) - self.last_heartbeat_log).total_seconds() >= 300:
+            logger.info(f"💓 Watchdog Heartbeat: Event-Handler läuft (letzte Verarbeitung: {self.last_processed_timestamp}, Heartbeat: {time_since_heartbeat:.1f}s alt)")
+            self.last_heartbeat_log = datetime.now(timezone.utc)
+        return 0
     
     async def stop(self):
         """Stoppt Event-Handler"""
         self.running = False
         
-        # Verarbeite verbleibenden Batch
-        if self.batch:
-            await self.process_batch()
-        
+        # Vorgemerkte Cooldowns schreiben
+        if get_ignore_cache().loaded:
+            await get_ignore_cache().flush(await get_pool())
+
+        await get_model_config_store().close()
+        await get_background_scheduler().stop()
+        # Leader-Locks freigeben - andere Knoten übernehmen sofort statt nach Ablauf der Lease
+        await get_leader_election().close()
+
         # Schließe LISTEN-Connection
         if self.listener_connection and not self.listener_connection.is_closed():
-            await self.listener_connection.close()
+            await self._close_listener()
             logger.info("✅ LISTEN-Connection geschlossen")
         
+        get_inference_executor().shutdown()
         logger.info("✅ Event-Handler gestoppt")
 
 
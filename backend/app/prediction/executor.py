@@ -0,0 +1,204 @@
+"""
+Inference-Executor für Pump Server
+
+Verlagert CPU-lastige Arbeit (Modell-Laden, Feature-Engineering, predict_proba)
+aus dem asyncio Event-Loop, damit FastAPI (/health, /metrics), MCP und die
+Hintergrund-Loops während einer Batch-Inferenz reaktionsfähig bleiben.
+
+Modi (INFERENCE_EXECUTOR_MODE):
+- "inline": alles direkt im Event-Loop (altes Verhalten)
+- "thread": ThreadPool - XGBoost/sklearn geben während der Inferenz den GIL frei
+- "process": ProcessPool für predict_proba, Modelle werden pro Worker vorgeladen
+             (Feature-Engineering und Modell-Laden laufen im ThreadPool)
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.prediction.model_artifacts import load_inference_model
+from app.utils.config import INFERENCE_EXECUTOR_MODE, INFERENCE_EXECUTOR_WORKERS
+from app.utils.logging_config import get_logger
+from app.utils.metrics import (
+    ml_executor_queue_depth, ml_executor_busy_workers,
+    ml_executor_saturation, ml_executor_task_duration_seconds
+)
+
+logger = get_logger(__name__)
+
+
+def predict_from_proba(model: Any, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Klasse und Wahrscheinlichkeit (Klasse 1) aus EINEM predict_proba-Aufruf.
+
+    Die Klasse entspricht model.predict(): classes_[argmax(proba)] - ein zweiter
+    Aufruf von predict() ist nicht nötig.
+    """
+    proba = model.predict_proba(X)
+    best = np.argmax(proba, axis=1)
+    classes = getattr(model, 'classes_', None)
+    labels = np.asarray(classes)[best] if classes is not None else best
+    return labels, proba[:, 1]  # Wahrscheinlichkeit für Klasse 1
+
+
+# ============================================================
+# Process-Worker (läuft im Kindprozess)
+# ============================================================
+
+_WORKER_MODELS: Dict[str, Any] = {}
+
+
+def _worker_load(model_path: str) -> Any:
+    # Memory-mapped Artefakt: alle Worker teilen sich eine Kopie im Page-Cache
+    return load_inference_model(model_path, label=model_path)
+
+
+def _worker_init(model_paths: List[str]):
+    """Lädt Modelle beim Start eines Worker-Prozesses vor"""
+    for path in model_paths:
+        try:
+            _WORKER_MODELS[path] = _worker_load(path)
+        except Exception as e:
+            logger.warning(f"⚠️ Worker konnte Modell nicht vorladen ({path}): {e}")
+
+
+def _worker_predict(model_path: str, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """predict_proba im Worker-Prozess (Modell aus prozesslokalem Cache)"""
+    model = _WORKER_MODELS.get(model_path)
+    if model is None:
+        model = _worker_load(model_path)
+        _WORKER_MODELS[model_path] = model
+    return predict_from_proba(model, X)
+
+
+class InferenceExecutor:
+    """
+    Konfigurierbarer Executor für den Prediction-Pfad.
+
+    Zählt wartende und laufende Aufgaben und exportiert sie als Prometheus-Metriken
+    (Queue-Tiefe, belegte Worker, Auslastung).
+    """
+
+    def __init__(self, mode: str = INFERENCE_EXECUTOR_MODE, workers: int = INFERENCE_EXECUTOR_WORKERS):
+        if mode not in ('inline', 'thread', 'process'):
+            logger.warning(f"⚠️ Unbekannter INFERENCE_EXECUTOR_MODE '{mode}' - verwende 'thread'")
+            mode = 'thread'
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.pending = 0
+        self.busy = 0
+        self._counter_lock = threading.Lock()
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._preload_paths: List[str] = []
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        return self._thread_pool
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            # spawn statt fork: Event-Loop, Threads und DB-Verbindungen nicht in Kindprozesse kopieren
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_worker_init,
+                initargs=(list(self._preload_paths),)
+            )
+            logger.info(f"✅ Inference-ProcessPool gestartet: {self.workers} Worker, {len(self._preload_paths)} Modelle vorgeladen")
+        return self._process_pool
+
+    def preload(self, model_paths: List[str]):
+        """
+        Setzt die Modelle, die Worker-Prozesse beim Start vorladen.
+
+        Ein bereits laufender ProcessPool wird neu gestartet, wenn neue Modelle hinzukommen.
+        """
+        paths = sorted(set(p for p in model_paths if p))
+        if paths == self._preload_paths:
+            return
+        self._preload_paths = paths
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False)
+            self._process_pool = None
+
+    def _count(self, pending: int = 0, busy: int = 0):
+        with self._counter_lock:
+            self.pending += pending
+            self.busy += busy
+            self._update_metrics()
+
+    def _update_metrics(self):
+        ml_executor_queue_depth.set(self.pending)
+        ml_executor_busy_workers.set(self.busy)
+        ml_executor_saturation.set(min(1.0, self.busy / self.workers) if self.mode != 'inline' else 0)
+
+    async def _submit(self, executor: Optional[Executor], task: str, fn: Callable, *args) -> Any:
+        start_time = time.time()
+        if executor is None:
+            try:
+                return fn(*args)
+            finally:
+                ml_executor_task_duration_seconds.labels(task=task).observe(time.time() - start_time)
+
+        self._count(pending=1)
+
+        def tracked(*call_args):
+            # Läuft im Worker-Thread: Warteschlange verlassen, Worker belegt
+            self._count(pending=-1, busy=1)
+            try:
+                return fn(*call_args)
+            finally:
+                self._count(busy=-1)
+
+        try:
+            if isinstance(executor, ProcessPoolExecutor):
+                # Zähler können nicht im Kindprozess aktualisiert werden - hier zählt "laufend" als belegt
+                self._count(pending=-1, busy=1)
+                try:
+                    return await asyncio.get_running_loop().run_in_executor(executor, partial(fn, *args))
+                finally:
+                    self._count(busy=-1)
+            return await asyncio.get_running_loop().run_in_executor(executor, partial(tracked, *args))
+        finally:
+            ml_executor_task_duration_seconds.labels(task=task).observe(time.time() - start_time)
+
+    async def run(self, task: str, fn: Callable, *args) -> Any:
+        """Führt eine CPU-lastige Funktion im ThreadPool aus (oder inline)"""
+        executor = None if self.mode == 'inline' else self._get_thread_pool()
+        return await self._submit(executor, task, fn, *args)
+
+    async def predict_proba(self, model: Any, model_path: Optional[str], X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batch-Inferenz (Klasse + Wahrscheinlichkeit).
+
+        Im Process-Modus wird nur der Modell-Pfad übertragen - der Worker nutzt sein vorgeladenes Modell.
+        """
+        if self.mode == 'process' and model_path:
+            return await self._submit(self._get_process_pool(), 'predict', _worker_predict, model_path, X)
+        return await self.run('predict', predict_from_proba, model, X)
+
+    def shutdown(self):
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False)
+            self._process_pool = None
+
+
+# Globale Instanz (pro Prozess)
+_inference_executor: Optional[InferenceExecutor] = None
+
+
+def get_inference_executor() -> InferenceExecutor:
+    """Gibt den prozessweiten InferenceExecutor zurück"""
+    global _inference_executor
+    if _inference_executor is None:
+        _inference_executor = InferenceExecutor()
+        logger.info(f"✅ Inference-Executor: Modus={_inference_executor.mode}, Worker={_inference_executor.workers}")
+    return _inference_executor
@@ -2,98 +2,301 @@
 Feature-Processing für Pump Server
 GLEICHE Logik wie Training Service für konsistente Features!
 """
+import asyncio
+import json
 import pandas as pd
 import numpy as np
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set, Tuple
 import asyncpg
 from app.database.connection import get_pool
+from app.database.models import (
+    get_coin_history_prefix, get_coin_history_prefixes_bulk, get_coin_metrics_columns
+)
+from app.prediction.executor import get_inference_executor
+from app.prediction.hot_store import MISS, get_hot_store
+from app.prediction.streaming_features import (
+    check_parity, get_streaming_engine, required_rows, streaming_mode
+)
+from app.utils.config import BOUNDED_HISTORY_QUERIES
 from app.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
 FEATURE_HISTORY_SIZE = 1000
 
-async def prepare_features(
-    coin_id: str,
-    model_config: Dict[str, Any],
-    pool: Optional[asyncpg.Pool] = None
-) -> pd.DataFrame:
+
+def _phases_key(phases: Optional[List[int]]) -> Tuple[int, ...]:
+    """Normalisiert einen Phasen-Filter zu einem hashbaren Key (leer = alle Phasen)"""
+    if not phases:
+        return ()
+    return tuple(sorted(int(p) for p in phases))
+
+
+class FeatureContext:
     """
-    Bereitet Features für einen Coin auf.
-    FLEXIBEL: Liest die tatsächliche Feature-Anzahl vom Modell selbst!
+    Per-Event Feature-Kontext für einen Coin.
+
+    Wird von predict_coin_all_models einmal pro Coin-Event erstellt und von allen
+    Modellen geteilt:
+    - Historie wird nur einmal pro Phasen-Filter aus coin_metrics geladen
+    - Feature-Engineering läuft nur einmal pro (Phasen-Filter, Windows, Flags)
+
+    Jedes Modell wählt danach nur noch seine Spalten aus dem geteilten Frame.
+
+    STREAMING_FEATURES_MODE:
+    - "on": Historie/Features kommen aus dem inkrementellen Streaming-Zustand (1 Zeile)
+    - "parity": pandas-Pfad bleibt maßgeblich, Streaming-Ergebnis wird verglichen
     """
-    if pool is None:
-        pool = await get_pool()
 
-    # KRITISCH: Erst die tatsächliche Feature-Anzahl und -Namen vom Modell lesen!
-    model_feature_names = None
-    try:
-        from app.prediction.model_manager import load_model
-        model_file_path = model_config['local_model_path']
-        model = load_model(model_file_path)
-
-        # Feature-Namen direkt vom Modell lesen (wenn vorhanden)
-        if hasattr(model, 'feature_names_in_'):
-            model_feature_names = list(model.feature_names_in_)
-            logger.info(f"Feature-Namen vom Modell gelesen: {len(model_feature_names)} Features")
-
-        # XGBoost/RandomForest haben n_features_in_
-        if hasattr(model, 'n_features_in_'):
-            expected_features = model.n_features_in_
-        elif hasattr(model, 'n_features_'):
-            expected_features = model.n_features_
+    def __init__(self, coin_id: str, pool: Optional[asyncpg.Pool] = None):
+        self.coin_id = coin_id
+        self.pool = pool
+        self.mode = streaming_mode()
+        self.bounded = BOUNDED_HISTORY_QUERIES
+        self._history_tasks: Dict[Tuple, asyncio.Future] = {}
+        self._stream_tasks: Dict[Tuple, asyncio.Future] = {}
+        self._engineered: Dict[Tuple, pd.DataFrame] = {}
+        # Bedarf pro Phasen-Filter: (Spalten, Zeilen) - Vereinigung aller registrierten FeaturePläne
+        self._demand: Dict[Tuple[int, ...], Tuple[frozenset, int]] = {}
+        # Phasen-Filter mit Plänen, die das volle Schema brauchen (Feature-Ergänzung aus frame.columns)
+        self._full_demand: Set[Tuple[int, ...]] = set()
+
+    def register_plan(self, plan: 'FeaturePlan'):
+        """
+        Meldet den Spalten- und Zeilenbedarf eines Modells an.
+
+        Werden alle Pläne VOR dem ersten get_history registriert, lädt ein einziger
+        Query die Vereinigung aller benötigten Spalten.
+        """
+        key = _phases_key(plan.phases)
+        if plan.base_columns is None:
+            self._full_demand.add(key)
+            return
+        columns, rows = self._demand.get(key, (frozenset(), 1))
+        self._demand[key] = (columns | frozenset(plan.base_columns), max(rows, plan.history_rows))
+
+    def history_demands(self) -> List[Tuple[Tuple[int, ...], Optional[frozenset], int]]:
+        """
+        Historie-Bedarf dieses Kontexts als (Phasen-Key, Spalten, Zeilen).
+
+        Ohne BOUNDED_HISTORY_QUERIES: alle Spalten, FEATURE_HISTORY_SIZE Zeilen.
+        Im Streaming-Modus "on" gibt es keinen Bedarf (Zustand statt Historie).
+        """
+        if self.mode == 'on':
+            return []
+        if self.bounded:
+            return [(key, columns, rows) for key, (columns, rows) in self._demand.items()] + [
+                (key, None, FEATURE_HISTORY_SIZE) for key in self._full_demand
+            ]
+        return [(key, None, FEATURE_HISTORY_SIZE) for key in set(self._demand) | self._full_demand]
+
+    def prime_from_hot_store(self, phases_key: Tuple[int, ...], columns: frozenset, rows: int) -> bool:
+        """Übernimmt die Historie aus dem Hot-Store, falls dieser sie vollständig hält"""
+        history = get_hot_store().history(self.coin_id, phases_key, columns, rows)
+        if history is MISS:
+            return False
+        self.prime_history(phases_key, columns, rows, _coerce_numeric(history))
+        return True
+
+    def prime_history(self, phases_key: Tuple[int, ...], columns: Optional[frozenset], rows: int, history: pd.DataFrame):
+        """Übernimmt eine bereits (per Bulk-Loader) geladene Historie - get_history macht dann keinen Query"""
+        task = asyncio.get_running_loop().create_future()
+        task.set_result(history)
+        self._history_tasks[(phases_key, columns, rows)] = task
+
+    async def _get_stream_state(self, phases: Optional[List[int]], window_sizes: Optional[List[int]] = None):
+        """Synchronisiert den Streaming-Zustand (nur einmal pro Event und Buffer-Größe)"""
+        key = (_phases_key(phases), required_rows(window_sizes or []))
+        task = self._stream_tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(get_streaming_engine().get_state(
+                self.coin_id, key[0], window_sizes=window_sizes, pool=self.pool
+            ))
+            self._stream_tasks[key] = task
+        return await task
+
+    async def get_history(
+        self,
+        phases: Optional[List[int]] = None,
+        limit: int = FEATURE_HISTORY_SIZE,
+        plan: Optional['FeaturePlan'] = None
+    ) -> pd.DataFrame:
+        """
+        Lädt die Historie für einen Phasen-Filter (nur einmal pro Event).
+
+        Parallel laufende Modelle mit gleichem Filter warten auf denselben Query.
+        Mit BOUNDED_HISTORY_QUERIES werden nur die Spalten und Zeilen der registrierten
+        FeaturePläne geladen; Full-History-Werte kommen aus einem Aggregat.
+        """
+        if self.mode == 'on':
+            state = await self._get_stream_state(phases)
+            return state.latest_frame()
+
+        phases_key = _phases_key(phases)
+        if self.bounded and plan is not None and plan.base_columns is not None:
+            self.register_plan(plan)
+            columns, rows = self._demand[phases_key]
+            # Bereits laufender Query, der den Bedarf abdeckt?
+            for (task_phases, task_columns, task_rows), task in self._history_tasks.items():
+                if task_phases == phases_key and task_columns is not None and columns <= task_columns and rows <= task_rows:
+                    return await task
+            key = (phases_key, columns, rows)
+            if key not in self._history_tasks:
+                self.prime_from_hot_store(phases_key, columns, rows)
         else:
-            # Fallback: Verwende Datenbank-Features
-            expected_features = len(model_config['features'])
-            logger.warning(f"Modell hat kein n_features_in_ Attribut, verwende DB-Features: {expected_features}")
+            columns, rows = None, limit
+            key = (phases_key, None, limit)
+
+        task = self._history_tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(get_coin_history_for_prediction(
+                coin_id=self.coin_id,
+                limit=rows,
+                phases=list(phases_key) or None,
+                pool=self.pool,
+                columns=sorted(columns) if columns is not None else None
+            ))
+            self._history_tasks[key] = task
+        return await task
+
+    async def get_engineered(
+        self,
+        history: pd.DataFrame,
+        phases: Optional[List[int]],
+        window_sizes: List[int],
+        include_flags: bool = False,
+        limit: int = FEATURE_HISTORY_SIZE
+    ) -> pd.DataFrame:
+        """
+        Gibt den Feature-Engineering-Frame für eine Window-Konfiguration zurück (einmal pro History-Frame).
 
-        logger.debug(f"Modell {model_config['id']} erwartet {expected_features} Features (DB hat {len(model_config['features'])})")
+        WICHTIG: Der zurückgegebene Frame wird geteilt und darf nicht in-place verändert werden.
+        """
+        # Im Streaming-Modus gibt es pro Phasen-Filter nur einen Zustand, sonst zählt der konkrete History-Frame
+        history_key = _phases_key(phases) if self.mode == 'on' else id(history)
+        key = (history_key, tuple(window_sizes), bool(include_flags))
+        engineered = self._engineered.get(key)
+        if engineered is None:
+            if self.mode == 'on':
+                state = await self._get_stream_state(phases, list(window_sizes))
+                engineered = state.features_frame(list(window_sizes), include_flags=include_flags)
+            else:
+                # CPU-lastig - läuft im Inference-Executor statt im Event-Loop
+                engineered = await get_inference_executor().run(
+                    'features', create_pump_detection_features, history, list(window_sizes), include_flags,
+                    history.attrs.get('history_prefix')
+                )
+                if self.mode == 'parity':
+                    # Ohne Aggregat sieht der pandas-Pfad nur `limit` Zeilen - kumulative Features nicht vergleichbar
+                    full_history = self.bounded or len(history) < limit
+                    await self._check_parity(engineered, phases, window_sizes, include_flags, full_history)
+            self._engineered[key] = engineered
+        else:
+            logger.debug(f"♻️ Feature-Frame aus Event-Kontext wiederverwendet (Windows={list(window_sizes)}, Flags={include_flags})")
+        return engineered
+
+    async def _check_parity(
+        self,
+        engineered: pd.DataFrame,
+        phases: Optional[List[int]],
+        window_sizes: List[int],
+        include_flags: bool,
+        full_history: bool
+    ):
+        """Vergleicht den pandas-Frame mit dem Streaming-Zustand (Fehler brechen die Vorhersage nicht ab)"""
+        try:
+            state = await self._get_stream_state(phases, list(window_sizes))
+            check_parity(state, engineered, list(window_sizes), include_flags=include_flags, compare_cumulative=full_history)
+        except Exception as e:
+            logger.warning(f"⚠️ Streaming-Parity-Check fehlgeschlagen für Coin {self.coin_id[:8]}...: {e}")
 
-    except Exception as e:
-        logger.error(f"Fehler beim Laden des Modells {model_config['id']}: {e}")
-        # Fallback: Verwende Datenbank-Features
-        expected_features = len(model_config['features'])
-        logger.warning(f"Verwende Fallback: {expected_features} Features aus DB")
-
-    # Hole ALLE verfügbaren Basis-Daten
-    history = await get_coin_history_for_prediction(
-        coin_id=coin_id,
-        limit=FEATURE_HISTORY_SIZE,
-        phases=model_config.get('phases'),
-        pool=pool
-    )
 
-    if len(history) == 0:
-        raise ValueError(f"Keine Daten für Coin {coin_id} gefunden")
+DEFAULT_WINDOW_SIZES = [5, 10, 15]
 
-    # Feature-Engineering und Feature-Auswahl
-    params = model_config.get('params') or {}
 
-    if model_feature_names:
-        # ===== NEUER PFAD: Exakte Feature-Namen vom Modell verwenden =====
-        required_features = model_feature_names
+def _plan_signature(model_config: Dict[str, Any]) -> Tuple:
+    """Signatur der Konfigurations-Felder, von denen ein FeaturePlan abhängt"""
+    return (
+        model_config.get('local_model_path'),
+        tuple(model_config.get('features') or ()),
+        json.dumps(model_config.get('params') or {}, sort_keys=True, default=str),
+        _phases_key(model_config.get('phases')),
+        model_config.get('target_variable'),
+        model_config.get('target_operator'),
+    )
 
-        # Pruefe ob Feature-Engineering noetig ist
-        has_engineered = any(f for f in required_features if f not in history.columns and not f.endswith('_has_data'))
-        has_flags = any(f.endswith('_has_data') for f in required_features)
 
-        if has_engineered or has_flags:
-            window_sizes = params.get('feature_engineering_windows', [5, 10, 15])
-            history = create_pump_detection_features(history, window_sizes=window_sizes, include_flags=has_flags)
+class FeaturePlan:
+    """
+    Vorberechneter Feature-Plan eines aktiven Modells.
 
-        logger.info(f"Verwende exakte Feature-Namen vom Modell: {len(required_features)} Features")
-    else:
-        # ===== FALLBACK: Alter Pfad fuer Modelle ohne feature_names_in_ =====
-        use_engineered_features = params.get('use_engineered_features', False)
+    Wird einmal pro Modell (Aktivierung/Laden) gebaut statt bei jeder Vorhersage:
+    - aufgelöste, geordnete Feature-Liste (feature_names_in_ bzw. DB-Features)
+    - benötigte Basis-Spalten, Windows, Flag-Bedarf, Phasen-Filter
+    - Spalten-Index-Array pro Frame-Schema (für schnelle Auswahl der letzten Zeile)
 
-        if use_engineered_features:
-            window_sizes = params.get('feature_engineering_windows', [5, 10, 15])
-            history = create_pump_detection_features(history, window_sizes=window_sizes)
+    Der Hot-Path führt den Plan nur noch aus (needs_engineering + select).
+    """
 
-        # Features auswaehlen: Die ersten N Features aus der Datenbank-Liste
-        db_features = model_config['features'].copy()
+    def __init__(self, model_config: Dict[str, Any], model: Any = None):
+        self.active_model_id = model_config.get('id')
+        self.signature = _plan_signature(model_config)
+        self.phases = list(_phases_key(model_config.get('phases'))) or None
+        params = model_config.get('params') or {}
+        self.window_sizes = list(params.get('feature_engineering_windows', DEFAULT_WINDOW_SIZES))
+        self.degraded = model is None  # Modell konnte nicht geladen werden - Plan wird nicht gecacht
+
+        self.model_feature_names: Optional[List[str]] = None
+        if model is not None and hasattr(model, 'feature_names_in_'):
+            self.model_feature_names = list(model.feature_names_in_)
+
+        if model is not None and hasattr(model, 'n_features_in_'):
+            self.expected_features = int(model.n_features_in_)
+        elif model is not None and hasattr(model, 'n_features_'):
+            self.expected_features = int(model.n_features_)
+        else:
+            # Fallback: Verwende Datenbank-Features
+            self.expected_features = len(model_config['features'])
+            if model is not None:
+                logger.warning(f"Modell hat kein n_features_in_ Attribut, verwende DB-Features: {self.expected_features}")
+
+        # Memoisiert pro Frame-Schema (Spalten-Tupel)
+        self._engineering: Dict[Tuple[str, ...], bool] = {}
+        self._selection: Dict[Tuple[str, ...], Tuple[List[str], np.ndarray]] = {}
+
+        if self.model_feature_names:
+            # ===== Exakte Feature-Namen vom Modell =====
+            self.required_features: Optional[List[str]] = self.model_feature_names
+            self.include_flags = any(f.endswith('_has_data') for f in self.required_features)
+            self.use_engineered_features = False
+            logger.info(
+                f"📋 Feature-Plan für Modell {self.active_model_id}: {len(self.required_features)} Features "
+                f"(exakte Namen vom Modell, Windows={self.window_sizes}, Flags={self.include_flags})"
+            )
+        else:
+            # ===== FALLBACK: Modelle ohne feature_names_in_ =====
+            self.include_flags = False
+            self.use_engineered_features = params.get('use_engineered_features', False)
+            self.required_features = self._resolve_db_features(model_config)
+
+        # Spalten, die aus coin_metrics geladen werden (sofern im Schema vorhanden):
+        # benötigte Features + Basis-Spalten für Engineering und Fallback-Berechnungen.
+        # None = keine Projektion: die Feature-Ergänzung (_resolve_selection) füllt aus
+        # frame.columns auf und braucht dafür exakt das Schema von SELECT *
+        self.base_columns: Optional[List[str]] = None
+        if self.required_features is not None:
+            base = list(self.required_features)
+            base.extend(c for c in ENGINEERING_BASE_COLUMNS if c not in base)
+            self.base_columns = base
+
+        # Zeilen für die Rolling-Windows (price_acceleration braucht shift(2*w), volume_spike 2*w)
+        self.history_rows = 2 * max(self.window_sizes or [0]) + 1
+
+    def _resolve_db_features(self, model_config: Dict[str, Any]) -> Optional[List[str]]:
+        """target_variable abgleichen und die ersten N DB-Features wählen (None = Ergänzung nötig)"""
+        db_features = list(model_config['features'])
         original_db_features_count = len(db_features)
-
+        expected_features = self.expected_features
         target_variable = model_config.get('target_variable')
 
         if expected_features == original_db_features_count:
@@ -107,20 +310,38 @@ async def prepare_features(
         else:
             logger.info(f"Keine Aenderung an target_variable '{target_variable}' (expected={expected_features}, db_count={original_db_features_count}, operator={model_config.get('target_operator')})")
 
-        # Nimm nur die ersten expected_features Features
+        self.db_features = db_features
         if len(db_features) >= expected_features:
-            required_features = db_features[:expected_features]
-        else:
-            if not use_engineered_features:
-                logger.warning(
-                    f"DB hat nur {len(db_features)} Features, Modell braucht {expected_features}. "
-                    f"Fuehre Feature-Engineering durch um fehlende Features zu generieren."
-                )
-                window_sizes = params.get('feature_engineering_windows', [5, 10, 15])
-                history = create_pump_detection_features(history, window_sizes=window_sizes)
+            return db_features[:expected_features]
 
-            available_cols = [c for c in history.columns if c not in ['mint', 'timestamp']]
-            required_features = [f for f in db_features if f in available_cols]
+        logger.warning(
+            f"DB hat nur {len(db_features)} Features, Modell braucht {expected_features}. "
+            f"Fuehre Feature-Engineering durch um fehlende Features zu generieren."
+        )
+        return None
+
+    def needs_engineering(self, columns: Any) -> bool:
+        """Prüft (einmal pro Frame-Schema), ob Feature-Engineering nötig ist"""
+        key = tuple(columns)
+        result = self._engineering.get(key)
+        if result is None:
+            if self.model_feature_names:
+                result = self.include_flags or any(
+                    f not in columns and not f.endswith('_has_data') for f in self.required_features
+                )
+            else:
+                result = bool(self.use_engineered_features or self.required_features is None)
+            self._engineering[key] = result
+        return result
+
+    def _resolve_selection(self, frame: pd.DataFrame) -> Tuple[List[str], List[str]]:
+        """Löst die Feature-Liste gegen ein Frame-Schema auf (Liste + fehlende Features)"""
+        required_features = self.required_features
+        if required_features is None:
+            # Feature-Ergänzung aus den verfügbaren (engineerten) Spalten
+            expected_features = self.expected_features
+            available_cols = [c for c in frame.columns if c not in ['mint', 'timestamp']]
+            required_features = [f for f in self.db_features if f in available_cols]
 
             for col in available_cols:
                 if len(required_features) >= expected_features:
@@ -131,48 +352,165 @@ async def prepare_features(
             if len(required_features) < expected_features:
                 raise ValueError(
                     f"Kann nicht genug Features generieren: {len(required_features)}/{expected_features}. "
-                    f"DB-Features: {db_features}, Verfuegbar: {len(available_cols)}"
+                    f"DB-Features: {self.db_features}, Verfuegbar: {len(available_cols)}"
                 )
 
             logger.warning(
-                f"Feature-Ergaenzung: DB hatte {len(db_features)}, Modell braucht {expected_features}. "
+                f"Feature-Ergaenzung: DB hatte {len(self.db_features)}, Modell braucht {expected_features}. "
                 f"Ergaenzt auf {len(required_features)} Features. "
                 f"ACHTUNG: Feature-Reihenfolge ist geschaetzt - Vorhersagequalitaet unklar!"
             )
 
-    # Validierung: Prüfe ob alle erforderlichen Features vorhanden sind
-    missing = [f for f in required_features if f not in history.columns]
-    if missing:
-        logger.warning(f"⚠️ Features fehlen: {missing} - versuche zu berechnen...")
-        history = calculate_missing_features(history, missing)
-
-        # Prüfe erneut
-        still_missing = [f for f in required_features if f not in history.columns]
-        if still_missing:
-            raise ValueError(
-                f"Features können nicht berechnet werden: {still_missing}\n"
-                f"Benötigt ({len(required_features)}): {required_features}\n"
-                f"Verfügbar ({len(list(history.columns))}): {sorted(list(history.columns))}"
-            )
+        missing = [f for f in required_features if f not in frame.columns]
+        return required_features, missing
+
+    def select(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Wählt die letzte Zeile in der korrekten Feature-Reihenfolge aus"""
+        key = tuple(frame.columns)
+        cached = self._selection.get(key)
+        if cached is not None:
+            required_features, column_index = cached
+            latest_data = frame.iloc[-1:, column_index]
+            return latest_data.fillna(0.0)  # NaN-Werte behandeln
+
+        required_features, missing = self._resolve_selection(frame)
+
+        # Validierung: Prüfe ob alle erforderlichen Features vorhanden sind
+        if missing:
+            logger.warning(f"⚠️ Features fehlen: {missing} - versuche zu berechnen...")
+            frame = calculate_missing_features(frame, missing)
+
+            # Prüfe erneut
+            still_missing = [f for f in required_features if f not in frame.columns]
+            if still_missing:
+                raise ValueError(
+                    f"Features können nicht berechnet werden: {still_missing}\n"
+                    f"Benötigt ({len(required_features)}): {required_features}\n"
+                    f"Verfügbar ({len(list(frame.columns))}): {sorted(list(frame.columns))}"
+                )
+            # Nicht cachen - fehlende Features müssen pro Frame berechnet werden
+            return frame.iloc[-1:][required_features].fillna(0.0)
+
+        column_index = frame.columns.get_indexer(required_features)
+        self._selection[key] = (required_features, column_index)
+        logger.debug(f"📋 Feature-Plan {self.active_model_id}: Spalten-Index für Schema mit {len(key)} Spalten berechnet")
+        return frame.iloc[-1:, column_index].fillna(0.0)
+
+
+# Feature-Pläne pro active_model_id
+_FEATURE_PLANS: Dict[Any, FeaturePlan] = {}
+
+
+async def get_feature_plan(model_config: Dict[str, Any]) -> FeaturePlan:
+    """
+    Holt den FeaturePlan eines Modells (baut ihn beim ersten Zugriff oder nach Konfig-Änderung).
+    """
+    key = model_config.get('id')
+    plan = _FEATURE_PLANS.get(key)
+    if plan is not None and plan.signature == _plan_signature(model_config):
+        return plan
+
+    # KRITISCH: Die tatsächliche Feature-Anzahl und -Namen vom Modell lesen!
+    model = None
+    try:
+        from app.prediction.model_manager import load_model
+        model = await get_inference_executor().run('load_model', load_model, model_config['local_model_path'])
+    except Exception as e:
+        logger.error(f"Fehler beim Laden des Modells {model_config['id']}: {e}")
+        logger.warning(f"Verwende Fallback: {len(model_config['features'])} Features aus DB")
+
+    plan = FeaturePlan(model_config, model)
+    if not plan.degraded:
+        _FEATURE_PLANS[key] = plan
+    return plan
+
+
+def peek_feature_plan(model_config: Dict[str, Any]) -> Optional[FeaturePlan]:
+    """Gibt einen bereits gebauten, aktuellen FeaturePlan zurück (ohne Modell zu laden)"""
+    plan = _FEATURE_PLANS.get(model_config.get('id'))
+    if plan is not None and plan.signature == _plan_signature(model_config):
+        return plan
+    return None
+
+
+def invalidate_feature_plan(active_model_id: Optional[int] = None):
+    """Verwirft den FeaturePlan eines Modells (oder alle, wenn keine ID angegeben ist)"""
+    if active_model_id is None:
+        _FEATURE_PLANS.clear()
+    else:
+        _FEATURE_PLANS.pop(active_model_id, None)
+
+
+async def prepare_features(
+    coin_id: str,
+    model_config: Dict[str, Any],
+    pool: Optional[asyncpg.Pool] = None,
+    feature_context: Optional[FeatureContext] = None
+) -> pd.DataFrame:
+    """
+    Bereitet Features für einen Coin auf.
+    FLEXIBEL: Liest die tatsächliche Feature-Anzahl vom Modell selbst!
+
+    Die Modell-Analyse (Feature-Namen, target_variable, Windows) steckt im
+    FeaturePlan und wird nur einmal pro Modell berechnet.
+
+    Mit feature_context werden Historie und Feature-Engineering zwischen
+    mehreren Modellen desselben Coin-Events geteilt.
+    """
+    if pool is None:
+        pool = await get_pool()
+
+    if feature_context is None:
+        feature_context = FeatureContext(coin_id, pool=pool)
+
+    plan = await get_feature_plan(model_config)
+
+    # Hole ALLE verfügbaren Basis-Daten (geteilt über den Event-Kontext)
+    history = await feature_context.get_history(phases=plan.phases, limit=FEATURE_HISTORY_SIZE, plan=plan)
+
+    if len(history) == 0:
+        raise ValueError(f"Keine Daten für Coin {coin_id} gefunden")
+
+    # Feature-Engineering (nur wenn der Plan es verlangt)
+    if plan.needs_engineering(history.columns):
+        history = await feature_context.get_engineered(
+            history, plan.phases, plan.window_sizes, include_flags=plan.include_flags
+        )
 
     # Features in der korrekten Reihenfolge zurückgeben
-    latest_data = history.iloc[-1:][required_features]
-    latest_data = latest_data.fillna(0.0)  # NaN-Werte behandeln
-    latest_data = latest_data[required_features]  # Sicherstellen der Reihenfolge
+    latest_data = plan.select(history)
 
-    logger.debug(f"✅ Features vorbereitet für Modell: {len(required_features)}/{expected_features} Features, Shape: {latest_data.shape}")
+    logger.debug(f"✅ Features vorbereitet für Modell {plan.active_model_id}: Shape: {latest_data.shape}")
     return latest_data
 
 
+def _coerce_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """Konvertiert alle numerischen Spalten zu float (gleiches Format für DB- und Hot-Store-Historie)"""
+    for col in df.columns:
+        if col not in ['mint', 'timestamp']:  # Nicht konvertieren
+            try:
+                # Konvertiere zu numeric, ignoriere Fehler bei Strings
+                df[col] = pd.to_numeric(df[col], errors='ignore', downcast='float')
+            except:
+                pass
+    return df
+
+
 async def get_coin_history_for_prediction(
     coin_id: str,
     limit: int,
     phases: Optional[List[int]] = None,
-    pool: Optional[asyncpg.Pool] = None
+    pool: Optional[asyncpg.Pool] = None,
+    columns: Optional[List[str]] = None
 ) -> pd.DataFrame:
     """
     Holt Historie für einen Coin (angepasst für Prediction).
-    Lädt ALLE verfügbaren Spalten aus coin_metrics für maximale Flexibilität.
+    Ohne columns werden ALLE verfügbaren Spalten aus coin_metrics geladen.
+
+    Mit columns (Window-begrenzter Modus) werden nur diese Spalten (soweit im Schema
+    vorhanden) und nur `limit` Zeilen geladen. Gibt es ältere Einträge, liefert ein
+    Aggregat die Full-History-Werte (ATH, dev_sold-Summe, erster Timestamp) -
+    abgelegt in df.attrs['history_prefix'] für create_pump_detection_features.
     
     WICHTIG: Wenn phases angegeben ist, werden nur Einträge aus diesen Phasen geladen.
     Dies stellt sicher, dass Modelle nur mit Daten aus den Phasen arbeiten, auf die sie trainiert wurden.
@@ -180,11 +518,20 @@ async def get_coin_history_for_prediction(
     if pool is None:
         pool = await get_pool()
 
+    select_list = "*"
+    if columns is not None:
+        schema_columns = await get_coin_metrics_columns(pool)
+        if schema_columns is None:
+            columns = None  # Schema unbekannt - lade alle Spalten
+        else:
+            projected = [c for c in schema_columns if c in set(columns) and c != 'timestamp']
+            select_list = ", ".join(['timestamp'] + [f'"{c}"' for c in projected])
+
     # PHASEN-FILTER: Wenn Modell auf spezifische Phasen trainiert wurde, filtere danach
     if phases and len(phases) > 0:
         # Modell ist nur für bestimmte Phasen trainiert - lade nur Daten aus diesen Phasen
-        query = """
-            SELECT * FROM coin_metrics
+        query = f"""
+            SELECT {select_list} FROM coin_metrics
             WHERE mint = $1
               AND phase_id_at_time = ANY($2::int[])
             ORDER BY timestamp DESC
@@ -194,8 +541,8 @@ async def get_coin_history_for_prediction(
         logger.debug(f"📊 Lade Historie für Coin {coin_id[:8]}... mit Phasen-Filter: {phases} -> {len(rows)} Einträge")
     else:
         # Modell ist für alle Phasen - lade alle Daten
-        query = """
-            SELECT * FROM coin_metrics
+        query = f"""
+            SELECT {select_list} FROM coin_metrics
             WHERE mint = $1
             ORDER BY timestamp DESC
             LIMIT $2
@@ -206,55 +553,169 @@ async def get_coin_history_for_prediction(
     if not rows:
         return pd.DataFrame()
 
+    prefix = None
+    if columns is not None and len(rows) >= limit:
+        # Es gibt ältere Einträge - Full-History-Werte aus dem Aggregat
+        try:
+            prefix = await get_coin_history_prefix(coin_id, rows[-1]['timestamp'], phases=phases, pool=pool)
+        except Exception as e:
+            logger.warning(f"⚠️ History-Aggregat für Coin {coin_id[:8]}... fehlgeschlagen: {e} - lade volle Historie")
+            return await get_coin_history_for_prediction(coin_id, FEATURE_HISTORY_SIZE, phases=phases, pool=pool)
+
     df = pd.DataFrame([dict(row) for row in rows])
     df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df = df.set_index('timestamp').sort_index()
+    df = _coerce_numeric(df.set_index('timestamp').sort_index())
 
-    # Konvertiere alle numerischen Spalten zu float
-    for col in df.columns:
-        if col not in ['mint', 'timestamp']:  # Nicht konvertieren
-            try:
-                # Konvertiere zu numeric, ignoriere Fehler bei Strings
-                df[col] = pd.to_numeric(df[col], errors='ignore', downcast='float')
-            except:
-                pass
+    if prefix is not None:
+        df.attrs['history_prefix'] = prefix
 
     logger.debug(f"📊 Geladene Spalten für {coin_id}: {len(df.columns)} Spalten, {len(df)} Zeilen")
     return df
 
 
-def add_ath_features(df: pd.DataFrame) -> pd.DataFrame:
+async def get_coin_histories_bulk(
+    coin_ids: List[str],
+    limit: int,
+    phases: Optional[List[int]] = None,
+    pool: Optional[asyncpg.Pool] = None,
+    columns: Optional[List[str]] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Lädt die letzten `limit` Zeilen für VIELE Coins in einem Round-Trip.
+
+    LATERAL-Join pro Mint (nutzt den (mint, timestamp)-Index), ein gemeinsamer
+    DataFrame-Decode, danach Gruppierung nach Mint. Full-History-Aggregate für
+    Coins mit älteren Einträgen kommen ebenfalls aus einem einzigen Query.
+
+    Returns:
+        mint -> DataFrame im Format von get_coin_history_for_prediction
+        (Coins ohne Daten erhalten einen leeren DataFrame)
+    """
+    if pool is None:
+        pool = await get_pool()
+
+    coin_ids = list(dict.fromkeys(coin_ids))
+    select_list = "c.*"
+    if columns is not None:
+        schema_columns = await get_coin_metrics_columns(pool)
+        if schema_columns is None:
+            columns = None
+        else:
+            projected = [c for c in schema_columns if c in set(columns) and c not in ('timestamp', 'mint')]
+            select_list = ", ".join(['c.mint', 'c.timestamp'] + [f'c."{c}"' for c in projected])
+
+    phase_filter = "AND c.phase_id_at_time = ANY($3::int[])" if phases else ""
+    args = [coin_ids, limit] + ([list(phases)] if phases else [])
+    rows = await pool.fetch(f"""
+        SELECT {select_list}
+        FROM unnest($1::text[]) AS m(mint)
+        CROSS JOIN LATERAL (
+            SELECT * FROM coin_metrics c
+            WHERE c.mint = m.mint
+              {phase_filter}
+            ORDER BY c.timestamp DESC
+            LIMIT $2
+        ) c
+    """, *args)
+    logger.debug(f"📊 Bulk-Historie: {len(coin_ids)} Coins, {len(rows)} Zeilen in einem Query")
+
+    histories: Dict[str, pd.DataFrame] = {coin_id: pd.DataFrame() for coin_id in coin_ids}
+    if not rows:
+        return histories
+
+    df = pd.DataFrame([dict(row) for row in rows])
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+
+    # Konvertiere alle numerischen Spalten zu float (einmal für alle Coins)
+    df = _coerce_numeric(df)
+
+    # Full-History-Aggregat für Coins mit älteren Einträgen
+    befores: Dict[str, Any] = {}
+    for coin_id, group in df.groupby('mint', sort=False):
+        frame = group.set_index('timestamp').sort_index()
+        if 'mint' not in (columns or ['mint']):
+            frame = frame.drop(columns=['mint'])
+        histories[coin_id] = frame
+        if columns is not None and len(frame) >= limit:
+            befores[coin_id] = frame.index[0].to_pydatetime()
+
+    if befores:
+        try:
+            prefixes = await get_coin_history_prefixes_bulk(befores, phases=phases, pool=pool)
+        except Exception as e:
+            logger.warning(f"⚠️ Bulk-History-Aggregat fehlgeschlagen: {e} - lade betroffene Coins einzeln")
+            for coin_id in befores:
+                histories.pop(coin_id, None)
+            return histories
+        for coin_id, prefix in prefixes.items():
+            histories[coin_id].attrs['history_prefix'] = prefix
+
+    return histories
+
+
+def _prefix_timestamp(value: Any, index: pd.Index) -> pd.Timestamp:
+    """Timestamp aus dem History-Aggregat passend zur Zeitzone des Index"""
+    ts = pd.Timestamp(value)
+    tz = getattr(index, 'tz', None)
+    if tz is not None and ts.tzinfo is None:
+        return ts.tz_localize(tz)
+    if tz is None and ts.tzinfo is not None:
+        return ts.tz_convert(None)
+    return ts
+
+
+def add_ath_features(df: pd.DataFrame, prefix: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
     """
     Fügt ATH-Features hinzu (Data Leakage-frei).
     GLEICHE Logik wie Training Service!
+
+    Args:
+        prefix: Aggregat der Historie VOR dem Frame (get_coin_history_prefix) -
+                ATH, erster Timestamp und letzter ATH-Breakout werden daraus fortgesetzt
     """
     if 'price_high' not in df.columns or 'price_close' not in df.columns:
         logger.warning("⚠️ ATH-Features: price_high oder price_close fehlen - überspringe")
         return df
 
+    prefix_ath = prefix.get('ath') if prefix else None
+    start_ts = _prefix_timestamp(prefix['first_ts'], df.index) if prefix else df.index[0]
+    prefix_breakout_ts = None
+    if prefix and prefix_ath is not None and prefix.get('ath_ts') is not None:
+        ath_ts = _prefix_timestamp(prefix['ath_ts'], df.index)
+        if ath_ts > start_ts:
+            # Erstes Erreichen des Prefix-ATH nach dem ersten Eintrag = letzter Breakout im Prefix
+            prefix_breakout_ts = ath_ts
+
     # Rolling ATH: Historisches Maximum bis zu jedem Zeitpunkt
     df['rolling_ath'] = df['price_high'].cummax()
+    if prefix_ath is not None:
+        df['rolling_ath'] = df['rolling_ath'].clip(lower=prefix_ath)
 
     # ATH-Distance: Wie weit entfernt vom historischen ATH?
     df['ath_distance_pct'] = ((df['rolling_ath'] - df['price_close']) / df['rolling_ath']) * 100
 
     # ATH-Breakout: Neue ATH-Breaks
     df['prev_rolling_ath'] = df['rolling_ath'].shift(1)
+    if prefix_ath is not None:
+        df.iloc[0, df.columns.get_loc('prev_rolling_ath')] = prefix_ath
     df['ath_breakout'] = (df['price_high'] > df['prev_rolling_ath']).astype(int)
 
     # Zeit seit letztem ATH
     # Für Prediction: Vereinfacht - verwende Index als Proxy für Zeit
     ath_timestamps = df.index[df['ath_breakout'] == 1]
-    if len(ath_timestamps) > 0:
+    first_ath_idx = prefix_breakout_ts if prefix_breakout_ts is not None else (
+        ath_timestamps[0] if len(ath_timestamps) > 0 else None
+    )
+    if first_ath_idx is not None:
         # Letzter ATH-Timestamp
-        last_ath_idx = ath_timestamps[-1]
+        last_ath_idx = ath_timestamps[-1] if len(ath_timestamps) > 0 else prefix_breakout_ts
         df['minutes_since_ath'] = (df.index - last_ath_idx).total_seconds() / 60
         # Für Daten vor dem ersten ATH
-        mask_before_first = df.index < ath_timestamps[0]
-        df.loc[mask_before_first, 'minutes_since_ath'] = (df.loc[mask_before_first].index - df.index[0]).total_seconds() / 60
+        mask_before_first = df.index < first_ath_idx
+        df.loc[mask_before_first, 'minutes_since_ath'] = (df.loc[mask_before_first].index - start_ts).total_seconds() / 60
     else:
         # Kein ATH gefunden - verwende Zeit seit Anfang
-        df['minutes_since_ath'] = (df.index - df.index[0]).total_seconds() / 60
+        df['minutes_since_ath'] = (df.index - start_ts).total_seconds() / 60
 
     # ATH-Zeit-Features
     df['ath_age_hours'] = df['minutes_since_ath'] / 60.0
@@ -270,10 +731,19 @@ def add_ath_features(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+# Basis-Spalten aus coin_metrics, die create_pump_detection_features (und die Fallbacks) lesen
+ENGINEERING_BASE_COLUMNS = (
+    'price_high', 'price_close', 'market_cap_close', 'volume_sol',
+    'buy_volume_sol', 'sell_volume_sol', 'num_buys', 'num_sells',
+    'dev_sold_amount', 'buy_pressure_ratio', 'whale_buy_volume_sol', 'whale_sell_volume_sol',
+    'volatility_pct', 'unique_signer_ratio', 'net_volume_sol',
+)
+
 def create_pump_detection_features(
     data: pd.DataFrame,
     window_sizes: list = [5, 10, 15],
-    include_flags: bool = False
+    include_flags: bool = False,
+    prefix: Optional[Dict[str, Any]] = None
 ) -> pd.DataFrame:
     """
     Erstellt zusätzliche Features für Pump-Detection.
@@ -282,6 +752,8 @@ def create_pump_detection_features(
     Args:
         include_flags: Wenn True, werden _has_data Flag-Features erzeugt
                        (zeigen an ob genug Daten fuer ein Window vorhanden sind)
+        prefix: Aggregat der Historie VOR dem Frame (Window-begrenzter Modus) - setzt
+                rolling_ath, dev_sold_cumsum und coin_age_minutes über die gesamte Historie fort
     """
     df = data.copy()
 
@@ -291,7 +763,8 @@ def create_pump_detection_features(
     # Coin-Age berechnen (wird fuer Flag-Features benoetigt)
     if include_flags:
         if hasattr(df.index, 'dtype') and pd.api.types.is_datetime64_any_dtype(df.index):
-            time_diff = (df.index - df.index[0]).total_seconds() / 60
+            start_ts = _prefix_timestamp(prefix['first_ts'], df.index) if prefix else df.index[0]
+            time_diff = (df.index - start_ts).total_seconds() / 60
             df['coin_age_minutes'] = time_diff
         else:
             df['coin_age_minutes'] = range(len(df))
@@ -299,12 +772,14 @@ def create_pump_detection_features(
 
     # Zuerst ATH-Features hinzufügen (falls nicht schon vorhanden)
     if 'rolling_ath' not in df.columns:
-        df = add_ath_features(df)
+        df = add_ath_features(df, prefix=prefix)
 
     # Dev-Tracking Features (KRITISCH!)
     if 'dev_sold_amount' in df.columns:
         df['dev_sold_flag'] = (df['dev_sold_amount'].fillna(0) > 0).astype(int)
         df['dev_sold_cumsum'] = df['dev_sold_amount'].fillna(0).cumsum()
+        if prefix:
+            df['dev_sold_cumsum'] += prefix.get('dev_sold_sum', 0.0)
         for window in window_sizes:
             df[f'dev_sold_spike_{window}'] = (
                 df['dev_sold_amount'].fillna(0) > df['dev_sold_amount'].fillna(0).rolling(window, min_periods=1).mean() * 2
@@ -0,0 +1,614 @@
+"""
+In-Process Hot-Store für coin_metrics
+
+Hält pro aktivem Coin die letzten HOT_STORE_ROWS Zeilen als NumPy-Ring-Buffer,
+damit Feature-Historie, Metriken-Snapshot (get_coin_metrics_at_timestamp) und
+ATH-Tracking nicht für gerade gesehene Zeilen zurück zu Postgres gehen.
+
+- Befüllung: der Event-Handler synchronisiert die Coins jedes Batches
+  (Delta-Query für bekannte Coins, Bootstrap für neue - je EIN Query)
+- Der Delta-Query liest die letzten LATE_ENTRY_WINDOW_SECONDS erneut, damit spät
+  committete Zeilen (Timestamp älter als der Buffer-Stand) nicht fehlen; bereits
+  vorhandene Timestamps werden übersprungen
+- Ältere Zeilen (verdrängt oder nie geladen) werden pro Phase aggregiert
+  (erster Timestamp, ATH, ATH-Zeitpunkt, dev_sold-Summe), damit Full-History-Werte
+  exakt wie im Aggregat-Query aus der DB bleiben
+- Verdrängung: Coins ohne neue Zeilen nach HOT_STORE_TTL_SECONDS, danach LRU
+  bis HOT_STORE_MAX_MB eingehalten ist
+
+Jeder Lesezugriff liefert entweder ein Ergebnis, das dem DB-Pfad entspricht,
+oder einen Miss - dann fragt der Aufrufer wie bisher die DB.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
+import asyncpg
+import numpy as np
+import pandas as pd
+from app.database.connection import get_pool
+from app.utils.config import (
+    HOT_STORE_ENABLED, HOT_STORE_ROWS, HOT_STORE_TTL_SECONDS,
+    HOT_STORE_MAX_MB, HOT_STORE_MAX_STALENESS_SECONDS, LATE_ENTRY_WINDOW_SECONDS
+)
+from app.utils.logging_config import get_logger
+from app.utils.metrics import ml_hot_store_hit_ratio, ml_hot_store_bytes, ml_hot_store_coins
+
+logger = get_logger(__name__)
+
+# Rückgabewert für "nicht im Hot-Store" (None ist ein gültiges DB-Ergebnis)
+MISS = object()
+
+_PHASE_COLUMN = 'phase_id_at_time'
+_PRICE_HIGH_COLUMN = 'price_high'
+_DEV_SOLD_COLUMN = 'dev_sold_amount'
+
+# Spalten für den Metriken-Snapshot (wie get_coin_metrics_at_timestamp)
+_SNAPSHOT_FLOAT_COLUMNS = (
+    'price_open', 'price_high', 'price_low', 'price_close',
+    'market_cap_close', 'volume_sol', 'buy_volume_sol', 'sell_volume_sol',
+)
+_SNAPSHOT_INT_COLUMNS = ('num_buys', 'num_sells', 'unique_wallets')
+
+
+def _is_numeric(value: Any) -> bool:
+    return value is None or isinstance(value, (int, float, Decimal, bool))
+
+
+def _to_ns(value: datetime) -> int:
+    """Timestamp (mit oder ohne Zeitzone, naiv = UTC) -> Nanosekunden seit Epoch"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return pd.Timestamp(value).value
+
+
+def _from_ns(value: int) -> datetime:
+    return pd.Timestamp(int(value), tz='UTC').to_pydatetime()
+
+
+class _PhaseAggregate:
+    """Aggregat der Zeilen einer Phase, die nicht (mehr) im Ring-Buffer liegen"""
+
+    __slots__ = ('first_ts', 'ath', 'ath_ts', 'dev_sold_sum', 'count')
+
+    def __init__(self, first_ts: int, ath: float, ath_ts: Optional[int], dev_sold_sum: float, count: int):
+        self.first_ts = first_ts
+        self.ath = ath
+        self.ath_ts = ath_ts
+        self.dev_sold_sum = dev_sold_sum
+        self.count = count
+
+    def merge(self, other: '_PhaseAggregate'):
+        self.first_ts = min(self.first_ts, other.first_ts)
+        if not np.isnan(other.ath) and (np.isnan(self.ath) or other.ath > self.ath):
+            self.ath, self.ath_ts = other.ath, other.ath_ts
+        elif not np.isnan(other.ath) and other.ath == self.ath and other.ath_ts is not None:
+            self.ath_ts = other.ath_ts if self.ath_ts is None else min(self.ath_ts, other.ath_ts)
+        self.dev_sold_sum += other.dev_sold_sum
+        self.count += other.count
+
+
+def _aggregate_rows(ts: np.ndarray, price_high: Optional[np.ndarray], dev_sold: Optional[np.ndarray]) -> Optional[_PhaseAggregate]:
+    """Aggregat über Zeilen mit derselben Semantik wie get_coin_history_prefix"""
+    if len(ts) == 0:
+        return None
+    ath, ath_ts = np.nan, None
+    if price_high is not None and not np.all(np.isnan(price_high)):
+        ath = float(np.nanmax(price_high))
+        ath_ts = int(ts[price_high == ath].min())
+    dev_sold_sum = float(np.nansum(dev_sold)) if dev_sold is not None else 0.0
+    return _PhaseAggregate(int(ts.min()), ath, ath_ts, dev_sold_sum, len(ts))
+
+
+class CoinRingBuffer:
+    """Letzte `capacity` Zeilen eines Coins (alle numerischen Spalten, float64)"""
+
+    __slots__ = ('data', 'ts', 'start', 'size', 'outside', 'synced_at', 'last_seen')
+
+    def __init__(self, capacity: int, n_columns: int):
+        self.data = np.full((capacity, n_columns), np.nan, dtype=np.float64)
+        self.ts = np.zeros(capacity, dtype=np.int64)
+        self.start = 0
+        self.size = 0
+        # Phase (None = ohne Phase) -> Aggregat der Zeilen vor dem Ring-Buffer
+        self.outside: Dict[Optional[int], _PhaseAggregate] = {}
+        self.synced_at = 0.0
+        self.last_seen = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.ts)
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + self.ts.nbytes
+
+    def order(self) -> np.ndarray:
+        """Positionen der Zeilen in chronologischer Reihenfolge"""
+        return (self.start + np.arange(self.size)) % self.capacity
+
+    @property
+    def newest_ts(self) -> Optional[int]:
+        if self.size == 0:
+            return None
+        return int(self.ts[(self.start + self.size - 1) % self.capacity])
+
+    @property
+    def oldest_ts(self) -> Optional[int]:
+        if self.size == 0:
+            return None
+        return int(self.ts[self.start])
+
+    def append(self, ts: np.ndarray, rows: np.ndarray, fold):
+        """
+        Hängt chronologisch sortierte Zeilen an.
+
+        Zeilen, die aus dem Buffer fallen, werden vorher über `fold(ts, rows)` aggregiert.
+        """
+        overflow = max(0, self.size + len(ts) - self.capacity)
+        if overflow:
+            n_old = min(overflow, self.size)
+            if n_old:
+                positions = self.order()[:n_old]
+                fold(self.ts[positions], self.data[positions])
+                self.start = (self.start + n_old) % self.capacity
+                self.size -= n_old
+            n_new = overflow - n_old
+            if n_new:
+                fold(ts[:n_new], rows[:n_new])
+                ts, rows = ts[n_new:], rows[n_new:]
+        positions = (self.start + self.size + np.arange(len(ts))) % self.capacity
+        self.ts[positions] = ts
+        self.data[positions] = rows
+        self.size += len(ts)
+
+
+class HotStore:
+    """
+    Prozessweiter Hot-Store (LRU über Coins, Speicherbudget in Bytes).
+
+    Spalten-Layout wird beim ersten Laden aus coin_metrics übernommen und gilt
+    für alle Coins (nur numerische Spalten, Text-Spalten führen zu einem Miss).
+    """
+
+    def __init__(
+        self,
+        enabled: bool = HOT_STORE_ENABLED,
+        capacity: int = HOT_STORE_ROWS,
+        ttl_seconds: float = HOT_STORE_TTL_SECONDS,
+        max_bytes: int = HOT_STORE_MAX_MB * 1024 * 1024,
+        max_staleness_seconds: float = HOT_STORE_MAX_STALENESS_SECONDS
+    ):
+        self.enabled = enabled
+        self.capacity = max(1, capacity)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_staleness_seconds = max_staleness_seconds
+        self.buffers: "OrderedDict[str, CoinRingBuffer]" = OrderedDict()
+        self.schema: Optional[List[str]] = None  # alle Spalten außer timestamp (Tabellenreihenfolge)
+        self.columns: List[str] = []  # numerische Spalten (Buffer-Layout)
+        self.column_index: Dict[str, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = asyncio.Lock()
+
+    # ------------------------------------------------------------
+    # Befüllung
+    # ------------------------------------------------------------
+
+    async def ingest(self, coin_ids: List[str], pool: Optional[asyncpg.Pool] = None):
+        """
+        Synchronisiert die Coins eines Batches mit coin_metrics.
+
+        Bekannte Coins laden nur Zeilen ab ihrem letzten Stand minus LATE_ENTRY_WINDOW_SECONDS
+        (ein Query für alle), neue Coins ihre letzten `capacity` Zeilen plus Phasen-Aggregat
+        der älteren Zeilen.
+        """
+        if not self.enabled or not coin_ids:
+            return
+        if pool is None:
+            pool = await get_pool()
+
+        async with self._lock:
+            coin_ids = list(dict.fromkeys(coin_ids))
+            known = [c for c in coin_ids if c in self.buffers and self.buffers[c].size]
+            new = [c for c in coin_ids if c not in known]
+            now = time.monotonic()
+            late_window = timedelta(seconds=LATE_ENTRY_WINDOW_SECONDS)
+
+            if known:
+                try:
+                    rows = await pool.fetch("""
+                        SELECT c.*
+                        FROM unnest($1::text[], $2::timestamptz[]) AS m(mint, since)
+                        JOIN coin_metrics c ON c.mint = m.mint AND c.timestamp > m.since
+                        ORDER BY c.mint, c.timestamp
+                    """, known, [_from_ns(self.buffers[c].newest_ts) - late_window for c in known])
+                    self._sync_rows(rows)
+                    for coin_id in known:
+                        buffer = self.buffers.get(coin_id)
+                        if buffer is None:
+                            new.append(coin_id)  # verworfen (siehe _sync_rows) -> neu laden
+                            continue
+                        buffer.synced_at = now
+                        buffer.last_seen = now
+                        self.buffers.move_to_end(coin_id)
+                except Exception as e:
+                    logger.warning(f"⚠️ Hot-Store Delta-Sync für {len(known)} Coins fehlgeschlagen: {e}")
+
+            if new:
+                try:
+                    await self._bootstrap(new, pool, now)
+                except Exception as e:
+                    logger.warning(f"⚠️ Hot-Store Bootstrap für {len(new)} Coins fehlgeschlagen: {e}")
+                    for coin_id in new:
+                        self._drop(coin_id)
+
+            self._evict(now)
+
+    async def _bootstrap(self, coin_ids: List[str], pool: asyncpg.Pool, now: float):
+        rows = await pool.fetch("""
+            SELECT c.*
+            FROM unnest($1::text[]) AS m(mint)
+            CROSS JOIN LATERAL (
+                SELECT * FROM coin_metrics c
+                WHERE c.mint = m.mint
+                ORDER BY c.timestamp DESC
+                LIMIT $2
+            ) c
+        """, coin_ids, self.capacity)
+        if rows and self.schema is None:
+            self._init_layout(rows)
+
+        for coin_id in coin_ids:
+            self._drop(coin_id)
+            if self.schema is not None:
+                buffer = CoinRingBuffer(self.capacity, len(self.columns))
+                buffer.synced_at = now
+                buffer.last_seen = now
+                self.buffers[coin_id] = buffer
+                self.bytes += buffer.nbytes
+        # Zeilen kommen absteigend pro Coin - für den Buffer aufsteigend sortieren
+        self._append_rows(sorted(rows, key=lambda r: (r['mint'], r['timestamp'])))
+
+        # Ältere Zeilen existieren nur, wenn das Limit erreicht wurde
+        befores = {
+            coin_id: self.buffers[coin_id].oldest_ts
+            for coin_id in coin_ids
+            if coin_id in self.buffers and self.buffers[coin_id].size >= self.capacity
+        }
+        if befores:
+            await self._load_outside(befores, pool)
+
+    async def _load_outside(self, befores: Dict[str, int], pool: asyncpg.Pool):
+        """Phasen-Aggregate der Zeilen vor dem Ring-Buffer (ein Query für alle Coins)"""
+        mints = list(befores.keys())
+        rows = await pool.fetch("""
+            WITH bounds AS (
+                SELECT * FROM unnest($1::text[], $2::timestamptz[]) AS b(mint, before_ts)
+            ), prefix AS (
+                SELECT c.mint, c.phase_id_at_time AS phase_id, c.timestamp, c.price_high, c.dev_sold_amount
+                FROM bounds b
+                JOIN coin_metrics c ON c.mint = b.mint AND c.timestamp < b.before_ts
+            ), agg AS (
+                SELECT
+                    mint,
+                    phase_id,
+                    MIN(timestamp) AS first_ts,
+                    MAX(price_high) AS ath,
+                    SUM(COALESCE(dev_sold_amount, 0)) AS dev_sold_sum,
+                    COUNT(*) AS row_count
+                FROM prefix
+                GROUP BY mint, phase_id
+            )
+            SELECT
+                agg.*,
+                (SELECT MIN(p.timestamp) FROM prefix p
+                 WHERE p.mint = agg.mint AND p.phase_id IS NOT DISTINCT FROM agg.phase_id AND p.price_high = agg.ath) AS ath_ts
+            FROM agg
+        """, mints, [_from_ns(befores[m]) for m in mints])
+        for row in rows:
+            buffer = self.buffers.get(row['mint'])
+            if buffer is None:
+                continue
+            phase = int(row['phase_id']) if row['phase_id'] is not None else None
+            aggregate = _PhaseAggregate(
+                _to_ns(row['first_ts']),
+                float(row['ath']) if row['ath'] is not None else np.nan,
+                _to_ns(row['ath_ts']) if row['ath_ts'] is not None else None,
+                float(row['dev_sold_sum'] or 0.0),
+                int(row['row_count'])
+            )
+            self._merge_outside(buffer, phase, aggregate)
+
+    def _init_layout(self, rows: List[asyncpg.Record]):
+        keys = [k for k in rows[0].keys() if k != 'timestamp']
+        self.schema = keys
+        self.columns = [k for k in keys if all(_is_numeric(row[k]) for row in rows)]
+        self.column_index = {c: i for i, c in enumerate(self.columns)}
+        logger.info(f"✅ Hot-Store Layout: {len(self.columns)} numerische Spalten, {self.capacity} Zeilen pro Coin")
+
+    def _group_rows(self, rows: List[asyncpg.Record]) -> Iterator[Tuple[str, CoinRingBuffer, np.ndarray, np.ndarray]]:
+        """Aufsteigend sortierte Zeilen (gruppiert nach mint) -> (mint, Buffer, Timestamps, Daten) pro Coin"""
+        if not rows or self.schema is None:
+            return
+        n_columns = len(self.columns)
+        group_start = 0
+        for i in range(1, len(rows) + 1):
+            if i < len(rows) and rows[i]['mint'] == rows[group_start]['mint']:
+                continue
+            coin_id = rows[group_start]['mint']
+            buffer = self.buffers.get(coin_id)
+            if buffer is not None:
+                chunk = rows[group_start:i]
+                ts = np.fromiter((_to_ns(r['timestamp']) for r in chunk), dtype=np.int64, count=len(chunk))
+                data = np.full((len(chunk), n_columns), np.nan, dtype=np.float64)
+                for j, row in enumerate(chunk):
+                    for k, column in enumerate(self.columns):
+                        value = row.get(column)
+                        if value is not None:
+                            try:
+                                data[j, k] = float(value)
+                            except (TypeError, ValueError):
+                                pass
+                yield coin_id, buffer, ts, data
+            group_start = i
+
+    def _append_rows(self, rows: List[asyncpg.Record]):
+        """Hängt aufsteigend sortierte Zeilen (gruppiert nach mint) an die Buffer an"""
+        for _, buffer, ts, data in self._group_rows(rows):
+            buffer.append(ts, data, lambda t, d, b=buffer: self._fold(b, t, d))
+
+    def _sync_rows(self, rows: List[asyncpg.Record]):
+        """
+        Übernimmt die Zeilen des Delta-Querys (inkl. Overlap vor dem letzten Stand).
+
+        Bereits vorhandene Timestamps werden übersprungen, spät committete Zeilen
+        chronologisch einsortiert. Liegt eine späte Zeile vor dem Buffer, obwohl ältere
+        Zeilen schon aggregiert sind, ist nicht entscheidbar, ob sie mitgezählt wurde -
+        dann wird der Coin verworfen (nächster Zugriff = Miss, ingest lädt ihn neu).
+        """
+        for coin_id, buffer, ts, data in self._group_rows(rows):
+            order = buffer.order()
+            unseen = ~np.isin(ts, buffer.ts[order])
+            ts, data = ts[unseen], data[unseen]
+            if len(ts) == 0:
+                continue
+            fold = lambda t, d, b=buffer: self._fold(b, t, d)
+            if buffer.size == 0 or ts.min() > buffer.newest_ts:
+                buffer.append(ts, data, fold)
+                continue
+
+            if ts.min() < buffer.oldest_ts and any(a.count for a in buffer.outside.values()):
+                logger.debug(f"Hot-Store: späte Zeile vor dem Buffer für {coin_id[:8]}... - neu laden")
+                self._drop(coin_id)
+                continue
+            merged_ts = np.concatenate([buffer.ts[order], ts])
+            merged = np.concatenate([buffer.data[order], data])
+            chronological = np.argsort(merged_ts, kind='stable')
+            buffer.start = 0
+            buffer.size = 0
+            buffer.append(merged_ts[chronological], merged[chronological], fold)
+
+    def _fold(self, buffer: CoinRingBuffer, ts: np.ndarray, data: np.ndarray):
+        """Aggregiert aus dem Buffer fallende Zeilen pro Phase"""
+        phases = data[:, self.column_index[_PHASE_COLUMN]] if _PHASE_COLUMN in self.column_index else np.full(len(ts), np.nan)
+        price_high = self.column_index.get(_PRICE_HIGH_COLUMN)
+        dev_sold = self.column_index.get(_DEV_SOLD_COLUMN)
+        for phase in np.unique(phases[~np.isnan(phases)]).tolist() + ([None] if np.isnan(phases).any() else []):
+            mask = np.isnan(phases) if phase is None else phases == phase
+            aggregate = _aggregate_rows(
+                ts[mask],
+                data[mask, price_high] if price_high is not None else None,
+                data[mask, dev_sold] if dev_sold is not None else None
+            )
+            if aggregate is not None:
+                self._merge_outside(buffer, int(phase) if phase is not None else None, aggregate)
+
+    @staticmethod
+    def _merge_outside(buffer: CoinRingBuffer, phase: Optional[int], aggregate: _PhaseAggregate):
+        existing = buffer.outside.get(phase)
+        if existing is None:
+            buffer.outside[phase] = aggregate
+        else:
+            existing.merge(aggregate)
+
+    def _drop(self, coin_id: str):
+        buffer = self.buffers.pop(coin_id, None)
+        if buffer is not None:
+            self.bytes -= buffer.nbytes
+
+    def _evict(self, now: float):
+        """TTL für inaktive Coins, danach LRU bis zum Speicherbudget"""
+        expired = [c for c, b in self.buffers.items() if now - b.last_seen > self.ttl_seconds]
+        for coin_id in expired:
+            self._drop(coin_id)
+        while self.buffers and self.bytes > self.max_bytes:
+            coin_id = next(iter(self.buffers))
+            self._drop(coin_id)
+        ml_hot_store_bytes.set(self.bytes)
+        ml_hot_store_coins.set(len(self.buffers))
+
+    # ------------------------------------------------------------
+    # Lesezugriffe (Ergebnis wie DB-Pfad oder MISS)
+    # ------------------------------------------------------------
+
+    def _record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        ml_hot_store_hit_ratio.set(self.hits / (self.hits + self.misses))
+
+    def _fresh(self, buffer: CoinRingBuffer) -> bool:
+        return time.monotonic() - buffer.synced_at <= self.max_staleness_seconds
+
+    def _get(self, coin_id: str) -> Optional[CoinRingBuffer]:
+        if not self.enabled:
+            return None
+        buffer = self.buffers.get(coin_id)
+        if buffer is None or buffer.size == 0:
+            self._record(False)
+            return None
+        return buffer
+
+    def history(
+        self,
+        coin_id: str,
+        phases_key: Tuple[int, ...],
+        columns: FrozenSet[str],
+        rows: int
+    ) -> Any:
+        """
+        Letzte `rows` Zeilen wie get_coin_history_for_prediction(columns=...), ohne
+        Typ-Konvertierung (float64) - inkl. df.attrs['history_prefix'] falls ältere Zeilen existieren.
+        """
+        buffer = self._get(coin_id)
+        if buffer is None:
+            return MISS
+        if not self._fresh(buffer):
+            self._record(False)
+            return MISS
+
+        projected = [c for c in self.schema if c in columns]
+        if any(c not in self.column_index for c in projected):
+            self._record(False)  # Text-Spalte angefragt
+            return MISS
+
+        order = buffer.order()
+        if phases_key:
+            if _PHASE_COLUMN not in self.column_index:
+                self._record(False)
+                return MISS
+            order = order[np.isin(buffer.data[order, self.column_index[_PHASE_COLUMN]], phases_key)]
+        outside = [a for p, a in buffer.outside.items() if not phases_key or p in phases_key]
+
+        prefix = None
+        if len(order) >= rows:
+            window, older = order[len(order) - rows:], order[:len(order) - rows]
+            prefix = self._prefix(buffer, older, outside)
+        elif any(a.count for a in outside):
+            self._record(False)  # DB hätte ältere Zeilen geliefert
+            return MISS
+        else:
+            window = order
+
+        self._record(True)
+        if len(window) == 0:
+            return pd.DataFrame()
+        index = pd.to_datetime(buffer.ts[window], utc=True)
+        index.name = 'timestamp'
+        frame = pd.DataFrame(
+            buffer.data[np.ix_(window, [self.column_index[c] for c in projected])],
+            index=index,
+            columns=projected
+        )
+        if prefix is not None:
+            frame.attrs['history_prefix'] = prefix
+        return frame
+
+    def _prefix(self, buffer: CoinRingBuffer, older: np.ndarray, outside: List[_PhaseAggregate]) -> Optional[Dict[str, Any]]:
+        """Full-History-Aggregat vor dem Fenster (Format wie get_coin_history_prefix)"""
+        price_high = self.column_index.get(_PRICE_HIGH_COLUMN)
+        dev_sold = self.column_index.get(_DEV_SOLD_COLUMN)
+        total = _aggregate_rows(
+            buffer.ts[older],
+            buffer.data[older, price_high] if price_high is not None else None,
+            buffer.data[older, dev_sold] if dev_sold is not None else None
+        )
+        for aggregate in outside:
+            if total is None:
+                total = _PhaseAggregate(aggregate.first_ts, aggregate.ath, aggregate.ath_ts, aggregate.dev_sold_sum, aggregate.count)
+            else:
+                total.merge(aggregate)
+        if total is None or total.count == 0:
+            return None
+        return {
+            'first_ts': _from_ns(total.first_ts),
+            'ath': None if np.isnan(total.ath) else total.ath,
+            'ath_ts': _from_ns(total.ath_ts) if total.ath_ts is not None else None,
+            'dev_sold_sum': total.dev_sold_sum,
+            'row_count': total.count,
+        }
+
+    def _covers(self, buffer: CoinRingBuffer, start_ns: int, end_ns: int) -> bool:
+        """Liegen alle DB-Zeilen im Bereich [start, end] sicher im Buffer?"""
+        if start_ns < buffer.oldest_ts and any(a.count for a in buffer.outside.values()):
+            return False
+        return end_ns <= buffer.newest_ts or self._fresh(buffer)
+
+    def metrics_at(self, coin_id: str, timestamp: datetime) -> Any:
+        """Metriken-Snapshot wie get_coin_metrics_at_timestamp (letzte Zeile <= timestamp)"""
+        buffer = self._get(coin_id)
+        if buffer is None:
+            return MISS
+        ts_ns = _to_ns(timestamp)
+        needed = _SNAPSHOT_FLOAT_COLUMNS + _SNAPSHOT_INT_COLUMNS + (_PHASE_COLUMN,)
+        if any(c not in self.column_index for c in needed) or not self._covers(buffer, ts_ns, ts_ns):
+            self._record(False)
+            return MISS
+
+        order = buffer.order()
+        position = int(np.searchsorted(buffer.ts[order], ts_ns, side='right')) - 1
+        self._record(True)
+        if position < 0:
+            return None
+        row = buffer.data[order[position]]
+
+        def value(column: str) -> Optional[float]:
+            v = float(row[self.column_index[column]])
+            return v if v and not np.isnan(v) else None  # gleiche Semantik wie "if row[x] else None"
+
+        metrics = {c: value(c) for c in _SNAPSHOT_FLOAT_COLUMNS}
+        metrics.update({c: (int(value(c)) if value(c) is not None else None) for c in _SNAPSHOT_INT_COLUMNS})
+        metrics['market_cap_open'] = None  # Existiert nicht in coin_metrics
+        metrics['volume_usd'] = None  # Existiert nicht in coin_metrics (nur volume_sol)
+        phase = value(_PHASE_COLUMN)
+        metrics['phase_id'] = int(phase) if phase is not None else None
+        return metrics
+
+    def price_history(self, coin_id: str, start: datetime, end: datetime) -> Any:
+        """Alle (timestamp, price_close) mit start <= timestamp <= end, aufsteigend"""
+        buffer = self._get(coin_id)
+        if buffer is None:
+            return MISS
+        start_ns, end_ns = _to_ns(start), _to_ns(end)
+        if 'price_close' not in self.column_index or not self._covers(buffer, start_ns, end_ns):
+            self._record(False)
+            return MISS
+
+        order = buffer.order()
+        ts = buffer.ts[order]
+        selected = order[(ts >= start_ns) & (ts <= end_ns)]
+        prices = buffer.data[selected, self.column_index['price_close']]
+        self._record(True)
+        return [
+            {'timestamp': _from_ns(t), 'price_close': None if np.isnan(p) else float(p)}
+            for t, p in zip(buffer.ts[selected], prices)
+        ]
+
+    def clear(self):
+        self.buffers.clear()
+        self.bytes = 0
+        ml_hot_store_bytes.set(0)
+        ml_hot_store_coins.set(0)
+
+
+# Globale Instanz (pro Prozess)
+_hot_store: Optional[HotStore] = None
+
+
+def get_hot_store() -> HotStore:
+    """Gibt den prozessweiten HotStore zurück"""
+    global _hot_store
+    if _hot_store is None:
+        _hot_store = HotStore()
+        if _hot_store.enabled:
+            logger.info(
+                f"✅ Hot-Store aktiv: {_hot_store.capacity} Zeilen/Coin, TTL={_hot_store.ttl_seconds}s, "
+                f"Budget={_hot_store.max_bytes // (1024 * 1024)} MB"
+            )
+    return _hot_store
@@ -0,0 +1,187 @@
+"""
+In-Memory Ignore-Cache für Pump Server
+
+Spiegelt die aktiven Cooldowns aus coin_scan_cache (ignore_until pro Coin × Modell)
+im Event-Handler-Prozess. Der Hot-Path (check_coin_ignore_status) liest nur noch
+aus dem Speicher, update_coin_scan_cache merkt die Zeile vor - geschrieben wird
+periodisch als ein Batch-UPSERT (Write-Behind).
+
+- Beim Start werden alle noch laufenden Cooldowns geladen
+- Abgelaufene Einträge werden beim Flush entfernt
+- Änderungen anderer Prozesse (z.B. manueller Predict über die API) werden
+  periodisch nachgeladen
+- Prozesse ohne geladenen Cache (API) lesen/schreiben wie bisher direkt in der DB
+
+Bei einem Absturz gehen höchstens die Cooldowns des letzten Flush-Intervalls verloren.
+"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Optional, Tuple
+import asyncpg
+from app.utils.config import IGNORE_CACHE_FLUSH_SECONDS, IGNORE_CACHE_RELOAD_SECONDS
+from app.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_UPSERT_SQL = """
+    INSERT INTO coin_scan_cache (
+        coin_id, active_model_id, last_scan_at, last_prediction,
+        last_probability, was_alert, ignore_until, ignore_reason, updated_at
+    )
+    SELECT coin_id, active_model_id, last_scan_at, last_prediction,
+           last_probability, was_alert, ignore_until, ignore_reason, last_scan_at
+    FROM unnest($1::text[], $2::bigint[], $3::timestamptz[], $4::int[],
+                $5::float8[], $6::bool[], $7::timestamptz[], $8::text[])
+        AS t(coin_id, active_model_id, last_scan_at, last_prediction,
+             last_probability, was_alert, ignore_until, ignore_reason)
+    ON CONFLICT (coin_id, active_model_id)
+    DO UPDATE SET
+        last_scan_at = EXCLUDED.last_scan_at,
+        last_prediction = EXCLUDED.last_prediction,
+        last_probability = EXCLUDED.last_probability,
+        was_alert = EXCLUDED.was_alert,
+        ignore_until = EXCLUDED.ignore_until,
+        ignore_reason = EXCLUDED.ignore_reason,
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+class CoinIgnoreCache:
+    """Cooldowns pro (coin_id, active_model_id) mit Write-Behind nach coin_scan_cache"""
+
+    def __init__(self):
+        self.loaded = False
+        # (coin_id, active_model_id) -> (ignore_until, ignore_reason) - nur laufende Cooldowns
+        self.entries: Dict[Tuple[str, int], Tuple[datetime, str]] = {}
+        # (coin_id, active_model_id) -> komplette coin_scan_cache-Zeile (letzte gewinnt)
+        self.pending: Dict[Tuple[str, int], Tuple] = {}
+        self.last_reload: Optional[datetime] = None
+        self._flush_lock = asyncio.Lock()
+
+    async def load(self, pool: asyncpg.Pool):
+        """Lädt alle noch laufenden Cooldowns aus coin_scan_cache"""
+        now = datetime.now(timezone.utc)
+        rows = await pool.fetch("""
+            SELECT coin_id, active_model_id, ignore_until, ignore_reason
+            FROM coin_scan_cache
+            WHERE ignore_until > $1
+        """, now)
+        self.entries = {
+            (row['coin_id'], row['active_model_id']): (row['ignore_until'], row['ignore_reason'] or "ignored")
+            for row in rows
+        }
+        self.last_reload = now
+        self.loaded = True
+        logger.info(f"🚫 Ignore-Cache geladen: {len(self.entries)} aktive Cooldowns")
+
+    def check(self, coin_id: str, active_model_id: int) -> Dict[str, Any]:
+        """Gleiches Ergebnis wie check_coin_ignore_status - ohne DB-Roundtrip"""
+        key = (coin_id, active_model_id)
+        entry = self.entries.get(key)
+        if entry is None:
+            return {"should_ignore": False}
+        ignore_until, ignore_reason = entry
+        now = datetime.now(timezone.utc)
+        if now >= ignore_until:
+            del self.entries[key]
+            return {"should_ignore": False}
+        return {
+            "should_ignore": True,
+            "ignore_until": ignore_until,
+            "ignore_reason": ignore_reason,
+            "remaining_seconds": (ignore_until - now).total_seconds()
+        }
+
+    def record(
+        self,
+        coin_id: str,
+        active_model_id: int,
+        last_scan_at: datetime,
+        prediction: int,
+        probability: float,
+        was_alert: bool,
+        ignore_until: Optional[datetime],
+        ignore_reason: Optional[str]
+    ):
+        """Übernimmt das Ergebnis einer Vorhersage sofort und merkt die DB-Zeile vor"""
+        key = (coin_id, active_model_id)
+        if ignore_until is not None:
+            self.entries[key] = (ignore_until, ignore_reason)
+        else:
+            self.entries.pop(key, None)
+        self.pending[key] = (
+            coin_id, active_model_id, last_scan_at, int(prediction),
+            float(probability), bool(was_alert), ignore_until, ignore_reason
+        )
+
+    def sweep(self) -> int:
+        """Entfernt abgelaufene Cooldowns"""
+        now = datetime.now(timezone.utc)
+        expired = [key for key, (ignore_until, _) in self.entries.items() if ignore_until <= now]
+        for key in expired:
+            del self.entries[key]
+        return len(expired)
+
+    async def flush(self, pool: asyncpg.Pool) -> int:
+        """Schreibt alle vorgemerkten Zeilen als einen UPSERT"""
+        async with self._flush_lock:
+            if not self.pending:
+                return 0
+            batch = self.pending
+            self.pending = {}
+            try:
+                columns = list(zip(*batch.values()))
+                await pool.execute(_UPSERT_SQL, *[list(column) for column in columns])
+                return len(batch)
+            except Exception as e:
+                # Zurücklegen - neuere Zeilen derselben Keys haben Vorrang
+                for key, row in batch.items():
+                    self.pending.setdefault(key, row)
+                logger.error(f"❌ Fehler beim Schreiben des Ignore-Cache ({len(batch)} Zeilen): {e}")
+                return 0
+
+    async def reload_external(self, pool: asyncpg.Pool):
+        """Übernimmt Cooldowns, die andere Prozesse seit dem letzten Nachladen geschrieben haben"""
+        since = self.last_reload - timedelta(seconds=IGNORE_CACHE_FLUSH_SECONDS) if self.last_reload else None
+        now = datetime.now(timezone.utc)
+        rows = await pool.fetch("""
+            SELECT coin_id, active_model_id, ignore_until, ignore_reason
+            FROM coin_scan_cache
+            WHERE ignore_until > $1
+              AND ($2::timestamptz IS NULL OR updated_at > $2)
+        """, now, since)
+        for row in rows:
+            key = (row['coin_id'], row['active_model_id'])
+            if key in self.pending:
+                continue  # eigener, noch nicht geschriebener Stand ist neuer
+            current = self.entries.get(key)
+            if current is None or current[0] < row['ignore_until']:
+                self.entries[key] = (row['ignore_until'], row['ignore_reason'] or "ignored")
+        self.last_reload = now
+
+    async def run(self, pool: asyncpg.Pool, is_running):
+        """Write-Behind-Loop: Flush + Sweep, periodisch Nachladen"""
+        logger.info(f"🚫 Ignore-Cache Write-Behind gestartet (Intervall: {IGNORE_CACHE_FLUSH_SECONDS}s)")
+        while is_running():
+            try:
+                await asyncio.sleep(IGNORE_CACHE_FLUSH_SECONDS)
+                written = await self.flush(pool)
+                swept = self.sweep()
+                if written or swept:
+                    logger.debug(f"🚫 Ignore-Cache: {written} Zeilen geschrieben, {swept} abgelaufen, {len(self.entries)} aktiv")
+                if (datetime.now(timezone.utc) - self.last_reload).total_seconds() >= IGNORE_CACHE_RELOAD_SECONDS:
+                    await self.reload_external(pool)
+            except Exception as e:
+                logger.error(f"❌ Fehler im Ignore-Cache-Loop: {e}", exc_info=True)
+
+
+# Globale Instanz (pro Prozess)
+_ignore_cache: Optional[CoinIgnoreCache] = None
+
+
+def get_ignore_cache() -> CoinIgnoreCache:
+    """Gibt die prozessweite CoinIgnoreCache-Instanz zurück"""
+    global _ignore_cache
+    if _ignore_cache is None:
+        _ignore_cache = CoinIgnoreCache()
+    return _ignore_cache
@@ -0,0 +1,94 @@
+"""
+Ingestion-Puffer für Pump Server
+
+Zwischen Keyset-Reader (coin_metrics) und Verarbeitung: pro Mint wird nur der neueste
+Eintrag gehalten - ein Coin mit 20 neuen Zeilen während eines Batches wird einmal
+vorhergesagt, nicht 20 Mal. Die Kapazität (Anzahl Mints) ist begrenzt; ist der Puffer
+voll, wird explizit verworfen (Load Shedding):
+
+- drop_oldest: der am längsten wartende Mint fliegt raus
+- alerts_first: Mints mit offenen Alerts werden bevorzugt behalten und zuerst verarbeitet
+
+Die Position eines Mints bleibt beim Zusammenfassen erhalten - laufend aktualisierte
+Coins verhungern dadurch nicht am Ende der Warteschlange.
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from app.utils.logging_config import get_logger
+from app.utils.metrics import ml_ingest_queue_depth, ml_ingest_coalesced_total, ml_ingest_shed_total
+
+logger = get_logger(__name__)
+
+SHED_POLICIES = ('drop_oldest', 'alerts_first')
+
+
+class IngestBuffer:
+    """Neuester Eintrag pro Mint, begrenzte Kapazität mit Load Shedding"""
+
+    def __init__(
+        self,
+        capacity: int,
+        shed_policy: str = 'drop_oldest',
+        is_priority: Optional[Callable[[str], bool]] = None
+    ):
+        if shed_policy not in SHED_POLICIES:
+            logger.warning(f"⚠️ Unbekannte Shed-Policy '{shed_policy}' - verwende drop_oldest")
+            shed_policy = 'drop_oldest'
+        self.capacity = max(1, capacity)
+        self.shed_policy = shed_policy
+        self.is_priority = is_priority or (lambda mint: False)
+        # mint -> Eintrag (Reihenfolge = Zeitpunkt, seit dem der Mint wartet)
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def put(self, entry: Dict[str, Any]):
+        mint = entry['mint']
+        current = self.entries.get(mint)
+        if current is not None:
+            # Zusammenfassen: nur der neueste Eintrag zählt (verspätete ältere Einträge verwerfen)
+            if entry['timestamp'] >= current['timestamp']:
+                self.entries[mint] = entry
+            ml_ingest_coalesced_total.inc()
+        else:
+            if len(self.entries) >= self.capacity:
+                self._shed()
+            self.entries[mint] = entry
+        ml_ingest_queue_depth.set(len(self.entries))
+
+    def put_many(self, entries: List[Dict[str, Any]]):
+        for entry in entries:
+            self.put(entry)
+
+    def _shed(self):
+        victim = None
+        if self.shed_policy == 'alerts_first':
+            victim = next((mint for mint in self.entries if not self.is_priority(mint)), None)
+        if victim is None:
+            victim = next(iter(self.entries))
+        entry = self.entries.pop(victim)
+        ml_ingest_shed_total.labels(policy=self.shed_policy).inc()
+        logger.debug(f"🗑️ Ingestion-Puffer voll ({self.capacity}) - verwerfe Coin {victim[:8]}... ({entry['timestamp']})")
+
+    def take(self, limit: int) -> List[Dict[str, Any]]:
+        """Entnimmt bis zu limit Einträge (am längsten wartende zuerst, bei alerts_first Alerts vorneweg)"""
+        mints: List[str] = []
+        if self.shed_policy == 'alerts_first':
+            mints = [mint for mint in self.entries if self.is_priority(mint)][:limit]
+        selected = set(mints)
+        for mint in self.entries:
+            if len(mints) >= limit:
+                break
+            if mint not in selected:
+                mints.append(mint)
+        batch = [self.entries.pop(mint) for mint in mints]
+        ml_ingest_queue_depth.set(len(self.entries))
+        return batch
+
+    def oldest_timestamp(self) -> Optional[datetime]:
+        """Ältester noch ausstehender Zeitstempel (für den persistierten Verarbeitungsstand)"""
+        if not self.entries:
+            return None
+        return min(entry['timestamp'] for entry in self.entries.values())
@@ -0,0 +1,222 @@
+"""
+Leader-Election für Hintergrund-Jobs (Pump Server)
+
+Auswertungs-Loop, ATH-Tracking und Alert-Evaluator starten in jedem Prozess - mit mehreren
+Replikas würden sie dieselben Zeilen in model_predictions / alert_evaluations parallel
+scannen und aktualisieren. Pro Job arbeitet deshalb nur der Prozess, der den Lock des Jobs hält:
+
+- pg_try_advisory_lock(LOCK_NAMESPACE, hashtext(job)) auf einer eigenen Connection. Das ist ein
+  Session-Lock: stirbt der Prozess oder die Connection, gibt Postgres ihn sofort frei
+- Lease: der Leader erneuert alle LEADER_RENEW_SECONDS seinen Eintrag in background_job_leaders
+  (siehe sql/migrations/create_background_job_leaders.sql). Ist die letzte Erneuerung älter als
+  LEADER_LEASE_SECONDS (z.B. hängender Event-Loop), pausiert der Leader den Job selbst, und ein
+  anderer Knoten beendet die Lock-Session des alten Leaders (pg_terminate_backend) und übernimmt
+- /health zeigt den aktuellen Leader pro Job aus dieser Tabelle
+
+Fehlt die Tabelle, wählt weiterhin der Advisory-Lock den Leader. Es gibt dann keine
+Lease-Übernahme bei hängenden Leadern und keine Anzeige über alle Knoten.
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+import asyncpg
+from app.utils.config import (
+    DB_DSN, WORKER_ID, LEADER_ELECTION_ENABLED, LEADER_LEASE_SECONDS, LEADER_RENEW_SECONDS
+)
+from app.utils.logging_config import get_logger
+from app.utils.metrics import ml_background_job_leader
+
+logger = get_logger(__name__)
+
+JOB_PREDICTION_EVALUATION = 'prediction_evaluation'
+JOB_ATH_TRACKING = 'ath_tracking'
+JOB_ALERT_EVALUATOR = 'alert_evaluator'
+
+# Fester erster Schlüssel von pg_try_advisory_lock(int, int) - trennt Leader-Locks von anderen Advisory-Locks
+LOCK_NAMESPACE = 7370
+
+
+class LeaderElection:
+    """Bewirbt sich für registrierte Jobs und hält deren Locks auf einer eigenen Connection"""
+
+    def __init__(self, node_id: str = WORKER_ID):
+        self.node_id = node_id
+        self.jobs: Set[str] = set()
+        # job -> Zeitpunkt (monotonic) der letzten erfolgreichen Lease-Erneuerung
+        self.held: Dict[str, float] = {}
+        self.connection: Optional[asyncpg.Connection] = None
+        self.table_available = True
+        self._task: Optional[asyncio.Task] = None
+
+    def is_leader(self, job: str) -> bool:
+        """True, wenn dieser Prozess den Job ausführen darf (Lease noch gültig)"""
+        if not LEADER_ELECTION_ENABLED:
+            return True
+        renewed = self.held.get(job)
+        return renewed is not None and time.monotonic() - renewed < LEADER_LEASE_SECONDS
+
+    async def wait_for_leadership(self, job: str, is_running: Callable[[], bool]) -> bool:
+        """Registriert den Job und wartet, bis dieser Prozess Leader ist (False, wenn er vorher stoppt)"""
+        if not LEADER_ELECTION_ENABLED:
+            return is_running()
+        if job not in self.jobs:
+            self.jobs.add(job)
+            ml_background_job_leader.labels(job=job).set(0)
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        while is_running():
+            if self.is_leader(job):
+                return True
+            await asyncio.sleep(LEADER_RENEW_SECONDS)
+        return False
+
+    async def run(self):
+        """Bewerbungs-/Erneuerungs-Loop (läuft bis close())"""
+        logger.info(f"👑 Leader-Election gestartet (Knoten: {self.node_id}, Lease: {LEADER_LEASE_SECONDS}s)")
+        while True:
+            try:
+                await self._tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Leader-Election fehlgeschlagen - gebe alle Jobs ab: {e}")
+                await self._release_all()
+            await asyncio.sleep(LEADER_RENEW_SECONDS)
+
+    async def _connect(self) -> asyncpg.Connection:
+        if self.connection is not None and not self.connection.is_closed():
+            return self.connection
+        # Alte Session weg = Locks weg
+        await self._release_all()
+        self.connection = await asyncpg.connect(
+            DB_DSN, server_settings={'application_name': f"pump-leader:{self.node_id}"[:63]}
+        )
+        return self.connection
+
+    async def _tick(self):
+        conn = await self._connect()
+        for job in sorted(self.jobs):
+            if job in self.held:
+                await self._renew(conn, job)
+            elif await conn.fetchval("SELECT pg_try_advisory_lock($1, hashtext($2))", LOCK_NAMESPACE, job):
+                logger.info(f"👑 Leader für Job '{job}' übernommen ({self.node_id})")
+                await self._renew(conn, job)
+            else:
+                await self._expire_stale_leader(conn, job)
+
+    async def _renew(self, conn: asyncpg.Connection, job: str):
+        """Lease erneuern (Zeitpunkt vor dem Write - im Zweifel läuft die Lease früher ab)"""
+        renewed = time.monotonic()
+        if self.table_available:
+            try:
+                await conn.execute("""
+                    INSERT INTO background_job_leaders (job, holder, backend_pid, acquired_at, renewed_at)
+                    VALUES ($1, $2, pg_backend_pid(), NOW(), NOW())
+                    ON CONFLICT (job) DO UPDATE SET
+                        acquired_at = CASE
+                            WHEN background_job_leaders.holder = EXCLUDED.holder
+                             AND background_job_leaders.backend_pid = EXCLUDED.backend_pid
+                            THEN background_job_leaders.acquired_at
+                            ELSE NOW()
+                        END,
+                        holder = EXCLUDED.holder,
+                        backend_pid = EXCLUDED.backend_pid,
+                        renewed_at = NOW()
+                """, job, self.node_id)
+            except asyncpg.UndefinedTableError:
+                self._table_missing()
+        self.held[job] = renewed
+        ml_background_job_leader.labels(job=job).set(1)
+
+    async def _expire_stale_leader(self, conn: asyncpg.Connection, job: str):
+        """Beendet die Lock-Session eines Leaders, dessen Lease abgelaufen ist"""
+        if not self.table_available:
+            return
+        try:
+            row = await conn.fetchrow("""
+                SELECT holder, backend_pid
+                FROM background_job_leaders
+                WHERE job = $1 AND renewed_at < NOW() - make_interval(secs => $2)
+            """, job, LEADER_LEASE_SECONDS)
+        except asyncpg.UndefinedTableError:
+            self._table_missing()
+            return
+        if row is None:
+            return
+        # Nur wenn diese Session tatsächlich noch einen Leader-Lock hält (sonst ist der Lock ohnehin frei)
+        terminated = await conn.fetchval("""
+            SELECT pg_terminate_backend(pid)
+            FROM pg_locks
+            WHERE locktype = 'advisory' AND classid = $1 AND objsubid = 2 AND pid = $2 AND granted
+            LIMIT 1
+        """, LOCK_NAMESPACE, row['backend_pid'])
+        if terminated:
+            logger.warning(f"⚠️ Lease für Job '{job}' abgelaufen (Leader {row['holder']}) - Lock-Session beendet, übernehme")
+
+    def _table_missing(self):
+        if self.table_available:
+            logger.warning("⚠️ Tabelle background_job_leaders fehlt - Leader-Election nur per Advisory-Lock ohne Lease-Übernahme (Migration create_background_job_leaders.sql ausführen)")
+        self.table_available = False
+
+    async def _release_all(self):
+        for job in self.held:
+            logger.warning(f"⚠️ Leader für Job '{job}' abgegeben ({self.node_id})")
+            ml_background_job_leader.labels(job=job).set(0)
+        self.held.clear()
+        if self.connection is not None:
+            try:
+                # Session schließen gibt alle Advisory-Locks frei
+                await self.connection.close(timeout=5)
+            except Exception:
+                self.connection.terminate()
+        self.connection = None
+
+    async def leaders(self, pool: asyncpg.Pool) -> List[Dict[str, Any]]:
+        """Aktueller Leader pro Job über alle Knoten (für /health)"""
+        if not LEADER_ELECTION_ENABLED:
+            return []
+        if self.table_available:
+            try:
+                rows = await pool.fetch("""
+                    SELECT job, holder, acquired_at, renewed_at,
+                           renewed_at < NOW() - make_interval(secs => $1) AS lease_expired
+                    FROM background_job_leaders
+                    ORDER BY job
+                """, LEADER_LEASE_SECONDS)
+                return [
+                    {
+                        'job': row['job'],
+                        'holder': row['holder'],
+                        'this_process': row['holder'] == self.node_id,
+                        'acquired_at': row['acquired_at'].isoformat(),
+                        'renewed_at': row['renewed_at'].isoformat(),
+                        'lease_expired': row['lease_expired']
+                    }
+                    for row in rows
+                ]
+            except asyncpg.UndefinedTableError:
+                self._table_missing()
+        # Ohne Tabelle: nur die Sicht dieses Prozesses
+        return [
+            {'job': job, 'holder': self.node_id if self.is_leader(job) else None, 'this_process': self.is_leader(job)}
+            for job in sorted(self.jobs)
+        ]
+
+    async def close(self):
+        """Stoppt die Bewerbung und gibt alle Locks frei (andere Knoten übernehmen sofort)"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self._release_all()
+
+
+# Globale Instanz (pro Prozess)
+_leader_election: Optional[LeaderElection] = None
+
+
+def get_leader_election() -> LeaderElection:
+    """Gibt die prozessweite LeaderElection-Instanz zurück"""
+    global _leader_election
+    if _leader_election is None:
+        _leader_election = LeaderElection()
+    return _leader_election
@@ -0,0 +1,186 @@
+"""
+Memory-Mapped Modell-Artefakte für Pump Server
+
+Kompilierte Baum-Ensembles (siehe tree_compiler) werden neben der .pkl-Datei als
+Verzeichnis mit unkomprimierten .npy-Arrays abgelegt (<modell>.pkl.trees/).
+Geladen werden die Arrays mit np.load(mmap_mode='r') - alle Prozesse eines Hosts
+(uvicorn-Worker, Event-Handler, Process-Executor-Worker) teilen sich dadurch eine
+physische Kopie im Page-Cache statt das Modell jeweils in den eigenen Heap zu entpicklen.
+
+Hinweis: joblib.load(mmap_mode='r') auf der .pkl hilft hier nicht - sklearn-Bäume
+kopieren ihre Knoten beim Entpicklen und XGBoost hält den Booster als Bytes.
+
+Das Original-Modell wird nur noch bei Bedarf geladen (z.B. RandomForest mit NaN-Eingaben).
+Ein Artefakt gilt nur, solange Größe und Änderungszeit der .pkl-Datei übereinstimmen.
+"""
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Optional
+import joblib
+import numpy as np
+from app.prediction.tree_compiler import CompiledTreeEnsemble, compile_model
+from app.utils.config import MODEL_MMAP_ARTIFACTS, TREE_COMPILER_ENABLED
+from app.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+ARTIFACT_VERSION = 1
+_ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'is_leaf')
+# Attribute des Original-Modells, die ohne dessen Laden verfügbar sein sollen
+_MODEL_ATTRIBUTES = ('feature_names_in_', 'n_features_in_')
+
+
+def artifact_path(model_file_path: str) -> str:
+    return f"{model_file_path}.trees"
+
+
+def artifacts_enabled() -> bool:
+    return TREE_COMPILER_ENABLED and MODEL_MMAP_ARTIFACTS
+
+
+def _source_stat(model_file_path: str) -> dict:
+    stat = os.stat(model_file_path)
+    return {'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+
+
+def save_model_artifact(compiled: CompiledTreeEnsemble, model_file_path: str) -> bool:
+    """
+    Schreibt ein kompiliertes Modell als Memory-Mapped-Artefakt.
+
+    Wird erst in ein temporäres Verzeichnis geschrieben und dann umbenannt, damit
+    parallel ladende Prozesse nie ein halbes Artefakt sehen.
+    """
+    target = artifact_path(model_file_path)
+    attributes = {}
+    absent = []
+    for name in _MODEL_ATTRIBUTES:
+        try:
+            value = getattr(compiled.original_model, name)
+        except AttributeError:
+            absent.append(name)
+            continue
+        attributes[name] = value.tolist() if isinstance(value, np.ndarray) else value
+
+    meta = {
+        'version': ARTIFACT_VERSION,
+        'kind': compiled.kind,
+        'base_margin': float(compiled.base_margin),
+        'classes': np.asarray(compiled.classes_).tolist(),
+        'original_type': compiled.original_type,
+        'attributes': attributes,
+        'absent_attributes': absent,
+        **_source_stat(model_file_path),
+    }
+
+    tmp_dir = tempfile.mkdtemp(prefix='.trees-', dir=os.path.dirname(os.path.abspath(model_file_path)))
+    try:
+        for name in _ARRAYS:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(getattr(compiled, name)))
+        if compiled.default_left is not None:
+            np.save(os.path.join(tmp_dir, "default_left.npy"), np.ascontiguousarray(compiled.default_left))
+        with open(os.path.join(tmp_dir, "meta.json"), 'w') as f:
+            json.dump(meta, f)
+
+        if os.path.isdir(target):
+            shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp_dir, target)
+        logger.info(f"💾 Memory-Mapped-Artefakt geschrieben: {target}")
+        return True
+    except Exception as e:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        logger.warning(f"⚠️ Konnte Modell-Artefakt nicht schreiben ({target}): {e}")
+        return False
+
+
+def load_model_artifact(model_file_path: str) -> Optional[CompiledTreeEnsemble]:
+    """
+    Lädt ein kompiliertes Modell mit memory-mapped Arrays.
+
+    Returns:
+        CompiledTreeEnsemble oder None (kein/veraltetes/defektes Artefakt)
+    """
+    target = artifact_path(model_file_path)
+    meta_file = os.path.join(target, "meta.json")
+    if not os.path.exists(meta_file):
+        return None
+    try:
+        with open(meta_file) as f:
+            meta = json.load(f)
+        if meta.get('version') != ARTIFACT_VERSION or any(
+            meta.get(k) != v for k, v in _source_stat(model_file_path).items()
+        ):
+            logger.info(f"ℹ️ Modell-Artefakt veraltet, wird neu erstellt: {target}")
+            return None
+
+        arrays = {name: np.load(os.path.join(target, f"{name}.npy"), mmap_mode='r') for name in _ARRAYS}
+        default_left_file = os.path.join(target, "default_left.npy")
+        default_left = np.load(default_left_file, mmap_mode='r') if os.path.exists(default_left_file) else None
+
+        compiled = CompiledTreeEnsemble(
+            kind=meta['kind'],
+            original_model=None,
+            default_left=default_left,
+            base_margin=np.float32(meta['base_margin']) if meta['kind'] == 'xgb' else meta['base_margin'],
+            classes=np.array(meta['classes']),
+            original_loader=lambda: joblib.load(model_file_path),
+            original_type=meta['original_type'],
+            **arrays
+        )
+        for name, value in meta.get('attributes', {}).items():
+            setattr(compiled, name, np.array(value, dtype=object) if isinstance(value, list) else value)
+        compiled.absent_attributes = frozenset(meta.get('absent_attributes', []))
+        logger.debug(f"✅ Modell memory-mapped geladen: {target}")
+        return compiled
+    except Exception as e:
+        logger.warning(f"⚠️ Modell-Artefakt nicht ladbar ({target}): {e}")
+        return None
+
+
+def load_inference_model(model_file_path: str, label: str = "") -> Any:
+    """
+    Lädt ein Modell für die Inferenz.
+
+    Mit TREE_COMPILER_ENABLED und MODEL_MMAP_ARTIFACTS bevorzugt das Memory-Mapped-Artefakt;
+    fehlt es, wird einmal kompiliert, das Artefakt geschrieben und memory-mapped geladen.
+    """
+    if artifacts_enabled():
+        compiled = load_model_artifact(model_file_path)
+        if compiled is not None:
+            return compiled
+
+    model = joblib.load(model_file_path)
+    if not TREE_COMPILER_ENABLED:
+        return model
+
+    model = compile_model(model, label=label or os.path.basename(model_file_path))
+    if artifacts_enabled() and isinstance(model, CompiledTreeEnsemble) and save_model_artifact(model, model_file_path):
+        # Private Kopie gegen die geteilte (memory-mapped) Variante tauschen
+        return load_model_artifact(model_file_path) or model
+    return model
+
+
+def convert_model_artifact(model_file_path: str) -> bool:
+    """
+    Erstellt das Memory-Mapped-Artefakt für eine gespeicherte Modell-Datei (einmalig).
+
+    Returns:
+        True wenn ein gültiges Artefakt vorliegt
+    """
+    if not artifacts_enabled():
+        return False
+    if load_model_artifact(model_file_path) is not None:
+        return True
+    model = compile_model(joblib.load(model_file_path), label=os.path.basename(model_file_path))
+    if not isinstance(model, CompiledTreeEnsemble):
+        return False  # nicht kompilierbar - Original wird weiter per joblib geladen
+    return save_model_artifact(model, model_file_path)
+
+
+def remove_model_artifact(model_file_path: str):
+    """Löscht das Artefakt einer Modell-Datei (falls vorhanden)"""
+    target = artifact_path(model_file_path)
+    if os.path.isdir(target):
+        shutil.rmtree(target, ignore_errors=True)
+        logger.info(f"🗑️ Modell-Artefakt gelöscht: {target}")
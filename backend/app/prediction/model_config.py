@@ -0,0 +1,143 @@
+"""
+Konfigurations-Snapshot der aktiven Modelle für Pump Server
+
+Der Event-Handler liest die Modell-Konfiguration nicht mehr alle 10 Sekunden per
+get_active_models() (inkl. COUNT/AVG über model_predictions), sondern hält einen
+unveränderlichen Snapshot (Tuple von MappingProxyType), der nur neu geladen wird, wenn:
+
+- ein NOTIFY auf 'prediction_model_config' eintrifft (Trigger auf prediction_active_models,
+  siehe sql/migrations/add_model_config_notify.sql)
+- invalidate() im selben Prozess aufgerufen wird
+- das Sicherheits-Intervall MODEL_CONFIG_REFRESH_SECONDS abläuft
+
+Fehlt der Trigger (Migration nicht ausgeführt), wird wie bisher alle
+MODEL_CONFIG_FALLBACK_SECONDS neu geladen.
+"""
+import asyncio
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+import asyncpg
+from app.utils.config import DB_DSN, MODEL_CONFIG_REFRESH_SECONDS, MODEL_CONFIG_FALLBACK_SECONDS
+from app.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+CONFIG_CHANNEL = 'prediction_model_config'
+_NOTIFY_TRIGGER = 'prediction_active_models_config_notify'
+# Kurz warten, damit mehrere PATCHes hintereinander nur einen Reload auslösen
+_DEBOUNCE_SECONDS = 0.2
+
+
+class ModelConfigSnapshot(NamedTuple):
+    """Unveränderlicher Stand der aktiven Modelle (kann ohne Kopie geteilt werden)"""
+    models: Tuple[Mapping[str, Any], ...]
+    by_id: Mapping[int, Mapping[str, Any]]
+    version: int
+    loaded_at: Optional[datetime]
+
+
+def build_snapshot(model_configs: List[Dict[str, Any]], version: int) -> ModelConfigSnapshot:
+    models = tuple(MappingProxyType(dict(m)) for m in model_configs)
+    return ModelConfigSnapshot(
+        models=models,
+        by_id=MappingProxyType({m['id']: m for m in models}),
+        version=version,
+        loaded_at=datetime.now(timezone.utc)
+    )
+
+
+class ModelConfigStore:
+    """Hält den aktuellen Snapshot und lädt ihn bei Änderungs-Benachrichtigungen neu"""
+
+    def __init__(self):
+        self.snapshot = build_snapshot([], version=0)
+        self.notify_available = False
+        self.listener_connection: Optional[asyncpg.Connection] = None
+        self._dirty = asyncio.Event()
+
+    def get(self) -> ModelConfigSnapshot:
+        return self.snapshot
+
+    def invalidate(self, active_model_id: Optional[int] = None):
+        """In-Prozess-Benachrichtigung: Snapshot beim nächsten Durchlauf neu laden"""
+        self._dirty.set()
+
+    async def refresh(self, pool: asyncpg.Pool) -> ModelConfigSnapshot:
+        """Lädt die Konfiguration der aktiven Modelle und ersetzt den Snapshot atomar"""
+        from app.database.models import get_active_model_configs
+        self._dirty.clear()
+        model_configs = await get_active_model_configs(pool)
+        self.snapshot = build_snapshot(model_configs, version=self.snapshot.version + 1)
+        logger.debug(f"✅ Modell-Konfiguration geladen (Version {self.snapshot.version}): {len(self.snapshot.models)} aktive Modelle")
+        return self.snapshot
+
+    def _on_notify(self, conn, pid, channel, payload):
+        # asyncpg ruft Listener im Event-Loop auf
+        logger.debug(f"🔔 Modell-Konfiguration geändert: {payload}")
+        self._dirty.set()
+
+    async def _ensure_listener(self, pool: asyncpg.Pool):
+        """(Re-)Connect des LISTEN auf den Konfigurations-Kanal"""
+        if self.listener_connection is not None and not self.listener_connection.is_closed():
+            return
+        try:
+            self.notify_available = bool(await pool.fetchval(
+                "SELECT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = $1)", _NOTIFY_TRIGGER
+            ))
+            if not self.notify_available:
+                logger.warning(
+                    f"⚠️ Trigger {_NOTIFY_TRIGGER} fehlt - Modell-Konfiguration wird alle "
+                    f"{MODEL_CONFIG_FALLBACK_SECONDS}s neu geladen (Migration add_model_config_notify.sql ausführen)"
+                )
+                return
+            self.listener_connection = await asyncpg.connect(DB_DSN)
+            await self.listener_connection.add_listener(CONFIG_CHANNEL, self._on_notify)
+            # Verbindungsabbruch: sofort aufwachen, neu verbinden und neu laden
+            self.listener_connection.add_termination_listener(lambda conn: self._dirty.set())
+            logger.info(f"👂 LISTEN auf '{CONFIG_CHANNEL}' aktiv")
+            # Änderungen vor dem (Re-)Connect wurden evtl. verpasst - einmal nachladen
+            self._dirty.set()
+        except Exception as e:
+            self.notify_available = False
+            logger.warning(f"⚠️ LISTEN auf '{CONFIG_CHANNEL}' fehlgeschlagen - Fallback auf Intervall: {e}")
+
+    async def run(
+        self,
+        pool: asyncpg.Pool,
+        is_running: Callable[[], bool],
+        on_change: Optional[Callable[[ModelConfigSnapshot], Awaitable[None]]] = None
+    ):
+        """Wartet auf Änderungen (oder das Sicherheits-Intervall) und lädt den Snapshot neu"""
+        while is_running():
+            try:
+                await self._ensure_listener(pool)
+                timeout = MODEL_CONFIG_REFRESH_SECONDS if self.notify_available else MODEL_CONFIG_FALLBACK_SECONDS
+                try:
+                    await asyncio.wait_for(self._dirty.wait(), timeout=timeout)
+                    await asyncio.sleep(_DEBOUNCE_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                snapshot = await self.refresh(pool)
+                if on_change is not None:
+                    await on_change(snapshot)
+            except Exception as e:
+                logger.error(f"❌ Fehler beim Aktualisieren der Modell-Konfiguration: {e}", exc_info=True)
+                await asyncio.sleep(MODEL_CONFIG_FALLBACK_SECONDS)
+
+    async def close(self):
+        if self.listener_connection is not None and not self.listener_connection.is_closed():
+            await self.listener_connection.close()
+        self.listener_connection = None
+
+
+# Globale Instanz (pro Prozess)
+_model_config_store: Optional[ModelConfigStore] = None
+
+
+def get_model_config_store() -> ModelConfigStore:
+    """Gibt die prozessweite ModelConfigStore-Instanz zurück"""
+    global _model_config_store
+    if _model_config_store is None:
+        _model_config_store = ModelConfigStore()
+    return _model_config_store
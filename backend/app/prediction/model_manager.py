@@ -4,23 +4,222 @@ Modell-Manager für Pump Server
 Verwaltet Modell-Laden, Caching und Download vom Training Service.
 """
 import os
-import joblib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 import aiohttp
-from typing import Dict, Any, Optional, List
+import numpy as np
+from typing import Dict, Any, Optional, List, Iterable
 from functools import lru_cache
-from app.utils.config import MODEL_STORAGE_PATH, TRAINING_SERVICE_API_URL
+from app.utils.config import (
+    MODEL_STORAGE_PATH, TRAINING_SERVICE_API_URL,
+    MODEL_CACHE_SIZE, MODEL_CACHE_MAX_MB
+)
+from app.prediction.model_artifacts import convert_model_artifact, load_inference_model
+from app.prediction.tree_compiler import CompiledTreeEnsemble, original_model_type
 from app.utils.logging_config import get_logger
+from app.utils.metrics import (
+    ml_model_load_duration_seconds, ml_model_cache_bytes,
+    ml_model_cache_requests_total, ml_model_cache_evictions_total, update_models_loaded
+)
 
 logger = get_logger(__name__)
 
-# LRU Cache für Modelle (max. 10 Modelle)
-MODEL_CACHE = {}
+
+def _estimate_model_bytes(model: Any, model_file_path: str) -> int:
+    """
+    Schätzt den Speicherbedarf eines geladenen Modells.
+
+    - Kompilierte Ensembles: Summe der NumPy-Arrays
+    - RandomForest: Knoten- und Werte-Arrays aller Bäume
+    - sonst (XGBoost): Größe der Modell-Datei
+    """
+    try:
+        if isinstance(model, CompiledTreeEnsemble):
+            arrays = sum(v.nbytes for v in vars(model).values() if isinstance(v, np.ndarray))
+            if model._original_model is None:
+                return arrays  # Original (noch) nicht geladen - nur die (memory-mapped) Arrays
+            return arrays + _estimate_model_bytes(model._original_model, model_file_path)
+        estimators = getattr(model, 'estimators_', None)
+        if estimators is not None and hasattr(estimators[0], 'tree_'):
+            total = 0
+            for estimator in estimators:
+                state = estimator.tree_.__getstate__()
+                total += state['nodes'].nbytes + state['values'].nbytes
+            return total
+    except Exception as e:
+        logger.debug(f"Speicherschätzung für {model_file_path} fehlgeschlagen: {e}")
+    try:
+        return os.path.getsize(model_file_path)
+    except OSError:
+        return 0
+
+
+class _CacheEntry:
+    __slots__ = ('model', 'nbytes')
+
+    def __init__(self, model: Any, nbytes: int):
+        self.model = model
+        self.nbytes = nbytes
+
+
+class ModelCache:
+    """
+    Speicherbegrenzter LRU-Cache für geladene Modelle (Key: Dateipfad).
+
+    - Budget: MODEL_CACHE_MAX_MB (geschätzte Modellgröße) und MODEL_CACHE_SIZE Einträge
+    - Aktive Modelle sind gepinnt und werden nie verdrängt
+    - Single-Flight: gleichzeitige Misses für denselben Pfad laden nur einmal,
+      die übrigen Aufrufer warten auf dasselbe Ergebnis
+
+    Thread-sicher - load_model läuft im Inference-Executor.
+    """
+
+    def __init__(self, max_entries: int = MODEL_CACHE_SIZE, max_bytes: int = MODEL_CACHE_MAX_MB * 1024 * 1024):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._loading: Dict[str, Future] = {}
+        self._pinned: set = set()
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+    def __contains__(self, model_file_path: str) -> bool:
+        return model_file_path in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_load(self, model_file_path: str, loader, label: Optional[str] = None) -> Any:
+        """Gibt das gecachte Modell zurück oder lädt es (genau einmal pro Pfad)"""
+        with self._lock:
+            entry = self._entries.get(model_file_path)
+            if entry is not None:
+                self._entries.move_to_end(model_file_path)
+                ml_model_cache_requests_total.labels(result='hit').inc()
+                return entry.model
+            future = self._loading.get(model_file_path)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._loading[model_file_path] = future
+            ml_model_cache_requests_total.labels(result='miss' if owner else 'wait').inc()
+
+        if not owner:
+            logger.debug(f"⏳ Warte auf laufenden Modell-Load: {model_file_path}")
+            return future.result()
+
+        try:
+            start_time = time.time()
+            model = loader(model_file_path)
+            ml_model_load_duration_seconds.labels(
+                model_id=label or os.path.basename(model_file_path)
+            ).observe(time.time() - start_time)
+            nbytes = _estimate_model_bytes(model, model_file_path)
+        except BaseException as e:
+            with self._lock:
+                self._loading.pop(model_file_path, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._loading.pop(model_file_path, None)
+            self._entries[model_file_path] = _CacheEntry(model, nbytes)
+            self.bytes += nbytes
+            self._evict()
+        logger.info(f"💾 Modell im Cache: {os.path.basename(model_file_path)} (~{nbytes / (1024 * 1024):.1f} MB, Cache: {self.bytes / (1024 * 1024):.1f} MB)")
+        future.set_result(model)
+        return model
+
+    def _evict(self):
+        """Verdrängt ungepinnte Modelle (LRU) bis Budget und Eintragslimit eingehalten sind"""
+        for path in list(self._entries.keys()):
+            if self.bytes <= self.max_bytes and len(self._entries) <= self.max_entries:
+                break
+            if path in self._pinned:
+                continue
+            self._remove(path)
+            ml_model_cache_evictions_total.inc()
+            logger.info(f"♻️ Modell aus Cache verdrängt: {path}")
+        self._update_metrics()
+
+    def _remove(self, model_file_path: str):
+        entry = self._entries.pop(model_file_path, None)
+        if entry is not None:
+            self.bytes -= entry.nbytes
+
+    def _update_metrics(self):
+        ml_model_cache_bytes.set(self.bytes)
+        update_models_loaded(len(self._entries))
+
+    def set_pinned(self, model_file_paths: Iterable[str]):
+        """
+        Setzt die gepinnten (aktiven) Modelle.
+
+        Nicht mehr aktive Modelle werden sofort aus dem Cache entfernt.
+        """
+        pinned = set(p for p in model_file_paths if p)
+        with self._lock:
+            released = self._pinned - pinned
+            self._pinned = pinned
+            for path in released:
+                if path in self._entries:
+                    self._remove(path)
+                    logger.info(f"🗑️ Modell nicht mehr aktiv - aus Cache entfernt: {path}")
+            self._evict()
+
+    def evict(self, model_file_path: str):
+        """Entfernt ein Modell aus dem Cache (z.B. nach Deaktivierung)"""
+        with self._lock:
+            self._pinned.discard(model_file_path)
+            if model_file_path in self._entries:
+                self._remove(model_file_path)
+                logger.debug(f"✅ Modell aus Cache entfernt: {model_file_path}")
+            self._update_metrics()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self._update_metrics()
+
+
+# Speicherbegrenzter LRU Cache für Modelle (aktive Modelle gepinnt)
+MODEL_CACHE = ModelCache()
 
 
 async def download_model_file(model_id: int) -> str:
     """
     Lädt Modell-Datei vom Training Service herunter.
 
+    Danach wird einmalig das Memory-Mapped-Artefakt erstellt (siehe model_artifacts),
+    das sich alle Prozesse des Hosts teilen.
+
+    Args:
+        model_id: ID des Modells in ml_models
+
+    Returns:
+        Lokaler Pfad zur Modell-Datei
+
+    Raises:
+        ValueError: Wenn Download fehlschlägt
+        FileNotFoundError: Wenn Modell nicht gefunden wird
+    """
+    local_path = await _download_model_file(model_id)
+    try:
+        # CPU-lastig (Kompilieren + Paritäts-Check) - nicht im Event-Loop
+        from app.prediction.executor import get_inference_executor
+        await get_inference_executor().run('convert_model', convert_model_artifact, local_path)
+    except Exception as e:
+        logger.warning(f"⚠️ Modell-Artefakt für {local_path} nicht erstellt: {e} - Modell wird normal geladen")
+    return local_path
+
+
+async def _download_model_file(model_id: int) -> str:
+    """
+    Lädt Modell-Datei vom Training Service herunter (ohne Artefakt-Konvertierung).
+
     Args:
         model_id: ID des Modells in ml_models
 
@@ -99,7 +298,7 @@ async def download_model_file(model_id: int) -> str:
         raise
 
 
-def load_model(model_file_path: str):
+def load_model(model_file_path: str, label: Optional[str] = None):
     """
     Lädt Modell aus Datei (mit Caching).
     
@@ -107,6 +306,7 @@ def load_model(model_file_path: str):
     
     Args:
         model_file_path: Pfad zur .pkl Datei
+        label: Label für die Lade-Metrik (z.B. model_id)
         
     Returns:
         Geladenes Modell (RandomForest oder XGBoost)
@@ -115,25 +315,24 @@ def load_model(model_file_path: str):
         FileNotFoundError: Wenn Datei nicht gefunden wird
         ValueError: Wenn Modell-Typ unbekannt ist
     """
-    # Prüfe Cache
-    if model_file_path in MODEL_CACHE:
-        logger.debug(f"✅ Modell aus Cache geladen: {model_file_path}")
-        return MODEL_CACHE[model_file_path]
-    
-    # Lade Modell
+    return MODEL_CACHE.get_or_load(model_file_path, _load_model_file, label=label)
+
+
+def _load_model_file(model_file_path: str):
+    """Lädt und validiert ein Modell aus der Datei (ohne Cache)"""
     if not os.path.exists(model_file_path):
         raise FileNotFoundError(f"Modell-Datei nicht gefunden: {model_file_path}")
     
     logger.info(f"📂 Lade Modell aus Datei: {model_file_path}")
-    model = joblib.load(model_file_path)
+    # Optional: kompiliert in flache NumPy-Arrays (fällt bei Paritäts-Abweichung auf Original zurück),
+    # bevorzugt memory-mapped aus dem Artefakt neben der .pkl-Datei
+    model = load_inference_model(model_file_path)
     
     # Validierung: Modell-Typ prüfen
-    model_type = type(model).__name__
+    model_type = original_model_type(model)
     if 'RandomForest' not in model_type and 'XGB' not in model_type:
         raise ValueError(f"Unbekannter Modell-Typ: {model_type}")
     
-    # In Cache speichern
-    MODEL_CACHE[model_file_path] = model
     logger.info(f"✅ Modell geladen: {model_type}")
     
     return model
@@ -153,7 +352,7 @@ def get_model(model_config: Dict[str, Any]):
         FileNotFoundError: Wenn Modell-Datei nicht gefunden wird
     """
     model_file_path = model_config['local_model_path']
-    return load_model(model_file_path)
+    return load_model(model_file_path, label=str(model_config.get('model_id', '')) or None)
 
 
 def clear_cache():
@@ -173,14 +372,23 @@ def reload_model(model_file_path: str):
         Neu geladenes Modell
     """
     # Entferne aus Cache
-    if model_file_path in MODEL_CACHE:
-        del MODEL_CACHE[model_file_path]
-        logger.debug(f"✅ Modell aus Cache entfernt: {model_file_path}")
+    MODEL_CACHE.evict(model_file_path)
     
     # Lade neu
     return load_model(model_file_path)
 
 
+def pin_active_models(model_file_paths: Iterable[str]):
+    """Pinnt die aktiven Modelle im Cache - nicht mehr aktive werden entfernt"""
+    MODEL_CACHE.set_pinned(model_file_paths)
+
+
+def evict_model(model_file_path: Optional[str]):
+    """Entfernt ein Modell aus dem Cache (nach Deaktivierung/Löschung)"""
+    if model_file_path:
+        MODEL_CACHE.evict(model_file_path)
+
+
 def get_cache_size() -> int:
     """
     Gibt aktuelle Cache-Größe zurück.
@@ -222,7 +430,7 @@ def validate_model_file(model_file_path: str) -> Dict[str, Any]:
     # 3. Versuche Modell zu laden
     try:
         model = load_model(model_file_path)
-        model_type = type(model).__name__
+        model_type = original_model_type(model)
         logger.info(f"✅ Modell erfolgreich geladen und validiert: {model_file_path} (Typ: {model_type})")
         return {"valid": True, "model": model, "model_type": model_type}
     except FileNotFoundError as e:
@@ -264,8 +472,8 @@ async def recover_model_file(model_config: Dict[str, Any]) -> str:
         recovered_path = await download_model_file(model_id)
 
         # Cache-Eintrag für den alten Pfad leeren
-        if expected_path and expected_path in MODEL_CACHE:
-            del MODEL_CACHE[expected_path]
+        if expected_path:
+            MODEL_CACHE.evict(expected_path)
 
         logger.info(f"✅ Modell-Datei wiederhergestellt: model_id={model_id} -> {recovered_path}")
         return recovered_path
@@ -0,0 +1,82 @@
+"""
+Routing-Index Coin → Modelle für Pump Server
+
+Statt für jeden Coin alle Modelle durchzugehen (coin_filter_mode, lineare Suche in
+coin_whitelist, Phasen-Prüfung), wird einmal pro Konfigurations-Snapshot ein Index gebaut:
+
+- phase_id → Modelle ohne Whitelist (Modelle für alle Phasen + phasenspezifische Modelle)
+- coin_id → Whitelist-Modelle (invertierter Index über alle Whitelists)
+
+Ein Coin wird damit über zwei Dict-Lookups geroutet - unabhängig von der Anzahl der
+Modelle und der Größe der Whitelists. Die Reihenfolge der Kandidaten entspricht der
+Reihenfolge der aktiven Modelle.
+"""
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+from app.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class ModelRoutingIndex:
+    """Vorberechnete Zuordnung Phase/Coin → Kandidaten-Modelle"""
+
+    def __init__(self, models: Sequence[Mapping[str, Any]], key: Optional[Hashable] = None):
+        self.key = key
+        self.model_count = len(models)
+        # Position in der Modell-Reihenfolge (zum Einsortieren der Whitelist-Treffer)
+        self.positions: Dict[int, int] = {id(m): position for position, m in enumerate(models)}
+        # Modelle für alle Phasen ohne Whitelist (Fallback für unbekannte Phasen / phase_id=None)
+        all_phase_models: List[Tuple[int, Mapping[str, Any]]] = []
+        phase_models: Dict[Any, List[Tuple[int, Mapping[str, Any]]]] = {}
+        # coin_id -> [(Position, Modell, Phasen oder None)]
+        self.whitelist_models: Dict[str, List[Tuple[int, Mapping[str, Any], Optional[frozenset]]]] = {}
+
+        for position, model_config in enumerate(models):
+            model_phases = model_config.get('phases')
+            phases = frozenset(model_phases) if model_phases else None
+
+            if (model_config.get('coin_filter_mode') or 'all') == 'whitelist':
+                # Leere Whitelist: Modell verarbeitet keinen Coin (wie bisher)
+                for coin_id in set(model_config.get('coin_whitelist') or []):
+                    self.whitelist_models.setdefault(coin_id, []).append((position, model_config, phases))
+                continue
+
+            if phases is None:
+                all_phase_models.append((position, model_config))
+            else:
+                for phase_id in phases:
+                    phase_models.setdefault(phase_id, []).append((position, model_config))
+
+        self.all_phase_models: Tuple[Mapping[str, Any], ...] = tuple(m for _, m in all_phase_models)
+        # Pro Phase bereits mit den Modellen für alle Phasen zusammengeführt (in Modell-Reihenfolge)
+        self.phase_models: Dict[Any, Tuple[Mapping[str, Any], ...]] = {
+            phase_id: tuple(m for _, m in sorted(all_phase_models + entries, key=lambda e: e[0]))
+            for phase_id, entries in phase_models.items()
+        }
+        logger.debug(
+            f"🔀 Routing-Index gebaut: {self.model_count} Modelle, {len(self.phase_models)} Phasen, "
+            f"{len(self.whitelist_models)} Whitelist-Coins"
+        )
+
+    def route(self, coin_id: str, phase_id: Any) -> List[Mapping[str, Any]]:
+        """Kandidaten-Modelle für einen Coin in einer Phase (vor der Ignore-Prüfung)"""
+        if phase_id is None:
+            candidates = self.all_phase_models
+        else:
+            candidates = self.phase_models.get(phase_id, self.all_phase_models)
+
+        whitelisted = self.whitelist_models.get(coin_id)
+        if not whitelisted:
+            return list(candidates)
+
+        # Whitelist-Modelle des Coins (wenige) nach Phase filtern und einsortieren
+        matches = [
+            (position, model_config) for position, model_config, phases in whitelisted
+            if phases is None or (phase_id is not None and phase_id in phases)
+        ]
+        if not matches:
+            return list(candidates)
+        if not candidates:
+            return [m for _, m in matches]
+        merged = [(self.positions[id(m)], m) for m in candidates] + matches
+        return [m for _, m in sorted(merged, key=lambda e: e[0])]
@@ -0,0 +1,216 @@
+"""
+Hintergrund-Scheduler für Pump Server
+
+Auswertung, ATH-Tracking, Alert-Evaluator und Watchdog liefen als eigene Loops mit festen
+Sleeps und teilten sich den DB-Pool ungebremst mit dem Prediction-Hot-Path. Der Scheduler
+besitzt jetzt alle Hintergrund-Jobs:
+
+- Adaptives Intervall: voller Batch → sofort weiter (Rückstand abbauen), etwas Arbeit →
+  normales Intervall, nichts zu tun → Intervall schrittweise verlängern
+- DB-Budget: Jobs erhalten einen BudgetedPool, der höchstens BACKGROUND_DB_SLOTS Verbindungen
+  gleichzeitig nutzt (Anteil BACKGROUND_DB_POOL_SHARE des Pools)
+- Vorrang für den Hot-Path: ist der Ingestion-Puffer tiefer als BACKGROUND_YIELD_QUEUE_DEPTH,
+  warten Jobs - höchstens BACKGROUND_MAX_DEFER_SECONDS, damit sie nicht verhungern
+- Leader-Jobs laufen nur auf dem gewählten Knoten (siehe leadership.py)
+"""
+import asyncio
+import contextlib
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+import asyncpg
+from app.prediction.leadership import get_leader_election
+from app.utils.config import (
+    BACKGROUND_DB_SLOTS, BACKGROUND_YIELD_QUEUE_DEPTH, BACKGROUND_MAX_DEFER_SECONDS,
+    BACKGROUND_IDLE_BACKOFF_FACTOR
+)
+from app.utils.logging_config import get_logger
+from app.utils.metrics import (
+    ml_background_job_duration_seconds, ml_background_job_backlog, ml_background_job_lag_seconds,
+    ml_background_job_deferred_total, ml_background_db_connections
+)
+
+logger = get_logger(__name__)
+
+# Prüfintervall, solange ein Job dem Hot-Path den Vortritt lässt
+_YIELD_POLL_SECONDS = 1.0
+
+
+class BudgetedPool:
+    """Pool-Zugriff mit begrenzter Anzahl gleichzeitig genutzter Verbindungen (für Hintergrund-Jobs)"""
+
+    def __init__(self, pool: asyncpg.Pool, slots: int):
+        self.pool = pool
+        self.slots = slots
+        self._semaphore = asyncio.Semaphore(slots)
+
+    @contextlib.asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        async with self._semaphore:
+            ml_background_db_connections.inc()
+            try:
+                yield
+            finally:
+                ml_background_db_connections.dec()
+
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        async with self._slot():
+            async with self.pool.acquire() as conn:
+                yield conn
+
+    async def fetch(self, *args, **kwargs):
+        async with self._slot():
+            return await self.pool.fetch(*args, **kwargs)
+
+    async def fetchrow(self, *args, **kwargs):
+        async with self._slot():
+            return await self.pool.fetchrow(*args, **kwargs)
+
+    async def fetchval(self, *args, **kwargs):
+        async with self._slot():
+            return await self.pool.fetchval(*args, **kwargs)
+
+    async def execute(self, *args, **kwargs):
+        async with self._slot():
+            return await self.pool.execute(*args, **kwargs)
+
+    async def executemany(self, *args, **kwargs):
+        async with self._slot():
+            return await self.pool.executemany(*args, **kwargs)
+
+
+class BackgroundJob:
+    """
+    Periodischer Hintergrund-Job.
+
+    run(pool) gibt die Anzahl gefundener/verarbeiteter Einträge zurück - daran wird das
+    nächste Intervall ausgerichtet (>= batch_size gilt als Rückstand).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[Optional[BudgetedPool]], Awaitable[int]],
+        interval: float,
+        batch_size: Optional[int] = None,
+        min_interval: float = 0.0,
+        max_interval: Optional[float] = None,
+        leader_job: Optional[str] = None,
+        uses_db: bool = True,
+        yields: bool = True,
+        initial_delay: float = 5.0
+    ):
+        self.name = name
+        self.run = run
+        self.interval = interval
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self.max_interval = max_interval if max_interval is not None else interval * BACKGROUND_IDLE_BACKOFF_FACTOR
+        self.leader_job = leader_job
+        self.uses_db = uses_db
+        self.yields = yields
+        self.initial_delay = initial_delay
+
+    def next_delay(self, processed: Optional[int], previous: float) -> float:
+        if processed is None:
+            return self.interval  # Fehler - normales Intervall
+        if self.batch_size and processed >= self.batch_size:
+            return self.min_interval  # Voller Batch - Rückstand sofort weiter abbauen
+        if processed > 0:
+            return self.interval
+        return min(self.max_interval, max(self.interval, previous * 2))
+
+
+class BackgroundScheduler:
+    """Besitzt alle Hintergrund-Jobs eines Prozesses"""
+
+    def __init__(self, db_slots: int = BACKGROUND_DB_SLOTS):
+        self.db_slots = db_slots
+        self.jobs: Dict[str, BackgroundJob] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.pool: Optional[BudgetedPool] = None
+        self.running = False
+        # Tiefe der Hot-Path-Warteschlange (vom Event-Handler gesetzt)
+        self.hot_path_depth: Callable[[], int] = lambda: 0
+
+    def register(self, job: BackgroundJob):
+        if job.name in self.jobs:
+            logger.warning(f"⚠️ Hintergrund-Job '{job.name}' bereits registriert")
+            return
+        self.jobs[job.name] = job
+        if self.running:
+            self.tasks[job.name] = asyncio.create_task(self._run_job(job))
+
+    def set_hot_path_depth(self, depth: Callable[[], int]):
+        self.hot_path_depth = depth
+
+    def start(self, pool: asyncpg.Pool):
+        """Startet alle registrierten (und später registrierten) Jobs"""
+        if self.running:
+            return
+        self.running = True
+        self.pool = BudgetedPool(pool, self.db_slots)
+        logger.info(f"🗓️ Hintergrund-Scheduler gestartet ({len(self.jobs)} Jobs, DB-Budget: {self.db_slots} Verbindungen)")
+        for job in self.jobs.values():
+            self.tasks[job.name] = asyncio.create_task(self._run_job(job))
+
+    async def stop(self):
+        self.running = False
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
+
+    async def _yield_to_hot_path(self, job: BackgroundJob):
+        """Wartet, solange der Hot-Path Rückstand hat (höchstens BACKGROUND_MAX_DEFER_SECONDS)"""
+        depth = self.hot_path_depth()
+        if depth <= BACKGROUND_YIELD_QUEUE_DEPTH:
+            return
+        ml_background_job_deferred_total.labels(job=job.name).inc()
+        logger.debug(f"⏸️ Job '{job.name}' wartet auf den Hot-Path ({depth} Coins im Puffer)")
+        deadline = time.monotonic() + BACKGROUND_MAX_DEFER_SECONDS
+        while self.running and self.hot_path_depth() > BACKGROUND_YIELD_QUEUE_DEPTH:
+            if time.monotonic() >= deadline:
+                logger.warning(f"⚠️ Job '{job.name}' läuft trotz Rückstand im Hot-Path (seit {BACKGROUND_MAX_DEFER_SECONDS:.0f}s verschoben)")
+                return
+            await asyncio.sleep(_YIELD_POLL_SECONDS)
+
+    async def _run_job(self, job: BackgroundJob):
+        logger.info(f"🔄 Hintergrund-Job '{job.name}' gestartet (Intervall: {job.interval:.0f}s)")
+        await asyncio.sleep(job.initial_delay)  # Kurze Verzögerung beim Start
+        leader_election = get_leader_election()
+        delay = job.interval
+        due = time.monotonic()
+        while self.running:
+            if job.leader_job and not leader_election.is_leader(job.leader_job):
+                # Nur ein Knoten führt den Job aus (Advisory-Lock + Lease)
+                if not await leader_election.wait_for_leadership(job.leader_job, lambda: self.running):
+                    break
+                due = time.monotonic()
+            if job.yields:
+                await self._yield_to_hot_path(job)
+
+            started = time.monotonic()
+            ml_background_job_lag_seconds.labels(job=job.name).set(max(0.0, started - due))
+            processed: Optional[int] = None
+            try:
+                processed = await job.run(self.pool if job.uses_db else None)
+                ml_background_job_backlog.labels(job=job.name).set(processed)
+            except Exception as e:
+                logger.error(f"❌ Fehler im Hintergrund-Job '{job.name}': {e}", exc_info=True)
+            ml_background_job_duration_seconds.labels(job=job.name).observe(time.monotonic() - started)
+
+            delay = job.next_delay(processed, delay)
+            due = time.monotonic() + delay
+            await asyncio.sleep(delay)
+
+
+# Globale Instanz (pro Prozess)
+_background_scheduler: Optional[BackgroundScheduler] = None
+
+
+def get_background_scheduler() -> BackgroundScheduler:
+    """Gibt die prozessweite BackgroundScheduler-Instanz zurück"""
+    global _background_scheduler
+    if _background_scheduler is None:
+        _background_scheduler = BackgroundScheduler()
+    return _background_scheduler
@@ -0,0 +1,792 @@
+"""
+Inkrementelle Streaming-Features für Pump Server
+
+Hält pro Coin (und Phasen-Filter) einen kleinen Zustand statt bei jeder Vorhersage
+bis zu FEATURE_HISTORY_SIZE Zeilen zu laden und create_pump_detection_features
+komplett neu zu rechnen:
+- Ring-Buffer der letzten Zeilen (O(Window) Speicher)
+- Laufende Summen/Zähler pro Spalte und Window (neuer Wert rein, herausfallender raus)
+- Laufendes ATH, dev_sold_cumsum, erster/letzter ATH-Breakout, erster Timestamp
+
+Jede neue coin_metrics-Zeile aktualisiert den Zustand in O(Anzahl Windows), unabhängig
+von der Buffer-Größe. Der neueste Feature-Vektor wird direkt aus den laufenden
+Aggregaten erzeugt - mit GLEICHER Logik wie create_pump_detection_features (letzte Zeile).
+
+Modi (STREAMING_FEATURES_MODE):
+- "off": nur pandas-Pfad
+- "parity": pandas-Pfad wird verwendet, Streaming läuft mit und wird verglichen
+- "on": nur Streaming-Pfad
+"""
+import asyncio
+import math
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import asyncpg
+import pandas as pd
+from app.database.connection import get_pool
+from app.database.models import get_coin_history_prefix
+from app.utils.config import (
+    BOUNDED_HISTORY_QUERIES, STREAMING_FEATURES_MODE, STREAMING_FEATURES_MAX_COINS,
+    STREAMING_FEATURES_PARITY_RTOL, STREAMING_FEATURES_PARITY_ATOL
+)
+from app.utils.logging_config import get_logger
+from app.utils.metrics import ml_streaming_feature_parity_total, ml_streaming_feature_states
+
+logger = get_logger(__name__)
+
+NAN = float('nan')
+
+# Minimale Buffer-Größe (deckt die Standard-Windows [5, 10, 15] inkl. Shift 2*w ab)
+MIN_BUFFER_ROWS = 32
+
+# Spalten, deren Verlauf im Ring-Buffer gehalten wird (alles andere braucht nur die letzte Zeile)
+_BUFFER_COLUMNS = (
+    'price_close', 'market_cap_close', 'volume_sol', 'dev_sold_amount',
+    'buy_pressure_ratio', 'whale_buy_volume_sol', 'whale_sell_volume_sol',
+    'volatility_pct', 'unique_signer_ratio', 'net_volume_sol',
+)
+
+# Features, die von der GESAMTEN Historie abhängen (pandas-Pfad sieht nur FEATURE_HISTORY_SIZE Zeilen)
+CUMULATIVE_FEATURES = frozenset({
+    'rolling_ath', 'prev_rolling_ath', 'ath_distance_pct', 'ath_breakout',
+    'minutes_since_ath', 'ath_age_hours', 'ath_is_recent', 'ath_is_old',
+    'dev_sold_cumsum', 'coin_age_minutes',
+})
+_CUMULATIVE_PREFIXES = (
+    'ath_distance_trend_', 'ath_approach_', 'ath_breakout_count_',
+    'ath_breakout_volume_ma_', 'ath_age_trend_',
+)
+
+
+def _to_float(value: Any) -> float:
+    """Konvertiert DB-Werte (Decimal, int, bool, None) zu float (None -> NaN)"""
+    if value is None:
+        return NAN
+    if isinstance(value, float):
+        return value
+    if isinstance(value, (int, Decimal, bool)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
+
+
+def _isnan(value: float) -> bool:
+    return value != value
+
+
+def _fill0(value: float) -> float:
+    return 0.0 if _isnan(value) else value
+
+
+def _div(a: float, b: float) -> float:
+    """Division mit NumPy-Semantik (x/0 -> ±inf, 0/0 -> NaN)"""
+    if _isnan(a) or _isnan(b):
+        return NAN
+    if b == 0:
+        if a == 0:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def _gt(a: float, b: float) -> int:
+    """Vergleich mit pandas-Semantik (NaN -> False)"""
+    return int(not _isnan(a) and not _isnan(b) and a > b)
+
+
+def _sign(value: float) -> float:
+    if _isnan(value):
+        return NAN
+    return float((value > 0) - (value < 0))
+
+
+_MICROSECOND = timedelta(microseconds=1)
+
+# Spalten mit laufenden Window-Aggregaten -> NaN als 0 behandeln (fillna(0) im pandas-Pfad)
+_WINDOW_SERIES = {
+    'dev_sold_amount': True,
+    'buy_pressure_ratio': True,
+    'whale_buy_volume_sol': True,
+    'whale_sell_volume_sol': True,
+    'volatility_pct': False,
+    'unique_signer_ratio': False,
+    'net_volume_sol': False,
+    'volume_sol': False,
+    'ath_distance_pct': False,
+    'ath_breakout': False,
+    'ath_breakout_volume': False,
+}
+
+
+class _RunningWindow:
+    """
+    Laufende Summe der letzten `size` Werte einer Spalte: pro Zeile kommt ein Wert hinzu,
+    der herausfallende wird abgezogen (O(1)). Rechnet wie pandas rolling(min_periods=1):
+    NaN zählt nicht, Kahan-Summation, Vorzeichen-Korrektur über die Anzahl negativer Werte
+    und exakter Wert bei konstantem Window - sonst kippen Vergleiche wie x > 2 * mean bei
+    Rundungsresten. ±inf wird getrennt gezählt, damit inf - inf nicht die Summe zerstört.
+    Alle `size` Zeilen wird die Summe neu gebildet - Rundungsfehler wachsen nicht unbegrenzt.
+    """
+
+    __slots__ = (
+        'values', 'total', 'compensation', 'valid', 'negative', 'pos_inf', 'neg_inf',
+        'same_count', 'previous_value', 'previous_mean', 'pushes'
+    )
+
+    def __init__(self, size: int):
+        self.values: Deque[float] = deque(maxlen=size)
+        self.same_count = 0
+        self.previous_value = NAN
+        self.previous_mean = NAN
+        self._resync()
+
+    def _resync(self):
+        self.total = 0.0
+        self.compensation = 0.0
+        self.valid = 0
+        self.negative = 0
+        self.pos_inf = 0
+        self.neg_inf = 0
+        self.pushes = 0
+        for value in self.values:
+            self._account(value, 1)
+
+    def _account(self, value: float, sign: int):
+        if _isnan(value):
+            return
+        if value == math.inf:
+            self.pos_inf += sign
+        elif value == -math.inf:
+            self.neg_inf += sign
+        else:
+            y = sign * value - self.compensation
+            t = self.total + y
+            self.compensation = t - self.total - y
+            self.total = t
+        if math.copysign(1.0, value) < 0:
+            self.negative += sign
+        self.valid += sign
+
+    def _track_same(self, value: float):
+        if _isnan(value):
+            return
+        self.same_count = self.same_count + 1 if value == self.previous_value else 1
+        self.previous_value = value
+
+    def push(self, value: float):
+        self.previous_mean = self.mean()
+        if len(self.values) == self.values.maxlen:
+            self._account(self.values[0], -1)
+        self.values.append(value)
+        self._account(value, 1)
+        self._track_same(value)
+        self.pushes += 1
+        if self.pushes >= self.values.maxlen:
+            self._resync()
+
+    def _infinite(self) -> Optional[float]:
+        if self.pos_inf and self.neg_inf:
+            return NAN
+        if self.pos_inf:
+            return math.inf
+        if self.neg_inf:
+            return -math.inf
+        return None
+
+    def sum(self) -> float:
+        """Summe der gültigen Werte (wie rolling(min_periods=1).sum(), NaN bei leerem Window)"""
+        if self.valid == 0:
+            return NAN
+        infinite = self._infinite()
+        if infinite is not None:
+            return infinite
+        if self.same_count >= self.valid:
+            return self.previous_value * self.valid
+        return self.total
+
+    def mean(self) -> float:
+        """Rolling-Mean mit min_periods=1 (NaN bei leerem Window)"""
+        if self.valid == 0:
+            return NAN
+        infinite = self._infinite()
+        if infinite is not None:
+            return infinite
+        if self.same_count >= self.valid:
+            return self.previous_value
+        result = self.total / self.valid
+        if self.negative == 0 and result < 0:
+            return 0.0
+        if self.negative == self.valid and result > 0:
+            return 0.0
+        return result
+
+
+class _AthAgeWindow:
+    """
+    Laufender Mittelwert von minutes_since_ath über die letzten `size` Zeilen.
+
+    Zeilen ab dem ersten Breakout zählen relativ zum (sich ändernden) letzten Breakout,
+    ältere relativ zum ersten Timestamp - daher getrennte, exakte Summen in Mikrosekunden.
+    """
+
+    __slots__ = ('rows', 'after_sum', 'after_count', 'before_sum', 'before_count')
+
+    def __init__(self, size: int, rows: List[Tuple[int, bool]] = ()):
+        self.rows: Deque[Tuple[int, bool]] = deque(maxlen=size)
+        self.after_sum = self.after_count = self.before_sum = self.before_count = 0
+        for offset, after in rows:
+            self.push(offset, after)
+
+    def _account(self, offset: int, after: bool, sign: int):
+        if after:
+            self.after_sum += sign * offset
+            self.after_count += sign
+        else:
+            self.before_sum += sign * offset
+            self.before_count += sign
+
+    def push(self, offset: int, after: bool):
+        if len(self.rows) == self.rows.maxlen:
+            self._account(*self.rows[0], -1)
+        self.rows.append((offset, after))
+        self._account(offset, after, 1)
+
+    def mean(self, last_breakout: Optional[int]) -> float:
+        count = self.after_count + self.before_count
+        if count == 0:
+            return NAN
+        micros = self.before_sum  # relativ zum ersten Timestamp (Offset 0)
+        if self.after_count:
+            micros += self.after_sum - self.after_count * last_breakout
+        return micros / 60_000_000 / count
+
+
+def _at(buffer: Deque[float], offset: int) -> float:
+    """Wert offset Zeilen vor der letzten Zeile (shift(offset)), NaN falls nicht vorhanden"""
+    if offset >= len(buffer):
+        return NAN
+    return buffer[-1 - offset]
+
+
+def _is_cumulative(feature: str) -> bool:
+    return feature in CUMULATIVE_FEATURES or feature.startswith(_CUMULATIVE_PREFIXES)
+
+
+class CoinFeatureState:
+    """
+    Streaming-Zustand eines Coins für einen Phasen-Filter.
+
+    Hält nur die letzten `capacity` Zeilen plus laufende Aggregate.
+    """
+
+    def __init__(self, coin_id: str, phases_key: Tuple[int, ...], capacity: int):
+        self.coin_id = coin_id
+        self.phases_key = phases_key
+        self.capacity = capacity
+        self.lock = asyncio.Lock()
+        self.rows_seen = 0
+        self.first_ts: Optional[datetime] = None
+        self.last_ts: Optional[datetime] = None
+        self.last_row: Dict[str, Any] = {}
+        self.columns: frozenset = frozenset()
+        self.has_ath = False
+        # Laufende Aggregate (gesamte Historie)
+        self.ath = NAN
+        self.prev_row_rolling_ath = NAN
+        self.dev_sold_cumsum = 0.0
+        self.first_breakout_ts: Optional[datetime] = None
+        self.last_breakout_ts: Optional[datetime] = None
+        # True wenn der Bootstrap ältere Zeilen abgeschnitten hat (kumulative Werte unvollständig)
+        self.truncated = False
+        # Ring-Buffer
+        self.timestamps: Deque[datetime] = deque(maxlen=capacity)
+        self.buffers: Dict[str, Deque[float]] = {}
+        self._reset_buffers()
+        # Laufende Window-Aggregate: (Spalte, Window) -> Summe/Zähler, Window -> ATH-Alter
+        self.windows: Dict[Tuple[str, int], _RunningWindow] = {}
+        self.age_windows: Dict[int, _AthAgeWindow] = {}
+        self.window_sizes: Tuple[int, ...] = ()
+
+    def _reset_buffers(self):
+        self.timestamps = deque(self.timestamps, maxlen=self.capacity)
+        names = list(_BUFFER_COLUMNS) + ['ath_distance_pct', 'ath_breakout', 'rolling_ath', 'ath_breakout_volume']
+        self.buffers = {
+            name: deque(self.buffers.get(name, ()), maxlen=self.capacity)
+            for name in names
+        }
+
+    def covers(self, required_rows: int) -> bool:
+        """Prüft ob der Buffer genug Zeilen für die angefragten Windows hält"""
+        return self.capacity >= required_rows or self.rows_seen <= self.capacity
+
+    def ensure_capacity(self, required_rows: int):
+        """Vergrößert den Buffer (nur sinnvoll solange noch keine Zeile verdrängt wurde)"""
+        if required_rows > self.capacity:
+            self.capacity = required_rows
+            self._reset_buffers()
+
+    def _window_value(self, series: str, value: float) -> float:
+        return _fill0(value) if _WINDOW_SERIES[series] else value
+
+    def _age_row(self, ts: datetime) -> Tuple[int, bool]:
+        """(Mikrosekunden seit dem ersten Timestamp, Zeile liegt ab dem ersten Breakout)"""
+        after = self.first_breakout_ts is not None and ts >= self.first_breakout_ts
+        return (ts - self.first_ts) // _MICROSECOND, after
+
+    def ensure_windows(self, window_sizes: List[int]):
+        """
+        Legt laufende Aggregate für neue Windows an - einmalig aus dem Ring-Buffer,
+        danach aktualisiert ingest sie pro Zeile.
+        """
+        sizes = tuple(sorted(set(window_sizes)))
+        if set(sizes) <= set(self.window_sizes):
+            return
+        for w in sizes:
+            specs = [(series, w) for series in _WINDOW_SERIES]
+            specs.append(('volume_sol', 2 * w))
+            for series, size in specs:
+                if (series, size) not in self.windows:
+                    # Eine Zeile mehr als das Window - previous_mean gilt dann schon für die vorletzte Zeile
+                    window = _RunningWindow(size)
+                    for value in list(self.buffers[series])[-size - 1:]:
+                        window.push(self._window_value(series, value))
+                    self.windows[(series, size)] = window
+            if w not in self.age_windows:
+                self.age_windows[w] = _AthAgeWindow(w, [self._age_row(ts) for ts in list(self.timestamps)[-w:]])
+        self.window_sizes = tuple(sorted(set(self.window_sizes) | set(sizes)))
+
+    def seed(self, prefix: Dict[str, Any]):
+        """
+        Übernimmt das Aggregat der Historie VOR dem ersten Buffer-Eintrag
+        (get_coin_history_prefix) - ATH, dev_sold-Summe und erster Timestamp
+        gelten damit für die gesamte Historie.
+        """
+        self.first_ts = prefix['first_ts']
+        self.rows_seen = prefix['row_count']
+        self.dev_sold_cumsum = prefix['dev_sold_sum']
+        if prefix.get('ath') is not None:
+            self.ath = prefix['ath']
+            self.prev_row_rolling_ath = prefix['ath']
+            ath_ts = prefix.get('ath_ts')
+            if ath_ts is not None and ath_ts > self.first_ts:
+                # Erstes Erreichen des Prefix-ATH = letzter Breakout vor dem Buffer
+                self.first_breakout_ts = ath_ts
+                self.last_breakout_ts = ath_ts
+
+    def ingest(self, row: Dict[str, Any]):
+        """Übernimmt eine neue coin_metrics-Zeile (O(1))"""
+        ts = row['timestamp']
+        if self.last_ts is not None and ts <= self.last_ts:
+            return
+
+        if not self.columns:
+            self.columns = frozenset(k for k in row.keys() if k not in ('timestamp',))
+            self.has_ath = (
+                'price_high' in self.columns and 'price_close' in self.columns
+                and 'rolling_ath' not in self.columns
+            )
+
+        if self.first_ts is None:
+            self.first_ts = ts
+        self.last_ts = ts
+        self.rows_seen += 1
+        self.last_row = {k: v for k, v in row.items() if k != 'timestamp'}
+        self.timestamps.append(ts)
+
+        for name in _BUFFER_COLUMNS:
+            self.buffers[name].append(_to_float(row.get(name)))
+
+        # ATH (cummax überspringt NaN, NaN-Positionen bleiben NaN)
+        if self.has_ath:
+            price_high = _to_float(row.get('price_high'))
+            price_close = _to_float(row.get('price_close'))
+            if _isnan(price_high):
+                rolling_ath = NAN
+            else:
+                self.ath = price_high if _isnan(self.ath) else max(self.ath, price_high)
+                rolling_ath = self.ath
+
+            breakout = _gt(price_high, self.prev_row_rolling_ath)
+            if breakout:
+                if self.first_breakout_ts is None:
+                    self.first_breakout_ts = ts
+                self.last_breakout_ts = ts
+            self.prev_row_rolling_ath = rolling_ath
+
+            ath_distance = _div(rolling_ath - price_close, rolling_ath) * 100
+            if _isnan(ath_distance):
+                ath_distance = 100.0
+            self.buffers['rolling_ath'].append(rolling_ath)
+            self.buffers['ath_breakout'].append(float(breakout))
+            self.buffers['ath_distance_pct'].append(ath_distance)
+            self.buffers['ath_breakout_volume'].append(breakout * self.buffers['volume_sol'][-1])
+
+        self.dev_sold_cumsum += _fill0(_to_float(row.get('dev_sold_amount')))
+
+        # Laufende Window-Aggregate (O(1) pro Window)
+        for (series, _), window in self.windows.items():
+            buffer = self.buffers[series]
+            if buffer:
+                window.push(self._window_value(series, buffer[-1]))
+        if self.age_windows:
+            age_row = self._age_row(ts)
+            for window in self.age_windows.values():
+                window.push(*age_row)
+
+    def _minutes_since_ath(self, ts: datetime) -> float:
+        """GLEICHE Logik wie add_ath_features (letzter Breakout gilt für alle Zeilen danach)"""
+        if self.last_breakout_ts is not None and ts >= self.first_breakout_ts:
+            return (ts - self.last_breakout_ts).total_seconds() / 60
+        return (ts - self.first_ts).total_seconds() / 60
+
+    def emit(self, window_sizes: List[int], include_flags: bool = False) -> Dict[str, Any]:
+        """
+        Erzeugt den neuesten Feature-Vektor (entspricht der letzten Zeile von
+        create_pump_detection_features).
+        """
+        if self.last_ts is None:
+            raise ValueError(f"Keine Daten für Coin {self.coin_id} gefunden")
+
+        cols = self.columns
+        out: Dict[str, Any] = {}
+        for key, value in self.last_row.items():
+            out[key] = value if isinstance(value, str) else _to_float(value)
+
+        self.ensure_windows(window_sizes)
+        b = self.buffers
+        win = self.windows
+
+        coin_age = (self.last_ts - self.first_ts).total_seconds() / 60
+        if include_flags:
+            out['coin_age_minutes'] = coin_age
+
+        def flag(name: str, window: int):
+            if include_flags:
+                out[f'{name}_has_data'] = int(coin_age >= window)
+
+        if self.has_ath:
+            minutes = self._minutes_since_ath(self.last_ts)
+            out['rolling_ath'] = b['rolling_ath'][-1]
+            out['ath_distance_pct'] = b['ath_distance_pct'][-1]
+            out['prev_rolling_ath'] = _at(b['rolling_ath'], 1)
+            out['ath_breakout'] = int(b['ath_breakout'][-1])
+            out['minutes_since_ath'] = minutes
+            out['ath_age_hours'] = minutes / 60.0
+            out['ath_is_recent'] = int(minutes < 60)
+            out['ath_is_old'] = int(minutes > 1440)
+
+        if 'dev_sold_amount' in cols:
+            dev = b['dev_sold_amount']
+            dev_last = _fill0(dev[-1])
+            out['dev_sold_flag'] = int(dev_last > 0)
+            out['dev_sold_cumsum'] = self.dev_sold_cumsum
+            for w in window_sizes:
+                mean = win[('dev_sold_amount', w)].mean()
+                out[f'dev_sold_spike_{w}'] = _gt(dev_last, mean * 2)
+                flag(f'dev_sold_spike_{w}', w)
+
+        if 'buy_pressure_ratio' in cols:
+            bp = b['buy_pressure_ratio']
+            for w in window_sizes:
+                ma = win[('buy_pressure_ratio', w)].mean()
+                out[f'buy_pressure_ma_{w}'] = ma
+                out[f'buy_pressure_trend_{w}'] = bp[-1] - ma
+                flag(f'buy_pressure_ma_{w}', w)
+                flag(f'buy_pressure_trend_{w}', w)
+
+        if 'whale_buy_volume_sol' in cols and 'whale_sell_volume_sol' in cols:
+            wb, ws = b['whale_buy_volume_sol'], b['whale_sell_volume_sol']
+            out['whale_net_volume'] = _fill0(wb[-1]) - _fill0(ws[-1])
+            for w in window_sizes:
+                out[f'whale_activity_{w}'] = win[('whale_buy_volume_sol', w)].sum() + win[('whale_sell_volume_sol', w)].sum()
+                flag(f'whale_activity_{w}', w)
+            if 'volume_sol' in cols and 'whale_dominance' not in cols:
+                dominance = _div(_fill0(wb[-1]) + _fill0(ws[-1]), b['volume_sol'][-1] + 0.001)
+                out['whale_dominance'] = _fill0(dominance)
+
+        if 'num_buys' in cols and 'num_sells' in cols:
+            ratio = _div(_to_float(self.last_row.get('num_buys')), _to_float(self.last_row.get('num_sells')) + 1)
+            out['buy_sell_ratio'] = 1.0 if _isnan(ratio) else ratio
+
+        if 'volatility_pct' in cols:
+            vol_pct = b['volatility_pct']
+            for w in window_sizes:
+                ma = win[('volatility_pct', w)].mean()
+                out[f'volatility_ma_{w}'] = ma
+                out[f'volatility_spike_{w}'] = _gt(vol_pct[-1], ma * 1.5)
+                flag(f'volatility_ma_{w}', w)
+                flag(f'volatility_spike_{w}', w)
+
+        if 'unique_signer_ratio' in cols:
+            for w in window_sizes:
+                out[f'wash_trading_flag_{w}'] = _gt(0.3, win[('unique_signer_ratio', w)].mean())
+                flag(f'wash_trading_flag_{w}', w)
+
+        if 'net_volume_sol' in cols:
+            nv = b['net_volume_sol']
+            for w in window_sizes:
+                out[f'net_volume_ma_{w}'] = win[('net_volume_sol', w)].mean()
+                current, previous = _sign(nv[-1]), _sign(_at(nv, w))
+                # NaN != x ist in pandas immer True
+                out[f'volume_flip_{w}'] = int(_isnan(current) or _isnan(previous) or current != previous)
+                flag(f'net_volume_ma_{w}', w)
+                flag(f'volume_flip_{w}', w)
+
+        if 'price_close' in cols:
+            pc = b['price_close']
+            for w in window_sizes:
+                change = pc[-1] - _at(pc, w)
+                previous = _at(pc, w)
+                out[f'price_change_{w}'] = change
+                out[f'price_roc_{w}'] = _div(change, NAN if previous == 0 else previous) * 100
+                out[f'price_acceleration_{w}'] = change - (previous - _at(pc, 2 * w))
+                flag(f'price_change_{w}', w)
+                flag(f'price_roc_{w}', w)
+                flag(f'price_acceleration_{w}', w)
+
+        if 'volume_sol' in cols:
+            vol = b['volume_sol']
+            for w in window_sizes:
+                avg = win[('volume_sol', w)].mean()
+                out[f'volume_ratio_{w}'] = _div(vol[-1], NAN if avg == 0 else avg)
+                out[f'volume_spike_{w}'] = _gt(vol[-1], win[('volume_sol', w * 2)].mean() * 2)
+                if include_flags:
+                    out[f'volume_ratio_{w}_has_data'] = int(coin_age >= w)
+                    out[f'volume_spike_{w}_has_data'] = int(coin_age >= w * 2)
+
+        if 'market_cap_close' in cols:
+            mc = b['market_cap_close']
+            for w in window_sizes:
+                out[f'mcap_velocity_{w}'] = mc[-1] - _at(mc, w)
+                flag(f'mcap_velocity_{w}', w)
+
+        if self.has_ath:
+            last_breakout = None
+            if self.last_breakout_ts is not None:
+                last_breakout = (self.last_breakout_ts - self.first_ts) // _MICROSECOND
+            for w in window_sizes:
+                trend = win[('ath_distance_pct', w)].mean()
+                # Rolling-Mean der vorherigen Zeile (diff() < 0 im pandas-Pfad)
+                previous_trend = win[('ath_distance_pct', w)].previous_mean
+                out[f'ath_distance_trend_{w}'] = trend
+                out[f'ath_approach_{w}'] = _gt(previous_trend, trend)
+                out[f'ath_breakout_count_{w}'] = win[('ath_breakout', w)].sum()
+                if 'volume_sol' in cols:
+                    out[f'ath_breakout_volume_ma_{w}'] = win[('ath_breakout_volume', w)].mean()
+                    flag(f'ath_breakout_volume_ma_{w}', w)
+                flag(f'ath_distance_trend_{w}', w)
+                flag(f'ath_approach_{w}', w)
+                flag(f'ath_breakout_count_{w}', w)
+
+            for w in window_sizes:
+                out[f'ath_age_trend_{w}'] = self.age_windows[w].mean(last_breakout)
+                flag(f'ath_age_trend_{w}', w)
+
+        # NaN/inf behandeln (wie im Training Service)
+        for key, value in out.items():
+            if isinstance(value, float) and (_isnan(value) or math.isinf(value)):
+                out[key] = 0.0
+        return out
+
+    def latest_frame(self) -> pd.DataFrame:
+        """Neueste Basis-Zeile als 1-Zeilen-DataFrame (gleiches Format wie get_coin_history_for_prediction)"""
+        if self.last_ts is None:
+            return pd.DataFrame()
+        values = {k: (v if isinstance(v, str) else _to_float(v)) for k, v in self.last_row.items()}
+        return pd.DataFrame([values], index=pd.DatetimeIndex([self.last_ts], name='timestamp'))
+
+    def features_frame(self, window_sizes: List[int], include_flags: bool = False) -> pd.DataFrame:
+        """Neuester Feature-Vektor als 1-Zeilen-DataFrame"""
+        return pd.DataFrame(
+            [self.emit(window_sizes, include_flags)],
+            index=pd.DatetimeIndex([self.last_ts], name='timestamp')
+        )
+
+
+def required_rows(window_sizes: List[int]) -> int:
+    """Benötigte Buffer-Zeilen für die Windows (price_acceleration braucht shift(2*w))"""
+    max_window = max(window_sizes) if window_sizes else 0
+    return max(MIN_BUFFER_ROWS, 2 * max_window + 1)
+
+
+class StreamingFeatureEngine:
+    """
+    Verwaltet die Streaming-Zustände aller Coins (LRU, max. STREAMING_FEATURES_MAX_COINS).
+
+    Neue Zeilen werden beim Abruf per Delta-Query (timestamp > letzter Stand) nachgeladen.
+    """
+
+    def __init__(self, max_coins: int = STREAMING_FEATURES_MAX_COINS, bootstrap_rows: int = 1000):
+        self.max_coins = max_coins
+        self.bootstrap_rows = bootstrap_rows
+        self.states: "OrderedDict[Tuple[str, Tuple[int, ...]], CoinFeatureState]" = OrderedDict()
+
+    async def get_state(
+        self,
+        coin_id: str,
+        phases_key: Tuple[int, ...],
+        window_sizes: Optional[List[int]] = None,
+        pool: Optional[asyncpg.Pool] = None
+    ) -> CoinFeatureState:
+        """Holt den synchronisierten Zustand eines Coins (Bootstrap beim ersten Zugriff)"""
+        if pool is None:
+            pool = await get_pool()
+
+        rows_needed = required_rows(window_sizes or [])
+        key = (coin_id, phases_key)
+        state = self.states.get(key)
+        if state is not None and not state.covers(rows_needed):
+            # Buffer zu klein und bereits Zeilen verdrängt - neu aufbauen
+            logger.debug(f"🔁 Streaming-Zustand für {coin_id[:8]}... wird für {rows_needed} Zeilen neu aufgebaut")
+            state = None
+
+        if state is None:
+            state = CoinFeatureState(coin_id, phases_key, capacity=rows_needed)
+            self.states[key] = state
+            self._evict()
+        else:
+            self.states.move_to_end(key)
+            state.ensure_capacity(rows_needed)
+
+        async with state.lock:
+            if state.last_ts is None:
+                rows, prefix = await self._fetch_bootstrap(pool, coin_id, phases_key, state.capacity)
+                if prefix is not None:
+                    state.seed(prefix)
+                elif len(rows) >= self.bootstrap_rows:
+                    state.truncated = True
+            else:
+                rows = await self._fetch_delta(pool, coin_id, phases_key, state.last_ts)
+            for row in rows:
+                state.ingest(dict(row))
+        return state
+
+    def _evict(self):
+        while len(self.states) > self.max_coins:
+            self.states.popitem(last=False)
+        ml_streaming_feature_states.set(len(self.states))
+
+    async def _fetch_bootstrap(self, pool: asyncpg.Pool, coin_id: str, phases_key: Tuple[int, ...], capacity: int):
+        """
+        Lädt die Startzeilen eines Zustands.
+
+        Mit BOUNDED_HISTORY_QUERIES nur `capacity` Zeilen plus Aggregat der älteren
+        Historie, sonst die letzten bootstrap_rows Zeilen.
+        """
+        limit = capacity if BOUNDED_HISTORY_QUERIES else self.bootstrap_rows
+        if phases_key:
+            rows = await pool.fetch("""
+                SELECT * FROM coin_metrics
+                WHERE mint = $1
+                  AND phase_id_at_time = ANY($2::int[])
+                ORDER BY timestamp DESC
+                LIMIT $3
+            """, coin_id, list(phases_key), limit)
+        else:
+            rows = await pool.fetch("""
+                SELECT * FROM coin_metrics
+                WHERE mint = $1
+                ORDER BY timestamp DESC
+                LIMIT $2
+            """, coin_id, limit)
+
+        prefix = None
+        if BOUNDED_HISTORY_QUERIES and rows and len(rows) >= limit:
+            prefix = await get_coin_history_prefix(
+                coin_id, rows[-1]['timestamp'], phases=list(phases_key) or None, pool=pool
+            )
+        return list(reversed(rows)), prefix
+
+    async def _fetch_delta(self, pool: asyncpg.Pool, coin_id: str, phases_key: Tuple[int, ...], since: datetime):
+        if phases_key:
+            return await pool.fetch("""
+                SELECT * FROM coin_metrics
+                WHERE mint = $1
+                  AND timestamp > $2
+                  AND phase_id_at_time = ANY($3::int[])
+                ORDER BY timestamp ASC
+            """, coin_id, since, list(phases_key))
+        return await pool.fetch("""
+            SELECT * FROM coin_metrics
+            WHERE mint = $1
+              AND timestamp > $2
+            ORDER BY timestamp ASC
+        """, coin_id, since)
+
+    def clear(self):
+        self.states.clear()
+        ml_streaming_feature_states.set(0)
+
+
+def check_parity(
+    state: CoinFeatureState,
+    reference: pd.DataFrame,
+    window_sizes: List[int],
+    include_flags: bool = False,
+    compare_cumulative: bool = True
+) -> Optional[bool]:
+    """
+    Vergleicht den Streaming-Feature-Vektor mit der letzten Zeile des pandas-Pfads.
+
+    Args:
+        compare_cumulative: False, wenn der pandas-Pfad nur einen Ausschnitt der Historie gesehen hat
+
+    Returns:
+        True (gleich), False (Abweichung) oder None (nicht vergleichbar, z.B. unterschiedlicher Datenstand)
+    """
+    if reference.empty or state.last_ts is None or reference.index[-1] != state.last_ts:
+        ml_streaming_feature_parity_total.labels(result='skipped').inc()
+        return None
+
+    # Kumulative Features nur vergleichen, wenn beide Seiten die gesamte Historie kennen
+    skip_cumulative = not compare_cumulative or state.truncated
+    streamed = state.emit(window_sizes, include_flags)
+    expected_row = reference.iloc[-1]
+    mismatches = []
+    for feature, expected in expected_row.items():
+        if feature == 'mint' or feature not in streamed or (skip_cumulative and _is_cumulative(feature)):
+            continue
+        actual = streamed[feature]
+        if isinstance(expected, str) or isinstance(actual, str):
+            continue
+        expected = _to_float(expected)
+        actual = _to_float(actual)
+        if _isnan(expected) and _isnan(actual):
+            continue
+        if not math.isclose(actual, expected, rel_tol=STREAMING_FEATURES_PARITY_RTOL, abs_tol=STREAMING_FEATURES_PARITY_ATOL):
+            mismatches.append((feature, expected, actual))
+
+    if mismatches:
+        ml_streaming_feature_parity_total.labels(result='mismatch').inc()
+        preview = ", ".join(f"{f}: pandas={e!r} streaming={a!r}" for f, e, a in mismatches[:5])
+        logger.warning(
+            f"⚠️ Streaming-Feature-Parität verletzt für Coin {state.coin_id[:8]}... "
+            f"({len(mismatches)} Abweichungen): {preview}"
+        )
+        return False
+
+    ml_streaming_feature_parity_total.labels(result='match').inc()
+    return True
+
+
+# Globale Instanz (pro Prozess)
+_streaming_engine: Optional[StreamingFeatureEngine] = None
+
+
+def get_streaming_engine() -> StreamingFeatureEngine:
+    """Gibt die prozessweite StreamingFeatureEngine zurück"""
+    global _streaming_engine
+    if _streaming_engine is None:
+        _streaming_engine = StreamingFeatureEngine()
+    return _streaming_engine
+
+
+def streaming_mode() -> str:
+    """Aktueller Streaming-Modus ("off", "parity" oder "on")"""
+    if STREAMING_FEATURES_MODE not in ('off', 'parity', 'on'):
+        return 'off'
+    return STREAMING_FEATURES_MODE
@@ -0,0 +1,333 @@
+"""
+Kompilierte Baum-Ensembles für Pump Server
+
+Übersetzt RandomForest- und XGBoost-Modelle beim Laden in flache NumPy-Arrays
+(Feature-Index, Schwellwert, linkes/rechtes Kind, Blattwert) und berechnet
+predict_proba als vektorisierte Traversierung über den ganzen Batch.
+
+Beim Kompilieren wird auf synthetischen Validierungszeilen (rund um die
+Split-Schwellwerte) gegen das Original-Modell geprüft - bis auf
+TREE_COMPILER_PARITY_ATOL (Rundung der Summen-Reihenfolge). Weicht das Ergebnis
+stärker ab oder ist das Modell nicht unterstützt, wird automatisch das Original verwendet.
+
+Unterstützt:
+- sklearn RandomForestClassifier (ein Output)
+- XGBClassifier mit Objective binary:logistic (numerische Splits)
+"""
+import json
+import math
+from typing import Any, Callable, Optional
+import numpy as np
+from app.utils.config import TREE_COMPILER_PARITY_ATOL, TREE_COMPILER_VALIDATION_ROWS
+from app.utils.logging_config import get_logger
+from app.utils.metrics import ml_tree_compiler_total
+
+logger = get_logger(__name__)
+
+
+class CompiledTreeEnsemble:
+    """
+    Flache Array-Darstellung eines Baum-Ensembles.
+
+    Alle Bäume liegen hintereinander in denselben Arrays; roots enthält den
+    Wurzel-Index jedes Baums. Blätter haben left == -1.
+
+    Unbekannte Attribute (feature_names_in_, n_features_in_, ...) werden an das
+    Original-Modell weitergereicht, damit prepare_features unverändert funktioniert.
+
+    Aus einem Memory-Mapped-Artefakt geladen (siehe model_artifacts) wird das
+    Original-Modell erst bei Bedarf über `original_loader` geladen.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        original_model: Any,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        default_left: Optional[np.ndarray] = None,
+        base_margin: float = 0.0,
+        is_leaf: Optional[np.ndarray] = None,
+        classes: Optional[np.ndarray] = None,
+        original_loader: Optional[Callable[[], Any]] = None,
+        original_type: Optional[str] = None
+    ):
+        self.kind = kind
+        self._original_model = original_model
+        self._original_loader = original_loader
+        self.original_type = type(original_model).__name__ if original_model is not None else original_type
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.default_left = default_left
+        self.base_margin = base_margin
+        self.is_leaf = is_leaf if is_leaf is not None else left < 0
+        self.classes_ = classes if classes is not None else getattr(original_model, 'classes_', np.array([0, 1]))
+        # Attribute, die das Original-Modell nicht hat (ohne es dafür zu laden)
+        self.absent_attributes: frozenset = frozenset()
+
+    @property
+    def original_model(self) -> Any:
+        if self._original_model is None and self._original_loader is not None:
+            self._original_model = self._original_loader()
+        return self._original_model
+
+    def __getattr__(self, name: str) -> Any:
+        # Nur für Attribute, die hier nicht gesetzt sind
+        if name in ('_original_model', '_original_loader', 'absent_attributes') or name in self.absent_attributes:
+            raise AttributeError(name)
+        return getattr(self.original_model, name)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    def _leaf_indices(self, X: np.ndarray) -> np.ndarray:
+        """Vektorisierte Traversierung: Blatt-Index pro (Zeile, Baum)"""
+        n_samples = X.shape[0]
+        rows = np.arange(n_samples)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_samples, self.n_trees)).copy()
+
+        while True:
+            active = ~self.is_leaf[nodes]
+            if not active.any():
+                return nodes
+            values = X[rows, self.feature[nodes]]
+            threshold = self.threshold[nodes]
+            if self.kind == 'xgb':
+                # XGBoost: fvalue < split_condition, fehlende Werte folgen default_left
+                go_left = np.where(np.isnan(values), self.default_left[nodes], values < threshold)
+            else:
+                # sklearn: X[i, feature] <= threshold (float32-Eingabe gegen float64-Schwellwert)
+                go_left = values <= threshold
+            nodes = np.where(active, np.where(go_left, self.left[nodes], self.right[nodes]), nodes)
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        if self.kind == 'rf':
+            if np.isnan(X).any():
+                # Fehlende Werte werden vom kompilierten RandomForest nicht abgebildet
+                return self.original_model.predict_proba(X)
+            leaves = self._leaf_indices(X)
+            # GLEICHE Reihenfolge wie sklearn: Summe Baum für Baum, dann / Anzahl Bäume
+            proba = np.zeros((X.shape[0], self.value.shape[1]), dtype=np.float64)
+            for tree in range(self.n_trees):
+                proba += self.value[leaves[:, tree]]
+            proba /= self.n_trees
+            return proba
+
+        leaves = self._leaf_indices(X)
+        # GLEICHE Reihenfolge wie XGBoost: float32-Summe Baum für Baum ab base_margin
+        margin = np.full(X.shape[0], self.base_margin, dtype=np.float32)
+        for tree in range(self.n_trees):
+            margin += self.value[leaves[:, tree]]
+        positive = (np.float32(1.0) / (np.float32(1.0) + np.exp(-margin))).astype(np.float32)
+        return np.vstack((np.float32(1.0) - positive, positive)).transpose()
+
+    def predict(self, X: Any) -> np.ndarray:
+        proba = self.predict_proba(X)
+        return np.asarray(self.classes_)[np.argmax(proba, axis=1)]
+
+
+def _compile_random_forest(model: Any) -> CompiledTreeEnsemble:
+    """RandomForestClassifier -> flache Arrays"""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        if tree.n_outputs != 1:
+            raise ValueError("Nur RandomForest mit einem Output wird unterstützt")
+
+        children_left = tree.children_left.astype(np.int64)
+        children_right = tree.children_right.astype(np.int64)
+        leaf = children_left < 0
+
+        # Blattwerte wie DecisionTreeClassifier.predict_proba normalisieren
+        proba = np.array(tree.value[:, 0, :model.n_classes_], dtype=np.float64)
+        normalizer = proba.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        proba /= normalizer
+
+        features.append(np.where(leaf, 0, tree.feature).astype(np.int64))
+        thresholds.append(tree.threshold.astype(np.float64))
+        lefts.append(np.where(leaf, -1, children_left + offset))
+        rights.append(np.where(leaf, -1, children_right + offset))
+        values.append(proba)
+        roots.append(offset)
+        offset += tree.node_count
+
+    return CompiledTreeEnsemble(
+        kind='rf',
+        original_model=model,
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        value=np.concatenate(values),
+        roots=np.array(roots, dtype=np.int64)
+    )
+
+
+def _compile_xgboost(model: Any) -> CompiledTreeEnsemble:
+    """XGBClassifier (binary:logistic) -> flache Arrays aus dem JSON-Modell"""
+    booster = model.get_booster()
+    raw = booster.save_raw(raw_format='json')
+    learner = json.loads(bytes(raw).decode('utf-8'))['learner']
+
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Objective {objective} wird nicht unterstützt")
+
+    gradient_booster = learner['gradient_booster']
+    if gradient_booster.get('name') != 'gbtree':
+        raise ValueError(f"Booster {gradient_booster.get('name')} wird nicht unterstützt")
+
+    trees = gradient_booster['model']['trees']
+    tree_info = gradient_booster['model'].get('tree_info', [0] * len(trees))
+    if any(info != 0 for info in tree_info):
+        raise ValueError("Nur ein Output (binär) wird unterstützt")
+
+    best_iteration = getattr(model, 'best_iteration', None)
+    if best_iteration is not None and best_iteration + 1 < len(trees):
+        raise ValueError("Early-Stopping (best_iteration) wird nicht unterstützt")
+
+    features, thresholds, lefts, rights, values, default_lefts, roots = [], [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        if tree.get('categories_nodes'):
+            raise ValueError("Kategorische Splits werden nicht unterstützt")
+
+        children_left = np.array(tree['left_children'], dtype=np.int64)
+        children_right = np.array(tree['right_children'], dtype=np.int64)
+        split_conditions = np.array(tree['split_conditions'], dtype=np.float32)
+        leaf = children_left < 0
+
+        features.append(np.where(leaf, 0, np.array(tree['split_indices'], dtype=np.int64)))
+        thresholds.append(split_conditions)
+        lefts.append(np.where(leaf, -1, children_left + offset))
+        rights.append(np.where(leaf, -1, children_right + offset))
+        # Im JSON-Modell steht der Blattwert in split_conditions
+        values.append(np.where(leaf, split_conditions, np.float32(0.0)).astype(np.float32))
+        default_lefts.append(np.array(tree['default_left'], dtype=bool))
+        roots.append(offset)
+        offset += len(children_left)
+
+    # base_score liegt im Wahrscheinlichkeitsraum -> Margin (logit)
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    base_margin = np.float32(-math.log(1.0 / base_score - 1.0))
+
+    return CompiledTreeEnsemble(
+        kind='xgb',
+        original_model=model,
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        value=np.concatenate(values),
+        roots=np.array(roots, dtype=np.int64),
+        default_left=np.concatenate(default_lefts),
+        base_margin=base_margin
+    )
+
+
+def _validation_rows(compiled: CompiledTreeEnsemble, n_features: int, n_rows: int) -> np.ndarray:
+    """
+    Synthetische Validierungszeilen rund um die Split-Schwellwerte.
+
+    Pro Feature werden Schwellwerte selbst sowie die direkt benachbarten
+    float32-Werte gezogen - so werden beide Seiten jedes Splits (und der
+    Gleichheitsfall) geprüft. Für XGBoost zusätzlich fehlende Werte.
+    """
+    rng = np.random.RandomState(42)
+    X = np.zeros((n_rows, n_features), dtype=np.float32)
+    split_nodes = ~compiled.is_leaf
+    for feature_index in range(n_features):
+        mask = split_nodes & (compiled.feature == feature_index)
+        if not mask.any():
+            continue
+        thresholds = np.unique(compiled.threshold[mask].astype(np.float32))
+        candidates = np.concatenate([
+            thresholds,
+            np.nextafter(thresholds, np.float32(np.inf)),
+            np.nextafter(thresholds, np.float32(-np.inf)),
+        ])
+        X[:, feature_index] = rng.choice(candidates, size=n_rows)
+        if compiled.kind == 'xgb':
+            X[rng.rand(n_rows) < 0.05, feature_index] = np.nan
+    return X
+
+
+def _n_features(model: Any) -> int:
+    n_features = getattr(model, 'n_features_in_', None)
+    if n_features is None:
+        raise ValueError("Modell hat kein n_features_in_ Attribut")
+    return int(n_features)
+
+
+def compile_model(model: Any, label: str = "") -> Any:
+    """
+    Kompiliert ein Modell in flache Arrays und prüft die Parität.
+
+    Returns:
+        CompiledTreeEnsemble bei Erfolg, sonst das Original-Modell
+    """
+    model_type = type(model).__name__
+    try:
+        if 'RandomForest' in model_type:
+            compiled = _compile_random_forest(model)
+        elif 'XGB' in model_type:
+            compiled = _compile_xgboost(model)
+        else:
+            raise ValueError(f"Modell-Typ {model_type} wird nicht unterstützt")
+    except Exception as e:
+        ml_tree_compiler_total.labels(result='unsupported').inc()
+        logger.info(f"ℹ️ Modell {label} nicht kompiliert ({model_type}): {e} - verwende Original")
+        return model
+
+    try:
+        X = _validation_rows(compiled, _n_features(model), TREE_COMPILER_VALIDATION_ROWS)
+        expected = np.asarray(model.predict_proba(X))
+        actual = compiled.predict_proba(X)
+        if TREE_COMPILER_PARITY_ATOL > 0:
+            matches = expected.shape == actual.shape and np.allclose(actual, expected, rtol=0.0, atol=TREE_COMPILER_PARITY_ATOL)
+        else:
+            matches = np.array_equal(actual, expected)
+        if not matches:
+            diff = float(np.max(np.abs(actual - expected))) if expected.shape == actual.shape else float('nan')
+            ml_tree_compiler_total.labels(result='fallback').inc()
+            logger.warning(
+                f"⚠️ Parität verletzt für kompiliertes Modell {label} ({model_type}, max. Abweichung {diff:.3g}) - verwende Original"
+            )
+            return model
+    except Exception as e:
+        ml_tree_compiler_total.labels(result='fallback').inc()
+        logger.warning(f"⚠️ Paritäts-Check fehlgeschlagen für Modell {label} ({model_type}): {e} - verwende Original")
+        return model
+
+    ml_tree_compiler_total.labels(result='compiled').inc()
+    logger.info(
+        f"✅ Modell {label} kompiliert ({model_type}): {compiled.n_trees} Bäume, {compiled.n_nodes} Knoten, "
+        f"Parität auf {TREE_COMPILER_VALIDATION_ROWS} Zeilen geprüft"
+    )
+    return compiled
+
+
+def original_model_type(model: Any) -> str:
+    """Typ-Name des Original-Modells (auch für kompilierte Modelle)"""
+    if isinstance(model, CompiledTreeEnsemble):
+        return model.original_type
+    return type(model).__name__
@@ -0,0 +1,137 @@
+"""
+Modell-Warm-up für Pump Server
+
+Lädt aktive Modelle im Hintergrund vor (bei Aktivierung, Import und Start),
+baut den FeaturePlan und schickt einen Dummy-Batch durch predict_proba - so
+zahlt nicht die erste echte Vorhersage für joblib.load, Plan-Auflösung und den
+ersten XGBoost-Aufruf.
+
+Der Event-Handler routet Coins nur an Modelle, die in diesem Prozess "ready" sind.
+Der Zustand ist prozesslokal (jeder Prozess hat eigene Modell-Caches) und
+wird auf /health für den API-Prozess ausgegeben.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.utils.config import MODEL_WARMUP_ENABLED, MODEL_WARMUP_ROWS
+from app.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+WARMING = 'warming'
+READY = 'ready'
+FAILED = 'failed'
+
+
+def _warmup_key(model_config: Dict[str, Any]) -> Tuple:
+    """Neu aufwärmen, wenn sich die Modell-Datei ändert (z.B. nach Recovery)"""
+    return (model_config.get('id'), model_config.get('local_model_path'))
+
+
+class ModelWarmup:
+    """Warm-up-Zustand der Modelle dieses Prozesses"""
+
+    def __init__(self, enabled: bool = MODEL_WARMUP_ENABLED, rows: int = MODEL_WARMUP_ROWS):
+        self.enabled = enabled
+        self.rows = max(1, rows)
+        self.states: Dict[Tuple, Dict[str, Any]] = {}
+        self._tasks: Dict[Tuple, asyncio.Task] = {}
+
+    def is_ready(self, model_config: Dict[str, Any]) -> bool:
+        """Darf der Event-Handler dieses Modell verwenden?"""
+        if not self.enabled:
+            return True
+        state = self.states.get(_warmup_key(model_config))
+        # Fehlgeschlagenes Warm-up blockiert nicht - der normale Pfad meldet den Fehler pro Vorhersage
+        return state is not None and state['state'] in (READY, FAILED)
+
+    def schedule(self, model_configs: List[Dict[str, Any]], complete: bool = True):
+        """
+        Startet das Warm-up für alle noch nicht aufgewärmten Modelle (im Hintergrund).
+
+        complete=True: model_configs sind ALLE aktiven Modelle - übrige Zustände werden verworfen.
+        """
+        if not self.enabled:
+            return
+        active_keys = set()
+        for model_config in model_configs:
+            key = _warmup_key(model_config)
+            active_keys.add(key)
+            if key in self.states:
+                continue
+            self.states[key] = {'state': WARMING, 'active_model_id': key[0], 'duration_ms': None, 'error': None}
+            self._tasks[key] = asyncio.create_task(self._warm(key, dict(model_config)))
+
+        # Zustände nicht mehr aktiver Modelle vergessen
+        if not complete:
+            return
+        for key in list(self.states.keys()):
+            if key not in active_keys and key not in self._tasks:
+                del self.states[key]
+
+    async def _warm(self, key: Tuple, model_config: Dict[str, Any]):
+        from app.prediction.engine import _get_model_with_recovery
+        from app.prediction.executor import get_inference_executor
+        from app.prediction.feature_processor import get_feature_plan
+
+        start_time = time.time()
+        try:
+            model = await _get_model_with_recovery(model_config)
+            plan = await get_feature_plan(model_config)
+            n_features = len(plan.expected_features) if plan.expected_features else int(getattr(model, 'n_features_in_', 0))
+            if n_features:
+                X = np.zeros((self.rows, n_features), dtype=np.float32)
+                await get_inference_executor().predict_proba(model, model_config.get('local_model_path'), X)
+            duration_ms = (time.time() - start_time) * 1000
+            self.states[key] = {'state': READY, 'active_model_id': key[0], 'duration_ms': round(duration_ms, 1), 'error': None}
+            logger.info(f"🔥 Modell {key[0]} aufgewärmt in {duration_ms:.0f}ms")
+        except Exception as e:
+            self.states[key] = {'state': FAILED, 'active_model_id': key[0], 'duration_ms': None, 'error': str(e)}
+            logger.warning(f"⚠️ Warm-up für Modell {key[0]} fehlgeschlagen: {e}")
+        finally:
+            self._tasks.pop(key, None)
+
+    async def schedule_active_models(self):
+        """Warm-up aller aktiven Modelle (z.B. beim Start)"""
+        if not self.enabled:
+            return
+        from app.database.models import get_active_model_configs
+        self.schedule(await get_active_model_configs())
+
+    async def schedule_model(self, active_model_id: int):
+        """Warm-up eines einzelnen Modells (nach Aktivierung/Import), falls aktiv"""
+        if not self.enabled:
+            return
+        from app.database.models import get_active_model_configs
+        model_configs = [m for m in await get_active_model_configs() if m.get('id') == active_model_id]
+        # Bereits bekannten Zustand verwerfen, damit z.B. eine geänderte Datei neu geladen wird
+        for model_config in model_configs:
+            key = _warmup_key(model_config)
+            if key not in self._tasks:
+                self.states.pop(key, None)
+        self.schedule(model_configs, complete=False)
+
+    def summary(self) -> Dict[str, Any]:
+        """Readiness für /health"""
+        counts = {WARMING: 0, READY: 0, FAILED: 0}
+        for state in self.states.values():
+            counts[state['state']] += 1
+        return {
+            'models_ready': counts[READY],
+            'models_warming': counts[WARMING],
+            'models_warmup_failed': counts[FAILED],
+            'model_readiness': sorted(self.states.values(), key=lambda s: s['active_model_id'] or 0),
+        }
+
+
+# Globale Instanz (pro Prozess)
+_model_warmup: Optional[ModelWarmup] = None
+
+
+def get_model_warmup() -> ModelWarmup:
+    """Gibt die prozessweite ModelWarmup-Instanz zurück"""
+    global _model_warmup
+    if _model_warmup is None:
+        _model_warmup = ModelWarmup()
+    return _model_warmup
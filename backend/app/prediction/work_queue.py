@@ -0,0 +1,173 @@
+"""
+Work-Queue für verteilte Prediction-Worker (Pump Server)
+
+Im verteilten Modus liest die Ingestion coin_metrics wie bisher (Keyset-Cursor), verarbeitet
+die Coins aber nicht selbst, sondern schreibt pro Mint einen Auftrag in prediction_work_queue
+(siehe sql/migrations/create_prediction_work_queue.sql):
+
+- enqueue: UPSERT pro Mint (neuester Eintrag gewinnt) + Verarbeitungsstand in EINER Transaktion;
+  eine laufende Lease bleibt dabei bestehen (sonst könnte ein zweiter Worker denselben Mint holen)
+- claim: Worker holen Aufträge per FOR UPDATE SKIP LOCKED mit Lease - optional nur aus ihren
+  Partitionen (Hash des Mints), damit ein Coin immer beim selben Worker landet (Hot-Store,
+  Ignore-Cache bleiben lokal konsistent)
+- ack: nach dem Persistieren löschen - nur wenn der Auftrag nicht inzwischen aktualisiert wurde;
+  ein aktualisierter Auftrag wird stattdessen sofort wieder freigegeben
+- release: nicht verarbeitete Aufträge (z.B. Warm-up) sofort wieder freigeben, ohne Versuch
+
+Stirbt ein Worker, läuft die Lease ab und ein anderer übernimmt. Doppelte Vorhersagen
+verhindert der Unique-Index auf model_predictions (ON CONFLICT DO NOTHING).
+"""
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import asyncpg
+from app.utils.config import (
+    WORKER_ID, WORK_QUEUE_PARTITIONS, WORKER_PARTITIONS, WORK_QUEUE_LEASE_SECONDS
+)
+from app.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def mint_partition(mint: str) -> int:
+    """Stabile Partition eines Mints (unabhängig von Prozess/Python-Hash-Seed)"""
+    return zlib.crc32(mint.encode()) % WORK_QUEUE_PARTITIONS
+
+
+def parse_partitions(spec: str) -> Optional[List[int]]:
+    """'0-3,8' -> [0, 1, 2, 3, 8]; leer -> None (alle Partitionen)"""
+    if not spec.strip():
+        return None
+    partitions = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            partitions.update(range(int(start), int(end) + 1))
+        else:
+            partitions.add(int(part))
+    return sorted(p for p in partitions if 0 <= p < WORK_QUEUE_PARTITIONS)
+
+
+class WorkQueue:
+    """Zugriff auf prediction_work_queue"""
+
+    def __init__(self, worker_id: str = WORKER_ID, partitions: Optional[List[int]] = None):
+        self.worker_id = worker_id
+        self.partitions = partitions
+
+    async def enqueue(
+        self,
+        pool: asyncpg.Pool,
+        entries: List[Dict[str, Any]],
+        watermark: Optional[Tuple[str, datetime, str]] = None
+    ) -> int:
+        """Schreibt Aufträge (ein Eintrag pro Mint) und optional den Verarbeitungsstand atomar"""
+        from app.database.models import save_processing_watermark
+        if not entries and watermark is None:
+            return 0
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                if entries:
+                    await conn.execute("""
+                        INSERT INTO prediction_work_queue (mint, timestamp, phase_id, partition)
+                        SELECT mint, timestamp, phase_id, partition
+                        FROM unnest($1::text[], $2::timestamptz[], $3::int[], $4::smallint[])
+                            AS t(mint, timestamp, phase_id, partition)
+                        ON CONFLICT (mint) DO UPDATE SET
+                            timestamp = EXCLUDED.timestamp,
+                            phase_id = EXCLUDED.phase_id,
+                            enqueued_at = NOW()
+                        WHERE prediction_work_queue.timestamp < EXCLUDED.timestamp
+                    """,
+                        [e['mint'] for e in entries],
+                        [e['timestamp'] for e in entries],
+                        [e.get('phase_id') for e in entries],
+                        [mint_partition(e['mint']) for e in entries]
+                    )
+                if watermark is not None:
+                    consumer, timestamp, mint = watermark
+                    await save_processing_watermark(conn, timestamp, mint, consumer=consumer)
+        return len(entries)
+
+    async def claim(self, pool: asyncpg.Pool, limit: int) -> List[Dict[str, Any]]:
+        """Holt bis zu limit freie Aufträge (älteste zuerst) und setzt eine Lease"""
+        rows = await pool.fetch("""
+            WITH next AS (
+                SELECT mint
+                FROM prediction_work_queue
+                WHERE (claimed_until IS NULL OR claimed_until < NOW())
+                  AND ($3::smallint[] IS NULL OR partition = ANY($3::smallint[]))
+                ORDER BY timestamp
+                LIMIT $2
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE prediction_work_queue q
+            SET claimed_by = $1,
+                claimed_until = NOW() + make_interval(secs => $4),
+                attempts = q.attempts + 1
+            FROM next
+            WHERE q.mint = next.mint
+            RETURNING q.mint, q.timestamp, q.phase_id, q.attempts
+        """, self.worker_id, limit, self.partitions, WORK_QUEUE_LEASE_SECONDS)
+        return [
+            {'mint': row['mint'], 'timestamp': row['timestamp'], 'phase_id': row['phase_id'], 'attempts': row['attempts']}
+            for row in rows
+        ]
+
+    async def ack(self, pool: asyncpg.Pool, entries: List[Dict[str, Any]]) -> int:
+        """
+        Löscht erledigte Aufträge. Während der Verarbeitung aktualisierte Aufträge bleiben
+        stehen und werden freigegeben (neuer Eintrag, Versuche zählen von vorn).
+
+        Returns:
+            Anzahl gelöschter Aufträge
+        """
+        if not entries:
+            return 0
+        return await pool.fetchval("""
+            WITH done AS (
+                SELECT * FROM unnest($1::text[], $2::timestamptz[]) AS a(mint, timestamp)
+            ), deleted AS (
+                DELETE FROM prediction_work_queue q
+                USING done a
+                WHERE q.mint = a.mint AND q.timestamp = a.timestamp
+                RETURNING q.mint
+            ), requeued AS (
+                UPDATE prediction_work_queue q
+                SET claimed_by = NULL,
+                    claimed_until = NULL,
+                    attempts = 0
+                FROM done a
+                WHERE q.mint = a.mint AND q.timestamp > a.timestamp AND q.claimed_by = $3
+                RETURNING q.mint
+            )
+            SELECT COUNT(*) FROM deleted
+        """, [e['mint'] for e in entries], [e['timestamp'] for e in entries], self.worker_id)
+
+    async def release(self, pool: asyncpg.Pool, entries: List[Dict[str, Any]]) -> int:
+        """Gibt geholte, aber nicht verarbeitete Aufträge frei (Versuch wird nicht gezählt)"""
+        if not entries:
+            return 0
+        result = await pool.execute("""
+            UPDATE prediction_work_queue
+            SET claimed_by = NULL,
+                claimed_until = NULL,
+                attempts = GREATEST(attempts - 1, 0)
+            WHERE mint = ANY($1::text[]) AND claimed_by = $2
+        """, [e['mint'] for e in entries], self.worker_id)
+        return int(result.split()[-1])
+
+
+# Globale Instanz (pro Prozess)
+_work_queue: Optional[WorkQueue] = None
+
+
+def get_work_queue() -> WorkQueue:
+    """Gibt die prozessweite WorkQueue-Instanz zurück"""
+    global _work_queue
+    if _work_queue is None:
+        _work_queue = WorkQueue(partitions=parse_partitions(WORKER_PARTITIONS))
+    return _work_queue
@@ -7,6 +7,7 @@ Wichtig für Docker-Deployment mit externer Datenbank.
 """
 import os
 import json
+import socket
 from typing import Dict, Any
 from dotenv import load_dotenv
 
@@ -87,6 +88,8 @@ else:
     # Fallback: Persistente Config oder Default
     _persistent_db_url = _persistent_config.get("database_url")
     DB_DSN = _persistent_db_url or "postgresql://user:password@db:5432/ml_predictions"
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
 
 # ============================================================
 # Ports
@@ -118,19 +121,96 @@ else:
 # Event-Handling
 # ============================================================
 POLLING_INTERVAL_SECONDS = int(os.getenv("POLLING_INTERVAL_SECONDS", "30"))
-BATCH_SIZE = int(os.getenv("BATCH_SIZE", "50"))
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "50"))  # Coins pro Verarbeitungs-Batch (aus dem Ingestion-Puffer)
+# Zeilen pro Keyset-Seite beim Polling von coin_metrics (mehrere Zeilen pro Mint werden zusammengefasst)
+POLLING_PAGE_SIZE = int(os.getenv("POLLING_PAGE_SIZE", "1000"))
+# Ingestion-Puffer: neuester Eintrag pro Mint, max. X Mints - danach Load Shedding (drop_oldest | alerts_first)
+INGEST_BUFFER_CAPACITY = int(os.getenv("INGEST_BUFFER_CAPACITY", "5000"))
+INGEST_SHED_POLICY = os.getenv("INGEST_SHED_POLICY", "drop_oldest").lower()
+# Fehlgeschlagene Einträge (Inferenz/Write) höchstens X Mal verarbeiten, danach verwerfen
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+# Gelesene Keys X Sekunden (Zeilen-Zeitstempel) hinter dem Cursor merken - NOTIFYs älterer Zeilen gelten als verspätet
+LATE_ENTRY_WINDOW_SECONDS = float(os.getenv("LATE_ENTRY_WINDOW_SECONDS", "120"))
+# Verteilter Betrieb: local (wie bisher) | ingest (nur coin_metrics -> Work-Queue) |
+# worker (nur Work-Queue abarbeiten) | distributed (beides)
+EVENT_HANDLER_MODE = os.getenv("EVENT_HANDLER_MODE", "local").lower()
+if EVENT_HANDLER_MODE not in ("local", "ingest", "worker", "distributed"):
+    EVENT_HANDLER_MODE = "local"
+WORKER_ID = os.getenv("WORKER_ID", f"{socket.gethostname()}-{os.getpid()}")
+WORK_QUEUE_PARTITIONS = int(os.getenv("WORK_QUEUE_PARTITIONS", "16"))  # Partition = Hash(mint) % X
+# Partitionen dieses Workers (z.B. "0-7" oder "0,2,4") - leer = alle
+WORKER_PARTITIONS = os.getenv("WORKER_PARTITIONS", "")
+WORK_QUEUE_LEASE_SECONDS = float(os.getenv("WORK_QUEUE_LEASE_SECONDS", "60"))
+WORK_QUEUE_POLL_SECONDS = float(os.getenv("WORK_QUEUE_POLL_SECONDS", "0.5"))
+WORK_QUEUE_MAX_ATTEMPTS = int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", "5"))
+# LISTEN/NOTIFY: Reconnect mit Backoff bis max. X Sekunden, Health-Check der Listener-Connection
+LISTEN_RECONNECT_MAX_SECONDS = float(os.getenv("LISTEN_RECONNECT_MAX_SECONDS", "30"))
+LISTEN_HEALTHCHECK_SECONDS = float(os.getenv("LISTEN_HEALTHCHECK_SECONDS", "30"))
 BATCH_TIMEOUT_SECONDS = int(os.getenv("BATCH_TIMEOUT_SECONDS", "5"))
+# Parallele Coins pro Pipeline-Stufe - Default lässt 2 Pool-Verbindungen für Hintergrund-Jobs frei (BACKGROUND_DB_SLOTS)
+COIN_PIPELINE_CONCURRENCY = int(os.getenv("COIN_PIPELINE_CONCURRENCY", str(max(1, DB_POOL_MAX_SIZE - 2))))
+# Ignore-Cache: Cooldowns (coin_scan_cache) im Event-Handler im Speicher, Write-Behind in die DB
+IGNORE_CACHE_ENABLED = os.getenv("IGNORE_CACHE_ENABLED", "true").lower() == "true"
+IGNORE_CACHE_FLUSH_SECONDS = float(os.getenv("IGNORE_CACHE_FLUSH_SECONDS", "2"))
+IGNORE_CACHE_RELOAD_SECONDS = float(os.getenv("IGNORE_CACHE_RELOAD_SECONDS", "60"))  # Änderungen anderer Prozesse
+# Modell-Konfiguration: Reload per NOTIFY, zusätzlich als Sicherheitsnetz nach Intervall
+MODEL_CONFIG_REFRESH_SECONDS = float(os.getenv("MODEL_CONFIG_REFRESH_SECONDS", "300"))
+MODEL_CONFIG_FALLBACK_SECONDS = float(os.getenv("MODEL_CONFIG_FALLBACK_SECONDS", "10"))  # ohne NOTIFY-Trigger
+# Leader-Election: Auswertung, ATH-Tracking und Alert-Evaluator laufen nur auf einem Knoten (Advisory-Lock + Lease)
+LEADER_ELECTION_ENABLED = os.getenv("LEADER_ELECTION_ENABLED", "true").lower() == "true"
+LEADER_LEASE_SECONDS = float(os.getenv("LEADER_LEASE_SECONDS", "30"))  # ohne Erneuerung -> Übernahme
+LEADER_RENEW_SECONDS = float(os.getenv("LEADER_RENEW_SECONDS", "10"))
+# Hintergrund-Scheduler (Auswertung, ATH-Tracking, Alert-Evaluator, Watchdog):
+# max. Anteil der Pool-Verbindungen für Hintergrund-Jobs - der Rest bleibt dem Hot-Path
+BACKGROUND_DB_POOL_SHARE = float(os.getenv("BACKGROUND_DB_POOL_SHARE", "0.2"))
+BACKGROUND_DB_SLOTS = max(1, round(DB_POOL_MAX_SIZE * BACKGROUND_DB_POOL_SHARE))
+# Ab dieser Tiefe des Ingestion-Puffers warten Hintergrund-Jobs (höchstens BACKGROUND_MAX_DEFER_SECONDS)
+BACKGROUND_YIELD_QUEUE_DEPTH = int(os.getenv("BACKGROUND_YIELD_QUEUE_DEPTH", "100"))
+BACKGROUND_MAX_DEFER_SECONDS = float(os.getenv("BACKGROUND_MAX_DEFER_SECONDS", "120"))
+# Ohne Rückstand wird das Intervall schrittweise verlängert (bis Intervall * Faktor)
+BACKGROUND_IDLE_BACKOFF_FACTOR = float(os.getenv("BACKGROUND_IDLE_BACKOFF_FACTOR", "2"))
 
 # ============================================================
 # Feature-Engineering
 # ============================================================
 FEATURE_HISTORY_SIZE = int(os.getenv("FEATURE_HISTORY_SIZE", "20"))
+# Historie nur mit benötigten Spalten/Zeilen laden, Full-History-Werte per Aggregat
+BOUNDED_HISTORY_QUERIES = os.getenv("BOUNDED_HISTORY_QUERIES", "true").lower() == "true"
+# Full-History-Aggregat pro Coin im Speicher, wird mit jedem neuen Fenster nur fortgeschrieben (max. X Coins)
+HISTORY_PREFIX_CACHE_COINS = int(os.getenv("HISTORY_PREFIX_CACHE_COINS", "10000"))
+# Inkrementelle Streaming-Features: "off" (nur pandas), "parity" (pandas + Vergleich), "on" (nur Streaming)
+STREAMING_FEATURES_MODE = os.getenv("STREAMING_FEATURES_MODE", "off").lower()
+STREAMING_FEATURES_MAX_COINS = int(os.getenv("STREAMING_FEATURES_MAX_COINS", "5000"))
+STREAMING_FEATURES_PARITY_RTOL = float(os.getenv("STREAMING_FEATURES_PARITY_RTOL", "1e-3"))
+STREAMING_FEATURES_PARITY_ATOL = float(os.getenv("STREAMING_FEATURES_PARITY_ATOL", "1e-6"))
+# Hot-Store: letzte Zeilen pro aktivem Coin im Speicher (Features, Metriken-Snapshot, ATH-Tracking)
+HOT_STORE_ENABLED = os.getenv("HOT_STORE_ENABLED", "false").lower() == "true"
+HOT_STORE_ROWS = int(os.getenv("HOT_STORE_ROWS", "256"))  # sollte deutlich mehr als LATE_ENTRY_WINDOW_SECONDS abdecken
+HOT_STORE_TTL_SECONDS = int(os.getenv("HOT_STORE_TTL_SECONDS", "600"))  # Coins ohne neue Zeilen verdrängen
+HOT_STORE_MAX_MB = int(os.getenv("HOT_STORE_MAX_MB", "256"))
+HOT_STORE_MAX_STALENESS_SECONDS = float(os.getenv("HOT_STORE_MAX_STALENESS_SECONDS", "5"))  # max. Alter seit letztem Sync
 
 # ============================================================
 # Performance
 # ============================================================
 MAX_CONCURRENT_PREDICTIONS = int(os.getenv("MAX_CONCURRENT_PREDICTIONS", "10"))
 MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "10"))
+MODEL_CACHE_MAX_MB = int(os.getenv("MODEL_CACHE_MAX_MB", "2048"))  # Budget für geladene Modelle (aktive sind gepinnt)
+# Executor für CPU-lastige Inferenz: "inline", "thread" oder "process"
+INFERENCE_EXECUTOR_MODE = os.getenv("INFERENCE_EXECUTOR_MODE", "thread").lower()
+INFERENCE_EXECUTOR_WORKERS = int(os.getenv("INFERENCE_EXECUTOR_WORKERS", "4"))
+# Kompilierte Baum-Ensembles (RandomForest/XGBoost als flache NumPy-Arrays)
+TREE_COMPILER_ENABLED = os.getenv("TREE_COMPILER_ENABLED", "false").lower() == "true"
+TREE_COMPILER_VALIDATION_ROWS = int(os.getenv("TREE_COMPILER_VALIDATION_ROWS", "512"))
+# Max. absolute Abweichung der Wahrscheinlichkeiten im Paritäts-Check. XGBoost summiert die float32-Margins
+# in anderer Reihenfolge (bis ~1.2e-7 in proba), sklearn-RandomForests mit n_jobs > 1 threadabhängig (~1e-16).
+# 0 = bit-exakt (XGBoost-Modelle fallen dann praktisch immer auf das Original zurück)
+TREE_COMPILER_PARITY_ATOL = float(os.getenv("TREE_COMPILER_PARITY_ATOL", "1e-6"))
+# Kompilierte Modelle als memory-mapped .npy-Artefakte (von allen Prozessen des Hosts geteilt)
+MODEL_MMAP_ARTIFACTS = os.getenv("MODEL_MMAP_ARTIFACTS", "true").lower() == "true"
+# Warm-up: Modelle im Hintergrund laden + Dummy-Batch, erst danach nutzt der Event-Handler sie
+MODEL_WARMUP_ENABLED = os.getenv("MODEL_WARMUP_ENABLED", "true").lower() == "true"
+MODEL_WARMUP_ROWS = int(os.getenv("MODEL_WARMUP_ROWS", "32"))
 
 # ============================================================
 # n8n Integration
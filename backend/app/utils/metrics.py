@@ -76,6 +76,161 @@ ml_model_load_duration_seconds = Histogram(
     buckets=[0.01, 0.05, 0.1, 0.5, 1.0, 5.0]
 )
 
+ml_model_cache_bytes = Gauge(
+    'ml_model_cache_bytes',
+    'Estimated memory of models held in the model cache in bytes'
+)
+
+ml_model_cache_requests_total = Counter(
+    'ml_model_cache_requests_total',
+    'Model cache lookups',
+    ['result']  # hit, miss, wait (joined an in-flight load)
+)
+
+ml_model_cache_evictions_total = Counter(
+    'ml_model_cache_evictions_total',
+    'Models evicted from the model cache to stay within budget'
+)
+
+ml_streaming_feature_parity_total = Counter(
+    'ml_streaming_feature_parity_total',
+    'Parity checks of streaming features against the pandas path',
+    ['result']  # match, mismatch, skipped
+)
+
+ml_streaming_feature_states = Gauge(
+    'ml_streaming_feature_states',
+    'Number of per-coin streaming feature states held in memory'
+)
+
+ml_hot_store_hit_ratio = Gauge(
+    'ml_hot_store_hit_ratio',
+    'Share of hot store reads served from memory (0.0 - 1.0)'
+)
+
+ml_hot_store_bytes = Gauge(
+    'ml_hot_store_bytes',
+    'Memory held by hot store ring buffers in bytes'
+)
+
+ml_hot_store_coins = Gauge(
+    'ml_hot_store_coins',
+    'Number of coins held in the hot store'
+)
+
+ml_tree_compiler_total = Counter(
+    'ml_tree_compiler_total',
+    'Tree ensemble compilation attempts at model load time',
+    ['result']  # compiled, fallback, unsupported
+)
+
+# Executor Metrics
+ml_executor_queue_depth = Gauge(
+    'ml_executor_queue_depth',
+    'Number of inference tasks waiting for an executor worker'
+)
+
+ml_executor_busy_workers = Gauge(
+    'ml_executor_busy_workers',
+    'Number of executor workers currently running a task'
+)
+
+ml_executor_saturation = Gauge(
+    'ml_executor_saturation',
+    'Share of executor workers currently busy (0.0 - 1.0)'
+)
+
+ml_executor_task_duration_seconds = Histogram(
+    'ml_executor_task_duration_seconds',
+    'Duration of executor tasks including queue wait in seconds',
+    ['task'],  # load_model, features, predict
+    buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0]
+)
+
+# Event-Pipeline Metrics
+ml_pipeline_stage_duration_seconds = Histogram(
+    'ml_pipeline_stage_duration_seconds',
+    'Duration of event pipeline stages in seconds (per coin or per wave)',
+    ['stage'],  # route, prepare, n8n (per coin); ingest, predict, persist (per wave)
+    buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0]
+)
+
+ml_pipeline_inflight = Gauge(
+    'ml_pipeline_inflight',
+    'Number of coins currently inside a concurrency-limited pipeline stage'
+)
+
+ml_ingest_listener_connected = Gauge(
+    'ml_ingest_listener_connected',
+    'LISTEN connection for coin_metrics inserts (1=push mode, 0=polling only)'
+)
+
+ml_ingest_queue_depth = Gauge(
+    'ml_ingest_queue_depth',
+    'Number of mints waiting in the ingestion buffer'
+)
+
+ml_ingest_coalesced_total = Counter(
+    'ml_ingest_coalesced_total',
+    'Events merged into an already pending mint (only the newest is predicted)'
+)
+
+ml_ingest_shed_total = Counter(
+    'ml_ingest_shed_total',
+    'Pending mints dropped because the ingestion buffer was full',
+    ['policy']  # drop_oldest, alerts_first
+)
+
+ml_work_queue_items_total = Counter(
+    'ml_work_queue_items_total',
+    'Work queue items by action in distributed mode',
+    ['action']  # enqueued, claimed, acked, released, dropped
+)
+
+ml_ingest_lag_seconds = Histogram(
+    'ml_ingest_lag_seconds',
+    'Delay between coin_metrics row timestamp and pickup by the event handler in seconds',
+    ['source'],  # notify, catchup, poll, late, queue
+    buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+)
+
+ml_background_job_leader = Gauge(
+    'ml_background_job_leader',
+    'Whether this process is the elected leader for a background job (1=leader)',
+    ['job']  # prediction_evaluation, ath_tracking, alert_evaluator
+)
+
+# Background Scheduler Metrics
+ml_background_job_duration_seconds = Histogram(
+    'ml_background_job_duration_seconds',
+    'Run time of a background job in seconds',
+    ['job'],  # prediction_evaluation, ath_tracking, alert_evaluator, watchdog
+    buckets=[0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0]
+)
+
+ml_background_job_backlog = Gauge(
+    'ml_background_job_backlog',
+    'Pending items found by the last run of a background job (capped at its batch size)',
+    ['job']
+)
+
+ml_background_job_lag_seconds = Gauge(
+    'ml_background_job_lag_seconds',
+    'Delay between a background job becoming due and its start in seconds',
+    ['job']
+)
+
+ml_background_job_deferred_total = Counter(
+    'ml_background_job_deferred_total',
+    'Background job starts deferred because the hot-path queue was deep',
+    ['job']
+)
+
+ml_background_db_connections = Gauge(
+    'ml_background_db_connections',
+    'Pool connections currently used by background jobs'
+)
+
 # Service Metrics
 ml_service_uptime_seconds = Gauge(
     'ml_service_uptime_seconds',
@@ -161,6 +316,18 @@ async def get_health_status() -> Dict[str, Any]:
         else:
             status = "degraded"  # DB nicht verbunden = Service nicht vollständig funktionsfähig
         
+        # Warm-up-Status der Modelle (Status bleibt "healthy" - Modelle im Warm-up sind kein Fehler)
+        from app.prediction.warmup import get_model_warmup
+        
+        # Leader pro Hintergrund-Job (über alle Replikas)
+        background_job_leaders = None
+        if db_connected:
+            try:
+                from app.prediction.leadership import get_leader_election
+                background_job_leaders = await get_leader_election().leaders(await get_pool())
+            except Exception as e:
+                logger.warning(f"⚠️ Fehler beim Lesen der Job-Leader: {e}")
+        
         return {
             "status": status,
             "db_connected": db_connected,
@@ -168,7 +335,9 @@ async def get_health_status() -> Dict[str, Any]:
             "predictions_last_hour": predictions_last_hour,
             "uptime_seconds": int(uptime),
             "start_time": health_status["start_time"],
-            "last_error": health_status["last_error"]
+            "last_error": health_status["last_error"],
+            "background_job_leaders": background_job_leaders,
+            **get_model_warmup().summary()
         }
     except Exception as e:
         logger.error(f"❌ Fehler beim Health Check: {e}", exc_info=True)
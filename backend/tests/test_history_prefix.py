@@ -0,0 +1,144 @@
+"""
+History-Prefix-Aggregat: inkrementelles Fortschreiben vs. Aggregation über die gesamte Historie
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("asyncpg")
+
+from conftest import run  # noqa: E402
+from app.database import models  # noqa: E402
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _rows(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        rows.append({
+            'timestamp': START + timedelta(seconds=5 * i),
+            # Wiederholte Höchststände prüfen den ersten ATH-Zeitpunkt
+            'price_high': Decimal(rng.choice([1, 2, 3, 3, 5, 5])) * Decimal(i // 40 + 1),
+            'dev_sold_amount': None if rng.random() < 0.2 else Decimal(rng.randint(0, 9)),
+        })
+    return rows
+
+
+def _full(rows, before):
+    prefix = [r for r in rows if r['timestamp'] < before]
+    if not prefix:
+        return None
+    ath = max(r['price_high'] for r in prefix)
+    return {
+        'first_ts': min(r['timestamp'] for r in prefix),
+        'ath': float(ath),
+        'ath_ts': min(r['timestamp'] for r in prefix if r['price_high'] == ath),
+        'dev_sold_sum': float(sum(r['dev_sold_amount'] or 0 for r in prefix)),
+        'row_count': len(prefix),
+    }
+
+
+def _delta(rows, entry, before):
+    since = entry['upto'] - timedelta(seconds=models.LATE_ENTRY_WINDOW_SECONDS)
+    return [r for r in rows if since <= r['timestamp'] < before]
+
+
+def test_advance_matches_full_aggregate():
+    rows = _rows(600)
+    before = rows[50]['timestamp']
+    empty = {'first_ts': None, 'ath': None, 'ath_ts': None, 'dev_sold_sum': 0, 'row_count': 0, 'recent': None}
+    entry = models._history_prefix_entry(empty, START)
+    for i in range(51, 600, 7):
+        before = rows[i]['timestamp']
+        entry = models._advance_history_prefix(entry, _delta(rows, entry, before), before)
+        assert models._history_prefix_result(entry) == _full(rows, before)
+
+
+def test_advance_counts_late_rows_once():
+    rows = _rows(300, seed=4)
+    late = rows.pop(250)  # wird erst nach dem ersten Stand committet
+    before = rows[255]['timestamp']
+    entry = models._history_prefix_entry({'first_ts': None, 'ath': None, 'ath_ts': None,
+                                          'dev_sold_sum': 0, 'row_count': 0, 'recent': None}, START)
+    entry = models._advance_history_prefix(entry, _delta(rows, entry, before), before)
+    rows.insert(250, late)
+    for before in (rows[260]['timestamp'], rows[260]['timestamp'], rows[280]['timestamp']):
+        entry = models._advance_history_prefix(entry, _delta(rows, entry, before), before)
+        assert models._history_prefix_result(entry) == _full(rows, before)
+
+
+def test_prefix_queries_match_full_history(db_dsn):
+    import asyncpg
+
+    async def scenario():
+        pool = await asyncpg.create_pool(db_dsn, min_size=1, max_size=2)
+        try:
+            await pool.execute("DROP TABLE IF EXISTS coin_metrics")
+            await pool.execute("""
+                CREATE TABLE coin_metrics (
+                    mint TEXT NOT NULL,
+                    timestamp TIMESTAMPTZ NOT NULL,
+                    phase_id_at_time INT,
+                    price_high NUMERIC,
+                    dev_sold_amount NUMERIC
+                )
+            """)
+            rows = {mint: _rows(400, seed=seed) for seed, mint in enumerate(('mint-a', 'mint-b'))}
+            late = rows['mint-a'].pop(260)
+
+            async def insert(mint, batch):
+                await pool.executemany(
+                    "INSERT INTO coin_metrics VALUES ($1, $2, 1, $3, $4)",
+                    [(mint, r['timestamp'], r['price_high'], r['dev_sold_amount']) for r in batch])
+
+            for mint, batch in rows.items():
+                await insert(mint, batch)
+            models._HISTORY_PREFIX_CACHE.clear()
+            for step, i in enumerate(range(100, 400, 25)):
+                if step == 8:
+                    await insert('mint-a', [late])
+                    rows['mint-a'].insert(260, late)
+                befores = {mint: batch[i - 1]['timestamp'] for mint, batch in rows.items()}
+                bulk = await models.get_coin_history_prefixes_bulk(befores, phases=[1], pool=pool)
+                single = await models.get_coin_history_prefix('mint-a', befores['mint-a'], phases=[1], pool=pool)
+                for mint, batch in rows.items():
+                    assert bulk[mint] == _full(batch, befores[mint])
+                assert single == _full(rows['mint-a'], befores['mint-a'])
+            # Zeitpunkt vor dem gecachten Stand -> volle Aggregation
+            earlier = rows['mint-b'][120]['timestamp']
+            assert await models.get_coin_history_prefix('mint-b', earlier, pool=pool) == _full(rows['mint-b'], earlier)
+        finally:
+            await pool.execute("DROP TABLE IF EXISTS coin_metrics")
+            await pool.close()
+
+    run(scenario())
+
+
+@pytest.mark.parametrize("rows", [200, 45])
+def test_bounded_window_with_prefix_matches_full_history(rows):
+    """Letzte 2*max(w)+1 Zeilen + Prefix-Aggregat liefern dieselben Features wie die gesamte Historie"""
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("pandas")
+    pytest.importorskip("prometheus_client")
+    from app.prediction.feature_processor import create_pump_detection_features
+    from test_streaming_features import WINDOWS, _frame
+
+    frame = _frame(rows, seed=rows)
+    history_rows = 2 * max(WINDOWS) + 1
+    window, older = frame.iloc[-history_rows:].copy(), frame.iloc[:-history_rows]
+    ath = older['price_high'].max()
+    prefix = {
+        'first_ts': older.index[0].to_pydatetime(),
+        'ath': float(ath),
+        'ath_ts': older.index[older['price_high'] == ath][0].to_pydatetime(),
+        'dev_sold_sum': float(older['dev_sold_amount'].fillna(0).sum()),
+        'row_count': len(older),
+    }
+    expected = create_pump_detection_features(frame, WINDOWS, include_flags=True).iloc[-1]
+    actual = create_pump_detection_features(window, WINDOWS, include_flags=True, prefix=prefix).iloc[-1]
+    assert list(actual.index) == list(expected.index)
+    assert np.allclose(actual.to_numpy(dtype=float), expected.to_numpy(dtype=float), rtol=1e-9, atol=1e-9, equal_nan=True)
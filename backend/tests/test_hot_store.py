@@ -0,0 +1,159 @@
+"""
+Hot-Store vs. coin_metrics: Fenster und Full-History-Aggregat nach Delta-Syncs mit spät committeten Zeilen
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+pytest.importorskip("asyncpg")
+pytest.importorskip("prometheus_client")
+
+from conftest import run  # noqa: E402
+from app.prediction.hot_store import MISS, HotStore  # noqa: E402
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+COLUMNS = frozenset({'phase_id_at_time', 'price_high', 'price_close', 'dev_sold_amount'})
+MINTS = ('mint-a', 'mint-b')
+
+
+def _table(count: int, seed: int):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(count):
+        rows.append({
+            'mint': MINTS[seed],
+            'timestamp': START + timedelta(seconds=5 * i),
+            'phase_id_at_time': 1 if i < count // 2 else 2,
+            'price_high': float(rng.choice([1.0, 2.0, 3.0, 5.0]) * (i // 30 + 1)),
+            'price_close': float(rng.uniform(0, 1)),
+            'dev_sold_amount': None if rng.uniform() < 0.2 else float(rng.integers(0, 9)),
+        })
+    return rows
+
+
+class _FakePool:
+    """Beantwortet die drei Queries des Hot-Stores aus einer In-Memory-Tabelle"""
+
+    def __init__(self):
+        self.rows = []
+
+    async def execute_insert(self, rows):
+        self.rows.extend(rows)
+
+    def _coin(self, mint):
+        return sorted((r for r in self.rows if r['mint'] == mint), key=lambda r: r['timestamp'])
+
+    async def fetch(self, query, *args):
+        if 'LIMIT' in query:  # Bootstrap
+            mints, limit = args
+            return [r for m in mints for r in reversed(self._coin(m)[-limit:])]
+        if 'prefix' in query:  # Phasen-Aggregate vor dem Buffer
+            result = []
+            for mint, before in zip(*args):
+                older = [r for r in self._coin(mint) if r['timestamp'] < before]
+                for phase in sorted({r['phase_id_at_time'] for r in older}):
+                    group = [r for r in older if r['phase_id_at_time'] == phase]
+                    ath = max(r['price_high'] for r in group)
+                    result.append({
+                        'mint': mint, 'phase_id': phase,
+                        'first_ts': group[0]['timestamp'], 'ath': ath,
+                        'ath_ts': min(r['timestamp'] for r in group if r['price_high'] == ath),
+                        'dev_sold_sum': sum(r['dev_sold_amount'] or 0 for r in group),
+                        'row_count': len(group),
+                    })
+            return result
+        mints, sinces = args  # Delta
+        return [r for m, since in zip(mints, sinces) for r in self._coin(m) if r['timestamp'] > since]
+
+
+async def _db_pool(dsn):
+    import asyncpg
+    pool = await asyncpg.create_pool(dsn, min_size=1, max_size=2)
+    await pool.execute("DROP TABLE IF EXISTS coin_metrics")
+    await pool.execute("""
+        CREATE TABLE coin_metrics (
+            mint TEXT NOT NULL,
+            timestamp TIMESTAMPTZ NOT NULL,
+            phase_id_at_time INT,
+            price_high DOUBLE PRECISION,
+            price_close DOUBLE PRECISION,
+            dev_sold_amount DOUBLE PRECISION,
+            PRIMARY KEY (mint, timestamp)
+        )
+    """)
+
+    async def execute_insert(rows):
+        await pool.executemany(
+            "INSERT INTO coin_metrics VALUES ($1, $2, $3, $4, $5, $6)",
+            [tuple(r.values()) for r in rows])
+
+    pool.execute_insert = execute_insert
+    return pool
+
+
+def _assert_matches_table(store, table, window_rows):
+    for mint in MINTS:
+        committed = sorted((r for r in table if r['mint'] == mint), key=lambda r: r['timestamp'])
+        frame = store.history(mint, (), COLUMNS, window_rows)
+        assert frame is not MISS
+        window, older = committed[-window_rows:], committed[:-window_rows]
+        assert [ts.to_pydatetime() for ts in frame.index] == [r['timestamp'] for r in window]
+        assert np.allclose(frame['price_high'].to_numpy(), [r['price_high'] for r in window])
+        assert np.allclose(frame['dev_sold_amount'].to_numpy(),
+                           [np.nan if r['dev_sold_amount'] is None else r['dev_sold_amount'] for r in window],
+                           equal_nan=True)
+        ath = max(r['price_high'] for r in older)
+        assert frame.attrs['history_prefix'] == {
+            'first_ts': older[0]['timestamp'],
+            'ath': ath,
+            'ath_ts': min(r['timestamp'] for r in older if r['price_high'] == ath),
+            'dev_sold_sum': sum(r['dev_sold_amount'] or 0 for r in older),
+            'row_count': len(older),
+        }
+
+
+async def _scenario(pool, capacity: int):
+    store = HotStore(enabled=True, capacity=capacity, ttl_seconds=3600, max_bytes=1 << 30, max_staleness_seconds=3600)
+    tables = {mint: _table(200, seed) for seed, mint in enumerate(MINTS)}
+    committed = []
+
+    async def commit(rows):
+        await pool.execute_insert(rows)
+        committed.extend(rows)
+
+    await commit([r for mint in MINTS for r in tables[mint][:60]])
+    await store.ingest(list(MINTS), pool)
+    _assert_matches_table(store, committed, min(capacity, 8))
+
+    # Pro Schritt 20 neue Zeilen, die erste davon wird erst im nächsten Schritt committet (liegt < 120s zurück)
+    late = []
+    for start in range(60, 200, 20):
+        chunk = [r for mint in MINTS for r in tables[mint][start:start + 20]]
+        delayed = [r for r in chunk if r['timestamp'] == START + timedelta(seconds=5 * start)]
+        await commit(late + [r for r in chunk if r not in delayed])
+        late = delayed
+        await store.ingest(list(MINTS), pool)
+        _assert_matches_table(store, committed, min(capacity, 8))
+    await commit(late)
+    await store.ingest(list(MINTS), pool)
+    _assert_matches_table(store, committed, min(capacity, 8))
+
+
+@pytest.mark.parametrize("capacity", [50, 10])
+def test_delta_sync_picks_up_late_rows(capacity):
+    # capacity=10: späte Zeile liegt vor dem Buffer -> Coin wird neu geladen statt falsch gezählt
+    run(_scenario(_FakePool(), capacity))
+
+
+def test_delta_sync_against_postgres(db_dsn):
+    async def scenario():
+        pool = await _db_pool(db_dsn)
+        try:
+            await _scenario(pool, 50)
+        finally:
+            await pool.execute("DROP TABLE IF EXISTS coin_metrics")
+            await pool.close()
+
+    run(scenario())
@@ -0,0 +1,151 @@
+"""
+Batch-Write der Vorhersagen (ein Statement) inkl. Verarbeitungsstand gegen eine lokale PostgreSQL-Instanz
+"""
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+asyncpg = pytest.importorskip("asyncpg")
+
+from conftest import run  # noqa: E402
+from app.database import models  # noqa: E402
+
+MIGRATIONS = Path(__file__).resolve().parents[2] / 'sql' / 'migrations'
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+CONSUMER = 'test_consumer'
+
+
+def _row(coin_id: str, seconds: int, probability: float, active_model_id: int):
+    return models.build_model_prediction_row(
+        coin_id=coin_id,
+        prediction_timestamp=START + timedelta(seconds=seconds),
+        model_id=10,
+        active_model_id=active_model_id,
+        prediction=int(probability >= 0.5),
+        probability=probability,
+        alert_threshold=0.7,
+        future_minutes=5,
+        metrics={'price_close': 1.5, 'volume_sol': 3.0},
+        phase_id_at_time=1
+    )
+
+
+def test_build_row_tags_and_evaluation_timestamp():
+    assert [_row('a', 0, p, 1)[5] for p in (0.2, 0.5, 0.69, 0.7)] == ['negativ', 'positiv', 'positiv', 'alert']
+    row = _row('a', 0, 0.9, 1)
+    assert row[7] - row[6] == timedelta(minutes=5)
+    assert (row[8], row[14]) == (1.5, 1)
+
+
+async def _prediction_pool(dsn):
+    pool = await asyncpg.create_pool(dsn, min_size=1, max_size=2)
+    await pool.execute("DROP TABLE IF EXISTS coin_scan_cache, model_predictions, prediction_active_models, prediction_watermarks")
+    # Nur die Spalten, die der Batch-Write anfasst
+    await pool.execute("""
+        CREATE TABLE prediction_active_models (
+            id BIGSERIAL PRIMARY KEY,
+            total_predictions INTEGER DEFAULT 0,
+            last_prediction_at TIMESTAMP WITH TIME ZONE,
+            updated_at TIMESTAMP WITH TIME ZONE
+        );
+        CREATE TABLE model_predictions (
+            id BIGSERIAL PRIMARY KEY,
+            coin_id VARCHAR(255) NOT NULL,
+            model_id BIGINT NOT NULL,
+            active_model_id BIGINT,
+            prediction INTEGER NOT NULL,
+            probability NUMERIC(5, 4) NOT NULL,
+            tag VARCHAR(20) NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'aktiv',
+            prediction_timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+            evaluation_timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+            price_close_at_prediction NUMERIC(20, 8),
+            price_open_at_prediction NUMERIC(20, 8),
+            price_high_at_prediction NUMERIC(20, 8),
+            price_low_at_prediction NUMERIC(20, 8),
+            market_cap_at_prediction NUMERIC(20, 2),
+            volume_at_prediction NUMERIC(20, 2),
+            phase_id_at_prediction INTEGER
+        );
+        CREATE TABLE coin_scan_cache (
+            coin_id VARCHAR(255) NOT NULL,
+            active_model_id BIGINT NOT NULL,
+            last_scan_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            last_prediction INTEGER NOT NULL,
+            last_probability NUMERIC(5, 4) NOT NULL,
+            was_alert BOOLEAN NOT NULL DEFAULT FALSE,
+            ignore_until TIMESTAMP WITH TIME ZONE,
+            ignore_reason VARCHAR(20),
+            updated_at TIMESTAMP WITH TIME ZONE,
+            UNIQUE (coin_id, active_model_id)
+        );
+    """)
+    # Unique-Index + prediction_watermarks wie in Produktion
+    await pool.execute((MIGRATIONS / 'add_prediction_idempotency.sql').read_text())
+    return pool
+
+
+async def _drop(pool):
+    await pool.execute("DROP TABLE IF EXISTS coin_scan_cache, model_predictions, prediction_active_models, prediction_watermarks")
+    await pool.close()
+
+
+def test_batch_write_is_idempotent_and_moves_watermark_forward(db_dsn):
+    async def scenario():
+        pool = await _prediction_pool(db_dsn)
+        try:
+            model_id = await pool.fetchval("INSERT INTO prediction_active_models DEFAULT VALUES RETURNING id")
+            rows = [_row('mint-a', 0, 0.2, model_id), _row('mint-b', 5, 0.9, model_id), _row('mint-c', 5, 0.6, model_id)]
+            scan = [models.compute_scan_cache_entry(r[0], model_id, r[3], r[4], 0.7, 60, 120, 300) for r in rows]
+
+            ids = await models.save_model_predictions_batch(
+                rows, scan_cache_rows=scan, watermark=(CONSUMER, START + timedelta(seconds=5), 'mint-c'), pool=pool)
+            assert len(ids) == 3
+            assert await pool.fetchval("SELECT total_predictions FROM prediction_active_models") == 3
+            assert await pool.fetchval("SELECT COUNT(*) FROM coin_scan_cache WHERE ignore_reason = 'alert'") == 1
+            assert await models.get_processing_watermark(pool, CONSUMER) == (START + timedelta(seconds=5), 'mint-c')
+
+            # Replay mit älterem Stand: keine Duplikate, Zähler und Stand unverändert
+            assert await models.save_model_predictions_batch(
+                rows, watermark=(CONSUMER, START, 'mint-z'), pool=pool) == []
+            assert await pool.fetchval("SELECT COUNT(*) FROM model_predictions") == 3
+            assert await pool.fetchval("SELECT total_predictions FROM prediction_active_models") == 3
+            assert await models.get_processing_watermark(pool, CONSUMER) == (START + timedelta(seconds=5), 'mint-c')
+
+            # Gemischter Batch: nur die neue Zeile zählt, Stand zieht nach
+            mixed = [rows[1], _row('mint-d', 10, 0.1, model_id)]
+            assert len(await models.save_model_predictions_batch(
+                mixed, watermark=(CONSUMER, START + timedelta(seconds=10), 'mint-d'), pool=pool)) == 1
+            assert await pool.fetchval("SELECT total_predictions FROM prediction_active_models") == 4
+            assert await models.get_processing_watermark(pool, CONSUMER) == (START + timedelta(seconds=10), 'mint-d')
+
+            # Gleicher Timestamp, kleinerer Mint -> kein Rückschritt; nur rewind setzt zurück
+            await models.save_processing_watermark(pool, START + timedelta(seconds=10), 'mint-a', consumer=CONSUMER)
+            assert await models.get_processing_watermark(pool, CONSUMER) == (START + timedelta(seconds=10), 'mint-d')
+            assert await models.rewind_processing_watermark(pool, START, 'mint-a', consumer=CONSUMER)
+            assert not await models.rewind_processing_watermark(pool, START + timedelta(seconds=10), 'mint-a', consumer=CONSUMER)
+            assert await models.get_processing_watermark(pool, CONSUMER) == (START, 'mint-a')
+        finally:
+            await _drop(pool)
+
+    run(scenario())
+
+
+def test_failed_batch_rolls_back_watermark(db_dsn):
+    async def scenario():
+        pool = await _prediction_pool(db_dsn)
+        try:
+            model_id = await pool.fetchval("INSERT INTO prediction_active_models DEFAULT VALUES RETURNING id")
+            await models.save_processing_watermark(pool, START, 'mint-a', consumer=CONSUMER)
+            broken = [_row('mint-b', 5, 0.4, model_id)[:5] + ('ungültig-zu-lang' * 5,) + _row('mint-b', 5, 0.4, model_id)[6:]]
+            with pytest.raises(asyncpg.exceptions.StringDataRightTruncationError):
+                await models.save_model_predictions_batch(
+                    broken, watermark=(CONSUMER, START + timedelta(seconds=5), 'mint-b'), pool=pool)
+            # Ein Statement = eine Transaktion: weder Vorhersage noch Stand geschrieben
+            assert await pool.fetchval("SELECT COUNT(*) FROM model_predictions") == 0
+            assert await models.get_processing_watermark(pool, CONSUMER) == (START, 'mint-a')
+        finally:
+            await _drop(pool)
+
+    run(scenario())
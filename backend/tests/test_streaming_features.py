@@ -0,0 +1,98 @@
+"""
+Parität Streaming-Features (laufende Window-Aggregate) vs. create_pump_detection_features
+"""
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("asyncpg")
+pytest.importorskip("prometheus_client")
+
+from app.prediction.feature_processor import ENGINEERING_BASE_COLUMNS, create_pump_detection_features  # noqa: E402
+from app.prediction.streaming_features import CoinFeatureState, _RunningWindow, required_rows  # noqa: E402
+
+WINDOWS = [5, 10, 15]
+
+
+def _frame(rows: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    index = pd.DatetimeIndex([start + timedelta(seconds=5 * i + int(rng.integers(0, 3))) for i in range(rows)], name='timestamp')
+    price = np.cumprod(1 + rng.normal(0, 0.05, rows)) * 1e-6
+    data = {column: rng.gamma(2.0, 10.0, rows) for column in ENGINEERING_BASE_COLUMNS}
+    data['price_close'] = price
+    data['price_high'] = price * (1 + rng.uniform(0, 0.1, rows))
+    data['net_volume_sol'] = rng.normal(0, 5, rows)
+    data['buy_pressure_ratio'] = rng.uniform(0, 1, rows)
+    data['unique_signer_ratio'] = rng.uniform(0, 0.8, rows)
+    data['dev_sold_amount'] = np.where(rng.uniform(0, 1, rows) < 0.1, rng.gamma(2.0, 5.0, rows), 0.0)
+    frame = pd.DataFrame(data, index=index)
+    # Lücken wie in coin_metrics (NULL -> NaN)
+    for column in ('volatility_pct', 'whale_buy_volume_sol', 'buy_pressure_ratio', 'volume_sol', 'net_volume_sol'):
+        frame.loc[rng.uniform(0, 1, rows) < 0.05, column] = np.nan
+    return frame
+
+
+def _assert_row_matches(streamed, expected_row):
+    mismatches = []
+    for feature, expected in expected_row.items():
+        if feature not in streamed:
+            continue
+        actual = float(streamed[feature])
+        if not math.isclose(actual, float(expected), rel_tol=1e-9, abs_tol=1e-9):
+            mismatches.append((feature, expected, actual))
+    assert not mismatches, mismatches[:10]
+
+
+def test_streaming_matches_pandas_for_every_row():
+    frame = _frame(400)
+    state = CoinFeatureState('mint', (), capacity=required_rows(WINDOWS))
+    for i, (ts, values) in enumerate(frame.iterrows()):
+        state.ingest({'timestamp': ts.to_pydatetime(), **values.to_dict()})
+        # Windows erst nach einigen Zeilen registrieren (Aufbau aus dem Ring-Buffer), danach laufend
+        if i < 40 or i % 9:
+            continue
+        reference = create_pump_detection_features(frame.iloc[:i + 1], WINDOWS, include_flags=True)
+        _assert_row_matches(state.emit(WINDOWS, include_flags=True), reference.iloc[-1])
+
+
+def test_streaming_window_added_later_is_built_from_buffer():
+    frame = _frame(120, seed=11)
+    state = CoinFeatureState('mint', (), capacity=required_rows([5, 10, 15, 20]))
+    for ts, values in frame.iterrows():
+        state.ingest({'timestamp': ts.to_pydatetime(), **values.to_dict()})
+    state.emit([5])
+    reference = create_pump_detection_features(frame, [5, 20])
+    _assert_row_matches(state.emit([5, 20]), reference.iloc[-1])
+
+
+def test_running_window_handles_nan_and_inf():
+    window = _RunningWindow(3)
+    for value in (1.0, math.nan, math.inf, 2.0):
+        window.push(value)
+    assert window.sum() == math.inf
+    window.push(4.0)
+    window.push(5.0)  # inf ist herausgefallen
+    assert window.sum() == 11.0
+    assert window.mean() == pytest.approx(11.0 / 3)
+    assert window.previous_mean == math.inf
+    window.push(-math.inf)
+    window.push(math.inf)
+    assert math.isnan(window.sum())
+
+
+def test_running_window_matches_pandas_rolling():
+    rng = np.random.default_rng(3)
+    values = np.where(rng.uniform(0, 1, 2000) < 0.8, 0.0, rng.gamma(2.0, 1e6, 2000))
+    values[rng.uniform(0, 1, 2000) < 0.05] = np.nan
+    series = pd.Series(values)
+    expected_mean = series.rolling(10, min_periods=1).mean()
+    expected_sum = series.rolling(10, min_periods=1).sum()
+    window = _RunningWindow(10)
+    for i, value in enumerate(values):
+        window.push(float(value))
+        assert window.mean() == pytest.approx(expected_mean[i], rel=1e-12, abs=1e-12, nan_ok=True)
+        assert window.sum() == pytest.approx(expected_sum[i], rel=1e-12, abs=1e-12, nan_ok=True)
@@ -0,0 +1,71 @@
+"""
+Parität kompilierter Baum-Ensembles gegen trainierte RandomForest- und XGBoost-Modelle
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("asyncpg")
+ensemble = pytest.importorskip("sklearn.ensemble")
+
+from app.prediction.tree_compiler import CompiledTreeEnsemble, compile_model  # noqa: E402
+from app.utils.config import TREE_COMPILER_PARITY_ATOL  # noqa: E402
+
+
+def _training_data(rows: int = 3000, features: int = 12, seed: int = 5):
+    rng = np.random.RandomState(seed)
+    X = rng.normal(size=(rows, features)).astype(np.float32)
+    X[:, 3] = rng.gamma(2.0, 1e3, rows)  # grobe Skala wie Volumen-Features
+    logit = X[:, 0] * 1.5 - X[:, 1] + 0.5 * X[:, 2] * X[:, 4] + np.log1p(X[:, 3]) * 0.2 - 1.0
+    y = (logit + rng.logistic(size=rows) > 0).astype(int)
+    return X, y
+
+
+def _assert_parity(compiled, model, X):
+    assert isinstance(compiled, CompiledTreeEnsemble), "Modell ist auf das Original zurückgefallen"
+    expected = np.asarray(model.predict_proba(X))
+    actual = compiled.predict_proba(X)
+    assert actual.shape == expected.shape
+    assert np.max(np.abs(actual - expected)) <= TREE_COMPILER_PARITY_ATOL
+
+
+def test_default_tolerance_is_set():
+    # 0 (bit-exakt) lässt jedes XGBoost-Modell an float32-Rundung scheitern
+    assert TREE_COMPILER_PARITY_ATOL > 0
+
+
+@pytest.mark.parametrize("n_jobs", [1, 4])
+def test_random_forest_compiles_with_parity(n_jobs):
+    X, y = _training_data()
+    model = ensemble.RandomForestClassifier(n_estimators=60, max_depth=12, n_jobs=n_jobs, random_state=1).fit(X, y)
+    compiled = compile_model(model, label="rf-test")
+    X_test, _ = _training_data(rows=2000, seed=9)
+    _assert_parity(compiled, model, X_test)
+
+
+def test_xgboost_compiles_with_parity():
+    xgboost = pytest.importorskip("xgboost")
+    X, y = _training_data()
+    model = xgboost.XGBClassifier(n_estimators=300, max_depth=6, learning_rate=0.1, random_state=1).fit(X, y)
+    compiled = compile_model(model, label="xgb-test")
+    X_test, _ = _training_data(rows=2000, seed=9)
+    X_test[np.random.RandomState(3).rand(*X_test.shape) < 0.05] = np.nan
+    _assert_parity(compiled, model, X_test)
+
+
+def test_xgboost_mmap_artifact_roundtrip(tmp_path, monkeypatch):
+    xgboost = pytest.importorskip("xgboost")
+    joblib = pytest.importorskip("joblib")
+    from app.prediction import model_artifacts
+
+    monkeypatch.setattr(model_artifacts, "TREE_COMPILER_ENABLED", True)
+    monkeypatch.setattr(model_artifacts, "MODEL_MMAP_ARTIFACTS", True)
+    X, y = _training_data()
+    model = xgboost.XGBClassifier(n_estimators=100, max_depth=5, random_state=1).fit(X, y)
+    model_file = str(tmp_path / "model.pkl")
+    joblib.dump(model, model_file)
+
+    loaded = model_artifacts.load_inference_model(model_file, label="xgb-artifact")
+    assert isinstance(loaded.value, np.memmap)
+    X_test, _ = _training_data(rows=1000, seed=9)
+    _assert_parity(loaded, model, X_test)
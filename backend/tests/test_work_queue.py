@@ -0,0 +1,125 @@
+"""
+Work-Queue: Claim/Ack/Release-Zyklus mit mehreren Workern gegen eine lokale PostgreSQL-Instanz
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("asyncpg")
+
+from conftest import run  # noqa: E402
+from app.prediction.work_queue import WorkQueue, mint_partition, parse_partitions  # noqa: E402
+from app.utils.config import WORK_QUEUE_PARTITIONS  # noqa: E402
+
+MIGRATION = Path(__file__).resolve().parents[2] / 'sql' / 'migrations' / 'create_prediction_work_queue.sql'
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def test_parse_partitions():
+    assert parse_partitions('') is None
+    assert parse_partitions('0-2, 5,5') == [0, 1, 2, 5]
+    assert parse_partitions(f'{WORK_QUEUE_PARTITIONS - 1}-{WORK_QUEUE_PARTITIONS + 3}') == [WORK_QUEUE_PARTITIONS - 1]
+
+
+def test_mint_partition_is_stable():
+    assert mint_partition('mint-a') == mint_partition('mint-a')
+    assert 0 <= mint_partition('mint-a') < WORK_QUEUE_PARTITIONS
+
+
+async def _queue_pool(dsn):
+    import asyncpg
+    pool = await asyncpg.create_pool(dsn, min_size=2, max_size=4)
+    await pool.execute("DROP TABLE IF EXISTS prediction_work_queue")
+    await pool.execute(MIGRATION.read_text())
+    return pool
+
+
+async def _row(pool, mint):
+    return await pool.fetchrow("SELECT * FROM prediction_work_queue WHERE mint = $1", mint)
+
+
+def test_claim_ack_release_cycle(db_dsn):
+    async def scenario():
+        pool = await _queue_pool(db_dsn)
+        w1, w2 = WorkQueue('worker-1'), WorkQueue('worker-2')
+        try:
+            await w1.enqueue(pool, [
+                {'mint': 'mint-a', 'timestamp': START, 'phase_id': 1},
+                {'mint': 'mint-b', 'timestamp': START + timedelta(seconds=5), 'phase_id': 1},
+            ])
+            claimed = await w1.claim(pool, 1)
+            assert [(c['mint'], c['attempts']) for c in claimed] == [('mint-a', 1)]  # älteste zuerst
+
+            # Neuer Eintrag während der Lease: Lease bleibt, kein zweiter Worker bekommt den Mint
+            await w1.enqueue(pool, [{'mint': 'mint-a', 'timestamp': START + timedelta(seconds=10), 'phase_id': 2}])
+            row = await _row(pool, 'mint-a')
+            assert row['claimed_by'] == 'worker-1' and row['timestamp'] == START + timedelta(seconds=10)
+            assert [c['mint'] for c in await w2.claim(pool, 10)] == ['mint-b']
+            assert await w2.claim(pool, 10) == []
+
+            # Älterer Eintrag überschreibt keinen neueren
+            await w2.enqueue(pool, [{'mint': 'mint-a', 'timestamp': START, 'phase_id': 1}])
+            assert (await _row(pool, 'mint-a'))['timestamp'] == START + timedelta(seconds=10)
+
+            # Ack des alten Stands löscht nicht, gibt den neuen Auftrag aber sofort frei
+            assert await w1.ack(pool, claimed) == 0
+            row = await _row(pool, 'mint-a')
+            assert row['claimed_by'] is None and row['attempts'] == 0
+            reclaimed = await w2.claim(pool, 10)
+            assert [(c['mint'], c['timestamp'], c['phase_id']) for c in reclaimed] == [
+                ('mint-a', START + timedelta(seconds=10), 2)
+            ]
+
+            # Release nur durch den haltenden Worker, ohne Versuch zu zählen
+            assert await w1.release(pool, reclaimed) == 0
+            assert await w2.release(pool, reclaimed) == 1
+            row = await _row(pool, 'mint-a')
+            assert row['claimed_by'] is None and row['attempts'] == 0
+
+            again = await w1.claim(pool, 10)
+            assert [c['mint'] for c in again] == ['mint-a']
+            assert await w1.ack(pool, again) == 1
+            assert await _row(pool, 'mint-a') is None
+        finally:
+            await pool.execute("DROP TABLE IF EXISTS prediction_work_queue")
+            await pool.close()
+
+    run(scenario())
+
+
+def test_concurrent_workers_claim_disjoint_items(db_dsn):
+    async def scenario():
+        pool = await _queue_pool(db_dsn)
+        workers = [WorkQueue(f'worker-{i}') for i in range(4)]
+        mints = [f'mint-{i:03d}' for i in range(200)]
+        try:
+            await workers[0].enqueue(pool, [
+                {'mint': mint, 'timestamp': START + timedelta(seconds=i), 'phase_id': 1}
+                for i, mint in enumerate(mints)
+            ])
+            seen = []
+
+            async def work(queue):
+                while True:
+                    items = await queue.claim(pool, 7)
+                    if not items:
+                        return
+                    # Ingestion schreibt parallel neuere Einträge für geholte Mints
+                    await workers[0].enqueue(pool, [
+                        {**item, 'timestamp': item['timestamp'] + timedelta(hours=1)} for item in items[:2]
+                    ])
+                    seen.extend((item['mint'], item['timestamp']) for item in items)
+                    await queue.ack(pool, items)
+
+            await asyncio.gather(*(work(queue) for queue in workers))
+            # Jeder Stand genau einmal verarbeitet, aktualisierte Mints in einer zweiten Runde
+            assert len(seen) == len(set(seen))
+            assert {mint for mint, _ in seen} == set(mints)
+            assert await pool.fetchval("SELECT COUNT(*) FROM prediction_work_queue") == 0
+        finally:
+            await pool.execute("DROP TABLE IF EXISTS prediction_work_queue")
+            await pool.close()
+
+    run(scenario())
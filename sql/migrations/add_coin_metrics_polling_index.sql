@@ -0,0 +1,11 @@
+-- Migration: Index fuer das Keyset-Polling des Event-Handlers
+-- Datum: 2026-10-16
+-- Zweck: Das Polling liest coin_metrics seitenweise ab dem Cursor (timestamp, mint):
+--          WHERE (timestamp, mint) > ($1, $2) ORDER BY timestamp, mint LIMIT $3
+--        Mit diesem Index ist das ein Index-Range-Scan ueber die neuen Zeilen (phase_id_at_time
+--        per INCLUDE, ohne Heap-Zugriff) statt GROUP BY mint + Self-Join ueber das ganze Fenster.
+-- Hinweis: CONCURRENTLY blockiert keine Inserts, darf aber nicht in einer Transaktion laufen.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_coin_metrics_timestamp_mint
+    ON coin_metrics(timestamp, mint)
+    INCLUDE (phase_id_at_time);
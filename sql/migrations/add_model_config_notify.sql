@@ -0,0 +1,41 @@
+-- Migration: NOTIFY bei Änderungen der Modell-Konfiguration
+-- Datum: 2026-10-16
+-- Zweck: Der Event-Handler hält einen Konfigurations-Snapshot der aktiven Modelle und
+--        lädt ihn nur noch bei Änderungen neu (LISTEN prediction_model_config) statt alle 10s.
+--        Zähler-Updates (total_predictions, last_prediction_at) lösen bewusst KEIN NOTIFY aus.
+
+CREATE OR REPLACE FUNCTION notify_model_config_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify(
+        'prediction_model_config',
+        json_build_object(
+            'active_model_id', COALESCE(NEW.id, OLD.id),
+            'operation', TG_OP
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS prediction_active_models_config_notify ON prediction_active_models;
+CREATE TRIGGER prediction_active_models_config_notify
+    AFTER INSERT OR DELETE ON prediction_active_models
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_model_config_change();
+
+DROP TRIGGER IF EXISTS prediction_active_models_config_update_notify ON prediction_active_models;
+CREATE TRIGGER prediction_active_models_config_update_notify
+    AFTER UPDATE OF
+        model_name, model_type, target_variable, target_operator, target_value,
+        future_minutes, price_change_percent, target_direction,
+        features, phases, params, local_model_path, model_file_url, is_active,
+        custom_name, alert_threshold,
+        n8n_webhook_url, n8n_send_mode, n8n_enabled,
+        ignore_bad_seconds, ignore_positive_seconds, ignore_alert_seconds,
+        coin_filter_mode, coin_whitelist, min_scan_interval_seconds,
+        max_log_entries_per_coin_negative, max_log_entries_per_coin_positive, max_log_entries_per_coin_alert,
+        send_ignored_to_n8n
+    ON prediction_active_models
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_model_config_change();
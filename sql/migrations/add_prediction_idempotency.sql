@@ -0,0 +1,31 @@
+-- Migration: Idempotente Vorhersage-Writes + persistenter Verarbeitungsstand
+-- Datum: 2026-10-16
+-- Zweck: 1) Eindeutigkeit (active_model_id, coin_id, prediction_timestamp) in model_predictions -
+--           der Event-Handler schreibt mit ON CONFLICT DO NOTHING, Batches koennen gefahrlos
+--           wiederholt/nachgespielt werden.
+--        2) Tabelle prediction_watermarks: Cursor (timestamp, mint) des Event-Handlers, wird mit
+--           dem letzten Batch-Write committet - nach einem Neustart geht es exakt dort weiter.
+
+BEGIN;
+
+-- Bestehende Duplikate entfernen (aelteste Zeile bleibt) - sonst schlaegt der Unique-Index fehl
+DELETE FROM model_predictions mp
+USING model_predictions older
+WHERE mp.active_model_id = older.active_model_id
+  AND mp.coin_id = older.coin_id
+  AND mp.prediction_timestamp = older.prediction_timestamp
+  AND mp.id > older.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_model_predictions_unique_scan
+    ON model_predictions(active_model_id, coin_id, prediction_timestamp);
+
+CREATE TABLE IF NOT EXISTS prediction_watermarks (
+    consumer VARCHAR(50) PRIMARY KEY,
+    last_timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_mint VARCHAR(255) NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE prediction_watermarks IS 'Verarbeitungsstand (timestamp, mint) pro Konsument - z.B. event_handler';
+
+COMMIT;
@@ -0,0 +1,20 @@
+-- Migration: Leader pro Hintergrund-Job (Leader-Election ueber mehrere Replikas)
+-- Datum: 2026-10-16
+-- Zweck: Auswertungs-Loop, ATH-Tracking und Alert-Evaluator laufen nur auf dem Knoten, der den
+--        Advisory-Lock des Jobs haelt (pg_try_advisory_lock). Der Leader erneuert hier regelmaessig
+--        seine Lease - bleibt die Erneuerung aus, beendet ein anderer Knoten die Session des alten
+--        Leaders und uebernimmt. /health zeigt den aktuellen Leader pro Job.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS background_job_leaders (
+    job VARCHAR(50) PRIMARY KEY,
+    holder VARCHAR(100) NOT NULL,
+    backend_pid INTEGER NOT NULL,
+    acquired_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    renewed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE background_job_leaders IS 'Aktueller Leader (Knoten + Backend-PID der Lock-Session) pro Hintergrund-Job mit Lease';
+
+COMMIT;
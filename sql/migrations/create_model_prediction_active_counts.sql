@@ -0,0 +1,72 @@
+-- Migration: Zähler für aktive model_predictions pro Coin, Modell und Tag
+-- Datum: 2026-10-16
+-- Zweck: max_log_entries_per_coin_* Prüfung ohne COUNT(*) über model_predictions.
+--        Die Zähler werden per Trigger gepflegt (INSERT, Status-Wechsel aktiv -> inaktiv,
+--        DELETE) - damit stimmen sie für alle Schreiber (Event-Handler, API, Auswertungs-Job).
+
+-- In einer Transaktion: Trigger und Backfill sehen denselben Stand
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS model_prediction_active_counts (
+    coin_id VARCHAR(255) NOT NULL,
+    active_model_id BIGINT NOT NULL,
+    tag VARCHAR(20) NOT NULL,
+    active_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (coin_id, active_model_id, tag)
+);
+
+COMMENT ON TABLE model_prediction_active_counts IS 'Anzahl aktiver model_predictions pro Coin/Modell/Tag (per Trigger gepflegt, für max_log_entries_per_coin_*)';
+
+CREATE OR REPLACE FUNCTION model_predictions_adjust_active_count(
+    p_coin_id VARCHAR, p_active_model_id BIGINT, p_tag VARCHAR, p_delta INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    IF p_active_model_id IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO model_prediction_active_counts (coin_id, active_model_id, tag, active_count)
+    VALUES (p_coin_id, p_active_model_id, p_tag, GREATEST(p_delta, 0))
+    ON CONFLICT (coin_id, active_model_id, tag)
+    DO UPDATE SET active_count = GREATEST(model_prediction_active_counts.active_count + p_delta, 0);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION model_predictions_active_count_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'aktiv' THEN
+        PERFORM model_predictions_adjust_active_count(OLD.coin_id, OLD.active_model_id, OLD.tag, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'aktiv' THEN
+        PERFORM model_predictions_adjust_active_count(NEW.coin_id, NEW.active_model_id, NEW.tag, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS model_predictions_active_count_insert_delete ON model_predictions;
+CREATE TRIGGER model_predictions_active_count_insert_delete
+    AFTER INSERT OR DELETE ON model_predictions
+    FOR EACH ROW
+    EXECUTE FUNCTION model_predictions_active_count_trigger();
+
+-- Nur Änderungen an den gezählten Spalten lösen den Trigger aus (nicht z.B. ATH-Updates)
+DROP TRIGGER IF EXISTS model_predictions_active_count_update ON model_predictions;
+CREATE TRIGGER model_predictions_active_count_update
+    AFTER UPDATE OF status, tag, coin_id, active_model_id ON model_predictions
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.tag IS DISTINCT FROM NEW.tag
+          OR OLD.coin_id IS DISTINCT FROM NEW.coin_id
+          OR OLD.active_model_id IS DISTINCT FROM NEW.active_model_id)
+    EXECUTE FUNCTION model_predictions_active_count_trigger();
+
+-- Zähler aus dem aktuellen Bestand aufbauen
+TRUNCATE model_prediction_active_counts;
+INSERT INTO model_prediction_active_counts (coin_id, active_model_id, tag, active_count)
+SELECT coin_id, active_model_id, tag, COUNT(*)
+FROM model_predictions
+WHERE status = 'aktiv' AND active_model_id IS NOT NULL
+GROUP BY coin_id, active_model_id, tag;
+
+COMMIT;
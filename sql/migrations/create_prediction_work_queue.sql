@@ -0,0 +1,22 @@
+-- Migration: Work-Queue fuer verteilte Prediction-Worker
+-- Datum: 2026-10-16
+-- Zweck: Im verteilten Modus (EVENT_HANDLER_MODE=ingest/worker/distributed) schreibt die Ingestion
+--        pro Mint einen Arbeitsauftrag (neuester Eintrag gewinnt). Worker holen sich Auftraege per
+--        FOR UPDATE SKIP LOCKED (optional nur ihre Partitionen = Hash des Mints), verarbeiten sie und
+--        loeschen sie danach (Ack). Abgelaufene Leases werden von anderen Workern uebernommen.
+
+CREATE TABLE IF NOT EXISTS prediction_work_queue (
+    mint VARCHAR(255) PRIMARY KEY,
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    phase_id INTEGER,
+    partition SMALLINT NOT NULL,
+    enqueued_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    claimed_by VARCHAR(100),
+    claimed_until TIMESTAMP WITH TIME ZONE,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+
+COMMENT ON TABLE prediction_work_queue IS 'Arbeitsauftraege (Coin-Eintraege) fuer verteilte Prediction-Worker - ein Eintrag pro Mint';
+
+CREATE INDEX IF NOT EXISTS idx_prediction_work_queue_claim
+    ON prediction_work_queue(partition, timestamp);